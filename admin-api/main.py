@@ -21,7 +21,7 @@ elif env_file.exists():
     logger.info(f"✅ 已載入環境變數: {env_file}")
 
 # 在載入環境變數後才導入 routers
-from routers import devices, scenarios
+from routers import devices, scenarios, faults
 from routers.scenarios import init_db
 
 
@@ -101,6 +101,7 @@ app.add_middleware(
 # 註冊路由
 app.include_router(devices.router)
 app.include_router(scenarios.router)
+app.include_router(faults.router)
 
 
 @app.get("/")
@@ -0,0 +1,41 @@
+"""故障注入數據模型"""
+from pydantic import BaseModel, Field
+from typing import Dict, Optional, Literal
+
+
+class LatencySpec(BaseModel):
+    """附加延遲分佈（秒）"""
+    dist: Literal["fixed", "uniform", "normal", "exponential"] = "fixed"
+    value: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+
+
+class FlapSpec(BaseModel):
+    """離散輸入位元週期翻轉"""
+    bit: int = 0
+    period: float = Field(gt=0)
+
+
+class FaultSpec(BaseModel):
+    """設備故障設定 (欄位說明見 simulator/faults.py)"""
+    latency: Optional[LatencySpec] = None
+    timeout_rate: Optional[float] = Field(None, ge=0, le=1)
+    timeout_delay: Optional[float] = Field(None, ge=0)
+    drop_rate: Optional[float] = Field(None, ge=0, le=1)
+    exception_rate: Optional[float] = Field(None, ge=0, le=1)
+    exception_code: Optional[int] = None
+    corrupt_rate: Optional[float] = Field(None, ge=0, le=1)
+    stuck: Optional[Dict[int, int]] = None
+    flap: Optional[FlapSpec] = None
+    seed: Optional[int] = None
+
+
+class FaultResponse(BaseModel):
+    """故障命令響應模型"""
+    success: bool
+    target: str
+    command: Optional[dict] = None
+    message: Optional[str] = None
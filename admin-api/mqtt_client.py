@@ -16,6 +16,9 @@ DEVICE_TOPIC_MAP = {
     "ac220v_3p_meter": "pump/sensors/power/ac220_3p",
 }
 
+# 模擬器故障注入命令主題 (與 simulator/faults.py 相同)
+FAULT_COMMAND_TOPIC = "simulator/faults/set"
+
 class MQTTManager:
     """MQTT 客戶端管理器"""
     
@@ -99,6 +102,13 @@ class MQTTManager:
                 except Exception as retry_error:
                     logger.error(f"❌ 重試發布失敗: {retry_error}")
     
+    async def publish_fault_command(self, command: dict):
+        """發布故障注入命令到模擬器"""
+        if not self._connected or not self.client:
+            await self.connect()
+        await self.client.publish(FAULT_COMMAND_TOPIC, payload=json.dumps(command, ensure_ascii=False))
+        logger.info(f"💥 已發布故障命令: {command}")
+    
     async def publish_all_devices(self, devices_dict: dict):
         """發布所有啟用設備的數據"""
         from modbus_reader import modbus_reader
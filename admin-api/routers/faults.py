@@ -0,0 +1,39 @@
+"""故障注入 API 路由 (經 MQTT 下達模擬器)"""
+from fastapi import APIRouter, HTTPException
+from models.fault import FaultSpec, FaultResponse
+from loguru import logger
+
+router = APIRouter(prefix="/api/faults", tags=["faults"])
+
+
+async def _send(command: dict) -> FaultResponse:
+    from mqtt_client import mqtt_manager
+    try:
+        await mqtt_manager.publish_fault_command(command)
+    except Exception as e:
+        logger.error(f"❌ 發布故障命令失敗: {e}")
+        raise HTTPException(status_code=503, detail=f"MQTT 無法使用: {e}")
+    return FaultResponse(success=True, target=command["target"], command=command, message="故障命令已發送")
+
+
+@router.put("/{target:path}", response_model=FaultResponse)
+async def set_faults(target: str, spec: FaultSpec):
+    """
+    設定設備故障 (取代目前設定)
+
+    target 可為 "rig001/relay_io"、設備名稱 (所有測試台) 或 "*"
+    """
+    faults = spec.model_dump(exclude_none=True)
+    return await _send({"action": "set", "target": target, "faults": faults})
+
+
+@router.delete("/{target:path}", response_model=FaultResponse)
+async def clear_faults(target: str):
+    """清除設備故障"""
+    return await _send({"action": "clear", "target": target})
+
+
+@router.post("/status", response_model=FaultResponse)
+async def request_status():
+    """要求模擬器回報目前的故障 (回覆發布於 simulator/faults/status)"""
+    return await _send({"action": "status", "target": "*"})
@@ -0,0 +1,84 @@
+"""匯流排封包錄製效能測試
+
+以程序內的 pymodbus TCP 伺服器測量 AsyncModbusTcpClient 讀取寄存器的往返時間，
+比較未錄製與錄製 (trace_packet → BusCapture) 的差異，並單獨測量每次交換的錄製 CPU 時間。
+
+用法:
+    python benchmarks/bench_bus_capture.py
+    python benchmarks/bench_bus_capture.py --reads 5000
+"""
+import argparse
+import asyncio
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pymodbus.client import AsyncModbusTcpClient  # noqa: E402
+from pymodbus.server import ModbusTcpServer  # noqa: E402
+from pymodbus.datastore import ModbusDeviceContext, ModbusServerContext, ModbusSequentialDataBlock  # noqa: E402
+from drivers.bus_capture import BusCapture  # noqa: E402
+
+
+async def measure_reads(port: int, reads: int, trace=None) -> float:
+    """返回每次讀取的平均往返時間（秒）"""
+    client = AsyncModbusTcpClient("127.0.0.1", port=port, trace_packet=trace)
+    await client.connect()
+    for _ in range(50):
+        await client.read_holding_registers(address=0x1000, count=2, device_id=1)
+    started = time.perf_counter()
+    for _ in range(reads):
+        await client.read_holding_registers(address=0x1000, count=2, device_id=1)
+    elapsed = time.perf_counter() - started
+    client.close()
+    return elapsed / reads
+
+
+def measure_trace(capture: BusCapture, exchanges: int) -> float:
+    """返回每次交換 (請求 + 回應) 的錄製 CPU 時間（秒）"""
+    channel = capture.channel("bench:trace", "socket")
+    request = bytes.fromhex("000100000006010310000002")
+    response = bytes.fromhex("00010000000701030400010002")
+    started = time.perf_counter()
+    for i in range(exchanges):
+        tid = (i & 0xFFFF).to_bytes(2, "big")
+        channel.trace(True, tid + request[2:])
+        channel.trace(False, tid + response[2:])
+    return (time.perf_counter() - started) / exchanges
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="匯流排封包錄製效能測試")
+    parser.add_argument("--reads", type=int, default=2000, help="每輪讀取次數")
+    args = parser.parse_args()
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    store = ModbusDeviceContext(hr=ModbusSequentialDataBlock(1, [0] * 5000))
+    server = ModbusTcpServer(ModbusServerContext(devices={1: store}, single=False), address=("127.0.0.1", port))
+    server_task = asyncio.create_task(server.serve_forever())
+    await asyncio.sleep(0.2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = BusCapture(tmp)
+        baseline = await measure_reads(port, args.reads)
+        traced = await measure_reads(port, args.reads, capture.channel(f"tcp:127.0.0.1:{port}", "socket").trace)
+        per_exchange = measure_trace(capture, args.reads * 10)
+        capture.close()
+        size = capture.path.stat().st_size
+
+    await server.shutdown()
+    server_task.cancel()
+
+    print(f"讀取往返 (未錄製): {baseline * 1e6:8.1f} µs")
+    print(f"讀取往返 (錄製):   {traced * 1e6:8.1f} µs ({(traced / baseline - 1) * 100:+.1f}%)")
+    print(f"錄製 CPU 時間:     {per_exchange * 1e6:8.1f} µs/交換 ({per_exchange / baseline * 100:.1f}% 往返時間)")
+    print(f"錄製檔大小:        {size / (args.reads * 11 + 50):8.1f} B/交換")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""MQTT 訊息分派效能測試
+
+以錄製的訊息流 (或合成的感測器訊息流) 測量 MQTTClient._handle_message 的
+每秒處理訊息數與每則訊息 CPU 時間，並與舊版「每則訊息先 decode 再 json.loads」比較。
+
+用法:
+    python benchmarks/bench_message_dispatch.py
+    python benchmarks/bench_message_dispatch.py --recording data/mqtt_buffer/segment_00000001.log
+
+錄製檔格式與離線緩衝區相同 (JSON Lines，每行含 t=主題、p=內容)。
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiomqtt import Message  # noqa: E402
+from config.settings import settings  # noqa: E402
+from core import mqtt_client as mqtt_module  # noqa: E402
+from core.mqtt_client import MQTTClient  # noqa: E402
+
+
+SENSOR_TOPICS = [
+    "pump/sensors/flow",
+    "pump/sensors/pressure/positive",
+    "pump/sensors/pressure/vacuum",
+    "pump/sensors/power/dc",
+    "pump/sensors/power/ac220_3p",
+    "pump/safety/status",
+]
+
+
+def load_stream(recording: str, count: int) -> list:
+    """載入錄製的訊息流，或合成感測器訊息流"""
+    if recording:
+        messages = []
+        with open(recording, "rb") as f:
+            for line in f:
+                record = json.loads(line)
+                payload = json.dumps(record["p"], ensure_ascii=False).encode()
+                messages.append(Message(record["t"], payload, 0, False, 0, None))
+        return messages
+
+    rng = random.Random(0)
+    messages = []
+    for i in range(count):
+        topic = SENSOR_TOPICS[i % len(SENSOR_TOPICS)]
+        payload = {
+            "voltage": rng.uniform(0, 240),
+            "current": rng.uniform(0, 10),
+            "power": rng.uniform(0, 2),
+            "pressure_mpa": rng.uniform(-0.1, 1.0),
+            "timestamp": time.time(),
+        }
+        messages.append(
+            Message(topic, json.dumps(payload).encode(), 0, False, 0, None)
+        )
+    return messages
+
+
+async def legacy_handle(client: MQTTClient, message: Message):
+    """舊版分派: 每則訊息都 decode + json.loads，再查詢訂閱"""
+    topic = message.topic.value
+    payload = json.loads(message.payload.decode())
+    if topic in client.subscriptions:
+        client.subscriptions[topic](payload)
+
+
+async def run(handler, client: MQTTClient, messages: list) -> tuple:
+    """執行一輪分派，返回 (訊息/秒, 每則 CPU 微秒)"""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for message in messages:
+        await handler(message)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return len(messages) / wall, cpu / len(messages) * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recording", help="錄製的訊息流 (JSON Lines)")
+    parser.add_argument("--count", type=int, default=200_000, help="合成訊息數量")
+    parser.add_argument(
+        "--subscribed",
+        type=int,
+        default=3,
+        help="有訂閱者的感測器主題數量 (其餘主題無訂閱者)"
+    )
+    args = parser.parse_args()
+
+    settings.MQTT_BUFFER_DIR = tempfile.mkdtemp(prefix="bench_mqtt_")
+    client = MQTTClient(broker="localhost", port=1883)
+    for topic in SENSOR_TOPICS[:args.subscribed]:
+        client.subscribe(topic, lambda payload: None)
+
+    messages = load_stream(args.recording, args.count)
+    decoder = "orjson" if mqtt_module.orjson else "json"
+
+    print(f"訊息數量: {len(messages)}，有訂閱者的主題: {args.subscribed}/{len(SENSOR_TOPICS)}")
+    print(f"{'分派方式':<24}{'訊息/秒':>14}{'CPU µs/則':>14}")
+
+    rate, cpu = await run(lambda m: legacy_handle(client, m), client, messages)
+    print(f"{'舊版 (decode + json)':<24}{rate:>14,.0f}{cpu:>14.2f}")
+
+    rate, cpu = await run(client._handle_message, client, messages)
+    print(f"{f'篩選後解碼 ({decoder})':<24}{rate:>14,.0f}{cpu:>14.2f}")
+
+    client.offline_buffer.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
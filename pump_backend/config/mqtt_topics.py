@@ -13,6 +13,32 @@ SENSOR_POWER_AC220_3P = "pump/sensors/power/ac220_3p"
 CONTROL_VALVE = "pump/control/valve"
 CONTROL_POWER = "pump/control/power"
 CONTROL_TEST = "pump/control/test"
+CONTROL_QUEUE = "pump/control/queue"
+CONTROL_REFERENCE = "pump/control/reference"
+
+# 控制命令回應主題 (未使用 MQTT v5 response-topic 的舊版客戶端)
+CONTROL_VALVE_STATUS = "pump/control/valve/status"
+CONTROL_POWER_STATUS = "pump/control/power/status"
+CONTROL_QUEUE_STATUS = "pump/control/queue/status"
+CONTROL_REFERENCE_STATUS = "pump/control/reference/status"
+
+# 多工作站命名空間
+# 設定多個工作站時，各工作站主題為 pump/{station}/{來源主題去除 pump/ 前綴}
+# (如 pump/rig1/sensors/flow)；單一工作站時維持原主題
+TOPIC_ROOT = "pump"
+# 工作站 ID 不可與第一層主題名稱相同，避免命名空間主題與原主題混淆
+RESERVED_STATION_IDS = {"sensors", "control", "rpc", "safety", "system", "test", "state"}
+
+
+def station_topic(station_id: str, topic: str) -> str:
+    """將主題加上工作站命名空間 (非 pump/ 開頭的主題維持不變)"""
+    if topic.startswith(TOPIC_ROOT + "/"):
+        return f"{TOPIC_ROOT}/{station_id}/{topic[len(TOPIC_ROOT) + 1:]}"
+    return topic
+
+
+# 請求/回應 (RPC) 主題前綴，各客戶端回應主題為 {prefix}/{client_id}
+RPC_RESPONSE_PREFIX = "pump/rpc/response"
 
 # 安全狀態主題
 SAFETY_STATUS = "pump/safety/status"
@@ -21,10 +47,48 @@ SAFETY_ALERT = "pump/system/alert"
 # 系統狀態主題
 SYSTEM_STATUS = "pump/system/status"
 SYSTEM_HEALTH = "pump/system/health"
+RELAY_STATUS = "pump/system/relays"
 
 # 測試記錄主題
 TEST_RECORD = "pump/test/record"
 TEST_STATUS = "pump/test/status"
+TEST_QUEUE = "pump/test/queue"
 
+# 最新狀態快取主題
+# 各來源主題的最新值以保留訊息發布於 pump/state/{來源主題去除 pump/ 前綴}
+STATE_PREFIX = "pump/state"
+STATE_SNAPSHOT_REQUEST = "pump/state/snapshot/request"
+STATE_SNAPSHOT = "pump/state/snapshot"
+STATE_SOURCE_TOPICS = [
+    "pump/sensors/#",
+    SAFETY_STATUS,
+    RELAY_STATUS,
+    TEST_STATUS,
+    TEST_QUEUE,
+]
 
+# 發布 QoS 策略
+# 依序比對 (支援 MQTT 萬用字元)，第一個符合的規則生效
+# 遙測數據使用 QoS 0 避免每則訊息的 PUBACK 往返，命令與警報維持 QoS 1/2
+PUBLISH_QOS_POLICY = [
+    ("pump/sensors/#", 0),
+    (SAFETY_STATUS, 0),
+    (SYSTEM_STATUS, 0),
+    (SYSTEM_HEALTH, 0),
+    (SAFETY_ALERT, 2),
+    ("pump/control/#", 1),
+    ("pump/test/#", 1),
+    ("pump/state/#", 1),
+]
+# 工作站命名空間主題套用相同策略 (原主題規則優先比對)
+PUBLISH_QOS_POLICY += [(station_topic("+", p), qos) for p, qos in PUBLISH_QOS_POLICY]
+DEFAULT_PUBLISH_QOS = 1
 
+# 離線暫存主題
+# Broker 斷線期間這些主題的訊息會寫入磁碟緩衝區，重連後依序重送
+OFFLINE_BUFFER_TOPICS = [
+    "pump/sensors/#",
+    TEST_RECORD,
+    TEST_STATUS,
+]
+OFFLINE_BUFFER_TOPICS += [station_topic("+", p) for p in OFFLINE_BUFFER_TOPICS]
@@ -18,6 +18,59 @@ class Settings:
         self.MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
         self.MQTT_USERNAME = os.getenv("MQTT_USERNAME")
         self.MQTT_PASSWORD = os.getenv("MQTT_PASSWORD")
+        # 發布管線: 同時在途訊息上限 (對應 mosquitto.conf max_inflight_messages)
+        self.MQTT_MAX_INFLIGHT = int(os.getenv("MQTT_MAX_INFLIGHT", "20"))
+        self.MQTT_PUBLISH_QUEUE_SIZE = int(os.getenv("MQTT_PUBLISH_QUEUE_SIZE", "1000"))
+        # 離線暫存: 斷線期間將遙測/測試紀錄寫入磁碟，重連後依序限速重送
+        self.MQTT_BUFFER_DIR = os.getenv("MQTT_BUFFER_DIR", "./data/mqtt_buffer")
+        self.MQTT_BUFFER_MAX_MB = int(os.getenv("MQTT_BUFFER_MAX_MB", "64"))
+        self.MQTT_REPLAY_RATE = int(os.getenv("MQTT_REPLAY_RATE", "200"))  # 訊息/秒
+        # 請求/回應 (RPC) 預設逾時 (秒)
+        self.MQTT_RPC_TIMEOUT = float(os.getenv("MQTT_RPC_TIMEOUT", "5.0"))
+        
+        # 測試配方 (JSON) 目錄
+        self.TEST_SCENARIO_DIR = os.getenv(
+            "TEST_SCENARIO_DIR",
+            str(Path(__file__).parent / "scenarios")
+        )
+        
+        # 測試結果評估: 壓力恆定判定窗口 (秒) 與容許變化比例
+        self.STEADY_STATE_WINDOW_S = float(os.getenv("STEADY_STATE_WINDOW_S", "30"))
+        self.STEADY_STATE_TOLERANCE = float(os.getenv("STEADY_STATE_TOLERANCE", "0.01"))
+        
+        # 批次測試佇列: 佇列檔案與換機時是否需完成測試蓋開/關循環
+        self.TEST_QUEUE_FILE = os.getenv("TEST_QUEUE_FILE", "./data/test_queue.json")
+        require_cover_cycle = os.getenv("TEST_QUEUE_REQUIRE_COVER_CYCLE", "true").lower()
+        self.TEST_QUEUE_REQUIRE_COVER_CYCLE = require_cover_cycle in ("true", "1", "yes")
+        
+        # 參考曲線比對資料庫: 目錄、曲線點數、DTW 限制帶比例
+        self.REFERENCE_DB_DIR = os.getenv("REFERENCE_DB_DIR", "./data/reference_curves")
+        self.REFERENCE_POINTS = int(os.getenv("REFERENCE_POINTS", "200"))
+        self.REFERENCE_BAND = float(os.getenv("REFERENCE_BAND", "0.1"))
+        # 相對參考曲線的偏差上限: 超過判定 FAIL / 測試中連續超過提前中止
+        self.REFERENCE_FAIL_DEVIATION = float(os.getenv("REFERENCE_FAIL_DEVIATION", "0.15"))
+        self.REFERENCE_ABORT_DEVIATION = float(os.getenv("REFERENCE_ABORT_DEVIATION", "0.3"))
+        self.REFERENCE_CHECK_INTERVAL_S = float(os.getenv("REFERENCE_CHECK_INTERVAL_S", "5"))
+        self.REFERENCE_ABORT_CHECKS = int(os.getenv("REFERENCE_ABORT_CHECKS", "3"))
+        
+        # 提前判定失敗: 以指數趨近擬合預測最終壓力/電流，於指定信賴水準下確定超出規格時中止
+        self.EARLY_FAIL_CONFIDENCE = float(os.getenv("EARLY_FAIL_CONFIDENCE", "0.95"))
+        self.EARLY_FAIL_INTERVAL_S = float(os.getenv("EARLY_FAIL_INTERVAL_S", "1.0"))
+        self.EARLY_FAIL_FORGETTING = float(os.getenv("EARLY_FAIL_FORGETTING", "0.98"))
+        self.EARLY_FAIL_MIN_POINTS = int(os.getenv("EARLY_FAIL_MIN_POINTS", "10"))
+        self.EARLY_FAIL_MIN_R2 = float(os.getenv("EARLY_FAIL_MIN_R2", "0.9"))
+        
+        # 測試期間錄製寄存器讀取 (寫入測試紀錄目錄，供 replay.py 離線重播)
+        record_registers = os.getenv("RECORD_REGISTERS", "false").lower()
+        self.RECORD_REGISTERS = record_registers in ("true", "1", "yes")
+        
+        # MODBUS 匯流排封包錄製目錄 (未設定時不錄製)、單檔大小上限與保留檔案數
+        self.BUS_CAPTURE_DIR = os.getenv("BUS_CAPTURE_DIR")
+        self.BUS_CAPTURE_MAX_MB = int(os.getenv("BUS_CAPTURE_MAX_MB", "64"))
+        self.BUS_CAPTURE_MAX_FILES = int(os.getenv("BUS_CAPTURE_MAX_FILES", "50"))
+        
+        # 多工作站配置 (JSON)，未設定時以單一工作站運行並維持原主題
+        self.STATIONS_FILE = os.getenv("STATIONS_FILE")
         
         # 模擬器開關
         use_simulator = os.getenv("USE_SIMULATOR", "true").lower()
@@ -0,0 +1,92 @@
+"""工作站配置"""
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from config.settings import settings
+from config.modbus_devices import get_device_config
+from config.mqtt_topics import RESERVED_STATION_IDS
+
+DEFAULT_DATA_DIR = "./data/test_records"
+STATION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+@dataclass
+class StationConfig:
+    """
+    工作站配置
+
+    station_id 為 None 表示單一工作站 (舊版) 模式，主題不加命名空間
+    """
+    station_id: Optional[str]
+    devices: Dict[str, Dict[str, Any]]
+    data_dir: str = DEFAULT_DATA_DIR
+    queue_file: str = field(default_factory=lambda: settings.TEST_QUEUE_FILE)
+
+
+def _merge_devices(
+    base: Dict[str, Dict[str, Any]],
+    overrides: Dict[str, Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """以工作站設定覆寫預設設備配置 (逐設備合併欄位)"""
+    devices = {name: dict(config) for name, config in base.items()}
+    for name, override in overrides.items():
+        if name not in devices:
+            raise ValueError(f"未知的設備: {name}")
+        devices[name].update(override)
+    return devices
+
+
+def load_station_configs(path: Optional[str] = None) -> List[StationConfig]:
+    """
+    載入工作站配置
+
+    檔案格式:
+        {"stations": [{"id": "rig1", "data_dir": "...", "queue_file": "...",
+                   "devices": {"relay_io": {"tcp_port": 5027}}}]}
+
+    各工作站的 devices 逐欄位覆寫 get_device_config() 的預設值。
+
+    Args:
+        path: 配置檔路徑，None 表示使用 STATIONS_FILE
+
+    Returns:
+        工作站配置列表；未設定配置檔時返回單一工作站 (舊版模式)
+
+    Raises:
+        ValueError: 配置內容無效
+    """
+    path = path or settings.STATIONS_FILE
+    base = get_device_config()
+    if not path:
+        return [StationConfig(station_id=None, devices=base)]
+
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    entries = data.get("stations", []) if isinstance(data, dict) else data
+    if not entries:
+        raise ValueError(f"工作站配置為空: {path}")
+
+    configs = []
+    seen = set()
+    for entry in entries:
+        station_id = entry.get("id")
+        if not station_id or not STATION_ID_PATTERN.match(station_id):
+            raise ValueError(f"工作站 ID 無效: {station_id!r}")
+        if station_id in RESERVED_STATION_IDS:
+            raise ValueError(f"工作站 ID 與保留主題名稱衝突: {station_id}")
+        if station_id in seen:
+            raise ValueError(f"工作站 ID 重複: {station_id}")
+        seen.add(station_id)
+
+        queue_file = Path(settings.TEST_QUEUE_FILE)
+        configs.append(StationConfig(
+            station_id=station_id,
+            devices=_merge_devices(base, entry.get("devices", {})),
+            data_dir=entry.get("data_dir", f"{DEFAULT_DATA_DIR}/{station_id}"),
+            queue_file=entry.get(
+                "queue_file",
+                str(queue_file.with_name(f"{queue_file.stem}_{station_id}{queue_file.suffix}"))
+            )
+        ))
+    return configs
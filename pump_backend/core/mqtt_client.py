@@ -1,10 +1,67 @@
 """非同步 MQTT 客戶端 (基於 aiomqtt)"""
 import asyncio
 import json
-from typing import Callable, Dict, Optional
-from aiomqtt import Client, Message
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+from aiomqtt import Client, Message, MqttError, ProtocolVersion, Topic
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
 from loguru import logger
 from config.settings import settings
+from config.mqtt_topics import (
+    PUBLISH_QOS_POLICY,
+    DEFAULT_PUBLISH_QOS,
+    OFFLINE_BUFFER_TOPICS,
+    RPC_RESPONSE_PREFIX
+)
+from core.offline_buffer import OfflineBuffer
+from models.enums import ConnectionState
+
+try:
+    # 選用: orjson 可直接解碼 bytes / memoryview，速度約為 json 的數倍
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
+
+@dataclass
+class PublishMetrics:
+    """發布管線統計"""
+    published: int = 0
+    failed: int = 0
+    dropped: int = 0
+    buffered: int = 0
+    replayed: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    latency_last_ms: float = 0.0
+    latency_avg_ms: float = 0.0      # 指數移動平均 (alpha=0.1)
+    latency_max_ms: float = 0.0
+    rpc_calls: int = 0
+    rpc_timeouts: int = 0
+    rpc_latency_avg_ms: float = 0.0  # 指數移動平均 (alpha=0.1)
+
+    def record_rpc_latency(self, latency_ms: float):
+        """記錄單次 RPC 往返延遲"""
+        if self.rpc_calls == 0:
+            self.rpc_latency_avg_ms = latency_ms
+        else:
+            self.rpc_latency_avg_ms += 0.1 * (latency_ms - self.rpc_latency_avg_ms)
+        self.rpc_calls += 1
+
+    def record_latency(self, latency_ms: float):
+        """記錄單則發布延遲"""
+        self.latency_last_ms = latency_ms
+        if self.published == 0:
+            self.latency_avg_ms = latency_ms
+        else:
+            self.latency_avg_ms += 0.1 * (latency_ms - self.latency_avg_ms)
+        self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+        self.published += 1
 
 
 class MQTTClient:
@@ -12,6 +69,23 @@ class MQTTClient:
     非同步 MQTT 客戶端 (基於 aiomqtt)
 
     v2.0 更新: 完全非同步實作，解決 paho-mqtt 執行緒問題
+
+    v2.1 更新:
+    - 依主題套用 QoS 策略 (遙測 QoS 0，命令/警報 QoS 1/2)
+    - 新增發布佇列 (publish_nowait)，以在途上限管線化發布，不需逐則等待
+
+    v2.2 更新:
+    - 連線監管迴圈 (ConnectionState 狀態機) 取代遞迴重連
+    - 斷線期間遙測/測試紀錄寫入離線緩衝區，重連後依序限速重送
+
+    v2.3 更新:
+    - 使用 MQTT v5，以 response-topic / correlation-data 實作請求/回應 (RPC)
+    - 每個客戶端擁有專屬回應主題 pump/rpc/response/{client_id}
+
+    v2.4 更新:
+    - 先依主題篩選再解碼，無訂閱者的訊息不解析
+    - JSON 直接由 bytes 單次解碼 (有安裝 orjson 時使用 orjson)
+    - 訂閱可選擇 raw=True 直接接收 memoryview 原始內容
     """
 
     def __init__(
@@ -19,77 +93,222 @@ class MQTTClient:
         broker: Optional[str] = None,
         port: Optional[int] = None,
         username: Optional[str] = None,
-        password: Optional[str] = None
+        password: Optional[str] = None,
+        client_id: Optional[str] = None,
+        buffer_dir: Optional[str] = None
     ):
+        """
+        Args:
+            broker: Broker 主機 (預設 MQTT_BROKER)
+            port: Broker 端口 (預設 MQTT_PORT)
+            username: 使用者名稱
+            password: 密碼
+            client_id: 客戶端 ID (預設隨機產生)
+            buffer_dir: 離線緩衝區目錄 (預設 MQTT_BUFFER_DIR)
+        """
         self.broker = broker or settings.MQTT_BROKER
         self.port = port or settings.MQTT_PORT
         self.username = username or settings.MQTT_USERNAME
         self.password = password or settings.MQTT_PASSWORD
+        self.client_id = client_id or f"pump-backend-{uuid.uuid4().hex[:8]}"
 
         self.subscriptions: Dict[str, Callable] = {}
+        self._publish_observers: list = []
+        self._raw_topics: set = set()
+        self._async_callbacks: Dict[str, bool] = {}
+        self.messages_received = 0
+        self.messages_skipped = 0
         self.client: Optional[Client] = None
-        self._message_task: Optional[asyncio.Task] = None
-        self._reconnect_interval = 5.0  # 5秒重連
+        self.state = ConnectionState.DISCONNECTED
+        self._connected = asyncio.Event()
+        self._supervisor_task: Optional[asyncio.Task] = None
+        self._replay_task: Optional[asyncio.Task] = None
+        self._reconnect_interval = 5.0  # 最長重連間隔 (秒)
+
+        # 發布管線
+        self._qos_cache: Dict[str, int] = {}
+        # 佇列上限只限制 QoS 0 (遙測)；QoS >= 1 的命令/狀態/警報不因遙測塞滿佇列而被捨棄
+        self._outgoing: asyncio.Queue = asyncio.Queue()
+        self._queue_limit = settings.MQTT_PUBLISH_QUEUE_SIZE
+        self._inflight = asyncio.Semaphore(settings.MQTT_MAX_INFLIGHT)
+        self._publish_task: Optional[asyncio.Task] = None
+        self._pending_publishes: set = set()
+        self.metrics = PublishMetrics()
+
+        # 離線暫存
+        self._buffer_cache: Dict[str, bool] = {}
+        self.offline_buffer = OfflineBuffer(
+            data_dir=buffer_dir or settings.MQTT_BUFFER_DIR,
+            max_bytes=settings.MQTT_BUFFER_MAX_MB * 1024 * 1024
+        )
+        self._replay_rate = settings.MQTT_REPLAY_RATE
+
+        # 請求/回應 (RPC)
+        self.response_topic = f"{RPC_RESPONSE_PREFIX}/{self.client_id}"
+        self._rpc_handlers: Dict[str, Tuple[Callable, Optional[str]]] = {}
+        self._pending_requests: Dict[bytes, asyncio.Future] = {}
+        self._rpc_timeout = settings.MQTT_RPC_TIMEOUT
 
     async def start(self):
-        """啟動 MQTT 連線"""
-        await self._connect_with_retry()
+        """啟動 MQTT 連線 (等待首次連線成功)"""
+        if self._supervisor_task is None:
+            self._supervisor_task = asyncio.create_task(self._connection_loop())
+        if self._publish_task is None:
+            self._publish_task = asyncio.create_task(self._publish_loop())
+        await self._connected.wait()
 
-    async def _connect_with_retry(self):
-        """帶重試的連線"""
+    def _set_state(self, state: ConnectionState):
+        if state != self.state:
+            logger.debug(f"🔄 MQTT 連線狀態: {self.state.value} -> {state.value}")
+            self.state = state
+
+    @property
+    def is_connected(self) -> bool:
+        """是否已連線"""
+        return self.state == ConnectionState.CONNECTED
+
+    async def _connection_loop(self):
+        """
+        連線監管迴圈
+
+        DISCONNECTED -> CONNECTING -> CONNECTED -> (斷線) -> DISCONNECTED ...
+        連線失敗時進入 BACKOFF，以指數退避重試 (上限 _reconnect_interval)
+        """
+        backoff = 0.5
         while True:
+            self._set_state(ConnectionState.CONNECTING)
+            client = Client(
+                hostname=self.broker,
+                port=self.port,
+                username=self.username,
+                password=self.password,
+                identifier=self.client_id,
+                protocol=ProtocolVersion.V5,
+                timeout=10.0
+            )
             try:
-                self.client = Client(
-                    hostname=self.broker,
-                    port=self.port,
-                    username=self.username,
-                    password=self.password,
-                    timeout=10.0
-                )
+                await client.__aenter__()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._set_state(ConnectionState.BACKOFF)
+                logger.error(f"❌ MQTT 連線失敗: {e}")
+                logger.info(f"⏱️ {backoff:.1f} 秒後重試...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self._reconnect_interval)
+                continue
 
-                await self.client.__aenter__()
-                logger.info(f"✅ MQTT 已連線至 {self.broker}:{self.port}")
+            backoff = 0.5
+            try:
+                await self._on_connected(client)
+                async for message in client.messages:
+                    await self._handle_message(message)
+            except asyncio.CancelledError:
+                logger.info("📭 訊息處理迴圈已停止")
+                raise
+            except MqttError as e:
+                logger.error(f"❌ MQTT 連線中斷: {e}")
+            except Exception as e:
+                logger.exception(f"❌ 訊息處理異常: {e}")
+            finally:
+                await self._on_disconnected(client)
 
-                # 訂閱所有主題
-                if self.subscriptions:
-                    topics = list(self.subscriptions.keys())
-                    await self.client.subscribe([(t, 1) for t in topics])
-                    logger.info(f"📥 已訂閱 {len(topics)} 個主題")
+    async def _on_connected(self, client: Client):
+        """連線建立: 重新訂閱並開始重送離線緩衝"""
+        self.client = client
+        self._set_state(ConnectionState.CONNECTED)
+        self._connected.set()
+        logger.info(f"✅ MQTT 已連線至 {self.broker}:{self.port}")
 
-                # 啟動訊息處理任務
-                self._message_task = asyncio.create_task(self._message_loop())
+        # 訂閱所有主題 (含 RPC 請求主題與本客戶端的回應主題)
+        topics = self._broker_topics()
+        await client.subscribe([(t, 1) for t in topics])
+        logger.info(f"📥 已訂閱 {len(topics)} 個主題")
 
-                return
+        self._ensure_replay()
 
-            except Exception as e:
-                logger.error(f"❌ MQTT 連線失敗: {e}")
-                logger.info(f"⏱️ {self._reconnect_interval} 秒後重試...")
-                await asyncio.sleep(self._reconnect_interval)
+    def _ensure_replay(self):
+        """已連線且有待重送訊息時啟動重送任務"""
+        if not self.offline_buffer.pending() or not self.is_connected:
+            return
+        if self._replay_task is None or self._replay_task.done():
+            self._replay_task = asyncio.create_task(self._replay_offline())
+
+    async def _on_disconnected(self, client: Client):
+        """連線中斷: 停止重送並釋放客戶端"""
+        self._connected.clear()
+        self.client = None
+        self._set_state(ConnectionState.DISCONNECTED)
+
+        if self._replay_task:
+            self._replay_task.cancel()
+            try:
+                await self._replay_task
+            except asyncio.CancelledError:
+                pass
+            self._replay_task = None
 
-    async def _message_loop(self):
-        """訊息處理迴圈"""
         try:
-            async for message in self.client.messages:
-                await self._handle_message(message)
-        except asyncio.CancelledError:
-            logger.info("📭 訊息處理迴圈已停止")
+            await client.__aexit__(None, None, None)
+        except Exception:
+            pass
+
+    async def _replay_offline(self):
+        """依寫入順序限速重送離線緩衝區的訊息"""
+        total = self.offline_buffer.pending()
+        logger.info(f"📤 開始重送離線緩衝訊息 ({total} 筆, {self._replay_rate} 筆/秒)")
+        batch_size = max(1, self._replay_rate // 10)
+
+        try:
+            while self.offline_buffer.pending() and self.client:
+                batch_start = time.perf_counter()
+                batch = self.offline_buffer.read_batch(batch_size)
+                if not batch:
+                    break
+                for record in batch:
+                    # 發送失敗時不移動游標，下次從此批次重新開始
+                    await self._send(record["t"], record["p"], record["q"], record["r"])
+                self.offline_buffer.commit()
+                self.metrics.replayed += len(batch)
+
+                # 限速: 每批次至少間隔 len(batch) / rate 秒
+                elapsed = time.perf_counter() - batch_start
+                await asyncio.sleep(max(0, len(batch) / self._replay_rate - elapsed))
         except Exception as e:
-            logger.exception(f"❌ 訊息處理異常: {e}")
-            # 重新連線
-            await self._connect_with_retry()
+            logger.error(f"❌ 離線緩衝重送中斷 (剩餘 {self.offline_buffer.pending()} 筆): {e}")
+            return
+
+        logger.info("✅ 離線緩衝訊息重送完成")
 
     async def _handle_message(self, message: Message):
         """處理單一訊息"""
         topic = message.topic.value
+        self.messages_received += 1
 
-        try:
-            payload = json.loads(message.payload.decode())
+        # 先依主題篩選: 沒有處理者的訊息直接略過，不解碼
+        callback = self.subscriptions.get(topic)
+        if (
+            callback is None
+            and topic != self.response_topic
+            and topic not in self._rpc_handlers
+        ):
+            self.messages_skipped += 1
+            return
 
-            if topic in self.subscriptions:
-                callback = self.subscriptions[topic]
+        try:
+            if callback is not None and topic in self._raw_topics:
+                # 原始內容: 零複製交給處理者自行解析
+                payload = memoryview(message.payload)
+            else:
+                payload = _json_loads(message.payload)
 
+            if topic == self.response_topic:
+                self._resolve_request(message, payload)
+            elif topic in self._rpc_handlers:
+                await self._handle_request(topic, message, payload)
+            else:
                 # 支援同步和非同步回調
-                if asyncio.iscoroutinefunction(callback):
+                if self._async_callbacks[topic]:
                     await callback(payload)
                 else:
                     callback(payload)
@@ -99,61 +318,391 @@ class MQTTClient:
         except Exception as e:
             logger.error(f"❌ 訊息處理失敗 [{topic}]: {e}")
 
-    def subscribe(self, topic: str, callback: Callable):
+    def _broker_topics(self) -> list:
+        """需向 Broker 訂閱的所有主題"""
+        return list(dict.fromkeys([
+            *self.subscriptions.keys(),
+            *self._rpc_handlers.keys(),
+            self.response_topic
+        ]))
+
+    def register_rpc_handler(
+        self,
+        topic: str,
+        handler: Callable,
+        status_topic: Optional[str] = None
+    ):
+        """
+        註冊請求處理器
+
+        處理器接收請求內容並返回回應字典 (可以是同步或非同步)。
+        請求帶有 response-topic 時，回應連同 correlation-data 發布至該主題；
+        未帶 response-topic 的舊版請求，回應發布至 status_topic (若有設定)。
+        回應不會再發布到請求主題，避免後端重複處理自己的回音。
+
+        Args:
+            topic: 請求主題
+            handler: 處理函數
+            status_topic: 舊版請求的回應主題
+        """
+        is_new = topic not in self._rpc_handlers
+        self._rpc_handlers[topic] = (handler, status_topic)
+        logger.info(f"📥 註冊請求處理器: {topic}")
+
+        if is_new and self.client and self.is_connected:
+            asyncio.create_task(self._subscribe_now(topic))
+
+    async def _handle_request(self, topic: str, message: Message, payload: Any):
+        """執行請求處理器並回覆"""
+        handler, status_topic = self._rpc_handlers[topic]
+
+        if asyncio.iscoroutinefunction(handler):
+            reply = await handler(payload)
+        else:
+            reply = handler(payload)
+        if reply is None:
+            return
+
+        props = message.properties
+        response_topic = getattr(props, "ResponseTopic", None) if props else None
+        if response_topic:
+            reply_props = Properties(PacketTypes.PUBLISH)
+            correlation = getattr(props, "CorrelationData", None)
+            if correlation is not None:
+                reply_props.CorrelationData = correlation
+            await self._publish_with_properties(response_topic, reply, 1, reply_props)
+        elif status_topic:
+            await self.publish(status_topic, reply)
+
+    def _resolve_request(self, message: Message, payload: Any):
+        """依 correlation-data 將回應交給等待中的請求"""
+        props = message.properties
+        correlation = getattr(props, "CorrelationData", None) if props else None
+        future = self._pending_requests.pop(correlation, None)
+        if future is None:
+            logger.debug(f"⏭️ 忽略無對應請求的回應 [{message.topic.value}]")
+            return
+        if not future.done():
+            future.set_result(payload)
+
+    async def request(
+        self,
+        topic: str,
+        payload: dict,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        發送請求並等待回應 (MQTT v5 request/response)
+
+        Args:
+            topic: 請求主題
+            payload: 請求內容
+            timeout: 逾時秒數，None 表示使用 MQTT_RPC_TIMEOUT
+
+        Returns:
+            回應內容
+
+        Raises:
+            asyncio.TimeoutError: 逾時未收到回應
+            ConnectionError: MQTT 未連線
+        """
+        if not self.client:
+            raise ConnectionError(f"MQTT 未連線，無法發送請求 [{topic}]")
+
+        correlation = uuid.uuid4().bytes
+        future = asyncio.get_running_loop().create_future()
+        self._pending_requests[correlation] = future
+
+        props = Properties(PacketTypes.PUBLISH)
+        props.ResponseTopic = self.response_topic
+        props.CorrelationData = correlation
+
+        start = time.perf_counter()
+        try:
+            await self._publish_with_properties(topic, payload, 1, props)
+            reply = await asyncio.wait_for(future, timeout=timeout or self._rpc_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.rpc_timeouts += 1
+            logger.warning(f"⏱️ 請求逾時 [{topic}]")
+            raise
+        finally:
+            self._pending_requests.pop(correlation, None)
+
+        self.metrics.record_rpc_latency((time.perf_counter() - start) * 1000)
+        return reply
+
+    async def _publish_with_properties(
+        self,
+        topic: str,
+        payload: Any,
+        qos: int,
+        properties: Properties
+    ):
+        """發布帶有 MQTT v5 屬性的訊息"""
+        if not self.client:
+            logger.warning(f"⚠️ MQTT 未連線，無法發布 [{topic}]")
+            return
+        await self._send(topic, payload, qos, False, properties)
+
+    def subscribe(self, topic: str, callback: Callable, raw: bool = False):
         """
         訂閱主題並註冊回調函數
 
+        已連線時立即向 Broker 訂閱，每次重連也會重新訂閱
+
         Args:
             topic: MQTT 主題
             callback: 回調函數 (可以是同步或非同步)
+            raw: True 時回調接收未解碼的 memoryview (僅在回調執行期間有效)
         """
+        is_new = topic not in self.subscriptions
         self.subscriptions[topic] = callback
+        self._async_callbacks[topic] = asyncio.iscoroutinefunction(callback)
+        if raw:
+            self._raw_topics.add(topic)
+        else:
+            self._raw_topics.discard(topic)
         logger.info(f"📥 註冊訂閱: {topic}")
 
+        if is_new and self.client and self.is_connected:
+            asyncio.create_task(self._subscribe_now(topic))
+
+    async def _subscribe_now(self, topic: str):
+        try:
+            await self.client.subscribe(topic, qos=1)
+        except Exception as e:
+            logger.error(f"❌ MQTT 訂閱失敗 [{topic}]: {e}")
+
+    def should_buffer(self, topic: str) -> bool:
+        """主題在斷線期間是否寫入離線緩衝區 (結果快取)"""
+        buffered = self._buffer_cache.get(topic)
+        if buffered is None:
+            buffered = any(Topic(topic).matches(p) for p in OFFLINE_BUFFER_TOPICS)
+            self._buffer_cache[topic] = buffered
+        return buffered
+
+    def resolve_qos(self, topic: str) -> int:
+        """
+        依 PUBLISH_QOS_POLICY 解析主題的 QoS (結果快取)
+
+        Args:
+            topic: MQTT 主題
+
+        Returns:
+            QoS 等級 (0, 1, 2)
+        """
+        qos = self._qos_cache.get(topic)
+        if qos is None:
+            qos = DEFAULT_PUBLISH_QOS
+            for pattern, policy_qos in PUBLISH_QOS_POLICY:
+                if Topic(topic).matches(pattern):
+                    qos = policy_qos
+                    break
+            self._qos_cache[topic] = qos
+        return qos
+
     async def publish(
         self,
         topic: str,
         payload: dict,
-        qos: int = 1,
+        qos: Optional[int] = None,
         retain: bool = False
     ):
         """
-        發布訊息
+        發布訊息 (等待發布完成)
 
         Args:
             topic: MQTT 主題
             payload: 資料 (字典)
-            qos: QoS 等級 (0, 1, 2)
+            qos: QoS 等級 (0, 1, 2)，None 表示依 QoS 策略決定
             retain: 是否保留訊息
         """
+        if qos is None:
+            qos = self.resolve_qos(topic)
+        self._notify_observers(topic, payload)
+        await self._publish_now(topic, payload, qos, retain)
+
+    def publish_nowait(
+        self,
+        topic: str,
+        payload: dict,
+        qos: Optional[int] = None,
+        retain: bool = False
+    ) -> bool:
+        """
+        將訊息放入發布佇列後立即返回 (不等待 PUBACK)
+
+        由 _publish_loop 以 MQTT_MAX_INFLIGHT 為上限管線化發送；
+        佇列達 MQTT_PUBLISH_QUEUE_SIZE 時只捨棄 QoS 0 訊息，QoS >= 1 的訊息一律加入佇列
+
+        Returns:
+            是否成功加入佇列 (QoS 0 且佇列已滿時捨棄並返回 False)
+        """
+        if qos is None:
+            qos = self.resolve_qos(topic)
+        self._notify_observers(topic, payload)
+        if qos == 0 and self._outgoing.qsize() >= self._queue_limit:
+            self.metrics.dropped += 1
+            logger.warning(f"⚠️ 發布佇列已滿，捨棄訊息 [{topic}]")
+            return False
+        self._outgoing.put_nowait((topic, payload, qos, retain))
+        return True
+
+    def add_publish_observer(self, observer: Callable):
+        """
+        註冊發布觀察者
+
+        本程序每次發布 (publish / publish_nowait) 時同步呼叫 observer(topic, payload)，
+        讓程序內元件不經 Broker 往返即可取得最新數據。觀察者必須快速返回。
+        """
+        self._publish_observers.append(observer)
+
+    def _notify_observers(self, topic: str, payload: dict):
+        for observer in self._publish_observers:
+            try:
+                observer(topic, payload)
+            except Exception as e:
+                logger.error(f"❌ 發布觀察者執行失敗 [{topic}]: {e}")
+
+    async def _publish_loop(self):
+        """發布佇列處理迴圈: 取出訊息並在在途上限內並行發送"""
+        try:
+            while True:
+                message = await self._outgoing.get()
+                await self._inflight.acquire()
+                task = asyncio.create_task(self._publish_inflight(*message))
+                self._pending_publishes.add(task)
+                task.add_done_callback(self._pending_publishes.discard)
+        except asyncio.CancelledError:
+            pass
+
+    async def _publish_inflight(self, topic: str, payload: dict, qos: int, retain: bool):
+        """發送一則佇列中的訊息，完成後釋放在途額度"""
+        self.metrics.in_flight += 1
+        self.metrics.max_in_flight = max(self.metrics.max_in_flight, self.metrics.in_flight)
+        try:
+            await self._publish_now(topic, payload, qos, retain)
+        finally:
+            self.metrics.in_flight -= 1
+            self._inflight.release()
+            self._outgoing.task_done()
+
+    async def _publish_now(self, topic: str, payload: dict, qos: int, retain: bool):
+        """
+        發送訊息並記錄延遲
+
+        未連線 (或仍有離線訊息待重送以維持順序) 時，
+        OFFLINE_BUFFER_TOPICS 的訊息寫入離線緩衝區，其餘捨棄
+        """
+        buffered = self.should_buffer(topic)
+        if buffered and (not self.client or self.offline_buffer.pending()):
+            self._buffer(topic, payload, qos, retain)
+            return
+
         if not self.client:
-            logger.warning(f"⚠️ MQTT 未連線，無法發布 [{topic}]")
+            self.metrics.dropped += 1
+            logger.debug(f"⚠️ MQTT 未連線，無法發布 [{topic}]")
             return
 
         try:
-            message = json.dumps(payload, ensure_ascii=False)
+            await self._send(topic, payload, qos, retain)
+        except Exception as e:
+            if buffered:
+                self._buffer(topic, payload, qos, retain)
+            else:
+                self.metrics.failed += 1
+            logger.error(f"❌ MQTT 發布異常 [{topic}]: {e}")
+
+    async def _send(
+        self,
+        topic: str,
+        payload: dict,
+        qos: int,
+        retain: bool,
+        properties: Optional[Properties] = None
+    ):
+        """實際發送 (失敗時拋出例外)"""
+        message = json.dumps(payload, ensure_ascii=False)
+        start = time.perf_counter()
+        if properties is not None:
+            await self.client.publish(
+                topic,
+                message,
+                qos=qos,
+                retain=retain,
+                properties=properties
+            )
+        else:
             await self.client.publish(
                 topic,
                 message,
                 qos=qos,
                 retain=retain
             )
-        except Exception as e:
-            logger.error(f"❌ MQTT 發布異常 [{topic}]: {e}")
+        self.metrics.record_latency((time.perf_counter() - start) * 1000)
+
+    def _buffer(self, topic: str, payload: dict, qos: int, retain: bool):
+        try:
+            self.offline_buffer.append(topic, payload, qos, retain)
+            self.metrics.buffered += 1
+            self._ensure_replay()
+        except OSError as e:
+            self.metrics.dropped += 1
+            logger.error(f"❌ 離線緩衝寫入失敗 [{topic}]: {e}")
+
+    def get_publish_metrics(self) -> Dict[str, float]:
+        """
+        獲取發布管線統計
+
+        Returns:
+            包含在途深度、佇列深度與發布延遲的字典
+        """
+        return {
+            "published": self.metrics.published,
+            "failed": self.metrics.failed,
+            "dropped": self.metrics.dropped,
+            "buffered": self.metrics.buffered,
+            "replayed": self.metrics.replayed,
+            "offline_pending": self.offline_buffer.pending(),
+            "in_flight": self.metrics.in_flight,
+            "max_in_flight": self.metrics.max_in_flight,
+            "queue_depth": self._outgoing.qsize(),
+            "latency_last_ms": round(self.metrics.latency_last_ms, 3),
+            "latency_avg_ms": round(self.metrics.latency_avg_ms, 3),
+            "latency_max_ms": round(self.metrics.latency_max_ms, 3),
+            "rpc_calls": self.metrics.rpc_calls,
+            "rpc_timeouts": self.metrics.rpc_timeouts,
+            "rpc_pending": len(self._pending_requests),
+            "rpc_latency_avg_ms": round(self.metrics.rpc_latency_avg_ms, 3),
+        }
+
+    async def flush(self, timeout: float = 5.0):
+        """等待發布佇列與在途訊息清空"""
+        try:
+            await asyncio.wait_for(self._outgoing.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ 發布佇列未在 {timeout}s 內清空 (剩餘 {self._outgoing.qsize()} 則)")
 
     async def disconnect(self):
         """斷線"""
-        if self._message_task:
-            self._message_task.cancel()
+        if self._publish_task:
+            # 未連線時佇列中的訊息會寫入離線緩衝區
+            await self.flush()
+            self._publish_task.cancel()
             try:
-                await self._message_task
+                await self._publish_task
             except asyncio.CancelledError:
                 pass
+            self._publish_task = None
 
-        if self.client:
-            await self.client.__aexit__(None, None, None)
+        if self._supervisor_task:
+            # 取消監管迴圈，由 _on_disconnected 釋放客戶端
+            self._supervisor_task.cancel()
+            try:
+                await self._supervisor_task
+            except asyncio.CancelledError:
+                pass
+            self._supervisor_task = None
 
+        self.offline_buffer.close()
         logger.info("🔌 MQTT 已斷線")
-
-
-
@@ -0,0 +1,208 @@
+"""MQTT 離線暫存緩衝區 (磁碟區段檔)"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+from loguru import logger
+
+
+class OfflineBuffer:
+    """
+    MQTT 離線暫存緩衝區
+
+    Broker 斷線期間將待發布訊息追加寫入磁碟區段檔 (JSON Lines)，
+    重新連線後依寫入順序讀出重送。
+
+    - 區段檔: segment_00000001.log, segment_00000002.log, ...
+    - 讀取游標 (區段序號 + 位移) 存於 cursor 檔，程序重啟後可接續重送
+    - 總容量超過上限時捨棄最舊的區段
+    """
+
+    def __init__(
+        self,
+        data_dir: str = "./data/mqtt_buffer",
+        max_bytes: int = 64 * 1024 * 1024,
+        segment_bytes: int = 4 * 1024 * 1024
+    ):
+        """
+        Args:
+            data_dir: 區段檔目錄
+            max_bytes: 緩衝區總容量上限
+            segment_bytes: 單一區段檔大小上限
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+
+        self._cursor_path = self.data_dir / "cursor"
+        self._segments: List[int] = sorted(
+            int(p.stem.split("_")[1]) for p in self.data_dir.glob("segment_*.log")
+        )
+        self._read_segment, self._read_offset = self._load_cursor()
+        if self._read_segment not in self._segments:
+            # 游標指向的區段已不存在: 從最舊的區段開始
+            if self._segments:
+                self._read_segment = self._segments[0]
+            self._read_offset = 0
+        self._write_handle = None
+        self._write_segment: Optional[int] = None
+        self._pending = 0
+        self._batch_end: Tuple[int, int] = (self._read_segment, self._read_offset)
+        self._batch_records = 0
+        self.dropped = 0
+
+        # 重新計算未重送的筆數
+        for seq in self._segments:
+            start = self._read_offset if seq == self._read_segment else 0
+            if seq >= self._read_segment:
+                self._pending += self._count_records(seq, start)
+
+        if self._pending:
+            logger.info(f"📦 離線緩衝區有 {self._pending} 筆待重送訊息")
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.data_dir / f"segment_{seq:08d}.log"
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        """讀取游標 (不存在時從最舊區段開始)"""
+        try:
+            seq, offset = self._cursor_path.read_text().split()
+            return int(seq), int(offset)
+        except (OSError, ValueError):
+            return (self._segments[0] if self._segments else 1), 0
+
+    def _save_cursor(self):
+        tmp = self._cursor_path.with_suffix(".tmp")
+        tmp.write_text(f"{self._read_segment} {self._read_offset}")
+        os.replace(tmp, self._cursor_path)
+
+    def _count_records(self, seq: int, offset: int) -> int:
+        with open(self._segment_path(seq), "rb") as f:
+            f.seek(offset)
+            return sum(1 for line in f if line.endswith(b"\n"))
+
+    def _total_bytes(self) -> int:
+        return sum(
+            self._segment_path(seq).stat().st_size
+            for seq in self._segments
+            if self._segment_path(seq).exists()
+        )
+
+    def _open_writer(self):
+        """開啟 (或輪替) 寫入區段"""
+        if self._write_handle:
+            self._write_handle.close()
+        seq = (self._segments[-1] + 1) if self._segments else self._read_segment
+        self._segments.append(seq)
+        self._write_segment = seq
+        self._write_handle = open(self._segment_path(seq), "ab")
+
+    def append(self, topic: str, payload: dict, qos: int, retain: bool):
+        """
+        追加一筆訊息
+
+        Args:
+            topic: MQTT 主題
+            payload: 訊息內容
+            qos: QoS 等級
+            retain: 是否保留訊息
+        """
+        if self._write_handle is None or self._write_handle.tell() >= self.segment_bytes:
+            self._open_writer()
+            self._enforce_limit()
+
+        record = json.dumps(
+            {"t": topic, "p": payload, "q": qos, "r": retain, "ts": time.time()},
+            ensure_ascii=False
+        )
+        self._write_handle.write(record.encode() + b"\n")
+        self._write_handle.flush()
+        self._pending += 1
+
+    def _enforce_limit(self):
+        """超過容量上限時捨棄最舊的區段 (保留目前寫入區段)"""
+        while len(self._segments) > 1 and self._total_bytes() > self.max_bytes:
+            oldest = self._segments[0]
+            start = self._read_offset if oldest == self._read_segment else 0
+            lost = self._count_records(oldest, start) if oldest >= self._read_segment else 0
+            self._drop_segment(oldest)
+            self._pending -= lost
+            self.dropped += lost
+            logger.warning(f"⚠️ 離線緩衝區已滿，捨棄最舊區段 ({lost} 筆訊息)")
+
+    def _drop_segment(self, seq: int):
+        self._segments.remove(seq)
+        try:
+            self._segment_path(seq).unlink()
+        except OSError:
+            pass
+        if seq == self._read_segment:
+            self._read_segment = self._segments[0] if self._segments else seq + 1
+            self._read_offset = 0
+            self._save_cursor()
+
+    def pending(self) -> int:
+        """待重送的訊息筆數"""
+        return self._pending
+
+    def read_batch(self, max_records: int = 50) -> List[dict]:
+        """
+        依寫入順序讀取一批待重送訊息 (不移動游標)
+
+        重送成功後呼叫 commit() 確認
+
+        Returns:
+            訊息列表，每筆含 t (topic)、p (payload)、q (qos)、r (retain)
+        """
+        batch: List[dict] = []
+        self._batch_end = (self._read_segment, self._read_offset)
+        seq, offset = self._batch_end
+
+        while len(batch) < max_records and seq in self._segments:
+            with open(self._segment_path(seq), "rb") as f:
+                f.seek(offset)
+                while len(batch) < max_records:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break  # 區段結尾 (或寫入中的不完整行)
+                    offset = f.tell()
+                    try:
+                        batch.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.warning(f"⚠️ 略過損毀的緩衝紀錄 [segment {seq}]")
+                        self._pending -= 1
+            self._batch_end = (seq, offset)
+            if len(batch) < max_records and seq != self._write_segment:
+                # 此區段已讀完，移至下一個區段
+                later = [s for s in self._segments if s > seq]
+                if not later:
+                    break
+                seq, offset = later[0], 0
+            else:
+                break
+
+        self._batch_records = len(batch)
+        return batch
+
+    def commit(self):
+        """確認上一批 read_batch() 已重送，移動游標並刪除已完成的區段"""
+        seq, offset = self._batch_end
+        for done in [s for s in self._segments if s < seq]:
+            self._drop_segment(done)
+        self._read_segment, self._read_offset = seq, offset
+        self._pending -= self._batch_records
+        self._batch_records = 0
+
+        # 全部重送完畢: 清除區段，下次從新區段開始
+        if self._pending <= 0 and seq != self._write_segment:
+            self._drop_segment(seq)
+        self._save_cursor()
+
+    def close(self):
+        """關閉寫入檔案"""
+        if self._write_handle:
+            self._write_handle.close()
+            self._write_handle = None
+            self._write_segment = None
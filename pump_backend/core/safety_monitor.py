@@ -3,11 +3,11 @@ import asyncio
 import threading
 import time
 from queue import Queue, Empty
-from typing import Optional
+from typing import Any, Dict, Optional
 from loguru import logger
 from drivers.relay_io import RelayIODriver
 from core.mqtt_client import MQTTClient
-from config.mqtt_topics import SAFETY_STATUS, SAFETY_ALERT
+from config.mqtt_topics import SAFETY_STATUS, SAFETY_ALERT, RELAY_STATUS
 
 
 class SafetyMonitor:
@@ -20,9 +20,22 @@ class SafetyMonitor:
     - 緊急操作直接在專用執行緒執行，不等待 MQTT
     """
 
-    def __init__(self, mqtt_client: MQTTClient):
+    def __init__(
+        self,
+        mqtt_client: MQTTClient,
+        relay_config: Optional[Dict[str, Any]] = None,
+        name: str = "SafetyMonitor"
+    ):
+        """
+        Args:
+            mqtt_client: MQTT 客戶端
+            relay_config: 繼電器 IO 配置 (預設 get_device_config()["relay_io"])
+            name: 監控執行緒名稱 (多工作站時區分各工作站)
+        """
         self.mqtt = mqtt_client
-        self.io_driver = RelayIODriver()
+        # 100Hz 執行緒直接進行同步讀寫，使用專屬連線 (不加入共用傳輸連線池)
+        self.io_driver = RelayIODriver(relay_config)
+        self.name = name
 
         # 安全狀態
         self.emergency_stop_active = False
@@ -34,6 +47,9 @@ class SafetyMonitor:
         self._stop_event = threading.Event()
         self._status_queue = Queue(maxsize=100)  # 狀態佇列
 
+        # 安全動作改變繼電器狀態後，於下一筆狀態一併發布
+        self._relay_states_changed = False
+
         # 看門狗
         self.watchdog_last_update = time.time()
 
@@ -49,7 +65,7 @@ class SafetyMonitor:
         self._monitor_thread = threading.Thread(
             target=self._monitor_loop_thread,
             daemon=True,
-            name="SafetyMonitor-100Hz"
+            name=f"{self.name}-100Hz"
         )
         self._monitor_thread.start()
         logger.info("🛡️ 安全監控器已啟動 (100Hz 專用執行緒)")
@@ -94,13 +110,17 @@ class SafetyMonitor:
                     cover_closed = bool(io_status & 0x02)       # Bit1
 
                     # 將狀態放入佇列供 MQTT 發布
+                    status = {
+                        'emergency_stop': emergency_pressed,
+                        'cover_closed': cover_closed,
+                        'system_locked': self.system_locked,
+                        'timestamp': time.time()
+                    }
+                    if self._relay_states_changed:
+                        status['relays'] = dict(self.io_driver.coil_states)
                     try:
-                        self._status_queue.put_nowait({
-                            'emergency_stop': emergency_pressed,
-                            'cover_closed': cover_closed,
-                            'system_locked': self.system_locked,
-                            'timestamp': time.time()
-                        })
+                        self._status_queue.put_nowait(status)
+                        self._relay_states_changed = False
                     except:
                         pass  # 佇列滿，捨棄舊數據
 
@@ -154,6 +174,7 @@ class SafetyMonitor:
 
         # 3. 鎖定系統
         self.system_locked = True
+        self._relay_states_changed = True
 
         # 4. 記錄到安全日誌
         logger.bind(event="emergency_stop").critical(
@@ -173,6 +194,7 @@ class SafetyMonitor:
 
         # 只切斷馬達電源，不洩壓
         self.io_driver.power_off_all_sync()
+        self._relay_states_changed = True
 
         logger.bind(event="cover_opened").warning("馬達已停止")
 
@@ -185,27 +207,33 @@ class SafetyMonitor:
         """
         在主 asyncio 循環中處理 MQTT 發布
 
-        從佇列讀取狀態並發布至 MQTT
+        從佇列讀取狀態並發布至 MQTT；警報只在警報狀態改變時發布 (不隨 100Hz 狀態重複)
         """
+        alert_type = None
         while True:
             try:
                 # 非阻塞讀取佇列
                 status = self._status_queue.get_nowait()
+                relays = status.pop('relays', None)
+                if relays is not None:
+                    self.mqtt.publish_nowait(RELAY_STATUS, {
+                        'relays': {str(ch): state for ch, state in relays.items()},
+                        'timestamp': status['timestamp']
+                    })
 
-                # 發布至 MQTT (異步操作)
-                await self.mqtt.publish(SAFETY_STATUS, status)
+                # 放入發布佇列 (100Hz 狀態不逐則等待 PUBACK)
+                self.mqtt.publish_nowait(SAFETY_STATUS, status)
 
-                # 如果有緊急事件，也發布警報
+                # 進入緊急停止或測試蓋開啟時發布警報
                 if status.get('emergency_stop'):
-                    await self.mqtt.publish(SAFETY_ALERT, {
-                        'type': 'emergency',
-                        'message': '🚨 緊急停止'
-                    })
+                    alert = {'type': 'emergency', 'message': '🚨 緊急停止'}
                 elif not status.get('cover_closed'):
-                    await self.mqtt.publish(SAFETY_ALERT, {
-                        'type': 'warning',
-                        'message': '⚠️ 測試蓋開啟'
-                    })
+                    alert = {'type': 'warning', 'message': '⚠️ 測試蓋開啟'}
+                else:
+                    alert = None
+                if alert is not None and alert['type'] != alert_type:
+                    self.mqtt.publish_nowait(SAFETY_ALERT, alert)
+                alert_type = alert['type'] if alert else None
 
             except Empty:
                 # 佇列為空，短暫等待
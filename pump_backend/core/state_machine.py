@@ -1,4 +1,7 @@
 """測試狀態機"""
+import asyncio
+import inspect
+import time
 from enum import Enum
 from typing import Optional, Callable, Dict, Any
 from loguru import logger
@@ -10,6 +13,11 @@ class StateMachine:
     測試狀態機
     
     管理測試流程的狀態轉換
+
+    - 同步處理器在轉換時直接執行
+    - 非同步處理器 (coroutine) 以 asyncio.Task 在背景執行，
+      轉換離開該狀態時 (暫停/停止/緊急停止) 立即取消
+    - 轉換歷史記錄時間戳、停留時間與轉換耗時
     """
 
     def __init__(self):
@@ -18,6 +26,10 @@ class StateMachine:
         self.state_handlers: Dict[TestState, Callable] = {}
         self.transition_history = []
 
+        self.state_task: Optional[asyncio.Task] = None
+        self.state_entered_at = time.monotonic()
+        self._transition_lock: Optional[asyncio.Lock] = None
+
     def register_handler(self, state: TestState, handler: Callable):
         """
         註冊狀態處理器
@@ -33,48 +45,101 @@ class StateMachine:
         """
         轉換到新狀態
         
+        離開目前狀態前取消其處理器 Task (由處理器自身發起的轉換除外)，
+        再啟動新狀態的處理器
+
         Args:
             new_state: 新狀態
             context: 狀態轉換上下文
         """
-        if new_state == self.current_state:
-            logger.debug(f"⏭️ 狀態未變更: {new_state.value}")
-            return
-        
-        # 檢查狀態轉換是否合法
-        if not self._can_transition(self.current_state, new_state):
-            logger.warning(
-                f"⚠️ 非法狀態轉換: {self.current_state.value} -> {new_state.value}"
+        if self._transition_lock is None:
+            self._transition_lock = asyncio.Lock()
+
+        async with self._transition_lock:
+            if new_state == self.current_state:
+                logger.debug(f"⏭️ 狀態未變更: {new_state.value}")
+                return
+            
+            # 檢查狀態轉換是否合法
+            if not self._can_transition(self.current_state, new_state):
+                logger.warning(
+                    f"⚠️ 非法狀態轉換: {self.current_state.value} -> {new_state.value}"
+                )
+                return
+
+            started = time.monotonic()
+            await self._cancel_state_task()
+
+            self.previous_state = self.current_state
+            self.current_state = new_state
+            time_in_state = started - self.state_entered_at
+            self.state_entered_at = time.monotonic()
+            
+            # 記錄轉換歷史
+            self.transition_history.append({
+                "from": self.previous_state.value,
+                "to": new_state.value,
+                "context": context or {},
+                "timestamp": time.time(),
+                "time_in_state_s": round(time_in_state, 3),
+                "transition_ms": round((self.state_entered_at - started) * 1000, 3)
+            })
+            
+            logger.info(
+                f"🔄 狀態轉換: {self.previous_state.value} -> {new_state.value}"
             )
-            return
-        
-        self.previous_state = self.current_state
-        self.current_state = new_state
-        
-        # 記錄轉換歷史
-        self.transition_history.append({
-            "from": self.previous_state.value,
-            "to": new_state.value,
-            "context": context or {}
-        })
-        
-        logger.info(
-            f"🔄 狀態轉換: {self.previous_state.value} -> {new_state.value}"
-        )
-        
-        # 執行狀態處理器
-        if new_state in self.state_handlers:
+            
+            # 執行狀態處理器
+            handler = self.state_handlers.get(new_state)
+            if handler is None:
+                return
             try:
-                handler = self.state_handlers[new_state]
-                if callable(handler):
-                    if hasattr(handler, '__call__'):
-                        if hasattr(handler, '__code__') and 'await' in str(handler.__code__.co_code):
-                            await handler(context)
-                        else:
-                            handler(context)
+                result = handler(context)
+                if inspect.isawaitable(result):
+                    self.state_task = asyncio.ensure_future(result)
+                    self.state_task.add_done_callback(
+                        lambda task, state=new_state: self._on_state_task_done(state, task)
+                    )
             except Exception as e:
                 logger.exception(f"❌ 狀態處理器執行失敗 [{new_state.value}]: {e}")
 
+    async def _cancel_state_task(self):
+        """取消目前狀態的處理器 Task 並等待其結束"""
+        task = self.state_task
+        self.state_task = None
+        if task is None or task.done() or task is asyncio.current_task():
+            # 處理器自身發起的轉換: 轉換完成後處理器自然結束
+            return
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+        except Exception:
+            pass  # 已由 _on_state_task_done 記錄
+
+    def _on_state_task_done(self, state: TestState, task: asyncio.Task):
+        """記錄處理器 Task 的異常"""
+        if task.cancelled():
+            logger.debug(f"⏹️ 狀態處理器已取消 [{state.value}]")
+            return
+        error = task.exception()
+        if error is not None:
+            logger.opt(exception=error).error(
+                f"❌ 狀態處理器執行失敗 [{state.value}]: {error}"
+            )
+
+    async def wait_state_task(self):
+        """等待目前狀態的處理器 Task 結束 (含其引發的後續轉換)"""
+        while self.state_task is not None and not self.state_task.done():
+            await asyncio.wait({self.state_task})
+
+    def get_state_duration(self) -> float:
+        """目前狀態已停留的時間（秒）"""
+        return time.monotonic() - self.state_entered_at
+
     def _can_transition(self, from_state: TestState, to_state: TestState) -> bool:
         """
         檢查狀態轉換是否合法
@@ -111,8 +176,12 @@ class StateMachine:
         return self.current_state
 
     def reset(self):
-        """重置狀態機"""
+        """重置狀態機 (取消目前狀態的處理器)"""
+        if self.state_task is not None and not self.state_task.done():
+            self.state_task.cancel()
+        self.state_task = None
         self.previous_state = None
         self.current_state = TestState.IDLE
+        self.state_entered_at = time.monotonic()
         logger.info("🔄 狀態機已重置")
 
@@ -0,0 +1,101 @@
+"""工作站 MQTT 介面 (多工作站共用同一個 MQTT 連線)"""
+from typing import Any, Callable, Optional
+from loguru import logger
+from core.mqtt_client import MQTTClient
+from config.mqtt_topics import TOPIC_ROOT, station_topic
+
+
+class StationMQTTClient:
+    """
+    工作站 MQTT 介面
+
+    包裝共用的 MQTTClient，服務以原主題 (pump/...) 發布/訂閱，
+    實際傳送時加上工作站命名空間 (pump/{station}/...)。
+    發布觀察者只收到本工作站的發布，主題已去除命名空間，
+    因此各服務不需修改即可在多工作站下運作，且不會看到其他工作站的數據。
+
+    其餘屬性 (is_connected、get_publish_metrics 等) 轉交共用客戶端。
+    """
+
+    def __init__(self, mqtt_client: MQTTClient, station_id: str):
+        """
+        Args:
+            mqtt_client: 共用的 MQTT 客戶端
+            station_id: 工作站 ID
+        """
+        self.mqtt = mqtt_client
+        self.station_id = station_id
+        self.prefix = station_topic(station_id, TOPIC_ROOT + "/")
+        self._publish_observers: list = []
+        self._observing = False
+
+    def topic(self, topic: str) -> str:
+        """原主題 -> 工作站主題"""
+        return station_topic(self.station_id, topic)
+
+    def local_topic(self, topic: str) -> Optional[str]:
+        """工作站主題 -> 原主題 (非本工作站主題返回 None)"""
+        if topic.startswith(self.prefix):
+            return f"{TOPIC_ROOT}/{topic[len(self.prefix):]}"
+        return None
+
+    async def publish(
+        self,
+        topic: str,
+        payload: dict,
+        qos: Optional[int] = None,
+        retain: bool = False
+    ):
+        await self.mqtt.publish(self.topic(topic), payload, qos, retain)
+
+    def publish_nowait(
+        self,
+        topic: str,
+        payload: dict,
+        qos: Optional[int] = None,
+        retain: bool = False
+    ) -> bool:
+        return self.mqtt.publish_nowait(self.topic(topic), payload, qos, retain)
+
+    def subscribe(self, topic: str, callback: Callable, raw: bool = False):
+        self.mqtt.subscribe(self.topic(topic), callback, raw=raw)
+
+    def register_rpc_handler(
+        self,
+        topic: str,
+        handler: Callable,
+        status_topic: Optional[str] = None
+    ):
+        self.mqtt.register_rpc_handler(
+            self.topic(topic),
+            handler,
+            self.topic(status_topic) if status_topic else None
+        )
+
+    async def request(
+        self,
+        topic: str,
+        payload: dict,
+        timeout: Optional[float] = None
+    ) -> Any:
+        return await self.mqtt.request(self.topic(topic), payload, timeout)
+
+    def add_publish_observer(self, observer: Callable):
+        """註冊本工作站的發布觀察者 (observer 收到原主題)"""
+        self._publish_observers.append(observer)
+        if not self._observing:
+            self.mqtt.add_publish_observer(self._dispatch_publish)
+            self._observing = True
+
+    def _dispatch_publish(self, topic: str, payload: dict):
+        local = self.local_topic(topic)
+        if local is None:
+            return
+        for observer in self._publish_observers:
+            try:
+                observer(local, payload)
+            except Exception as e:
+                logger.error(f"❌ 發布觀察者執行失敗 [{topic}]: {e}")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.mqtt, name)
@@ -0,0 +1,450 @@
+"""MODBUS 匯流排封包錄製 (二進位追加日誌 + 索引)"""
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+from config.settings import settings
+
+# 檔案格式
+# 日誌 (.buscap): 檔頭 MAGIC + (建立時的 wall time, monotonic)，之後為連續紀錄
+#   紀錄: RECORD 結構 (請求時間 monotonic, 延遲 µs, 通道, 從站, 結果, 請求長度, 回應長度) + 請求 + 回應
+#   通道定義: outcome = OUTCOME_CHANNEL，請求欄位為通道名稱 (UTF-8)
+#   標記 (如測試開始/結束): outcome = OUTCOME_MARKER，請求欄位為標記文字 (UTF-8)
+# 索引 (.idx): 檔頭 INDEX_MAGIC，之後為 INDEX_ENTRY (時間, 日誌位移, 通道, 從站)；
+#   每個 (通道, 從站) 每 index_interval 秒最多一筆，另含各通道定義 (從站 = 0xFF) 與標記 (從站 = 0xFE) 的位置
+MAGIC = b"PBCAP1\x00\x00"
+INDEX_MAGIC = b"PBIDX1\x00\x00"
+HEADER = struct.Struct("<dd")
+RECORD = struct.Struct("<dIHBBHH")
+INDEX_ENTRY = struct.Struct("<dQHB")
+
+OUTCOME_OK = 0
+OUTCOME_EXCEPTION = 1
+OUTCOME_TIMEOUT = 2
+OUTCOME_MARKER = 0xFE
+OUTCOME_CHANNEL = 0xFF
+OUTCOME_NAMES = {OUTCOME_OK: "ok", OUTCOME_EXCEPTION: "exception", OUTCOME_TIMEOUT: "timeout"}
+
+MARKER_UNIT = 0xFE
+CHANNEL_UNIT = 0xFF
+# 逾時或並行請求使紀錄不完全依時間排列，索引搜尋時往前保留的時間
+SEEK_MARGIN_S = 5.0
+
+
+def rtu_frame_length(buffer: bytes) -> Optional[int]:
+    """RTU 回應訊框長度 (資料不足或無法判斷時返回 None)"""
+    if len(buffer) < 3:
+        return None
+    function = buffer[1]
+    if function & 0x80:
+        return 5
+    if function in (1, 2, 3, 4):
+        return 5 + buffer[2]
+    if function in (5, 6, 15, 16):
+        return 8
+    return None
+
+
+class CaptureChannel:
+    """
+    單一傳輸 (TCP 端點或串口) 的封包追蹤
+
+    作為 pymodbus 客戶端的 trace_packet，將請求與回應配對為一筆交換：
+    TCP 依 MBAP 交易 ID 配對，RTU 依序配對 (同一匯流排同時只有一個請求)。
+    """
+
+    def __init__(self, capture: "BusCapture", channel_id: int, name: str, framer: str, timeout: float):
+        self.capture = capture
+        self.channel_id = channel_id
+        self.name = name
+        self.framer = framer
+        self.timeout = timeout
+        self._pending: Dict[Optional[int], Tuple[float, bytes]] = {}
+        self._rx = b""
+
+    def trace(self, sending: bool, data: bytes) -> bytes:
+        """pymodbus trace_packet 回呼 (必須返回原資料)"""
+        now = time.monotonic()
+        if sending:
+            self._expire(now)
+            key = int.from_bytes(data[0:2], "big") if self.framer == "socket" else None
+            self._pending[key] = (now, bytes(data))
+            self._rx = b""
+        else:
+            self._rx += data
+            self._drain(now)
+        return data
+
+    def _expire(self, now: float):
+        """未收到回應的請求記錄為逾時 (RTU 送出下一個請求時，TCP 超過逾時時間時)"""
+        if self.framer != "socket":
+            if None in self._pending:
+                sent, request = self._pending.pop(None)
+                self.capture.write(self, sent, now - sent, OUTCOME_TIMEOUT, request, self._rx)
+            return
+        for key in [k for k, (sent, _) in self._pending.items() if now - sent > self.timeout]:
+            sent, request = self._pending.pop(key)
+            self.capture.write(self, sent, now - sent, OUTCOME_TIMEOUT, request, b"")
+
+    def _drain(self, now: float):
+        """從接收緩衝取出完整回應訊框並配對請求"""
+        while self._rx:
+            if self.framer == "socket":
+                if len(self._rx) < 8:
+                    return
+                length = 6 + int.from_bytes(self._rx[4:6], "big")
+                key = int.from_bytes(self._rx[0:2], "big")
+                function = self._rx[7]
+            else:
+                length = rtu_frame_length(self._rx)
+                key = None
+                function = self._rx[1] if len(self._rx) > 1 else 0
+            if length is None or len(self._rx) < length:
+                return
+            frame, self._rx = self._rx[:length], self._rx[length:]
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                continue
+            sent, request = pending
+            outcome = OUTCOME_EXCEPTION if function & 0x80 else OUTCOME_OK
+            self.capture.write(self, sent, now - sent, outcome, request, frame)
+
+    def flush(self):
+        """未完成的請求記錄為逾時"""
+        now = time.monotonic()
+        for sent, request in self._pending.values():
+            self.capture.write(self, sent, now - sent, OUTCOME_TIMEOUT, request, self._rx)
+        self._pending.clear()
+        self._rx = b""
+
+
+class BusCapture:
+    """
+    MODBUS 匯流排封包錄製
+
+    每筆請求/回應交換以固定 20 位元組標頭 + 原始訊框追加寫入日誌，
+    並以稀疏索引 (每設備每秒一筆) 依設備與時間快速定位。
+    多個工作站共用同一份錄製 (傳輸可跨工作站共用)：測試開始/結束以標記 (mark) 記錄於日誌，
+    日誌檔超過 max_bytes 時輪替，保留最近 max_files 個。
+
+    trace 回呼於 pymodbus 的發送/接收路徑執行 (串口在執行緒池中)，
+    寫入以鎖保護，只做 struct.pack 與緩衝寫入。
+    """
+
+    def __init__(
+        self,
+        capture_dir: str,
+        max_files: int = 50,
+        max_bytes: int = 64 * 1024 * 1024,
+        index_interval: float = 1.0,
+        flush_interval: float = 1.0
+    ):
+        """
+        Args:
+            capture_dir: 錄製目錄
+            max_files: 保留的日誌檔數量
+            max_bytes: 單一日誌檔大小上限 (超過時輪替)
+            index_interval: 每個設備的索引間隔（秒）
+            flush_interval: 寫入磁碟的間隔（秒）
+        """
+        self.capture_dir = Path(capture_dir)
+        self.capture_dir.mkdir(parents=True, exist_ok=True)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.index_interval = index_interval
+        self.flush_interval = flush_interval
+        self.records = 0
+
+        self._lock = threading.Lock()
+        self._channels: Dict[str, CaptureChannel] = {}
+        self._log = None
+        self._index = None
+        self._offset = 0
+        self._last_indexed: Dict[Tuple[int, int], float] = {}
+        self._last_flush = 0.0
+        self.path: Optional[Path] = None
+        self.rotate("capture")
+
+    def channel(self, name: str, framer: str, timeout: float = 3.0) -> CaptureChannel:
+        """取得傳輸的追蹤通道 (相同名稱共用)"""
+        with self._lock:
+            channel = self._channels.get(name)
+            if channel is None:
+                channel = CaptureChannel(self, len(self._channels), name, framer, timeout)
+                self._channels[name] = channel
+                self._write_channel(channel)
+            return channel
+
+    def _write_channel(self, channel: CaptureChannel):
+        encoded = channel.name.encode("utf-8")
+        self._index.write(INDEX_ENTRY.pack(time.monotonic(), self._offset, channel.channel_id, CHANNEL_UNIT))
+        self._append(RECORD.pack(0.0, 0, channel.channel_id, 0, OUTCOME_CHANNEL, len(encoded), 0) + encoded)
+
+    def _append(self, data: bytes):
+        self._log.write(data)
+        self._offset += len(data)
+
+    def write(
+        self,
+        channel: CaptureChannel,
+        sent: float,
+        latency: float,
+        outcome: int,
+        request: bytes,
+        response: bytes
+    ):
+        """寫入一筆交換紀錄"""
+        if not request:
+            return
+        channel_id = channel.channel_id
+        unit = request[6] if channel.framer == "socket" and len(request) > 6 else request[0]
+        with self._lock:
+            if self._log is None:
+                return
+            key = (channel_id, unit)
+            last = self._last_indexed.get(key)
+            if last is None or sent - last >= self.index_interval:
+                self._last_indexed[key] = sent
+                self._index.write(INDEX_ENTRY.pack(sent, self._offset, channel_id, unit))
+            self._append(
+                RECORD.pack(sent, min(int(latency * 1e6), 0xFFFFFFFF), channel_id, unit, outcome,
+                            len(request), len(response))
+                + request + response
+            )
+            self.records += 1
+            if self._offset >= self.max_bytes:
+                self._open("capture")
+            elif sent - self._last_flush >= self.flush_interval:
+                self._last_flush = sent
+                self._log.flush()
+                self._index.flush()
+
+    def mark(self, label: str):
+        """
+        寫入標記 (如 "test_start station-1 test_001")
+
+        Args:
+            label: 標記文字
+        """
+        encoded = label.encode("utf-8")
+        now = time.monotonic()
+        with self._lock:
+            if self._log is None:
+                return
+            self._index.write(INDEX_ENTRY.pack(now, self._offset, 0, MARKER_UNIT))
+            self._append(RECORD.pack(now, 0, 0, 0, OUTCOME_MARKER, len(encoded), 0) + encoded)
+            self._log.flush()
+            self._index.flush()
+
+    def rotate(self, label: str) -> Path:
+        """
+        輪替日誌檔
+
+        Args:
+            label: 檔名標籤
+
+        Returns:
+            新日誌檔路徑
+        """
+        for channel in list(self._channels.values()):
+            channel.flush()
+        with self._lock:
+            return self._open(label)
+
+    def _open(self, label: str) -> Path:
+        """關閉目前日誌檔並開啟新檔 (需持有鎖；未完成的請求於新檔中配對)"""
+        self._close_files()
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        self.path = self.capture_dir / f"{label}_{stamp}.buscap"
+        suffix = 1
+        while self.path.exists():
+            self.path = self.capture_dir / f"{label}_{stamp}_{suffix}.buscap"
+            suffix += 1
+        self._log = open(self.path, "wb")
+        self._index = open(self.path.with_suffix(".idx"), "wb")
+        self._index.write(INDEX_MAGIC)
+        self._offset = 0
+        self._append(MAGIC + HEADER.pack(time.time(), time.monotonic()))
+        self._last_indexed.clear()
+        # 每個檔案自帶通道定義，可單獨讀取
+        for channel in self._channels.values():
+            self._write_channel(channel)
+        self._prune()
+        logger.info(f"📼 匯流排錄製檔: {self.path.name}")
+        return self.path
+
+    def _prune(self):
+        logs = sorted(self.capture_dir.glob("*.buscap"), key=lambda p: p.stat().st_mtime)
+        for old in logs[:-self.max_files]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".idx").unlink(missing_ok=True)
+
+    def _close_files(self):
+        if self._log is not None:
+            self._log.close()
+            self._index.close()
+            self._log = self._index = None
+
+    def close(self):
+        """結束錄製"""
+        for channel in list(self._channels.values()):
+            channel.flush()
+        with self._lock:
+            self._close_files()
+
+
+@dataclass
+class CaptureMarker:
+    """一筆標記"""
+    t: float
+    label: str
+
+
+@dataclass
+class CaptureRecord:
+    """一筆請求/回應交換"""
+    t: float
+    latency: float
+    channel: str
+    unit: int
+    outcome: str
+    request: bytes
+    response: bytes
+
+    @property
+    def function(self) -> int:
+        """功能碼"""
+        frame = self.request[7:] if self.channel.startswith("tcp:") else self.request[1:]
+        return frame[0] if frame else 0
+
+    def registers(self) -> Optional[List[int]]:
+        """讀取寄存器回應 (功能碼 3/4) 的寄存器值"""
+        if self.outcome != "ok" or self.function not in (3, 4):
+            return None
+        if self.channel.startswith("tcp:"):
+            data = self.response[9:9 + self.response[8]]
+        else:
+            data = self.response[3:3 + self.response[2]]
+        return [int.from_bytes(data[i:i + 2], "big") for i in range(0, len(data) - 1, 2)]
+
+
+class CaptureReader:
+    """匯流排錄製檔讀取 (依索引定位設備與時間)"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            head = f.read(len(MAGIC) + HEADER.size)
+        if not head.startswith(MAGIC):
+            raise ValueError(f"不是匯流排錄製檔: {path}")
+        self.wall_start, self.mono_start = HEADER.unpack_from(head, len(MAGIC))
+        self._data_start = len(MAGIC) + HEADER.size
+
+        self.index: List[Tuple[float, int, int, int]] = []
+        index_path = self.path.with_suffix(".idx")
+        if index_path.exists():
+            raw = index_path.read_bytes()[len(INDEX_MAGIC):]
+            usable = len(raw) - len(raw) % INDEX_ENTRY.size
+            self.index = list(INDEX_ENTRY.iter_unpack(raw[:usable]))
+
+        self.channels: Dict[int, str] = {}
+        self.markers: List[CaptureMarker] = []
+        for t, offset, channel_id, unit in self.index:
+            if unit == CHANNEL_UNIT:
+                self.channels[channel_id] = self._read_text(offset)
+            elif unit == MARKER_UNIT:
+                self.markers.append(CaptureMarker(t, self._read_text(offset)))
+
+    def _read_text(self, offset: int) -> str:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            fields = RECORD.unpack(f.read(RECORD.size))
+            return f.read(fields[5]).decode("utf-8")
+
+    def wall_time(self, t: float) -> float:
+        """monotonic 時間換算為 wall time"""
+        return self.wall_start + (t - self.mono_start)
+
+    def _seek_offset(self, channel_id: Optional[int], unit: Optional[int], start: Optional[float]) -> int:
+        if start is None:
+            return self._data_start
+        offset = self._data_start
+        for t, entry_offset, entry_channel, entry_unit in self.index:
+            if entry_unit in (CHANNEL_UNIT, MARKER_UNIT):
+                continue
+            if t > start - SEEK_MARGIN_S:
+                break
+            if (channel_id is None or entry_channel == channel_id) and (unit is None or entry_unit == unit):
+                offset = entry_offset
+        return offset
+
+    def records(
+        self,
+        channel: Optional[str] = None,
+        unit: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> Iterator[CaptureRecord]:
+        """
+        讀取交換紀錄
+
+        Args:
+            channel: 通道名稱 (如 "tcp:localhost:5020"、"rtu:/dev/ttyUSB0")
+            unit: 從站 ID
+            start, end: 時間範圍 (monotonic)
+        """
+        channel_id = None
+        if channel is not None:
+            channel_id = next((i for i, name in self.channels.items() if name == channel), None)
+            if channel_id is None:
+                return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._seek_offset(channel_id, unit, start))
+            while True:
+                head = f.read(RECORD.size)
+                if len(head) < RECORD.size:
+                    return
+                t, latency_us, rec_channel, rec_unit, outcome, req_len, resp_len = RECORD.unpack(head)
+                body = f.read(req_len + resp_len)
+                if len(body) < req_len + resp_len:
+                    return
+                if outcome == OUTCOME_CHANNEL:
+                    self.channels.setdefault(rec_channel, body[:req_len].decode("utf-8"))
+                    continue
+                if outcome == OUTCOME_MARKER:
+                    continue
+                if end is not None and t > end + SEEK_MARGIN_S:
+                    return
+                if channel_id is not None and rec_channel != channel_id:
+                    continue
+                if unit is not None and rec_unit != unit:
+                    continue
+                if (start is not None and t < start) or (end is not None and t > end):
+                    continue
+                yield CaptureRecord(
+                    t, latency_us / 1e6, self.channels.get(rec_channel, str(rec_channel)), rec_unit,
+                    OUTCOME_NAMES.get(outcome, str(outcome)), body[:req_len], body[req_len:]
+                )
+
+
+_capture: Optional[BusCapture] = None
+_capture_lock = threading.Lock()
+
+
+def get_bus_capture() -> Optional[BusCapture]:
+    """程序共用的匯流排錄製 (未設定 BUS_CAPTURE_DIR 時返回 None)"""
+    global _capture
+    if not settings.BUS_CAPTURE_DIR:
+        return None
+    with _capture_lock:
+        if _capture is None:
+            _capture = BusCapture(
+                settings.BUS_CAPTURE_DIR,
+                settings.BUS_CAPTURE_MAX_FILES,
+                settings.BUS_CAPTURE_MAX_MB * 1024 * 1024
+            )
+        return _capture
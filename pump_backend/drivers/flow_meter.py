@@ -1,7 +1,8 @@
 """流量計驅動 (AFM07 系列數顯氣體質量流量計)"""
-from typing import Optional, Dict
+from typing import Any, Optional, Dict
 from loguru import logger
 from .modbus_base import ModbusDevice
+from .transport_pool import TransportPool
 from config.modbus_devices import get_device_config
 
 
@@ -15,8 +16,17 @@ class FlowMeterDriver(ModbusDevice):
     - 轉換係數: 10 (除法)
     """
 
-    def __init__(self):
-        config = get_device_config()["flow_meter"]
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        transport_pool: Optional[TransportPool] = None
+    ):
+        """
+        Args:
+            config: 設備配置 (預設 get_device_config()["flow_meter"])
+            transport_pool: 共用傳輸連線池
+        """
+        config = config or get_device_config()["flow_meter"]
         super().__init__(
             port=config["port"],
             baudrate=config.get("baudrate", 19200),
@@ -26,7 +36,8 @@ class FlowMeterDriver(ModbusDevice):
             slave_id=config["slave_id"],
             timeout=config["timeout"],
             use_tcp=config.get("use_tcp", False),
-            tcp_port=config.get("tcp_port", 502)
+            tcp_port=config.get("tcp_port", 502),
+            transport_pool=transport_pool
         )
 
     async def read_instantaneous_flow(self) -> Optional[float]:
@@ -5,10 +5,12 @@ from contextlib import asynccontextmanager
 from pymodbus.client import ModbusSerialClient, AsyncModbusTcpClient
 from pymodbus.exceptions import ModbusException
 from loguru import logger
-from typing import Optional, List
+from typing import Callable, Optional, List
 from tenacity import retry, stop_after_attempt, wait_fixed
 from pump_backend.models.device_health import DeviceStatus, DeviceHealth
 from config.settings import settings
+from .transport_pool import TransportPool
+from .bus_capture import get_bus_capture
 
 
 class ModbusDevice:
@@ -28,6 +30,13 @@ class ModbusDevice:
     v2.2 更新:
     - 新增 Modbus TCP 支援
     - 自動檢測連接類型（串口或 TCP）
+
+    v2.3 更新:
+    - 支援共用傳輸連線池 (多工作站共用同一端點/串口)
+
+    v2.4 更新:
+    - 新增 read_observer，每次保持寄存器讀取後回呼 (寄存器錄製)
+    - 設定 BUS_CAPTURE_DIR 時於傳輸層錄製原始請求/回應訊框 (bus_capture)
     """
 
     def __init__(
@@ -40,7 +49,8 @@ class ModbusDevice:
         slave_id: int = 1,
         timeout: float = 1.0,
         use_tcp: bool = False,
-        tcp_port: int = 502
+        tcp_port: int = 502,
+        transport_pool: Optional[TransportPool] = None
     ):
         """
         Args:
@@ -53,41 +63,74 @@ class ModbusDevice:
             timeout: 超時時間
             use_tcp: 是否使用 TCP 連接
             tcp_port: TCP 端口（僅用於 TCP）
+            transport_pool: 共用傳輸連線池 (多工作站時，同一端點/串口共用連線)
         """
         self.port = port
         self.slave_id = slave_id
         self.use_tcp = use_tcp
         self.tcp_port = tcp_port
 
-        if use_tcp:
-            # 使用 Modbus TCP
-            self.client = AsyncModbusTcpClient(
-                host=port,
-                port=tcp_port,
-                timeout=timeout
-            )
-            self._executor = None  # TCP 客戶端是異步的，不需要執行緒池
-        else:
+        def create_transport():
+            # 匯流排封包錄製 (每個傳輸一個通道)
+            capture = get_bus_capture()
+            trace_packet = None
+            if capture is not None:
+                name = f"tcp:{port}:{tcp_port}" if use_tcp else f"rtu:{port}"
+                trace_packet = capture.channel(name, "socket" if use_tcp else "rtu", timeout).trace
+            if use_tcp:
+                # 使用 Modbus TCP
+                client = AsyncModbusTcpClient(
+                    host=port,
+                    port=tcp_port,
+                    timeout=timeout,
+                    trace_packet=trace_packet
+                )
+                return client, None  # TCP 客戶端是異步的，不需要執行緒池
             # 使用 Modbus RTU (串口)
-            self.client = ModbusSerialClient(
+            client = ModbusSerialClient(
                 port=port,
                 baudrate=baudrate,
                 parity=parity,
                 stopbits=stopbits,
                 bytesize=bytesize,
-                timeout=timeout
+                timeout=timeout,
+                trace_packet=trace_packet
             )
-            self._executor = ThreadPoolExecutor(
+            executor = ThreadPoolExecutor(
                 max_workers=1,
                 thread_name_prefix=f"Modbus-{port}"
             )
+            return client, executor
+
+        self._transport_pool = transport_pool
+        self._transport_key = None
+        if transport_pool is not None:
+            self._transport_key = transport_pool.key_for(port, use_tcp, tcp_port)
+            self.client, self._executor = transport_pool.acquire(
+                self._transport_key, create_transport
+            )
+        else:
+            self.client, self._executor = create_transport()
 
         self.connected = False
         self.status = DeviceStatus()
         self.max_errors = 5  # 連續 5 次失敗視為不健康
+        # 讀取觀察者: read_observer(address, count, registers)，失敗時 registers 為 None
+        self.read_observer: Optional[Callable[[int, int, Optional[List[int]]], None]] = None
 
     async def connect(self) -> bool:
-        """建立連線"""
+        """建立連線 (共用傳輸已由其他設備連線時直接沿用)"""
+        if self._transport_pool is None:
+            return await self._connect()
+        async with self._transport_pool.lock(self._transport_key):
+            if getattr(self.client, "connected", False):
+                self.connected = True
+                self.status.update_success()
+                logger.info(f"🔗 沿用共用 MODBUS 連線: {self.port} (Slave ID: {self.slave_id})")
+                return True
+            return await self._connect()
+
+    async def _connect(self) -> bool:
         try:
             if self.use_tcp:
                 # TCP 連接（異步）
@@ -172,9 +215,13 @@ class ModbusDevice:
             if self.status.health == DeviceHealth.HEALTHY:
                 logger.debug(f"✅ MODBUS 讀取成功 [{self.port}]")
 
+            if self.read_observer is not None:
+                self.read_observer(address, count, result.registers)
             return result.registers
 
         except Exception as e:
+            if self.read_observer is not None:
+                self.read_observer(address, count, None)
             self.status.update_error()
             logger.error(
                 f"❌ MODBUS 讀取失敗 [{self.port}] "
@@ -320,8 +367,28 @@ class ModbusDevice:
 
         return result
 
+    def _release_transport(self) -> bool:
+        """
+        釋放共用傳輸
+
+        Returns:
+            是否需要關閉連線 (未使用連線池，或為共用傳輸的最後一個使用者)
+        """
+        if self._transport_pool is None:
+            return True
+        last = self._transport_pool.release(self._transport_key)
+        self._transport_pool = None
+        if not last:
+            # 其他設備仍在使用: 只標記本設備離線，不關閉共用連線與執行緒池
+            self.connected = False
+            self._executor = None
+            self.status.health = DeviceHealth.OFFLINE
+        return last
+
     async def disconnect_async(self):
         """斷線（異步版本）"""
+        if not self._release_transport():
+            return
         if self.connected:
             if self.use_tcp:
                 # TCP 斷線（異步）
@@ -343,6 +410,8 @@ class ModbusDevice:
 
     def disconnect(self):
         """斷線（同步版本，向後兼容）"""
+        if not self._release_transport():
+            return
         if self.connected:
             if self.use_tcp:
                 # TCP 斷線（嘗試同步關閉）
@@ -1,7 +1,8 @@
 """電表驅動 (JX3101 單相 / JX8304M 三相)"""
-from typing import Optional, Dict
+from typing import Any, Optional, Dict
 from loguru import logger
 from .modbus_base import ModbusDevice
+from .transport_pool import TransportPool
 from config.modbus_devices import get_device_config
 
 
@@ -39,10 +40,17 @@ class SinglePhasePowerMeterDriver(ModbusDevice):
     - 功率: 係數 0.01 (除法)
     """
 
-    def __init__(self, meter_type: str = "dc"):
+    def __init__(
+        self,
+        meter_type: str = "dc",
+        config: Optional[Dict[str, Any]] = None,
+        transport_pool: Optional[TransportPool] = None
+    ):
         """
         Args:
             meter_type: "dc", "ac110", "ac220"
+            config: 設備配置 (預設依 meter_type 取自 get_device_config())
+            transport_pool: 共用傳輸連線池
         """
         config_map = {
             "dc": "dc_meter",
@@ -50,7 +58,7 @@ class SinglePhasePowerMeterDriver(ModbusDevice):
             "ac220": "ac220v_meter"
         }
         config_key = config_map.get(meter_type, "dc_meter")
-        config = get_device_config()[config_key]
+        config = config or get_device_config()[config_key]
         
         super().__init__(
             port=config["port"],
@@ -61,7 +69,8 @@ class SinglePhasePowerMeterDriver(ModbusDevice):
             slave_id=config["slave_id"],
             timeout=config["timeout"],
             use_tcp=config.get("use_tcp", False),
-            tcp_port=config.get("tcp_port", 502)
+            tcp_port=config.get("tcp_port", 502),
+            transport_pool=transport_pool
         )
         self.meter_type = meter_type
 
@@ -167,8 +176,17 @@ class ThreePhasePowerMeterDriver(ModbusDevice):
     - 功率: 係數 0.01 (除法)
     """
 
-    def __init__(self):
-        config = get_device_config()["ac220v_3p_meter"]
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        transport_pool: Optional[TransportPool] = None
+    ):
+        """
+        Args:
+            config: 設備配置 (預設 get_device_config()["ac220v_3p_meter"])
+            transport_pool: 共用傳輸連線池
+        """
+        config = config or get_device_config()["ac220v_3p_meter"]
         super().__init__(
             port=config["port"],
             baudrate=config.get("baudrate", 57600),
@@ -178,7 +196,8 @@ class ThreePhasePowerMeterDriver(ModbusDevice):
             slave_id=config["slave_id"],
             timeout=config["timeout"],
             use_tcp=config.get("use_tcp", False),
-            tcp_port=config.get("tcp_port", 502)
+            tcp_port=config.get("tcp_port", 502),
+            transport_pool=transport_pool
         )
 
     async def read_voltage_phase(self, phase: str) -> Optional[float]:
@@ -1,7 +1,8 @@
 """壓力計驅動 (Delta DPA 系列壓力感測器)"""
-from typing import Optional, Dict
+from typing import Any, Optional, Dict
 from loguru import logger
 from .modbus_base import ModbusDevice
+from .transport_pool import TransportPool
 from config.modbus_devices import get_device_config
 
 
@@ -17,13 +18,20 @@ class PressureSensorDriver(ModbusDevice):
     - 真空範圍: 0 ~ -0.1 MPa (0 ~ -100 kPa)
     """
 
-    def __init__(self, sensor_type: str = "positive"):
+    def __init__(
+        self,
+        sensor_type: str = "positive",
+        config: Optional[Dict[str, Any]] = None,
+        transport_pool: Optional[TransportPool] = None
+    ):
         """
         Args:
             sensor_type: "positive" 或 "vacuum"
+            config: 設備配置 (預設依 sensor_type 取自 get_device_config())
+            transport_pool: 共用傳輸連線池
         """
         config_key = "pressure_positive" if sensor_type == "positive" else "pressure_vacuum"
-        config = get_device_config()[config_key]
+        config = config or get_device_config()[config_key]
         
         super().__init__(
             port=config["port"],
@@ -34,7 +42,8 @@ class PressureSensorDriver(ModbusDevice):
             slave_id=config["slave_id"],
             timeout=config["timeout"],
             use_tcp=config.get("use_tcp", False),
-            tcp_port=config.get("tcp_port", 502)
+            tcp_port=config.get("tcp_port", 502),
+            transport_pool=transport_pool
         )
         self.sensor_type = sensor_type
 
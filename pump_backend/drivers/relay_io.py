@@ -1,8 +1,9 @@
 """繼電器 IO 驅動 (Waveshare Modbus RTU Relay)"""
 import asyncio
-from typing import Optional, Dict
+from typing import Any, Optional, Dict
 from loguru import logger
 from .modbus_base import ModbusDevice
+from .transport_pool import TransportPool
 from config.modbus_devices import get_device_config
 
 
@@ -17,8 +18,19 @@ class RelayIODriver(ModbusDevice):
     - 支援功能碼 0x02 (Read Discrete Inputs)
     """
 
-    def __init__(self):
-        config = get_device_config()["relay_io"]
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        transport_pool: Optional[TransportPool] = None,
+        coil_states: Optional[Dict[int, bool]] = None
+    ):
+        """
+        Args:
+            config: 設備配置 (預設 get_device_config()["relay_io"])
+            transport_pool: 共用傳輸連線池
+            coil_states: 共用的繼電器狀態記錄 (同一繼電器模組的多個驅動共用，預設各自記錄)
+        """
+        config = config or get_device_config()["relay_io"]
         super().__init__(
             port=config["port"],
             baudrate=config.get("baudrate", 115200),
@@ -28,7 +40,8 @@ class RelayIODriver(ModbusDevice):
             slave_id=config["slave_id"],
             timeout=config["timeout"],
             use_tcp=config.get("use_tcp", False),
-            tcp_port=config.get("tcp_port", 502)
+            tcp_port=config.get("tcp_port", 502),
+            transport_pool=transport_pool
         )
         
         # 繼電器通道映射（CH1-CH8 對應 Coil 0x0000-0x0007）
@@ -43,6 +56,11 @@ class RelayIODriver(ModbusDevice):
             'CH8': 0x0007,  # AC220V 3P 電源
         }
 
+        # 最後一次成功寫入的繼電器狀態 {channel: state}
+        self.coil_states: Dict[int, bool] = (
+            coil_states if coil_states is not None else {ch: False for ch in range(1, 9)}
+        )
+
     async def set_relay(self, channel: int, state: bool) -> bool:
         """
         設定單個繼電器狀態
@@ -59,7 +77,10 @@ class RelayIODriver(ModbusDevice):
             return False
         
         address = channel - 1  # Coil 地址從 0 開始
-        return await self.write_single_coil(address, state)
+        success = await self.write_single_coil(address, state)
+        if success:
+            self.coil_states[channel] = state
+        return success
 
     async def set_relays(self, states: Dict[int, bool]) -> bool:
         """
@@ -97,6 +118,7 @@ class RelayIODriver(ModbusDevice):
                     raise Exception(f"寫入多個繼電器失敗: {result}")
                 
                 self.status.update_success()
+                self._record_states(states)
                 return True
             else:
                 # 串口模式：使用同步方法（在執行緒池中執行）
@@ -108,12 +130,19 @@ class RelayIODriver(ModbusDevice):
                 )
                 if success:
                     self.status.update_success()
+                    self._record_states(states)
                 return success
         except Exception as e:
             self.status.update_error()
             logger.error(f"❌ 設定多個繼電器失敗: {e}")
             return False
 
+    def _record_states(self, states: Dict[int, bool]):
+        """記錄成功寫入的繼電器狀態"""
+        for channel, state in states.items():
+            if 1 <= channel <= 8:
+                self.coil_states[channel] = bool(state)
+
     def _write_multiple_coils_sync(self, states: Dict[int, bool]) -> bool:
         """寫入多個線圈（同步）"""
         if not self.connected:
@@ -272,6 +301,7 @@ class RelayIODriver(ModbusDevice):
                 logger.error(f"❌ 關閉所有繼電器失敗: {result}")
                 return False
             
+            self._record_states({i: False for i in range(1, 9)})
             return True
         except Exception as e:
             logger.error(f"❌ 關閉所有繼電器異常: {e}")
@@ -324,6 +354,7 @@ class RelayIODriver(ModbusDevice):
                 logger.error(f"❌ 設定電磁閥失敗: {result}")
                 return False
             
+            self._record_states(dict(enumerate(values, start=1)))
             return True
         except Exception as e:
             logger.error(f"❌ 設定電磁閥異常: {e}")
@@ -372,6 +403,7 @@ class RelayIODriver(ModbusDevice):
                 logger.error(f"❌ 切斷電源失敗: {result}")
                 return False
             
+            self._record_states({5: False, 6: False, 7: False, 8: False})
             return True
         except Exception as e:
             logger.error(f"❌ 切斷電源異常: {e}")
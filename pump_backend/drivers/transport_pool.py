@@ -0,0 +1,85 @@
+"""MODBUS 傳輸連線池 (多工作站共用)"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from loguru import logger
+
+
+@dataclass
+class _Transport:
+    """共用傳輸: 客戶端、串口執行緒池與引用計數"""
+    client: object
+    executor: Optional[ThreadPoolExecutor]
+    refs: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class TransportPool:
+    """
+    MODBUS 傳輸連線池
+
+    同一 TCP 端點 (host, port) 或同一串口上的設備共用一個客戶端，
+    串口另共用單一執行緒的執行緒池，確保同一匯流排上的請求依序執行。
+    以引用計數管理生命週期，最後一個設備釋放時才關閉連線。
+    """
+
+    def __init__(self):
+        self._transports: Dict[Hashable, _Transport] = {}
+
+    @staticmethod
+    def key_for(port: str, use_tcp: bool, tcp_port: int) -> Tuple:
+        """傳輸識別鍵"""
+        return ("tcp", port, tcp_port) if use_tcp else ("rtu", port)
+
+    def acquire(
+        self,
+        key: Hashable,
+        factory: Callable[[], Tuple[object, Optional[ThreadPoolExecutor]]]
+    ) -> Tuple[object, Optional[ThreadPoolExecutor]]:
+        """
+        取得共用傳輸 (不存在時以 factory 建立)
+
+        Args:
+            key: 傳輸識別鍵
+            factory: 返回 (客戶端, 執行緒池) 的建立函數
+
+        Returns:
+            (客戶端, 執行緒池)
+        """
+        transport = self._transports.get(key)
+        if transport is None:
+            client, executor = factory()
+            transport = _Transport(client, executor)
+            self._transports[key] = transport
+            logger.debug(f"🔗 建立共用 MODBUS 傳輸: {key}")
+        transport.refs += 1
+        return transport.client, transport.executor
+
+    def release(self, key: Hashable) -> bool:
+        """
+        釋放共用傳輸
+
+        Returns:
+            是否為最後一個使用者 (呼叫端應關閉連線)
+        """
+        transport = self._transports.get(key)
+        if transport is None:
+            return True
+        transport.refs -= 1
+        if transport.refs > 0:
+            return False
+        del self._transports[key]
+        return True
+
+    def lock(self, key: Hashable) -> asyncio.Lock:
+        """傳輸連線鎖 (避免多個設備同時建立同一連線)"""
+        return self._transports[key].lock
+
+    def refs(self, key: Hashable) -> int:
+        """傳輸目前的使用者數量"""
+        transport = self._transports.get(key)
+        return transport.refs if transport else 0
+
+    def __len__(self) -> int:
+        return len(self._transports)
@@ -41,47 +41,34 @@ async def main():
 
     # 初始化元件
     from core.mqtt_client import MQTTClient
-    from core.safety_monitor import SafetyMonitor
-    from core.watchdog import Watchdog
-    from services.sensor_service import SensorService
-    from services.control_service import ControlService
-    from services.data_logger import DataLogger
-    from services.test_automation import TestAutomation
+    from drivers.transport_pool import TransportPool
+    from services.station import Station
+    from services.reference_db import ReferenceDatabase
+    from config.stations import load_station_configs
 
+    # 所有工作站共用 MQTT 連線、MODBUS 傳輸連線池與參考曲線資料庫
     mqtt = MQTTClient()
-    safety = SafetyMonitor(mqtt)
-    watchdog = Watchdog(mqtt_client=mqtt)
-    sensors = SensorService(mqtt)
-    control = ControlService(mqtt, safety)
-    data_logger = DataLogger(mqtt)
-    automation = TestAutomation(mqtt, control, sensors, data_logger)
+    transport_pool = TransportPool()
+    reference_db = ReferenceDatabase()
+    stations = [
+        Station(mqtt, config, transport_pool, reference_db)
+        for config in load_station_configs()
+    ]
+    if len(stations) > 1:
+        logger.info(f"🏭 多工作站模式: {', '.join(s.name for s in stations)}")
 
     try:
         # 啟動所有服務
         # 先啟動基礎服務
         await mqtt.start()
-        safety_started = await safety.start()
-        if not safety_started:
+
+        # 各工作站獨立啟動，單一工作站失敗不影響其他工作站
+        running = [station for station in stations if await station.start()]
+        if not running:
             logger.error("❌ 安全監控器啟動失敗，系統無法繼續")
             return
-        
-        sensors_started = await sensors.start()
-        control_started = await control.start()
-        
-        if not sensors_started:
-            logger.warning("⚠️ 感測器服務啟動失敗，將繼續運行但無法讀取數據")
-        if not control_started:
-            logger.warning("⚠️ 控制服務啟動失敗，將繼續運行但無法控制設備")
-        
-        automation.start()
-        
-        tasks = [
-            watchdog.monitor(safety),
-            sensors.polling_loop() if sensors_started else asyncio.sleep(3600),
-            control.command_handler() if control_started else asyncio.sleep(3600),
-            data_logger.logging_loop(),
-            automation.state_machine_loop()
-        ]
+
+        tasks = [task for station in running for task in station.tasks()]
 
         await asyncio.gather(
             *tasks,
@@ -95,11 +82,8 @@ async def main():
     finally:
         # 優雅關閉所有服務
         logger.info("🛑 執行安全關閉程序...")
-        automation.stop()
-        sensors.stop()
-        control.stop()
-        data_logger.stop()
-        safety.stop()
+        for station in stations:
+            station.stop()
         await mqtt.disconnect()
         logger.info("✅ 系統已安全關閉")
 
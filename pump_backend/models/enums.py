@@ -37,4 +37,43 @@ class ValveState(Enum):
     CLOSED = "closed"                # 關閉
 
 
+class ConnectionState(Enum):
+    """MQTT 連線狀態"""
+    DISCONNECTED = "disconnected"    # 未連線
+    CONNECTING = "connecting"        # 連線中
+    CONNECTED = "connected"          # 已連線
+    BACKOFF = "backoff"              # 連線失敗，等待重試
 
+
+class RecipeStepType(Enum):
+    """測試配方步驟類型"""
+    SET_VALVES = "set_valves"        # 設定閥門
+    POWER_ON = "power_on"            # 開啟電源
+    POWER_OFF = "power_off"          # 關閉電源
+    RAMP_HOLD = "ramp_hold"          # 升壓/抽真空直到達標並保持
+    MEASURE = "measure"              # 量測窗口
+    VENT = "vent"                    # 洩壓
+    WAIT = "wait"                    # 等待
+    WAIT_PLATEAU = "wait_plateau"    # 等待訊號進入恆定狀態
+
+
+class StepStatus(Enum):
+    """配方步驟結果"""
+    PASSED = "passed"                # 完成
+    FAILED = "failed"                # 失敗 (致動失敗或條件不符)
+    TIMEOUT = "timeout"              # 逾時
+
+
+class PlateauEvent(Enum):
+    """平台 (恆定狀態) 事件"""
+    ENTERED = "plateau_entered"      # 進入恆定狀態
+    EXITED = "plateau_exited"        # 離開恆定狀態
+
+
+class QueueItemStatus(Enum):
+    """批次測試佇列項目狀態"""
+    PENDING = "pending"              # 等待測試
+    RUNNING = "running"              # 測試中
+    COMPLETED = "completed"          # 測試完成
+    FAILED = "failed"                # 測試失敗
+    STOPPED = "stopped"              # 測試被停止 (手動或緊急停止)
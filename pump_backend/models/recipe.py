@@ -0,0 +1,76 @@
+"""測試配方模型"""
+import json
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from models.enums import RecipeStepType, StepStatus
+
+
+@dataclass
+class RecipeStep:
+    """配方步驟"""
+    type: RecipeStepType
+    params: Dict[str, Any] = field(default_factory=dict)
+    name: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RecipeStep":
+        """由設定字典建立步驟 (type 以外的欄位皆為參數)"""
+        params = dict(data)
+        try:
+            step_type = RecipeStepType(params.pop("type"))
+        except KeyError:
+            raise ValueError(f"配方步驟缺少 type: {data}")
+        name = params.pop("name", None)
+        return cls(type=step_type, params=params, name=name)
+
+    @property
+    def label(self) -> str:
+        return self.name or self.type.value
+
+
+@dataclass
+class Recipe:
+    """測試配方 (依序執行的步驟)"""
+    name: str
+    steps: List[RecipeStep]
+    description: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Recipe":
+        """由設定字典建立配方"""
+        steps = [RecipeStep.from_dict(step) for step in data.get("steps", [])]
+        if not steps:
+            raise ValueError(f"配方沒有任何步驟: {data.get('name', 'N/A')}")
+        return cls(
+            name=data.get("name", "inline"),
+            steps=steps,
+            description=data.get("description")
+        )
+
+    @classmethod
+    def from_file(cls, path: Path) -> "Recipe":
+        """由 JSON 檔案載入配方"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        data.setdefault("name", Path(path).stem)
+        return cls.from_dict(data)
+
+
+@dataclass
+class StepResult:
+    """步驟執行結果"""
+    index: int
+    step: str
+    type: RecipeStepType
+    status: StepStatus
+    started_at: float
+    duration_s: float
+    message: Optional[str] = None
+    measurements: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["type"] = self.type.value
+        data["status"] = self.status.value
+        return data
@@ -0,0 +1,47 @@
+"""批次測試佇列模型"""
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Optional
+from models.enums import QueueItemStatus
+
+
+@dataclass
+class QueueItem:
+    """佇列項目 (一台待測幫浦)"""
+    serial: str
+    recipe: Optional[str] = None
+    config: Dict[str, Any] = field(default_factory=dict)
+    item_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: QueueItemStatus = QueueItemStatus.PENDING
+    enqueued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    test_id: Optional[str] = None
+    result: Optional[str] = None
+    phases: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QueueItem":
+        """由字典建立項目 (命令內容或佇列檔案)"""
+        if not data.get("serial"):
+            raise ValueError(f"佇列項目缺少 serial: {data}")
+        data = dict(data)
+        data["status"] = QueueItemStatus(data.get("status", QueueItemStatus.PENDING.value))
+        known = cls.__dataclass_fields__.keys()
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    @property
+    def duration_s(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round(self.finished_at - self.started_at, 3)
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in (QueueItemStatus.PENDING, QueueItemStatus.RUNNING)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["status"] = self.status.value
+        return data
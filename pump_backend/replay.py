@@ -0,0 +1,54 @@
+"""測試重播工具
+
+以錄製的寄存器讀取 (RECORD_REGISTERS=true 時寫入測試紀錄目錄的 *.registers.jsonl)
+經由感測器服務、數據記錄與結果評估管線離線重現測試。
+
+用法:
+    python replay.py data/test_records/test_T001.registers.jsonl
+    python replay.py data/test_records/test_T001.registers.jsonl --speed 1 --output result.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from loguru import logger
+from config.settings import settings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="寄存器錄製檔 (JSON Lines)")
+    parser.add_argument("--speed", type=float, default=None, help="重播倍速 (1 為原速，未指定時盡快重播)")
+    parser.add_argument("--data-dir", default=None, help="重播 CSV 輸出目錄 (預設暫存目錄)")
+    parser.add_argument("--reference", action="store_true", help="與參考曲線資料庫比對")
+    parser.add_argument("--output", help="重播摘要輸出檔 (JSON)")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level=settings.LOG_LEVEL)
+
+    from services.replay import ReplayHarness
+    from services.reference_db import ReferenceDatabase
+
+    harness = ReplayHarness(
+        args.recording,
+        args.data_dir or tempfile.mkdtemp(prefix="replay_"),
+        speed=args.speed,
+        reference_db=ReferenceDatabase() if args.reference else None
+    )
+    summary = await harness.run()
+
+    record = summary["record"] or {}
+    print(f"測試: {summary['test_id']} → {record.get('result')}")
+    print(f"週期 {summary['cycles']}，讀取 {summary['reads']}，訊息 {summary['messages']}，"
+          f"耗時 {summary['elapsed_s']:.3f} 秒")
+    print(f"處理速率: {summary['reads_per_s']} 讀取/秒，{summary['messages_per_s']} 訊息/秒")
+    print(f"CSV: {summary['csv_file']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
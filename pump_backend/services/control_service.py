@@ -1,11 +1,20 @@
 """控制服務 - 閥門和電源控制"""
 import asyncio
-from typing import Dict, Optional
+import time
+from typing import Any, Dict, Optional
 from loguru import logger
 from core.mqtt_client import MQTTClient
 from core.safety_monitor import SafetyMonitor
 from drivers.relay_io import RelayIODriver
-from config.mqtt_topics import CONTROL_VALVE, CONTROL_POWER, CONTROL_TEST
+from drivers.transport_pool import TransportPool
+from config.mqtt_topics import (
+    CONTROL_VALVE,
+    CONTROL_POWER,
+    CONTROL_TEST,
+    CONTROL_VALVE_STATUS,
+    CONTROL_POWER_STATUS,
+    RELAY_STATUS
+)
 
 
 class ControlService:
@@ -14,12 +23,31 @@ class ControlService:
     
     負責處理閥門和電源控制命令
     所有操作都需要通過安全檢查
+
+    閥門/電源命令以請求處理器註冊，回應發布至請求者的 response-topic
+    (舊版客戶端則發布至 *_STATUS 主題)，不再回發到命令主題
     """
 
-    def __init__(self, mqtt_client: MQTTClient, safety_monitor: SafetyMonitor):
+    def __init__(
+        self,
+        mqtt_client: MQTTClient,
+        safety_monitor: SafetyMonitor,
+        relay_config: Optional[Dict[str, Any]] = None,
+        transport_pool: Optional[TransportPool] = None
+    ):
+        """
+        Args:
+            mqtt_client: MQTT 客戶端
+            safety_monitor: 安全監控器
+            relay_config: 繼電器 IO 配置 (預設 get_device_config()["relay_io"])
+            transport_pool: 共用傳輸連線池
+        """
         self.mqtt = mqtt_client
         self.safety = safety_monitor
-        self.io_driver = RelayIODriver()
+        # 與安全監控器的驅動共用繼電器狀態，任一方發布的 RELAY_STATUS 都包含另一方的寫入
+        self.io_driver = RelayIODriver(
+            relay_config, transport_pool, coil_states=safety_monitor.io_driver.coil_states
+        )
         self._running = False
 
     async def start(self):
@@ -40,16 +68,20 @@ class ControlService:
         """
         logger.info("🔄 控制命令處理迴圈已啟動")
         
-        # 訂閱控制命令主題
-        self.mqtt.subscribe(CONTROL_VALVE, self._handle_valve_command)
-        self.mqtt.subscribe(CONTROL_POWER, self._handle_power_command)
+        # 註冊控制命令處理器
+        self.mqtt.register_rpc_handler(
+            CONTROL_VALVE, self._handle_valve_command, CONTROL_VALVE_STATUS
+        )
+        self.mqtt.register_rpc_handler(
+            CONTROL_POWER, self._handle_power_command, CONTROL_POWER_STATUS
+        )
         self.mqtt.subscribe(CONTROL_TEST, self._handle_test_command)
         
         # 保持運行
         while self._running:
             await asyncio.sleep(1.0)
 
-    async def _handle_valve_command(self, payload: Dict):
+    async def _handle_valve_command(self, payload: Dict) -> Dict:
         """
         處理閥門控制命令
         
@@ -58,6 +90,9 @@ class ControlService:
             "valve": "A" | "B" | "C" | "D",
             "state": true | false
         }
+
+        Returns:
+            回應內容 ({"status": "success" | "error", ...})
         """
         try:
             valve = payload.get("valve", "").upper()
@@ -65,17 +100,19 @@ class ControlService:
             
             if valve not in ["A", "B", "C", "D"]:
                 logger.error(f"❌ 無效的閥門: {valve}")
-                return
+                return {
+                    "status": "error",
+                    "message": f"無效的閥門: {valve}"
+                }
             
             # 安全檢查
             can_proceed, error_msg = self.safety.check_start_conditions()
             if not can_proceed:
                 logger.warning(f"⚠️ 閥門控制被拒絕: {error_msg}")
-                await self.mqtt.publish(CONTROL_VALVE, {
+                return {
                     "status": "error",
                     "message": error_msg
-                })
-                return
+                }
             
             # 控制閥門
             channel_map = {"A": 1, "B": 2, "C": 3, "D": 4}
@@ -84,22 +121,27 @@ class ControlService:
             
             if success:
                 logger.info(f"✅ 閥門 {valve} 已{'開啟' if state else '關閉'}")
-                await self.mqtt.publish(CONTROL_VALVE, {
+                self.publish_relay_states()
+                return {
                     "status": "success",
                     "valve": valve,
                     "state": state
-                })
+                }
             else:
                 logger.error(f"❌ 閥門 {valve} 控制失敗")
-                await self.mqtt.publish(CONTROL_VALVE, {
+                return {
                     "status": "error",
                     "message": f"閥門 {valve} 控制失敗"
-                })
+                }
                 
         except Exception as e:
             logger.exception(f"❌ 處理閥門命令異常: {e}")
+            return {
+                "status": "error",
+                "message": str(e)
+            }
 
-    async def _handle_power_command(self, payload: Dict):
+    async def _handle_power_command(self, payload: Dict) -> Dict:
         """
         處理電源控制命令
         
@@ -108,6 +150,9 @@ class ControlService:
             "power_type": "dc" | "ac110" | "ac220" | "ac220_3p",
             "state": true | false
         }
+
+        Returns:
+            回應內容 ({"status": "success" | "error", ...})
         """
         try:
             power_type = payload.get("power_type", "")
@@ -117,11 +162,10 @@ class ControlService:
             can_proceed, error_msg = self.safety.check_start_conditions()
             if not can_proceed:
                 logger.warning(f"⚠️ 電源控制被拒絕: {error_msg}")
-                await self.mqtt.publish(CONTROL_POWER, {
+                return {
                     "status": "error",
                     "message": error_msg
-                })
-                return
+                }
             
             # 控制電源
             channel_map = {
@@ -134,26 +178,34 @@ class ControlService:
             channel = channel_map.get(power_type)
             if channel is None:
                 logger.error(f"❌ 無效的電源類型: {power_type}")
-                return
+                return {
+                    "status": "error",
+                    "message": f"無效的電源類型: {power_type}"
+                }
             
             success = await self.io_driver.set_relay(channel, state)
             
             if success:
                 logger.info(f"✅ 電源 {power_type} 已{'開啟' if state else '關閉'}")
-                await self.mqtt.publish(CONTROL_POWER, {
+                self.publish_relay_states()
+                return {
                     "status": "success",
                     "power_type": power_type,
                     "state": state
-                })
+                }
             else:
                 logger.error(f"❌ 電源 {power_type} 控制失敗")
-                await self.mqtt.publish(CONTROL_POWER, {
+                return {
                     "status": "error",
                     "message": f"電源 {power_type} 控制失敗"
-                })
+                }
                 
         except Exception as e:
             logger.exception(f"❌ 處理電源命令異常: {e}")
+            return {
+                "status": "error",
+                "message": str(e)
+            }
 
     async def _handle_test_command(self, payload: Dict):
         """
@@ -175,6 +227,24 @@ class ControlService:
         except Exception as e:
             logger.exception(f"❌ 處理測試命令異常: {e}")
 
+    async def set_valve(self, valve: str, state: bool) -> Dict:
+        """
+        設定閥門 (供自動測試使用，與 MQTT 命令相同的安全檢查)
+
+        Returns:
+            回應內容 ({"status": "success" | "error", ...})
+        """
+        return await self._handle_valve_command({"valve": valve, "state": state})
+
+    async def set_power(self, power_type: str, state: bool) -> Dict:
+        """
+        設定電源 (供自動測試使用，與 MQTT 命令相同的安全檢查)
+
+        Returns:
+            回應內容 ({"status": "success" | "error", ...})
+        """
+        return await self._handle_power_command({"power_type": power_type, "state": state})
+
     async def emergency_shutdown(self):
         """
         緊急關閉
@@ -194,8 +264,16 @@ class ControlService:
             4: False
         })
         
+        self.publish_relay_states()
         logger.critical("✅ 緊急關閉程序已完成")
 
+    def publish_relay_states(self):
+        """發布目前繼電器狀態 (CH1-CH8)"""
+        self.mqtt.publish_nowait(RELAY_STATUS, {
+            "relays": {str(ch): state for ch, state in self.io_driver.coil_states.items()},
+            "timestamp": time.time()
+        })
+
     def stop(self):
         """停止控制服務"""
         self._running = False
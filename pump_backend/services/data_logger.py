@@ -47,8 +47,15 @@ class DataLogger:
         訂閱感測器數據並記錄到 CSV
         """
         logger.info("🔄 數據記錄迴圈已啟動")
+        self.subscribe()
         
-        # 訂閱所有感測器主題
+        # 保持運行，等待測試開始
+        self._running = True
+        while self._running:
+            await asyncio.sleep(1.0)
+
+    def subscribe(self):
+        """訂閱所有感測器主題"""
         self.mqtt.subscribe(SENSOR_FLOW, self._handle_flow_data)
         self.mqtt.subscribe(SENSOR_PRESSURE_POSITIVE, self._handle_pressure_positive_data)
         self.mqtt.subscribe(SENSOR_PRESSURE_VACUUM, self._handle_pressure_vacuum_data)
@@ -58,11 +65,6 @@ class DataLogger:
         self.mqtt.subscribe(SENSOR_POWER_AC220_3P, self._handle_power_ac220_3p_data)
         
         logger.info("📥 已訂閱所有感測器數據主題")
-        
-        # 保持運行，等待測試開始
-        self._running = True
-        while self._running:
-            await asyncio.sleep(1.0)
 
     def start_test_logging(self, test_id: str):
         """
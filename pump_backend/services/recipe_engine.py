@@ -0,0 +1,468 @@
+"""測試配方執行引擎"""
+import asyncio
+import operator
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from loguru import logger
+from core.mqtt_client import MQTTClient
+from services.control_service import ControlService
+from models.enums import PlateauEvent, RecipeStepType, StepStatus, TestState
+from models.recipe import Recipe, RecipeStep, StepResult
+from utils.plateau_detector import PlateauDetector
+from config.settings import settings
+from config.mqtt_topics import (
+    TEST_STATUS,
+    SENSOR_FLOW,
+    SENSOR_PRESSURE_POSITIVE,
+    SENSOR_PRESSURE_VACUUM,
+    SENSOR_POWER_DC,
+    SENSOR_POWER_AC110,
+    SENSOR_POWER_AC220,
+    SENSOR_POWER_AC220_3P
+)
+
+# 訊號名稱 -> (主題, 欄位)
+SIGNAL_SOURCES = {
+    "pressure": (SENSOR_PRESSURE_POSITIVE, "pressure_mpa"),
+    "vacuum": (SENSOR_PRESSURE_VACUUM, "pressure_kpa"),
+    "flow": (SENSOR_FLOW, "instantaneous_flow"),
+}
+
+# 電力訊號依目前開啟的電源類型對應電表
+POWER_TOPICS = {
+    "dc": SENSOR_POWER_DC,
+    "ac110": SENSOR_POWER_AC110,
+    "ac220": SENSOR_POWER_AC220,
+    "ac220_3p": SENSOR_POWER_AC220_3P,
+}
+POWER_FIELDS = {"current": "current", "voltage": "voltage", "power": "active_power"}
+POWER_FIELDS_3P = {"current": "current_a", "voltage": "voltage_a", "power": "total_active_power"}
+
+SENSOR_TOPICS = {topic for topic, _ in SIGNAL_SOURCES.values()} | set(POWER_TOPICS.values())
+
+OPERATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+# 洩壓閥組合 (與 ControlService.emergency_shutdown 相同)
+DEFAULT_VENT_VALVES = {"A": True, "B": True, "C": False, "D": False}
+
+StepOutcome = Tuple[StepStatus, Optional[str], Dict[str, Any]]
+
+
+class RecipeEngine:
+    """
+    測試配方執行引擎
+
+    依序執行配方步驟 (閥門、電源、升壓保持、等待恆定、量測窗口、洩壓)，
+    以 time.monotonic() 計時，終止條件在每筆新的感測器數據到達時評估。
+
+    感測器數據透過 MQTTClient 發布觀察者取得 (本程序發布，不經 Broker 往返)。
+    執行中的步驟可被取消 (暫停/停止)，恢復時從中斷的步驟重新執行。
+    """
+
+    def __init__(
+        self,
+        mqtt_client: MQTTClient,
+        control_service: ControlService,
+        scenario_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            mqtt_client: MQTT 客戶端
+            control_service: 控制服務 (閥門/電源)
+            scenario_dir: 配方 JSON 目錄 (預設 settings.TEST_SCENARIO_DIR)
+        """
+        self.mqtt = mqtt_client
+        self.control = control_service
+        self.scenario_dir = Path(scenario_dir or settings.TEST_SCENARIO_DIR)
+
+        self.power_type: Optional[str] = None
+        self.current_index = 0
+        self.results: List[StepResult] = []
+
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._sample_event = asyncio.Event()
+        self._sample_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self._step_handlers = {
+            RecipeStepType.SET_VALVES: self._step_set_valves,
+            RecipeStepType.POWER_ON: self._step_power_on,
+            RecipeStepType.POWER_OFF: self._step_power_off,
+            RecipeStepType.RAMP_HOLD: self._step_ramp_hold,
+            RecipeStepType.MEASURE: self._step_measure,
+            RecipeStepType.VENT: self._step_vent,
+            RecipeStepType.WAIT: self._step_wait,
+            RecipeStepType.WAIT_PLATEAU: self._step_wait_plateau,
+        }
+
+    def start(self):
+        """開始觀察感測器數據"""
+        self.mqtt.add_publish_observer(self._on_publish)
+
+    # ===== 配方載入 =====
+
+    def list_recipes(self) -> List[str]:
+        """可用的配方名稱"""
+        return sorted(p.stem for p in self.scenario_dir.glob("*.json"))
+
+    def load_recipe(self, spec: Union[str, Dict[str, Any]]) -> Recipe:
+        """
+        載入配方
+
+        Args:
+            spec: 配方名稱 (scenario_dir 下的 JSON 檔名) 或內嵌配方字典
+
+        Raises:
+            ValueError: 配方不存在或格式錯誤
+        """
+        if isinstance(spec, dict):
+            return Recipe.from_dict(spec)
+
+        path = self.scenario_dir / f"{spec}.json"
+        if not path.exists():
+            raise ValueError(f"配方不存在: {spec}")
+        return Recipe.from_file(path)
+
+    # ===== 感測器訊號 =====
+
+    def _on_publish(self, topic: str, payload: Dict[str, Any]):
+        """發布觀察者: 保存最新感測器數據並喚醒等待中的步驟"""
+        if topic not in SENSOR_TOPICS or not isinstance(payload, dict):
+            return
+        self._latest[topic] = payload
+        self._sample_event.set()
+        for listener in self._sample_listeners:
+            listener(topic, payload)
+
+    def add_sample_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """註冊感測器數據監聽器 (每筆數據呼叫一次)"""
+        self._sample_listeners.append(listener)
+
+    def remove_sample_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """移除感測器數據監聽器"""
+        if listener in self._sample_listeners:
+            self._sample_listeners.remove(listener)
+
+    def resolve_signal(self, name: str) -> Tuple[str, str]:
+        """
+        訊號名稱對應的 (主題, 欄位)
+
+        電力訊號 (current/voltage/power) 使用目前開啟的電源類型對應電表
+
+        Raises:
+            ValueError: 未知訊號或未開啟電源
+        """
+        if name in SIGNAL_SOURCES:
+            return SIGNAL_SOURCES[name]
+        if name in POWER_FIELDS:
+            if self.power_type is None:
+                raise ValueError(f"訊號 {name} 需要先開啟電源")
+            fields = POWER_FIELDS_3P if self.power_type == "ac220_3p" else POWER_FIELDS
+            return POWER_TOPICS[self.power_type], fields[name]
+        raise ValueError(f"未知的訊號: {name}")
+
+    def read_signal(self, name: str) -> Optional[float]:
+        """讀取訊號最新值 (尚無數據時返回 None)"""
+        topic, field = self.resolve_signal(name)
+        value = self._latest.get(topic, {}).get(field)
+        return float(value) if value is not None else None
+
+    async def _wait_sample(self, deadline: float):
+        """等待下一筆感測器數據或到達期限 (monotonic)"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        self._sample_event.clear()
+        try:
+            await asyncio.wait_for(self._sample_event.wait(), remaining)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _wait_condition(
+        self,
+        signal: str,
+        op: str,
+        target: float,
+        timeout: float,
+        hold: float = 0.0
+    ) -> StepOutcome:
+        """
+        等待訊號滿足條件並持續 hold 秒
+
+        條件中斷時重新計算保持時間；timeout 內未完成返回 TIMEOUT
+        """
+        compare = OPERATORS.get(op)
+        if compare is None:
+            raise ValueError(f"未知的比較運算子: {op}")
+        self.resolve_signal(signal)  # 先驗證訊號
+
+        started = time.monotonic()
+        deadline = started + timeout
+        reached_at: Optional[float] = None
+        time_to_target: Optional[float] = None
+        value: Optional[float] = None
+
+        while True:
+            value = self.read_signal(signal)
+            now = time.monotonic()
+            if value is not None and compare(value, target):
+                if reached_at is None:
+                    reached_at = now
+                    if time_to_target is None:
+                        time_to_target = round(now - started, 3)
+                if now - reached_at >= hold:
+                    return StepStatus.PASSED, None, {
+                        "value": value,
+                        "time_to_target_s": time_to_target,
+                    }
+            else:
+                reached_at = None
+
+            if now >= deadline:
+                return StepStatus.TIMEOUT, (
+                    f"{signal} 未在 {timeout} 秒內達到 {op} {target}"
+                    + (f" 並保持 {hold} 秒" if hold else "")
+                ), {"value": value, "time_to_target_s": time_to_target}
+
+            wake_at = deadline if reached_at is None else min(deadline, reached_at + hold)
+            await self._wait_sample(wake_at)
+
+    # ===== 配方執行 =====
+
+    def reset(self):
+        """清除執行紀錄"""
+        self.current_index = 0
+        self.results = []
+
+    async def run(self, recipe: Recipe, start_index: int = 0) -> bool:
+        """
+        執行配方
+
+        Args:
+            recipe: 配方
+            start_index: 起始步驟 (恢復時從中斷的步驟重新執行)
+
+        Returns:
+            是否所有步驟皆完成
+        """
+        logger.info(f"📋 執行測試配方: {recipe.name} ({len(recipe.steps)} 個步驟)")
+
+        for index in range(start_index, len(recipe.steps)):
+            self.current_index = index
+            step = recipe.steps[index]
+            result = await self.run_step(index, step)
+            self.results.append(result)
+
+            self.mqtt.publish_nowait(TEST_STATUS, {
+                "state": TestState.RUNNING.value,
+                "message": f"步驟 {index + 1}/{len(recipe.steps)} {step.label}: {result.status.value}",
+                "step": result.to_dict()
+            })
+
+            if result.status != StepStatus.PASSED and not step.params.get("continue_on_fail", False):
+                logger.error(f"❌ 配方步驟失敗 [{step.label}]: {result.message}")
+                return False
+
+        self.current_index = len(recipe.steps)
+        logger.info(f"✅ 測試配方完成: {recipe.name}")
+        return True
+
+    async def run_step(self, index: int, step: RecipeStep) -> StepResult:
+        """執行單一步驟並記錄結果 (取消時直接向上傳遞)"""
+        logger.info(f"▶️ 步驟 {index + 1}: {step.label}")
+        started_at = time.time()
+        started = time.monotonic()
+
+        try:
+            status, message, measurements = await self._step_handlers[step.type](step.params)
+        except (KeyError, TypeError, ValueError) as e:
+            status, message, measurements = StepStatus.FAILED, f"步驟參數錯誤: {e}", {}
+
+        return StepResult(
+            index=index,
+            step=step.label,
+            type=step.type,
+            status=status,
+            started_at=started_at,
+            duration_s=round(time.monotonic() - started, 3),
+            message=message,
+            measurements=measurements
+        )
+
+    # ===== 步驟實作 =====
+
+    async def _set_valves(self, valves: Dict[str, bool]) -> Optional[str]:
+        """設定多個閥門，返回錯誤訊息 (成功時為 None)"""
+        for valve, state in valves.items():
+            reply = await self.control.set_valve(valve, bool(state))
+            if reply.get("status") != "success":
+                return reply.get("message", f"閥門 {valve} 控制失敗")
+        return None
+
+    async def _step_set_valves(self, params: Dict[str, Any]) -> StepOutcome:
+        """{"valves": {"A": false, "B": true, ...}}"""
+        error = await self._set_valves(params["valves"])
+        if error:
+            return StepStatus.FAILED, error, {}
+        return StepStatus.PASSED, None, {}
+
+    async def _step_power_on(self, params: Dict[str, Any]) -> StepOutcome:
+        """{"power_type": "dc" | "ac110" | "ac220" | "ac220_3p"}"""
+        power_type = params["power_type"]
+        reply = await self.control.set_power(power_type, True)
+        if reply.get("status") != "success":
+            return StepStatus.FAILED, reply.get("message"), {}
+        self.power_type = power_type
+        return StepStatus.PASSED, None, {}
+
+    async def _step_power_off(self, params: Dict[str, Any]) -> StepOutcome:
+        """{"power_type": ...} (省略時關閉所有電源)"""
+        power_types = [params["power_type"]] if "power_type" in params else list(POWER_TOPICS)
+        for power_type in power_types:
+            reply = await self.control.set_power(power_type, False)
+            if reply.get("status") != "success":
+                return StepStatus.FAILED, reply.get("message"), {}
+        if self.power_type in power_types:
+            self.power_type = None
+        return StepStatus.PASSED, None, {}
+
+    async def _step_ramp_hold(self, params: Dict[str, Any]) -> StepOutcome:
+        """{"signal": "pressure", "op": ">=", "target": 0.6, "hold": 5, "timeout": 60}"""
+        return await self._wait_condition(
+            params["signal"],
+            params.get("op", ">="),
+            float(params["target"]),
+            float(params.get("timeout", 60)),
+            float(params.get("hold", 0))
+        )
+
+    async def _step_measure(self, params: Dict[str, Any]) -> StepOutcome:
+        """{"duration": 10, "signals": ["pressure", "current"]}"""
+        duration = float(params["duration"])
+        sources = {name: self.resolve_signal(name) for name in params.get("signals", ["pressure"])}
+        stats = {name: {"count": 0, "min": None, "max": None, "sum": 0.0} for name in sources}
+
+        def collect(topic: str, payload: Dict[str, Any]):
+            for name, (source_topic, field) in sources.items():
+                if topic != source_topic or payload.get(field) is None:
+                    continue
+                value = float(payload[field])
+                s = stats[name]
+                s["count"] += 1
+                s["sum"] += value
+                s["min"] = value if s["min"] is None else min(s["min"], value)
+                s["max"] = value if s["max"] is None else max(s["max"], value)
+
+        deadline = time.monotonic() + duration
+        self.add_sample_listener(collect)
+        try:
+            await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+        finally:
+            self.remove_sample_listener(collect)
+
+        measurements = {
+            name: {
+                "count": s["count"],
+                "min": s["min"],
+                "max": s["max"],
+                "avg": s["sum"] / s["count"] if s["count"] else None,
+            }
+            for name, s in stats.items()
+        }
+        missing = [name for name, s in stats.items() if not s["count"]]
+        if missing:
+            return StepStatus.FAILED, f"量測期間沒有數據: {', '.join(missing)}", measurements
+        return StepStatus.PASSED, None, measurements
+
+    async def _step_vent(self, params: Dict[str, Any]) -> StepOutcome:
+        """
+        {"valves": {...}, "until": {"signal": "pressure", "op": "<=", "target": 0.01},
+         "timeout": 30, "duration": 5, "close_after": true}
+
+        開啟洩壓閥，等待條件成立 (或 duration 秒)，再關閉閥門
+        """
+        valves = params.get("valves", DEFAULT_VENT_VALVES)
+        error = await self._set_valves(valves)
+        if error:
+            return StepStatus.FAILED, error, {}
+
+        try:
+            until = params.get("until")
+            if until:
+                outcome = await self._wait_condition(
+                    until["signal"],
+                    until.get("op", "<="),
+                    float(until["target"]),
+                    float(params.get("timeout", 30))
+                )
+            else:
+                await asyncio.sleep(float(params.get("duration", 5)))
+                outcome = (StepStatus.PASSED, None, {})
+        finally:
+            if params.get("close_after", True):
+                await self._set_valves({valve: False for valve, state in valves.items() if state})
+
+        return outcome
+
+    async def _step_wait(self, params: Dict[str, Any]) -> StepOutcome:
+        """{"duration": 5}"""
+        await asyncio.sleep(float(params["duration"]))
+        return StepStatus.PASSED, None, {}
+
+    async def _step_wait_plateau(self, params: Dict[str, Any]) -> StepOutcome:
+        """
+        {"signal": "vacuum", "window": 300, "tolerance": 0.01, "timeout": 3600}
+
+        等待訊號進入平台 (恆定狀態)，平台成立即完成，不必跑滿固定時間；
+        timeout 內未成立返回 TIMEOUT (PRD FR-004: 持續變化超過 1 小時 → 超時停止)
+        """
+        signal = params["signal"]
+        topic, field = self.resolve_signal(signal)
+        detector = PlateauDetector(
+            float(params.get("window", 300)),
+            float(params.get("tolerance", 0.01)),
+            params.get("exit_tolerance")
+        )
+        timeout = float(params.get("timeout", 3600))
+        entered = asyncio.Event()
+        started = time.monotonic()
+
+        def on_sample(sample_topic: str, payload: Dict[str, Any]):
+            if sample_topic != topic or payload.get(field) is None:
+                return
+            event = detector.update(time.monotonic(), float(payload[field]))
+            if event is None:
+                return
+            self._publish_plateau_event(signal, event, detector)
+            if event == PlateauEvent.ENTERED:
+                entered.set()
+
+        self.add_sample_listener(on_sample)
+        try:
+            await asyncio.wait_for(entered.wait(), timeout)
+        except asyncio.TimeoutError:
+            return StepStatus.TIMEOUT, f"{signal} 未在 {timeout} 秒內達到恆定", {
+                "deviation": detector.deviation()
+            }
+        finally:
+            self.remove_sample_listener(on_sample)
+
+        return StepStatus.PASSED, None, {
+            "plateau_value": detector.plateau_value,
+            "time_to_plateau_s": round(time.monotonic() - started, 3),
+        }
+
+    def _publish_plateau_event(self, signal: str, event: PlateauEvent, detector: PlateauDetector):
+        """發布平台事件至測試狀態主題"""
+        logger.info(f"📏 {signal} {event.value}: {detector.window.mean:.3f}")
+        self.mqtt.publish_nowait(TEST_STATUS, {
+            "state": TestState.RUNNING.value,
+            "event": event.value,
+            "signal": signal,
+            "value": detector.window.mean,
+            "timestamp": time.time()
+        })
@@ -0,0 +1,292 @@
+"""幫浦參考曲線資料庫 (比對資料庫)"""
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from core.mqtt_client import MQTTClient
+from utils.curve_compare import CurveRecorder, uniform_grid, resample, compare_curves
+from config.settings import settings
+from config.mqtt_topics import CONTROL_REFERENCE, CONTROL_REFERENCE_STATUS
+
+# 比對的曲線 (壓力依測試類型為真空 kPa 或正壓 kg/cm²)
+REFERENCE_SIGNALS = ("pressure", "current", "flow")
+# 即時比對所需的最少參考點數
+MIN_COMPARE_POINTS = 5
+
+
+class ReferenceDatabase:
+    """
+    幫浦參考曲線資料庫
+
+    每個幫浦型號保存一組良品的壓力/電流/流量對時間曲線，
+    重新取樣至固定點數 (REFERENCE_POINTS) 後存為 JSON；
+    同型號再次加入良品時以逐點平均合併，count 記錄合併的台數。
+
+    比對以參考曲線最大絕對值正規化的 RMSE 與限制帶 DTW 計算，
+    測試進行中可只比對已經過的時間區段 (前綴)。
+    """
+
+    def __init__(
+        self,
+        db_dir: Optional[str] = None,
+        points: Optional[int] = None,
+        band_ratio: Optional[float] = None
+    ):
+        """
+        Args:
+            db_dir: 資料庫目錄 (預設 REFERENCE_DB_DIR)
+            points: 參考曲線點數 (預設 REFERENCE_POINTS)
+            band_ratio: DTW 限制帶寬度佔曲線長度的比例 (預設 REFERENCE_BAND)
+        """
+        self.db_dir = Path(db_dir or settings.REFERENCE_DB_DIR)
+        self.points = points or settings.REFERENCE_POINTS
+        self.band_ratio = settings.REFERENCE_BAND if band_ratio is None else band_ratio
+        self._cache: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def _path(self, pump_model: str) -> Path:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", pump_model)
+        return self.db_dir / f"{safe}.json"
+
+    def get(self, pump_model: str) -> Optional[Dict[str, Any]]:
+        """獲取型號的參考資料 (結果快取)"""
+        if pump_model not in self._cache:
+            path = self._path(pump_model)
+            reference = None
+            if path.exists():
+                try:
+                    reference = json.loads(path.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    logger.error(f"❌ 參考曲線載入失敗 [{path}]: {e}")
+            self._cache[pump_model] = reference
+        return self._cache[pump_model]
+
+    def list_models(self) -> List[Dict[str, Any]]:
+        """所有參考資料摘要 (不含曲線)"""
+        summaries = []
+        for path in sorted(self.db_dir.glob("*.json")):
+            try:
+                reference = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            summaries.append({k: v for k, v in reference.items() if k != "curves"})
+        return summaries
+
+    def delete(self, pump_model: str) -> bool:
+        """刪除型號的參考資料"""
+        path = self._path(pump_model)
+        self._cache.pop(pump_model, None)
+        if not path.exists():
+            return False
+        path.unlink()
+        logger.info(f"🗑️ 已刪除參考曲線: {pump_model}")
+        return True
+
+    def _save(self, reference: Dict[str, Any]):
+        self.db_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(reference["pump_model"])
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(reference, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        self._cache[reference["pump_model"]] = reference
+
+    def add(
+        self,
+        pump_model: str,
+        curves: Dict[str, CurveRecorder],
+        mode: Optional[str] = None,
+        test_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        加入一台良品的測試曲線
+
+        Args:
+            pump_model: 幫浦型號
+            curves: 各訊號的測試曲線
+            mode: 測試類型 (vacuum / positive / flow)
+            test_id: 來源測試 ID
+
+        Returns:
+            更新後的參考資料
+
+        Raises:
+            ValueError: 沒有可用的曲線，或與既有參考的測試類型不同
+        """
+        curves = {s: c for s, c in curves.items() if s in REFERENCE_SIGNALS and len(c) >= 2}
+        if not curves:
+            raise ValueError("測試沒有可用的曲線數據")
+
+        existing = self.get(pump_model)
+        if existing is not None and mode and existing.get("mode") not in (None, mode):
+            raise ValueError(f"型號 {pump_model} 的參考為 {existing['mode']} 測試，與 {mode} 不同")
+
+        now = time.time()
+        if existing is None:
+            duration = max(c.duration for c in curves.values())
+            grid = uniform_grid(duration, self.points)
+            reference = {
+                "pump_model": pump_model,
+                "mode": mode,
+                "duration_s": round(duration, 3),
+                "points": self.points,
+                "count": 1,
+                "curves": {s: resample(c.times, c.values, grid) for s, c in curves.items()},
+                "source_tests": [test_id] if test_id else [],
+                "created_at": now,
+                "updated_at": now,
+            }
+        else:
+            # 重新取樣至既有參考的時間軸後逐點平均
+            reference = dict(existing)
+            grid = uniform_grid(reference["duration_s"], reference["points"])
+            count = reference["count"] + 1
+            merged = dict(reference["curves"])
+            for signal, curve in curves.items():
+                values = resample(curve.times, curve.values, grid)
+                if signal in merged:
+                    merged[signal] = [r + (v - r) / count for r, v in zip(merged[signal], values)]
+                else:
+                    merged[signal] = values
+            reference.update({
+                "count": count,
+                "curves": merged,
+                "source_tests": reference.get("source_tests", []) + ([test_id] if test_id else []),
+                "updated_at": now,
+            })
+
+        self._save(reference)
+        logger.info(f"💾 參考曲線已更新: {pump_model} (共 {reference['count']} 台)")
+        return reference
+
+    def compare(
+        self,
+        pump_model: str,
+        curves: Dict[str, CurveRecorder],
+        elapsed: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        比對測試曲線與參考曲線
+
+        Args:
+            pump_model: 幫浦型號
+            curves: 各訊號的測試曲線
+            elapsed: 測試經過時間，僅比對參考曲線的此前綴 (None 表示完整比對)
+
+        Returns:
+            比對結果 (各訊號相對 RMSE / DTW，deviation 為各訊號 DTW 的最大值)；
+            沒有參考或資料不足時返回 None
+        """
+        reference = self.get(pump_model)
+        if reference is None:
+            return None
+
+        started = time.perf_counter()
+        grid = uniform_grid(reference["duration_s"], reference["points"])
+        if elapsed is not None and elapsed < reference["duration_s"]:
+            grid = [t for t in grid if t <= elapsed]
+        if len(grid) < MIN_COMPARE_POINTS:
+            return None
+
+        signals = {}
+        for signal, ref_curve in reference["curves"].items():
+            curve = curves.get(signal)
+            if curve is None or len(curve) < 2:
+                continue
+            candidate = resample(curve.times, curve.values, grid)
+            rel_rmse, rel_dtw = compare_curves(ref_curve[:len(grid)], candidate, self.band_ratio)
+            signals[signal] = {"rmse": round(rel_rmse, 4), "dtw": round(rel_dtw, 4)}
+        if not signals:
+            return None
+
+        return {
+            "pump_model": pump_model,
+            "reference_count": reference["count"],
+            "coverage": round(len(grid) / reference["points"], 3),
+            "signals": signals,
+            "deviation": max(s["dtw"] for s in signals.values()),
+            "compute_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+
+class ReferenceService:
+    """
+    比對資料庫命令服務
+
+    命令 (CONTROL_REFERENCE):
+    - save: 將最近一次通過的測試曲線存入比對資料庫 (可指定 pump_model)
+    - compare: 以最近一次測試比對參考曲線
+    - list / get / delete: 查詢與刪除參考資料
+    """
+
+    def __init__(self, mqtt_client: MQTTClient, database: ReferenceDatabase, evaluator):
+        """
+        Args:
+            mqtt_client: MQTT 客戶端
+            database: 參考曲線資料庫
+            evaluator: 測試評估服務 (提供最近一次測試的曲線)
+        """
+        self.mqtt = mqtt_client
+        self.database = database
+        self.evaluator = evaluator
+
+    def start(self):
+        """註冊命令處理器"""
+        self.mqtt.register_rpc_handler(
+            CONTROL_REFERENCE, self._handle_command, CONTROL_REFERENCE_STATUS
+        )
+
+    def _handle_command(self, payload: Dict) -> Dict:
+        """
+        處理比對資料庫命令
+
+        命令格式:
+        {
+            "action": "save" | "compare" | "list" | "get" | "delete",
+            "pump_model": "DMM9200",  # 未指定時使用最近一次測試的型號
+            "force": false            # save 時允許存入未通過的測試
+        }
+        """
+        try:
+            action = payload.get("action", "").lower()
+            last = self.evaluator.last_test
+            pump_model = payload.get("pump_model") or (last or {}).get("config", {}).get("pump_model")
+
+            if action == "list":
+                return {"status": "success", "references": self.database.list_models()}
+            if not pump_model:
+                return {"status": "error", "message": "未指定幫浦型號"}
+
+            if action == "get":
+                reference = self.database.get(pump_model)
+                if reference is None:
+                    return {"status": "error", "message": f"型號 {pump_model} 沒有參考曲線"}
+                return {"status": "success", "reference": reference}
+            if action == "delete":
+                if not self.database.delete(pump_model):
+                    return {"status": "error", "message": f"型號 {pump_model} 沒有參考曲線"}
+                return {"status": "success", "pump_model": pump_model}
+            if action in ("save", "compare"):
+                if last is None:
+                    return {"status": "error", "message": "沒有可用的測試數據"}
+                if action == "save":
+                    if last["result"] != "PASS" and not payload.get("force"):
+                        return {"status": "error", "message": "最近一次測試未通過，不可作為參考曲線 (force 可強制存入)"}
+                    reference = self.database.add(
+                        pump_model, last["curves"], last["mode"], last["test_id"]
+                    )
+                    summary = {k: v for k, v in reference.items() if k != "curves"}
+                    return {"status": "success", "reference": summary}
+                comparison = self.database.compare(pump_model, last["curves"])
+                if comparison is None:
+                    return {"status": "error", "message": f"型號 {pump_model} 沒有參考曲線"}
+                return {"status": "success", "comparison": comparison}
+
+            return {"status": "error", "message": f"未知的比對資料庫命令: {action}"}
+
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        except Exception as e:
+            logger.exception(f"❌ 處理比對資料庫命令異常: {e}")
+            return {"status": "error", "message": str(e)}
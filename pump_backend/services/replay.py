@@ -0,0 +1,255 @@
+"""測試重播 - 以錄製的寄存器讀取重現測試"""
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from loguru import logger
+from drivers.transport_pool import TransportPool
+from services.sensor_service import SensorService
+from services.data_logger import DataLogger
+from services.test_evaluator import TestEvaluator
+from utils.register_recording import load_recording
+from models.enums import TestState
+from config.modbus_devices import get_device_config
+
+# 感測器服務的設備 (錄製檔以設備配置名稱識別)
+SENSOR_DEVICES = (
+    "flow_meter",
+    "pressure_positive",
+    "pressure_vacuum",
+    "dc_meter",
+    "ac110v_meter",
+    "ac220v_meter",
+    "ac220v_3p_meter",
+)
+REPLAY_HOST = "replay"
+
+
+class VirtualClock:
+    """虛擬時鐘 (只前進不後退)"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def set(self, t: float):
+        if t > self.now:
+            self.now = t
+
+
+class LoopbackMQTT:
+    """
+    程序內回送 MQTT
+
+    提供服務使用的 MQTTClient 介面 (publish / publish_nowait / subscribe / add_publish_observer)，
+    不連線 Broker：發布時同步通知觀察者並依序記錄，deliver() 時交給訂閱者，
+    模擬 Broker 往返但順序固定，供重播取得確定的輸出。
+    """
+
+    def __init__(self):
+        self.subscriptions: Dict[str, Callable] = {}
+        self.messages: List[Tuple[str, Dict[str, Any]]] = []
+        self._observers: List[Callable] = []
+        self._pending: Deque[Tuple[str, Dict[str, Any]]] = deque()
+
+    def subscribe(self, topic: str, callback: Callable, raw: bool = False):
+        self.subscriptions[topic] = callback
+
+    def add_publish_observer(self, observer: Callable):
+        self._observers.append(observer)
+
+    def publish_nowait(self, topic: str, payload: dict, qos: Optional[int] = None, retain: bool = False) -> bool:
+        for observer in self._observers:
+            observer(topic, payload)
+        self.messages.append((topic, payload))
+        self._pending.append((topic, payload))
+        return True
+
+    async def publish(self, topic: str, payload: dict, qos: Optional[int] = None, retain: bool = False):
+        self.publish_nowait(topic, payload, qos, retain)
+        await self.deliver()
+
+    async def deliver(self):
+        """將待送訊息交給訂閱者"""
+        while self._pending:
+            topic, payload = self._pending.popleft()
+            callback = self.subscriptions.get(topic)
+            if callback is None:
+                continue
+            result = callback(payload)
+            if asyncio.iscoroutine(result):
+                await result
+
+
+class ReplayResponse:
+    """重播的讀取回應 (介面同 pymodbus 回應)"""
+
+    def __init__(self, registers: Optional[List[int]]):
+        self.registers = registers if registers is not None else []
+        self._error = registers is None
+
+    def isError(self) -> bool:
+        return self._error
+
+
+class ReplayTransport:
+    """
+    重播傳輸 (介面同 AsyncModbusTcpClient)
+
+    依 (位址, 數量) 依序返回錄製的讀取結果，並將虛擬時鐘推進至錄製時間；
+    每筆讀取僅在其錄製的輪詢週期內返回，錄製檔未涵蓋的讀取回應錯誤。
+    """
+
+    def __init__(self, device: str, clock: VirtualClock):
+        self.device = device
+        self.clock = clock
+        self.connected = False
+        self.cycle = 0
+        self.reads = 0
+        self._entries: Dict[Tuple[int, int], Deque[Dict[str, Any]]] = defaultdict(deque)
+
+    def load(self, entry: Dict[str, Any]):
+        self._entries[(entry["a"], entry["n"])].append(entry)
+
+    async def connect(self) -> bool:
+        self.connected = True
+        return True
+
+    async def close(self):
+        self.connected = False
+
+    async def read_holding_registers(self, address: int, count: int, device_id: int = 1) -> ReplayResponse:
+        queue = self._entries.get((address, count))
+        if not queue or queue[0]["c"] != self.cycle:
+            return ReplayResponse(None)
+        entry = queue.popleft()
+        self.clock.set(entry["t"])
+        self.reads += 1
+        return ReplayResponse(entry["r"])
+
+
+class ReplayHarness:
+    """
+    測試重播
+
+    將錄製檔 (RegisterRecorder) 的寄存器讀取經由實際的
+    SensorService → ThrottledPublisher → DataLogger → TestEvaluator 管線重新執行：
+    - 驅動程式經傳輸連線池取得 ReplayTransport，解碼與發布流程與正式運行相同
+    - 所有時間來源為虛擬時鐘 (錄製時間)，相同錄製檔的輸出 (訊息、CSV、測試結果) 完全相同
+    - speed=1.0 以錄製時的節奏重播，None 表示盡快重播 (用於效能測試)
+    """
+
+    def __init__(
+        self,
+        recording: str,
+        data_dir: str,
+        speed: Optional[float] = None,
+        reference_db=None
+    ):
+        """
+        Args:
+            recording: 錄製檔路徑
+            data_dir: 重播產生的 CSV 輸出目錄
+            speed: 重播倍速 (None 表示不等待)
+            reference_db: 參考曲線資料庫 (比對用，可省略)
+        """
+        self.header, self.entries = load_recording(recording)
+        self.speed = speed
+        self.clock = VirtualClock(self.header.get("started_at", 0.0))
+        self.mqtt = LoopbackMQTT()
+
+        # 預先放入重播傳輸，驅動程式建立時即取得 (連線池保留一個引用，設備斷線時不關閉)
+        pool = TransportPool()
+        defaults = get_device_config()
+        devices = {}
+        self.transports: Dict[str, ReplayTransport] = {}
+        for index, name in enumerate(SENSOR_DEVICES):
+            transport = ReplayTransport(name, self.clock)
+            pool.acquire(TransportPool.key_for(REPLAY_HOST, True, index), lambda t=transport: (t, None))
+            devices[name] = {**defaults[name], "port": REPLAY_HOST, "use_tcp": True, "tcp_port": index}
+            self.transports[name] = transport
+        for entry in self.entries:
+            if "d" in entry and entry["d"] in self.transports:
+                self.transports[entry["d"]].load(entry)
+
+        self.sensors = SensorService(self.mqtt, devices, pool, clock=self.clock)
+        self.data_logger = DataLogger(self.mqtt, data_dir)
+        self.evaluator = TestEvaluator(
+            self.mqtt, clock=self.clock, wall_clock=self.clock, reference_db=reference_db
+        )
+
+    def _steps(self) -> List[Tuple[str, float, Any]]:
+        """錄製內容依序分為輪詢週期與事件"""
+        steps = []
+        cycle = None
+        for entry in self.entries:
+            if "e" in entry:
+                # 週期中途的事件於該週期結束後套用
+                steps.append(("event", entry["t"], entry))
+            elif entry["c"] != cycle:
+                cycle = entry["c"]
+                steps.append(("cycle", entry["t"], cycle))
+        return steps
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        執行重播
+
+        Returns:
+            重播摘要 (測試結果紀錄、CSV 路徑、讀取/訊息數與處理速率)
+        """
+        config = self.header.get("config", {})
+        await self.sensors.start()
+        self.data_logger.subscribe()
+        self.evaluator.start()
+        self.evaluator.begin(config)
+        self.data_logger.start_test_logging(self.evaluator.test_id)
+        csv_file = self.data_logger.csv_handle.name if self.data_logger.csv_handle else None
+
+        outcome = TestState.COMPLETED
+        started = time.perf_counter()
+        previous = None
+        cycles = 0
+        for kind, t, item in self._steps():
+            if self.speed and previous is not None and t > previous:
+                await asyncio.sleep((t - previous) / self.speed)
+            previous = t
+            self.clock.set(t)
+
+            if kind == "cycle":
+                for transport in self.transports.values():
+                    transport.cycle = item
+                await self.sensors.poll_once(item)
+                cycles += 1
+            elif item["e"] == "pause":
+                self.evaluator.pause()
+            elif item["e"] == "resume":
+                self.evaluator.resume()
+            elif item["e"] == "end" and item.get("outcome"):
+                outcome = TestState(item["outcome"])
+            await self.mqtt.deliver()
+
+        record = await self.evaluator.finish(outcome)
+        self.data_logger.stop_test_logging()
+        self.sensors.stop()
+        elapsed = time.perf_counter() - started
+
+        reads = sum(t.reads for t in self.transports.values())
+        summary = {
+            "test_id": record["test_id"] if record else None,
+            "record": record,
+            "csv_file": csv_file,
+            "cycles": cycles,
+            "reads": reads,
+            "messages": len(self.mqtt.messages),
+            "elapsed_s": round(elapsed, 6),
+            "reads_per_s": round(reads / elapsed, 1) if elapsed > 0 else None,
+            "messages_per_s": round(len(self.mqtt.messages) / elapsed, 1) if elapsed > 0 else None,
+        }
+        logger.info(
+            f"⏯️ 重播完成: {cycles} 週期、{reads} 次讀取、{len(self.mqtt.messages)} 則訊息 "
+            f"({elapsed:.3f} 秒) → {record['result'] if record else 'N/A'}"
+        )
+        return summary
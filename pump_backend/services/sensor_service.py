@@ -1,16 +1,19 @@
 """感測器輪詢服務"""
 import asyncio
 import time
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Optional
 from loguru import logger
 from core.mqtt_client import MQTTClient
 from utils.throttled_publisher import ThrottledPublisher
+from utils.register_recording import RegisterRecorder
 from drivers.flow_meter import FlowMeterDriver
 from drivers.pressure_sensor import PressureSensorDriver
 from drivers.power_meter import (
     SinglePhasePowerMeterDriver,
     ThreePhasePowerMeterDriver
 )
+from drivers.transport_pool import TransportPool
+from config.modbus_devices import get_device_config
 from config.mqtt_topics import (
     SENSOR_FLOW,
     SENSOR_PRESSURE_POSITIVE,
@@ -27,23 +30,86 @@ class SensorService:
     感測器輪詢服務
     
     負責定期讀取所有感測器數據並發布到 MQTT
+
+    測試期間可錄製所有寄存器讀取 (start_recording)，供重播工具離線重現
     """
 
-    def __init__(self, mqtt_client: MQTTClient):
+    def __init__(
+        self,
+        mqtt_client: MQTTClient,
+        device_config: Optional[Dict[str, Dict[str, Any]]] = None,
+        transport_pool: Optional[TransportPool] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            mqtt_client: MQTT 客戶端
+            device_config: 設備配置 (預設 get_device_config())
+            transport_pool: 共用傳輸連線池
+            clock: 數據時間戳來源 (重播時為虛擬時鐘)
+        """
         self.mqtt = mqtt_client
-        self.throttled_publisher = ThrottledPublisher(mqtt_client, min_interval=0.1)
+        self.clock = clock
+        self.throttled_publisher = ThrottledPublisher(mqtt_client, min_interval=0.1, clock=clock)
+        devices = device_config or get_device_config()
+        pool = transport_pool
         
         # 初始化所有感測器驅動
-        self.flow_meter = FlowMeterDriver()
-        self.pressure_positive = PressureSensorDriver("positive")
-        self.pressure_vacuum = PressureSensorDriver("vacuum")
-        self.dc_meter = SinglePhasePowerMeterDriver("dc")
-        self.ac110v_meter = SinglePhasePowerMeterDriver("ac110")
-        self.ac220v_meter = SinglePhasePowerMeterDriver("ac220")
-        self.ac220v_3p_meter = ThreePhasePowerMeterDriver()
+        self.flow_meter = FlowMeterDriver(devices["flow_meter"], pool)
+        self.pressure_positive = PressureSensorDriver("positive", devices["pressure_positive"], pool)
+        self.pressure_vacuum = PressureSensorDriver("vacuum", devices["pressure_vacuum"], pool)
+        self.dc_meter = SinglePhasePowerMeterDriver("dc", devices["dc_meter"], pool)
+        self.ac110v_meter = SinglePhasePowerMeterDriver("ac110", devices["ac110v_meter"], pool)
+        self.ac220v_meter = SinglePhasePowerMeterDriver("ac220", devices["ac220v_meter"], pool)
+        self.ac220v_3p_meter = ThreePhasePowerMeterDriver(devices["ac220v_3p_meter"], pool)
         
+        self.recorder: Optional[RegisterRecorder] = None
         self._running = False
 
+    def _devices_by_name(self) -> Dict[str, Any]:
+        """設備配置名稱 -> 驅動 (錄製檔以此名稱識別設備)"""
+        return {
+            "flow_meter": self.flow_meter,
+            "pressure_positive": self.pressure_positive,
+            "pressure_vacuum": self.pressure_vacuum,
+            "dc_meter": self.dc_meter,
+            "ac110v_meter": self.ac110v_meter,
+            "ac220v_meter": self.ac220v_meter,
+            "ac220v_3p_meter": self.ac220v_3p_meter,
+        }
+
+    def start_recording(self, path: str, config: Optional[Dict[str, Any]] = None):
+        """
+        開始錄製寄存器讀取
+
+        Args:
+            path: 錄製檔路徑
+            config: 測試配置 (寫入檔頭)
+        """
+        self.stop_recording()
+        recorder = RegisterRecorder(path, config, clock=self.clock)
+        for name, device in self._devices_by_name().items():
+            device.read_observer = (
+                lambda address, count, registers, name=name: recorder.record(name, address, count, registers)
+            )
+        self.recorder = recorder
+        logger.info(f"⏺️ 開始錄製寄存器讀取: {path}")
+
+    def mark_recording(self, event: str):
+        """於錄製檔記錄事件 (pause / resume)"""
+        if self.recorder is not None:
+            self.recorder.mark(event)
+
+    def stop_recording(self, outcome: Optional[str] = None):
+        """結束錄製"""
+        if self.recorder is None:
+            return
+        for device in self._devices_by_name().values():
+            device.read_observer = None
+        self.recorder.close(outcome)
+        logger.info(f"⏹️ 寄存器錄製完成: {self.recorder.path} ({self.recorder.reads} 筆)")
+        self.recorder = None
+
     async def start(self):
         """啟動感測器服務"""
         # 連接所有感測器
@@ -91,22 +157,7 @@ class SensorService:
             loop_start = time.time()
             
             try:
-                # 流量計：1Hz (每秒)
-                if counter % 1 == 0:
-                    await self._poll_flow_meter()
-                
-                # 壓力計：1Hz (每秒)
-                if counter % 1 == 0:
-                    await self._poll_pressure_sensors()
-                
-                # 電表：2Hz (每 0.5 秒)
-                if counter % 1 == 0:  # 每秒讀取一次（簡化）
-                    await self._poll_power_meters()
-                
-                # 定期刷新待發布的訊息
-                if counter % 10 == 0:
-                    await self.throttled_publisher.flush_pending()
-                
+                await self.poll_once(counter)
                 counter += 1
                 
             except Exception as e:
@@ -117,6 +168,32 @@ class SensorService:
             sleep_time = max(0, 1.0 - elapsed)
             await asyncio.sleep(sleep_time)
 
+    async def poll_once(self, counter: int):
+        """
+        執行一次輪詢週期
+
+        Args:
+            counter: 輪詢週期計數 (控制不同頻率)
+        """
+        if self.recorder is not None:
+            self.recorder.cycle = counter
+
+        # 流量計：1Hz (每秒)
+        if counter % 1 == 0:
+            await self._poll_flow_meter()
+        
+        # 壓力計：1Hz (每秒)
+        if counter % 1 == 0:
+            await self._poll_pressure_sensors()
+        
+        # 電表：2Hz (每 0.5 秒)
+        if counter % 1 == 0:  # 每秒讀取一次（簡化）
+            await self._poll_power_meters()
+        
+        # 定期刷新待發布的訊息
+        if counter % 10 == 0:
+            await self.throttled_publisher.flush_pending()
+
     async def _poll_flow_meter(self):
         """輪詢流量計"""
         try:
@@ -126,7 +203,7 @@ class SensorService:
                     SENSOR_FLOW,
                     {
                         **data,
-                        "timestamp": time.time()
+                        "timestamp": self.clock()
                     }
                 )
         except Exception as e:
@@ -143,7 +220,7 @@ class SensorService:
                     {
                         "pressure_mpa": pressure_pos,
                         "pressure_kgcm2": pressure_pos * 10.1972,
-                        "timestamp": time.time()
+                        "timestamp": self.clock()
                     }
                 )
             
@@ -155,7 +232,7 @@ class SensorService:
                     {
                         "pressure_mpa": pressure_vac,
                         "pressure_kpa": pressure_vac * 1000,
-                        "timestamp": time.time()
+                        "timestamp": self.clock()
                     }
                 )
         except Exception as e:
@@ -171,7 +248,7 @@ class SensorService:
                     SENSOR_POWER_DC,
                     {
                         **dc_data,
-                        "timestamp": time.time()
+                        "timestamp": self.clock()
                     }
                 )
             
@@ -182,7 +259,7 @@ class SensorService:
                     SENSOR_POWER_AC110,
                     {
                         **ac110_data,
-                        "timestamp": time.time()
+                        "timestamp": self.clock()
                     }
                 )
             
@@ -193,7 +270,7 @@ class SensorService:
                     SENSOR_POWER_AC220,
                     {
                         **ac220_data,
-                        "timestamp": time.time()
+                        "timestamp": self.clock()
                     }
                 )
             
@@ -204,7 +281,7 @@ class SensorService:
                     SENSOR_POWER_AC220_3P,
                     {
                         **ac220_3p_data,
-                        "timestamp": time.time()
+                        "timestamp": self.clock()
                     }
                 )
         except Exception as e:
@@ -213,6 +290,7 @@ class SensorService:
     def stop(self):
         """停止感測器服務"""
         self._running = False
+        self.stop_recording()
         # 斷開所有感測器
         self.flow_meter.disconnect()
         self.pressure_positive.disconnect()
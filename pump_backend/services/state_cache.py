@@ -0,0 +1,129 @@
+"""最新狀態快取服務 (Last-Value Cache)"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from aiomqtt import Topic
+from loguru import logger
+from core.mqtt_client import MQTTClient
+from config.mqtt_topics import (
+    STATE_PREFIX,
+    STATE_SNAPSHOT_REQUEST,
+    STATE_SNAPSHOT,
+    STATE_SOURCE_TOPICS
+)
+
+
+class StateCache:
+    """
+    最新狀態快取服務
+
+    觀察本程序發布的感測器、安全狀態、繼電器與測試狀態訊息，
+    保存每個來源主題的最新值，數值改變時以保留訊息 (retain) 發布至
+    pump/state/...，UI 或管理工具連線後即可立即取得完整狀態，不需等待下一次輪詢。
+
+    - 安全/繼電器/測試狀態: 改變即發布
+    - 感測器數據: 改變後最多每 sensor_interval 秒發布一次
+    - 快照請求: pump/state/snapshot/request (支援 MQTT v5 request/response)
+    """
+
+    def __init__(self, mqtt_client: MQTTClient, sensor_interval: float = 1.0):
+        """
+        Args:
+            mqtt_client: MQTT 客戶端
+            sensor_interval: 感測器狀態最小發布間隔（秒）
+        """
+        self.mqtt = mqtt_client
+        self.sensor_interval = sensor_interval
+
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._dirty: set = set()
+        self._last_publish: Dict[str, float] = {}
+        self._source_cache: Dict[str, Optional[str]] = {}
+        self._running = False
+
+    def start(self):
+        """開始觀察發布並註冊快照請求處理器"""
+        self.mqtt.add_publish_observer(self._on_publish)
+        self.mqtt.register_rpc_handler(
+            STATE_SNAPSHOT_REQUEST, self._handle_snapshot_request, STATE_SNAPSHOT
+        )
+        self._running = True
+        logger.info("✅ 最新狀態快取服務已啟動")
+
+    def _state_topic(self, topic: str) -> Optional[str]:
+        """來源主題對應的保留狀態主題 (非來源主題返回 None，結果快取)"""
+        if topic in self._source_cache:
+            return self._source_cache[topic]
+
+        state_topic = None
+        if any(Topic(topic).matches(p) for p in STATE_SOURCE_TOPICS):
+            state_topic = f"{STATE_PREFIX}/{topic.split('/', 1)[1]}"
+        self._source_cache[topic] = state_topic
+        return state_topic
+
+    def _on_publish(self, topic: str, payload: Dict[str, Any]):
+        """發布觀察者: 數值 (忽略時間戳) 改變時標記為待發布"""
+        state_topic = self._state_topic(topic)
+        if state_topic is None or not isinstance(payload, dict):
+            return
+
+        previous = self._state.get(state_topic)
+        if previous is not None and _without_timestamp(previous) == _without_timestamp(payload):
+            return
+
+        self._state[state_topic] = dict(payload)
+        self._dirty.add(state_topic)
+
+    def get(self, source_topic: str) -> Optional[Dict[str, Any]]:
+        """
+        獲取來源主題的最新值
+
+        Args:
+            source_topic: 來源主題 (如 "pump/sensors/flow")
+        """
+        state_topic = self._state_topic(source_topic)
+        return self._state.get(state_topic) if state_topic else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """完整狀態快照"""
+        return {
+            "state": {topic: value for topic, value in self._state.items()},
+            "timestamp": time.time()
+        }
+
+    def _handle_snapshot_request(self, payload: Any) -> Dict[str, Any]:
+        """處理快照請求"""
+        return self.snapshot()
+
+    def flush(self, force: bool = False):
+        """
+        發布已改變的狀態 (保留訊息)
+
+        Args:
+            force: 忽略感測器發布間隔
+        """
+        now = time.monotonic()
+        for state_topic in list(self._dirty):
+            if not force and state_topic.startswith(f"{STATE_PREFIX}/sensors/"):
+                if now - self._last_publish.get(state_topic, 0) < self.sensor_interval:
+                    continue
+            self.mqtt.publish_nowait(state_topic, self._state[state_topic], retain=True)
+            self._last_publish[state_topic] = now
+            self._dirty.discard(state_topic)
+
+    async def publish_loop(self):
+        """狀態發布迴圈 (每 50ms 檢查一次)"""
+        logger.info("🔄 最新狀態快取發布迴圈已啟動")
+        while self._running:
+            self.flush()
+            await asyncio.sleep(0.05)
+
+    def stop(self):
+        """停止服務"""
+        self._running = False
+        self.flush(force=True)
+        logger.info("🛑 最新狀態快取服務已停止")
+
+
+def _without_timestamp(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in payload.items() if k != "timestamp"}
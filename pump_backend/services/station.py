@@ -0,0 +1,124 @@
+"""測試工作站 - 單一測試台的完整服務組合"""
+import asyncio
+from typing import Optional
+from loguru import logger
+from core.mqtt_client import MQTTClient
+from core.station_mqtt import StationMQTTClient
+from core.safety_monitor import SafetyMonitor
+from core.watchdog import Watchdog
+from drivers.transport_pool import TransportPool
+from services.sensor_service import SensorService
+from services.control_service import ControlService
+from services.data_logger import DataLogger
+from services.test_automation import TestAutomation
+from services.test_queue import TestQueue
+from services.reference_db import ReferenceDatabase, ReferenceService
+from services.state_cache import StateCache
+from config.stations import StationConfig
+
+
+class Station:
+    """
+    測試工作站
+
+    依工作站配置建立一組獨立的服務 (安全監控、感測、控制、記錄、自動化、批次佇列、狀態快取)：
+    - MQTT 連線、MODBUS 傳輸連線池與參考曲線資料庫由所有工作站共用
+    - 各工作站主題加上命名空間 (pump/{station}/...)，服務只看得到自己的數據與命令
+    - 安全監控使用各自的繼電器 IO，一個工作站的緊急停止不會影響其他工作站
+    """
+
+    def __init__(
+        self,
+        mqtt_client: MQTTClient,
+        config: StationConfig,
+        transport_pool: Optional[TransportPool] = None,
+        reference_db: Optional[ReferenceDatabase] = None
+    ):
+        """
+        Args:
+            mqtt_client: 共用的 MQTT 客戶端
+            config: 工作站配置
+            transport_pool: 共用傳輸連線池
+            reference_db: 共用參考曲線資料庫
+        """
+        self.station_id = config.station_id
+        self.config = config
+        if config.station_id is None:
+            self.mqtt = mqtt_client
+            self.name = "default"
+        else:
+            self.mqtt = StationMQTTClient(mqtt_client, config.station_id)
+            self.name = config.station_id
+
+        relay_config = config.devices["relay_io"]
+        self.state_cache = StateCache(self.mqtt)
+        self.safety = SafetyMonitor(
+            self.mqtt,
+            relay_config,
+            name=f"SafetyMonitor-{self.name}" if self.station_id else "SafetyMonitor"
+        )
+        self.watchdog = Watchdog(mqtt_client=self.mqtt)
+        self.sensors = SensorService(self.mqtt, config.devices, transport_pool)
+        self.control = ControlService(self.mqtt, self.safety, relay_config, transport_pool)
+        self.data_logger = DataLogger(self.mqtt, config.data_dir)
+        self.automation = TestAutomation(
+            self.mqtt, self.control, self.sensors, self.data_logger, reference_db
+        )
+        self.queue = TestQueue(self.mqtt, self.automation, config.queue_file)
+        self.reference = (
+            ReferenceService(self.mqtt, reference_db, self.automation.evaluator)
+            if reference_db is not None else None
+        )
+
+        self.sensors_started = False
+        self.control_started = False
+
+    async def start(self) -> bool:
+        """
+        啟動工作站服務 (MQTT 需已啟動)
+
+        Returns:
+            是否啟動成功 (安全監控器無法啟動時此工作站不運行)
+        """
+        self.state_cache.start()
+        if not await self.safety.start():
+            logger.error(f"❌ [{self.name}] 安全監控器啟動失敗，此工作站無法運行")
+            return False
+
+        self.sensors_started = await self.sensors.start()
+        self.control_started = await self.control.start()
+
+        if not self.sensors_started:
+            logger.warning(f"⚠️ [{self.name}] 感測器服務啟動失敗，將繼續運行但無法讀取數據")
+        if not self.control_started:
+            logger.warning(f"⚠️ [{self.name}] 控制服務啟動失敗，將繼續運行但無法控制設備")
+
+        self.automation.start()
+        self.queue.start()
+        if self.reference is not None:
+            self.reference.start()
+        logger.info(f"🏭 工作站已啟動: {self.name}")
+        return True
+
+    def tasks(self) -> list:
+        """工作站的常駐協程"""
+        return [
+            self.watchdog.monitor(self.safety),
+            self.sensors.polling_loop() if self.sensors_started else asyncio.sleep(3600),
+            self.control.command_handler() if self.control_started else asyncio.sleep(3600),
+            self.data_logger.logging_loop(),
+            self.automation.state_machine_loop(),
+            self.queue.run_loop(),
+            self.state_cache.publish_loop()
+        ]
+
+    def stop(self):
+        """停止工作站服務"""
+        self.queue.stop()
+        self.automation.stop()
+        self.sensors.stop()
+        self.control.stop()
+        self.data_logger.stop()
+        self.safety.stop()
+        self.state_cache.stop()
+        logger.info(f"🛑 工作站已停止: {self.name}")
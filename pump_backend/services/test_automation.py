@@ -9,8 +9,13 @@ from core.safety_monitor import SafetyMonitor
 from services.control_service import ControlService
 from services.sensor_service import SensorService
 from services.data_logger import DataLogger
+from services.recipe_engine import RecipeEngine
+from services.test_evaluator import TestEvaluator
+from drivers.bus_capture import get_bus_capture
+from models.recipe import Recipe
 from models.enums import TestState, TestMode, PowerType, ValveState
-from config.mqtt_topics import TEST_STATUS, TEST_RECORD, CONTROL_TEST
+from config.settings import settings
+from config.mqtt_topics import TEST_STATUS, TEST_RECORD, CONTROL_TEST, SAFETY_ALERT
 
 
 class TestAutomation:
@@ -26,7 +31,8 @@ class TestAutomation:
         mqtt_client: MQTTClient,
         control_service: ControlService,
         sensor_service: SensorService,
-        data_logger: Optional[DataLogger] = None
+        data_logger: Optional[DataLogger] = None,
+        reference_db=None
     ):
         self.mqtt = mqtt_client
         self.control = control_service
@@ -35,9 +41,15 @@ class TestAutomation:
         
         self.state_machine = StateMachine()
         self._setup_state_handlers()
+        self.recipe_engine = RecipeEngine(mqtt_client, control_service)
+        self.current_recipe: Optional[Recipe] = None
+        self.evaluator = TestEvaluator(mqtt_client, reference_db=reference_db)
+        self.evaluator.on_abort = self._on_early_abort
         
         self.current_test_config: Optional[Dict[str, Any]] = None
         self.test_start_time: Optional[float] = None
+        self._elapsed_before_pause = 0.0
+        self._safety_task: Optional[asyncio.Task] = None
         self._running = False
 
     def _setup_state_handlers(self):
@@ -81,6 +93,9 @@ class TestAutomation:
         
         # 訂閱測試控制命令
         self.mqtt.subscribe(CONTROL_TEST, self._handle_test_command)
+
+        # 觀察安全警報 (本程序發布，不經 Broker 往返)
+        self.mqtt.add_publish_observer(self._on_publish)
         
         # 保持運行
         while self._running:
@@ -116,6 +131,52 @@ class TestAutomation:
         except Exception as e:
             logger.exception(f"❌ 處理測試命令異常: {e}")
 
+    def _on_publish(self, topic: str, payload: Dict):
+        """
+        發布觀察者: 緊急停止時停止測試，測試蓋開啟時暫停測試
+
+        警報於事件期間持續發布，僅在狀態需要改變時排程一次轉換
+        """
+        if topic != SAFETY_ALERT or not isinstance(payload, dict):
+            return
+        if self._safety_task is not None and not self._safety_task.done():
+            return
+
+        current_state = self.state_machine.get_state()
+        alert_type = payload.get("type")
+        if alert_type == "emergency" and current_state in [TestState.RUNNING, TestState.PAUSED]:
+            logger.warning("🚨 緊急停止，停止測試")
+            self._safety_task = asyncio.create_task(
+                self.state_machine.transition_to(TestState.STOPPED, {"reason": "emergency_stop"})
+            )
+        elif alert_type == "warning" and current_state == TestState.RUNNING:
+            logger.warning("⚠️ 測試蓋開啟，暫停測試")
+            self._safety_task = asyncio.create_task(
+                self.state_machine.transition_to(TestState.PAUSED, {"reason": "cover_opened"})
+            )
+
+    def _mark_bus_capture(self, event: str):
+        """於共用的匯流排封包錄製中標記本工作站的測試開始/結束 (不輪替檔案，避免切斷其他工作站的測試)"""
+        capture = get_bus_capture()
+        if capture is not None and self.evaluator.test_id is not None:
+            station = getattr(self.mqtt, "station_id", None) or "default"
+            capture.mark(f"{event} {station} {self.evaluator.test_id}")
+
+    def _on_early_abort(self, reason: str, details: Dict[str, Any]):
+        """評估服務回報確定不合格 (偏離參考曲線或預測超出規格): 切斷電源、洩壓並提前判定失敗"""
+        if self._safety_task is not None and not self._safety_task.done():
+            return
+        if self.state_machine.get_state() != TestState.RUNNING:
+            return
+        self._safety_task = asyncio.create_task(
+            self._abort_test(f"{reason}，提前中止")
+        )
+
+    async def _abort_test(self, reason: str):
+        """提前中止測試 (轉為 FAILED)"""
+        await self.control.emergency_shutdown()
+        await self.state_machine.transition_to(TestState.FAILED, {"error": reason})
+
     async def start_test(self, config: Dict[str, Any]):
         """
         開始測試
@@ -180,11 +241,17 @@ class TestAutomation:
         self.state_machine.reset()
         self.current_test_config = None
         self.test_start_time = None
+        self._elapsed_before_pause = 0.0
+        self.current_recipe = None
+        self.recipe_engine.reset()
         logger.info("🔄 測試已重置")
 
     async def _handle_initializing(self, context: Optional[Dict] = None):
         """處理初始化狀態"""
         logger.info("🔧 測試初始化中...")
+        self._elapsed_before_pause = 0.0
+        self.current_recipe = None
+        self.recipe_engine.reset()
         
         try:
             # 1. 檢查所有感測器連線狀態
@@ -242,9 +309,22 @@ class TestAutomation:
 
     async def _handle_running(self, context: Optional[Dict] = None):
         """處理運行狀態"""
-        logger.info("▶️ 測試運行中...")
+        resumed = self.state_machine.previous_state == TestState.PAUSED
+        logger.info("▶️ 測試恢復運行..." if resumed else "▶️ 測試運行中...")
         
-        self.test_start_time = time.time()
+        if not resumed or self.test_start_time is None:
+            self.test_start_time = time.time()
+            self._elapsed_before_pause = 0.0
+            self.evaluator.begin(context or self.current_test_config or {})
+            self._mark_bus_capture("test_start")
+            if settings.RECORD_REGISTERS and self.data_logger:
+                self.sensors.start_recording(
+                    str(self.data_logger.data_dir / f"test_{self.evaluator.test_id}.registers.jsonl"),
+                    self.evaluator.config
+                )
+        else:
+            self.evaluator.resume()
+            self.sensors.mark_recording("resume")
         
         await self.mqtt.publish(TEST_STATUS, {
             "state": TestState.RUNNING.value,
@@ -255,6 +335,12 @@ class TestAutomation:
         # 執行測試流程
         try:
             config = context or self.current_test_config or {}
+
+            # 配方模式: 依序執行配方步驟 (config/scenarios 或內嵌 steps)
+            recipe_spec = config.get("recipe") or ({"steps": config["steps"]} if config.get("steps") else None)
+            if recipe_spec:
+                await self._run_recipe(recipe_spec, resumed)
+                return
             
             # 1. 根據配置啟動電源（如果需要）
             if config.get("power_on"):
@@ -277,21 +363,28 @@ class TestAutomation:
             
             if duration > 0:
                 logger.info(f"⏱️ 測試將運行 {duration} 秒")
-                elapsed = 0
                 check_interval = 1.0  # 每秒檢查一次
-                
-                while elapsed < duration and self._running:
-                    await asyncio.sleep(check_interval)
-                    elapsed += check_interval
-                    
-                    # 定期發布狀態更新
-                    if int(elapsed) % 10 == 0:  # 每 10 秒更新一次
-                        await self.mqtt.publish(TEST_STATUS, {
-                            "state": TestState.RUNNING.value,
-                            "message": f"測試運行中 ({int(elapsed)}/{duration} 秒)",
-                            "elapsed": elapsed,
-                            "duration": duration
-                        })
+                segment_start = time.monotonic()
+                elapsed = self._elapsed_before_pause
+                next_report = (int(elapsed) // 10 + 1) * 10
+
+                try:
+                    while elapsed < duration and self._running:
+                        await asyncio.sleep(min(check_interval, duration - elapsed))
+                        elapsed = self._elapsed_before_pause + time.monotonic() - segment_start
+                        
+                        # 定期發布狀態更新
+                        if elapsed >= next_report:  # 每 10 秒更新一次
+                            next_report += 10
+                            await self.mqtt.publish(TEST_STATUS, {
+                                "state": TestState.RUNNING.value,
+                                "message": f"測試運行中 ({int(elapsed)}/{duration} 秒)",
+                                "elapsed": elapsed,
+                                "duration": duration
+                            })
+                finally:
+                    # 暫停/停止時取消此 Task: 保留已運行時間供恢復時接續
+                    self._elapsed_before_pause += time.monotonic() - segment_start
                 
                 if elapsed >= duration:
                     logger.info("✅ 測試時長已達到，完成測試")
@@ -306,9 +399,36 @@ class TestAutomation:
             logger.exception(f"❌ 測試運行異常: {e}")
             await self.state_machine.transition_to(TestState.FAILED, {"error": str(e)})
 
+    async def _run_recipe(self, recipe_spec, resumed: bool):
+        """
+        執行測試配方
+
+        恢復時從中斷的步驟重新執行；全部步驟完成轉為 COMPLETED，
+        步驟失敗時切斷電源、洩壓並轉為 FAILED
+        """
+        if not resumed or self.current_recipe is None:
+            self.current_recipe = self.recipe_engine.load_recipe(recipe_spec)
+            self.recipe_engine.reset()
+
+        passed = await self.recipe_engine.run(
+            self.current_recipe, self.recipe_engine.current_index
+        )
+
+        if passed:
+            await self.state_machine.transition_to(TestState.COMPLETED)
+        else:
+            # 步驟失敗: 切斷電源並洩壓
+            await self.control.emergency_shutdown()
+            last = self.recipe_engine.results[-1]
+            await self.state_machine.transition_to(TestState.FAILED, {
+                "error": f"步驟 {last.step} {last.status.value}: {last.message}"
+            })
+
     async def _handle_paused(self, context: Optional[Dict] = None):
         """處理暫停狀態"""
         logger.info("⏸️ 測試已暫停")
+        self.evaluator.pause()
+        self.sensors.mark_recording("pause")
         
         await self.mqtt.publish(TEST_STATUS, {
             "state": TestState.PAUSED.value,
@@ -326,12 +446,20 @@ class TestAutomation:
         # 停止數據記錄
         if self.data_logger:
             self.data_logger.stop_test_logging()
+
+        self.sensors.stop_recording(TestState.COMPLETED.value)
+        self._mark_bus_capture("test_end")
+        await self.evaluator.finish(TestState.COMPLETED)
         
-        await self.mqtt.publish(TEST_STATUS, {
+        status = {
             "state": TestState.COMPLETED.value,
             "message": "測試完成",
             "duration": test_duration
-        })
+        }
+        if self.current_recipe:
+            status["recipe"] = self.current_recipe.name
+            status["steps"] = [r.to_dict() for r in self.recipe_engine.results]
+        await self.mqtt.publish(TEST_STATUS, status)
         
         # 自動重置（可選）
         await asyncio.sleep(2.0)
@@ -344,6 +472,10 @@ class TestAutomation:
         # 停止數據記錄
         if self.data_logger:
             self.data_logger.stop_test_logging()
+
+        self.sensors.stop_recording(TestState.FAILED.value)
+        self._mark_bus_capture("test_end")
+        await self.evaluator.finish(TestState.FAILED)
         
         await self.mqtt.publish(TEST_STATUS, {
             "state": TestState.FAILED.value,
@@ -361,6 +493,10 @@ class TestAutomation:
         # 停止數據記錄
         if self.data_logger:
             self.data_logger.stop_test_logging()
+
+        self.sensors.stop_recording(TestState.STOPPED.value)
+        self._mark_bus_capture("test_end")
+        await self.evaluator.finish(TestState.STOPPED)
         
         await self.mqtt.publish(TEST_STATUS, {
             "state": TestState.STOPPED.value,
@@ -373,6 +509,8 @@ class TestAutomation:
 
     def start(self):
         """啟動自動測試引擎"""
+        self.recipe_engine.start()
+        self.evaluator.start()
         self._running = True
         logger.info("✅ 自動測試引擎已啟動")
 
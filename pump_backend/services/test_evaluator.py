@@ -0,0 +1,422 @@
+"""串流測試結果評估服務"""
+import time
+from statistics import NormalDist
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+from core.mqtt_client import MQTTClient
+from utils.running_stats import RunningStats
+from utils.plateau_detector import PlateauDetector
+from utils.curve_compare import CurveRecorder
+from utils.trend_predictor import ExponentialPredictor
+from models.enums import TestMode, TestState
+from config.settings import settings
+from config.mqtt_topics import (
+    TEST_RECORD,
+    SENSOR_FLOW,
+    SENSOR_PRESSURE_POSITIVE,
+    SENSOR_PRESSURE_VACUUM,
+    SENSOR_POWER_DC,
+    SENSOR_POWER_AC110,
+    SENSOR_POWER_AC220,
+    SENSOR_POWER_AC220_3P
+)
+
+# 測試類型 -> (壓力主題, 欄位, 單位)；真空以 kPa、正壓以 kg/cm² 記錄 (PRD FR-003)
+PRESSURE_SOURCES = {
+    "vacuum": (SENSOR_PRESSURE_VACUUM, "pressure_kpa", "kPa"),
+    "positive": (SENSOR_PRESSURE_POSITIVE, "pressure_kgcm2", "kg/cm2"),
+}
+
+POWER_TOPICS = {
+    SENSOR_POWER_DC: "dc",
+    SENSOR_POWER_AC110: "ac110",
+    SENSOR_POWER_AC220: "ac220",
+    SENSOR_POWER_AC220_3P: "ac220_3p",
+}
+
+
+class TestEvaluator:
+    """
+    串流測試結果評估
+
+    測試運行期間逐筆更新 PRD 測試紀錄所需的統計值 (每筆樣本 O(1))：
+    - 最大/平均壓力、平均/最大電流、平均流量 (Welford 平均/變異數 + 最小/最大值)
+    - 恆壓電流: 壓力處於平台 (PlateauDetector 判定恆定) 期間的電流平均值
+    - 壓力/電流/流量對測試時間的曲線 (CurveRecorder)，設定參考曲線資料庫時
+      定期與型號參考曲線比對，連續明顯偏離時呼叫 on_abort 提前中止
+    - 壓力/電流最終值預測 (ExponentialPredictor)，依判定條件 (config.criteria)
+      在指定信賴水準下確定無法合格時呼叫 on_abort 提前中止
+
+    測試結束時組成結果紀錄 (含 PASS/FAIL) 發布至 TEST_RECORD，不需回讀已儲存的數據。
+    """
+
+    def __init__(
+        self,
+        mqtt_client: MQTTClient,
+        steady_window: Optional[float] = None,
+        steady_tolerance: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        reference_db=None,
+        wall_clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            mqtt_client: MQTT 客戶端
+            steady_window: 壓力恆定判定窗口（秒）
+            steady_tolerance: 窗口內容許的壓力變化比例
+            clock: 時間來源 (單調時鐘)
+            reference_db: 參考曲線資料庫 (ReferenceDatabase，None 表示不比對)
+            wall_clock: 紀錄日期與時間戳的時間來源 (重播時為虛擬時鐘)
+        """
+        self.mqtt = mqtt_client
+        self.steady_window = steady_window or settings.STEADY_STATE_WINDOW_S
+        self.steady_tolerance = steady_tolerance or settings.STEADY_STATE_TOLERANCE
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.reference_db = reference_db
+        self.check_interval = settings.REFERENCE_CHECK_INTERVAL_S
+        # 提前中止回呼: (原因, 詳細資料)
+        self.on_abort: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+        self.pressure = RunningStats()
+        self.current = RunningStats()
+        self.flow = RunningStats()
+        self.steady_current = RunningStats()
+        self._plateau = PlateauDetector(self.steady_window, self.steady_tolerance)
+
+        self.config: Dict[str, Any] = {}
+        self.test_id: Optional[str] = None
+        self.mode = "positive"
+        self.power_type: Optional[str] = None
+        self.active = False
+        self.steady = False
+        self._started_at: Optional[float] = None
+        self._resumed_at: Optional[float] = None
+        self._active_time = 0.0
+
+        self.curves: Dict[str, CurveRecorder] = {}
+        self.live_comparison: Optional[Dict[str, Any]] = None
+        self.last_test: Optional[Dict[str, Any]] = None
+        self._last_check = 0.0
+        self._deviation_count = 0
+        self._aborted = False
+        self.early_fail: Optional[Dict[str, Any]] = None
+        self._pressure_trend = self._new_predictor()
+        self._current_trend = self._new_predictor()
+
+    @staticmethod
+    def _new_predictor() -> ExponentialPredictor:
+        return ExponentialPredictor(
+            interval=settings.EARLY_FAIL_INTERVAL_S,
+            forgetting=settings.EARLY_FAIL_FORGETTING,
+            min_points=settings.EARLY_FAIL_MIN_POINTS,
+            min_r2=settings.EARLY_FAIL_MIN_R2
+        )
+
+    def start(self):
+        """開始觀察感測器數據"""
+        self.mqtt.add_publish_observer(self._on_publish)
+
+    def begin(self, config: Dict[str, Any]):
+        """
+        開始評估新的測試
+
+        Args:
+            config: 測試配置 (test_id, mode, power_type, pump_model, rated_power, criteria, recipe)
+        """
+        for stats in (self.pressure, self.current, self.flow, self.steady_current):
+            stats.reset()
+        self._plateau.reset()
+
+        self.config = config
+        self.test_id = config.get("test_id", f"test_{int(self.wall_clock())}")
+        self.mode = self._resolve_mode(config)
+        self.power_type = config.get("power_type")
+        self.steady = False
+        self._started_at = self.wall_clock()
+        self._resumed_at = self.clock()
+        self._active_time = 0.0
+        # 每次測試建立新的曲線，結束後保留於 last_test 供存入參考資料庫
+        self.curves = {signal: CurveRecorder() for signal in ("pressure", "current", "flow")}
+        self.live_comparison = None
+        self._last_check = 0.0
+        self._deviation_count = 0
+        self._aborted = False
+        self.early_fail = None
+        self._pressure_trend.reset()
+        self._current_trend.reset()
+        self.active = True
+        logger.info(f"📐 測試評估開始: {self.test_id} ({self.mode})")
+
+    @staticmethod
+    def _resolve_mode(config: Dict[str, Any]) -> str:
+        """測試類型: config.mode，否則由配方名稱推斷，預設正壓"""
+        mode = config.get("mode")
+        if mode in ("vacuum", "positive", "flow"):
+            return mode
+        recipe = config.get("recipe")
+        if isinstance(recipe, str):
+            for candidate in ("vacuum", "flow"):
+                if candidate in recipe:
+                    return candidate
+        return "positive"
+
+    def pause(self):
+        """暫停評估 (暫停期間的數據不列入統計)"""
+        if self.active:
+            self._active_time += self.clock() - self._resumed_at
+            self.active = False
+            self._plateau.reset()
+            self.steady = False
+            # 暫停期間可能洩壓，恢復後重新擬合
+            self._pressure_trend.reset()
+            self._current_trend.reset()
+
+    def resume(self):
+        """恢復評估"""
+        if self.test_id and not self.active:
+            self._resumed_at = self.clock()
+            self.active = True
+
+    def _on_publish(self, topic: str, payload: Dict[str, Any]):
+        """發布觀察者: 逐筆更新統計"""
+        if not self.active or not isinstance(payload, dict):
+            return
+
+        if self.mode in PRESSURE_SOURCES:
+            pressure_topic, field, _ = PRESSURE_SOURCES[self.mode]
+            if topic == pressure_topic and payload.get(field) is not None:
+                self._add_pressure(float(payload[field]))
+                return
+
+        if topic == SENSOR_FLOW and payload.get("instantaneous_flow") is not None:
+            flow = float(payload["instantaneous_flow"])
+            self.flow.update(flow)
+            self.curves["flow"].add(self.elapsed(), flow)
+            return
+
+        power_type = POWER_TOPICS.get(topic)
+        if power_type is not None:
+            current = self._extract_current(power_type, payload)
+            if current is None:
+                return
+            if self.power_type is None:
+                if current <= 0:
+                    return
+                # 未指定電源類型: 鎖定第一個有電流的電表
+                self.power_type = power_type
+            if power_type == self.power_type:
+                self.current.update(current)
+                elapsed = self.elapsed()
+                self.curves["current"].add(elapsed, current)
+                if self._current_trend.update(elapsed, current):
+                    self._check_prediction()
+                if self.steady:
+                    self.steady_current.update(current)
+
+    def _add_pressure(self, value: float):
+        self.pressure.update(value)
+        self._plateau.update(self.clock(), value)
+        if self._plateau.in_plateau and not self.steady:
+            logger.info(f"📏 壓力恆定: {self._plateau.plateau_value:.3f}")
+        self.steady = self._plateau.in_plateau
+        elapsed = self.elapsed()
+        self.curves["pressure"].add(elapsed, value)
+        if self._pressure_trend.update(elapsed, value):
+            self._check_prediction()
+        if self.reference_db is not None and elapsed - self._last_check >= self.check_interval:
+            self._last_check = elapsed
+            self._check_reference(elapsed)
+
+    def elapsed(self) -> float:
+        """測試運行時間 (不含暫停)"""
+        return self._active_time + (self.clock() - self._resumed_at if self.active else 0.0)
+
+    def _check_reference(self, elapsed: float):
+        """與參考曲線比對已經過的區段，連續偏離超過中止門檻時呼叫 on_abort"""
+        pump_model = self.config.get("pump_model")
+        if not pump_model or not self._early_abort_enabled():
+            return
+        comparison = self.reference_db.compare(pump_model, self.curves, elapsed)
+        if comparison is None:
+            return
+        self.live_comparison = comparison
+
+        if comparison["deviation"] > settings.REFERENCE_ABORT_DEVIATION:
+            self._deviation_count += 1
+        else:
+            self._deviation_count = 0
+        if self._deviation_count >= settings.REFERENCE_ABORT_CHECKS:
+            self._abort(f"偏離參考曲線 {comparison['deviation']:.1%}", comparison)
+
+    def _early_abort_enabled(self) -> bool:
+        return not self._aborted and self.config.get("early_abort", True)
+
+    def _abort(self, reason: str, details: Dict[str, Any]):
+        self._aborted = True
+        logger.warning(f"📉 提前判定失敗 [{self.test_id}]: {reason}")
+        if self.on_abort is not None:
+            self.on_abort(reason, details)
+
+    def _check_prediction(self):
+        """
+        以預測的最終壓力/電流對照判定條件
+
+        最有利的信賴界限 (壓力取絕對值上界、電流取下界) 仍不合格時提前判定失敗
+        """
+        criteria = self.config.get("criteria", {})
+        if not self._early_abort_enabled() or not criteria:
+            return
+        confidence = self.config.get("early_fail_confidence", settings.EARLY_FAIL_CONFIDENCE)
+        z = NormalDist().inv_cdf(confidence)
+
+        target = criteria.get("pressure")
+        prediction = self._pressure_trend.prediction() if target is not None else None
+        if prediction is not None:
+            final, std = prediction
+            if abs(final) + z * std < abs(target):
+                self.early_fail = {
+                    "signal": "pressure", "predicted": round(final, 3), "std": round(std, 3),
+                    "limit": target, "confidence": confidence, "elapsed_s": round(self.elapsed(), 3)
+                }
+                self._abort(f"預測最終壓力 {final:.2f} 未達 {target}", self.early_fail)
+                return
+
+        max_current = criteria.get("max_current")
+        prediction = self._current_trend.prediction() if max_current is not None else None
+        if prediction is not None:
+            final, std = prediction
+            if final - z * std > max_current:
+                self.early_fail = {
+                    "signal": "current", "predicted": round(final, 3), "std": round(std, 3),
+                    "limit": max_current, "confidence": confidence, "elapsed_s": round(self.elapsed(), 3)
+                }
+                self._abort(f"預測穩態電流 {final:.2f} A 超過 {max_current} A", self.early_fail)
+
+    @staticmethod
+    def _extract_current(power_type: str, payload: Dict[str, Any]) -> Optional[float]:
+        """電流值 (三相取三相平均)"""
+        if power_type == "ac220_3p":
+            phases = [payload.get(k) for k in ("current_a", "current_b", "current_c")]
+            phases = [float(p) for p in phases if p is not None]
+            return sum(phases) / len(phases) if phases else None
+        current = payload.get("current")
+        return float(current) if current is not None else None
+
+    def _peak_pressure(self) -> Optional[float]:
+        """最大壓力 (真空取最低值，即絕對值最大)"""
+        if not self.pressure.count:
+            return None
+        return self.pressure.min if self.mode == "vacuum" else self.pressure.max
+
+    def _evaluate(
+        self,
+        outcome: TestState,
+        peak_pressure: Optional[float],
+        comparison: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """依判定條件 (config.criteria) 返回失敗原因列表"""
+        reasons = []
+        if outcome != TestState.COMPLETED:
+            reasons.append(f"測試未完成 ({outcome.value})")
+
+        criteria = self.config.get("criteria", {})
+        target = criteria.get("pressure")
+        if target is not None:
+            if peak_pressure is None or abs(peak_pressure) < abs(target):
+                reasons.append(f"最大壓力未達 {target}")
+        max_current = criteria.get("max_current")
+        if max_current is not None and self.current.count and self.current.max > max_current:
+            reasons.append(f"最大電流 {self.current.max:.2f} A 超過 {max_current} A")
+        min_flow = criteria.get("min_flow")
+        if min_flow is not None and (not self.flow.count or self.flow.mean < min_flow):
+            reasons.append(f"平均流量低於 {min_flow}")
+        if comparison is not None and comparison["deviation"] > settings.REFERENCE_FAIL_DEVIATION:
+            reasons.append(f"偏離參考曲線 {comparison['deviation']:.1%}")
+        if self.early_fail is not None:
+            reasons.append(
+                f"提前判定: 預測{'最終壓力' if self.early_fail['signal'] == 'pressure' else '穩態電流'} "
+                f"{self.early_fail['predicted']} 超出規格 {self.early_fail['limit']}"
+            )
+        return reasons
+
+    def build_record(self, outcome: TestState) -> Dict[str, Any]:
+        """
+        組成測試結果紀錄 (欄位對應 PRD 6.2.3 CSV 格式)
+
+        Args:
+            outcome: 測試結束狀態 (COMPLETED / FAILED / STOPPED)
+        """
+        duration = self.elapsed()
+        started = datetime.fromtimestamp(self._started_at or self.wall_clock())
+        peak_pressure = self._peak_pressure()
+        comparison = None
+        if self.reference_db is not None and self.config.get("pump_model"):
+            # 未完成的測試只比對已運行的區段
+            comparison = self.reference_db.compare(
+                self.config["pump_model"], self.curves,
+                None if outcome == TestState.COMPLETED else duration
+            )
+        fail_reasons = self._evaluate(outcome, peak_pressure, comparison)
+        unit = PRESSURE_SOURCES[self.mode][2] if self.mode in PRESSURE_SOURCES else None
+
+        return {
+            "test_id": self.test_id,
+            "date": started.strftime("%Y-%m-%d"),
+            "time": started.strftime("%H:%M:%S"),
+            "pump_model": self.config.get("pump_model"),
+            "pump_function": self.mode,
+            "test_mode": (TestMode.AUTOMATIC if self.config.get("recipe") or self.config.get("steps")
+                          else TestMode.MANUAL).value,
+            "power_type": self.power_type,
+            "rated_power_w": self.config.get("rated_power"),
+            "duration_s": round(duration, 3),
+            "max_pressure": peak_pressure,
+            "avg_pressure": self.pressure.mean if self.pressure.count else None,
+            "pressure_unit": unit,
+            "constant_pressure_current_a": self.steady_current.mean if self.steady_current.count else None,
+            "avg_current_a": self.current.mean if self.current.count else None,
+            "max_current_a": self.current.max,
+            "flow": self.flow.mean if self.flow.count else None,
+            "result": "FAIL" if fail_reasons else "PASS",
+            "fail_reasons": fail_reasons,
+            "outcome": outcome.value,
+            "reference_comparison": comparison,
+            "early_fail": self.early_fail,
+            "statistics": {
+                "pressure": self.pressure.to_dict(),
+                "current": self.current.to_dict(),
+                "flow": self.flow.to_dict(),
+                "constant_pressure_current": self.steady_current.to_dict(),
+            },
+            "timestamp": self.wall_clock()
+        }
+
+    async def finish(self, outcome: TestState) -> Optional[Dict[str, Any]]:
+        """
+        結束評估並發布結果紀錄至 TEST_RECORD
+
+        Returns:
+            結果紀錄 (未開始評估時返回 None)
+        """
+        if self.test_id is None:
+            return None
+
+        record = self.build_record(outcome)
+        self.last_test = {
+            "test_id": self.test_id,
+            "mode": self.mode,
+            "config": self.config,
+            "curves": self.curves,
+            "result": record["result"],
+        }
+        self.active = False
+        self.test_id = None
+
+        logger.info(
+            f"📊 測試結果 [{record['test_id']}]: {record['result']} | "
+            f"最大壓力 {record['max_pressure']} | 恆壓電流 {record['constant_pressure_current_a']}"
+        )
+        await self.mqtt.publish(TEST_RECORD, record)
+        return record
@@ -0,0 +1,432 @@
+"""批次測試佇列服務"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from core.mqtt_client import MQTTClient
+from services.test_automation import TestAutomation
+from models.test_queue import QueueItem
+from models.enums import QueueItemStatus, TestState
+from config.settings import settings
+from config.mqtt_topics import (
+    CONTROL_QUEUE,
+    CONTROL_QUEUE_STATUS,
+    TEST_QUEUE,
+    TEST_STATUS,
+    TEST_RECORD,
+    SAFETY_STATUS
+)
+
+# 測試結束狀態 -> 佇列項目狀態
+TERMINAL_STATES = {
+    TestState.COMPLETED.value: QueueItemStatus.COMPLETED,
+    TestState.FAILED.value: QueueItemStatus.FAILED,
+    TestState.STOPPED.value: QueueItemStatus.STOPPED,
+}
+
+
+class TestQueue:
+    """
+    批次測試佇列
+
+    操作員一次排入多台幫浦 (序號 + 配方)，佇列依序交由自動測試引擎執行：
+    - 換機聯鎖: 兩台之間需完成測試蓋開 -> 關循環 (換上下一台) 才開始下一台
+    - 佇列保存於 JSON 檔案，重新啟動後保留 (中斷的項目重新排入，佇列維持暫停)
+    - 統計產能 (台/小時)、各階段耗時與佇列位置，發布至 TEST_QUEUE
+    - 測試被停止 (手動或緊急停止) 時暫停佇列，需操作員重新啟動
+    """
+
+    def __init__(
+        self,
+        mqtt_client: MQTTClient,
+        automation: TestAutomation,
+        queue_file: Optional[str] = None,
+        require_cover_cycle: Optional[bool] = None,
+        poll_interval: float = 0.2
+    ):
+        """
+        Args:
+            mqtt_client: MQTT 客戶端
+            automation: 自動測試引擎
+            queue_file: 佇列檔案路徑 (預設 TEST_QUEUE_FILE)
+            require_cover_cycle: 換機時是否需完成測試蓋開/關循環 (預設 TEST_QUEUE_REQUIRE_COVER_CYCLE)
+            poll_interval: 等待下一台的檢查間隔（秒）
+        """
+        self.mqtt = mqtt_client
+        self.automation = automation
+        self.queue_file = Path(queue_file or settings.TEST_QUEUE_FILE)
+        self.require_cover_cycle = (
+            settings.TEST_QUEUE_REQUIRE_COVER_CYCLE if require_cover_cycle is None else require_cover_cycle
+        )
+        self.poll_interval = poll_interval
+
+        self.items: List[QueueItem] = []
+        self.active = False
+        self.current: Optional[QueueItem] = None
+        self.batch_started_at: Optional[float] = None
+        self.waiting_for: Optional[str] = None
+
+        # 換機聯鎖
+        self.cover_closed: Optional[bool] = None
+        self._cover_opened = False
+        self._last_finished_at: Optional[float] = None
+
+        # 目前測試的結束通知
+        self._unit_done = asyncio.Event()
+        self._unit_outcome: Optional[str] = None
+        self._unit_record: Optional[Dict[str, Any]] = None
+        self._running = False
+
+        self._load()
+
+    def _load(self):
+        """載入佇列檔案 (中斷的項目重新排入)"""
+        if not self.queue_file.exists():
+            return
+        try:
+            data = json.loads(self.queue_file.read_text(encoding="utf-8"))
+            self.items = [QueueItem.from_dict(item) for item in data.get("items", [])]
+            self.batch_started_at = data.get("batch_started_at")
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ 測試佇列檔案載入失敗 [{self.queue_file}]: {e}")
+            return
+
+        for item in self.items:
+            if item.status == QueueItemStatus.RUNNING:
+                logger.warning(f"⚠️ 測試中斷，重新排入佇列: {item.serial}")
+                item.status = QueueItemStatus.PENDING
+                item.started_at = None
+        logger.info(f"📋 測試佇列已載入: {len(self.pending())} 台待測")
+
+    def _save(self):
+        """寫入佇列檔案 (先寫暫存檔再替換，避免寫到一半斷電)"""
+        data = {
+            "batch_started_at": self.batch_started_at,
+            "items": [item.to_dict() for item in self.items],
+        }
+        try:
+            self.queue_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.queue_file.with_suffix(self.queue_file.suffix + ".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, self.queue_file)
+        except OSError as e:
+            logger.error(f"❌ 測試佇列檔案寫入失敗 [{self.queue_file}]: {e}")
+
+    def pending(self) -> List[QueueItem]:
+        """待測項目 (依佇列順序)"""
+        return [item for item in self.items if item.status == QueueItemStatus.PENDING]
+
+    def enqueue(self, entries: List[Dict[str, Any]]) -> List[QueueItem]:
+        """
+        排入待測幫浦
+
+        Args:
+            entries: 項目列表 ({"serial", "recipe", "config"})
+
+        Raises:
+            ValueError: 缺少序號或配方不存在
+        """
+        items = [QueueItem.from_dict(entry) for entry in entries]
+        for recipe in {item.recipe for item in items if item.recipe}:
+            self.automation.recipe_engine.load_recipe(recipe)
+
+        self.items.extend(items)
+        self._save()
+        logger.info(f"📥 排入 {len(items)} 台待測幫浦 (待測 {len(self.pending())} 台)")
+        self.publish_status()
+        return items
+
+    def remove(self, item_id: str) -> bool:
+        """移除待測項目 (測試中或已完成的項目不可移除)"""
+        for item in self.items:
+            if item.item_id == item_id and item.status == QueueItemStatus.PENDING:
+                self.items.remove(item)
+                self._save()
+                self.publish_status()
+                return True
+        return False
+
+    def clear(self, finished: bool = False) -> int:
+        """
+        清除項目
+
+        Args:
+            finished: True 清除已結束的項目，False 清除待測項目
+
+        Returns:
+            清除數量
+        """
+        keep = [
+            item for item in self.items
+            if (not item.finished if finished else item.status != QueueItemStatus.PENDING)
+        ]
+        removed = len(self.items) - len(keep)
+        self.items = keep
+        if finished:
+            self.batch_started_at = None
+        self._save()
+        self.publish_status()
+        return removed
+
+    def resume(self):
+        """開始/繼續執行佇列"""
+        if not self.active:
+            self.active = True
+            if self.batch_started_at is None:
+                self.batch_started_at = time.time()
+                self._save()
+            logger.info(f"▶️ 批次測試開始 (待測 {len(self.pending())} 台)")
+            self.publish_status()
+
+    def pause(self):
+        """暫停佇列 (目前測試繼續完成，不再開始下一台)"""
+        if self.active:
+            self.active = False
+            logger.info("⏸️ 批次測試已暫停")
+            self.publish_status()
+
+    def throughput(self) -> Dict[str, Any]:
+        """
+        本批次產能統計
+
+        Returns:
+            units: 已結束台數、units_per_hour: 產能、
+            avg_cycle_s: 平均每台週期 (含換機)、avg_test_s: 平均測試時間
+        """
+        finished = [
+            item for item in self.items
+            if item.finished and item.duration_s is not None
+            and self.batch_started_at is not None and item.started_at >= self.batch_started_at
+        ]
+        if not finished:
+            return {"units": 0, "units_per_hour": None, "avg_cycle_s": None, "avg_test_s": None}
+
+        elapsed = max(item.finished_at for item in finished) - self.batch_started_at
+        return {
+            "units": len(finished),
+            "units_per_hour": round(len(finished) * 3600 / elapsed, 2) if elapsed > 0 else None,
+            "avg_cycle_s": round(elapsed / len(finished), 3),
+            "avg_test_s": round(sum(item.duration_s for item in finished) / len(finished), 3),
+        }
+
+    def status(self) -> Dict[str, Any]:
+        """佇列狀態 (含各項目的佇列位置)"""
+        positions = {item.item_id: index for index, item in enumerate(self.pending(), start=1)}
+        counts = {status.value: 0 for status in QueueItemStatus}
+        for item in self.items:
+            counts[item.status.value] += 1
+
+        return {
+            "active": self.active,
+            "current": self.current.to_dict() if self.current else None,
+            "waiting_for": self.waiting_for,
+            "counts": counts,
+            "throughput": self.throughput(),
+            "items": [
+                {**item.to_dict(), "position": positions.get(item.item_id)}
+                for item in self.items
+            ],
+            "timestamp": time.time()
+        }
+
+    def publish_status(self):
+        """發布佇列狀態"""
+        self.mqtt.publish_nowait(TEST_QUEUE, self.status())
+
+    def start(self):
+        """註冊佇列命令處理器並開始觀察測試狀態"""
+        self.mqtt.add_publish_observer(self._on_publish)
+        self.mqtt.register_rpc_handler(CONTROL_QUEUE, self._handle_command, CONTROL_QUEUE_STATUS)
+        self._running = True
+        self.publish_status()
+        logger.info("✅ 批次測試佇列已啟動")
+
+    async def _handle_command(self, payload: Dict) -> Dict:
+        """
+        處理佇列命令
+
+        命令格式:
+        {
+            "action": "enqueue" | "remove" | "clear" | "start" | "pause" | "status",
+            "items": [{"serial": "SN001", "recipe": "vacuum_test", "config": {...}}],  # enqueue
+            "serials": ["SN001", "SN002"], "recipe": "...", "config": {...},          # enqueue (同配方)
+            "item_id": "...",                                                          # remove
+            "finished": false                                                          # clear
+        }
+        """
+        try:
+            action = payload.get("action", "").lower()
+
+            if action == "enqueue":
+                defaults = {"recipe": payload.get("recipe"), "config": payload.get("config", {})}
+                entries = payload.get("items") or [{"serial": s} for s in payload.get("serials", [])]
+                if not entries:
+                    return {"status": "error", "message": "未指定待測幫浦"}
+                items = self.enqueue([{**defaults, **entry} for entry in entries])
+                return {"status": "success", "queued": [item.item_id for item in items]}
+            elif action == "remove":
+                if not self.remove(payload.get("item_id", "")):
+                    return {"status": "error", "message": f"找不到待測項目: {payload.get('item_id')}"}
+            elif action == "clear":
+                self.clear(payload.get("finished", False))
+            elif action == "start":
+                self.resume()
+            elif action == "pause":
+                self.pause()
+            elif action != "status":
+                logger.warning(f"⚠️ 未知的佇列命令: {action}")
+                return {"status": "error", "message": f"未知的佇列命令: {action}"}
+
+            return {"status": "success", "queue": self.status()}
+
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        except Exception as e:
+            logger.exception(f"❌ 處理佇列命令異常: {e}")
+            return {"status": "error", "message": str(e)}
+
+    def _on_publish(self, topic: str, payload: Dict[str, Any]):
+        """發布觀察者: 追蹤測試蓋狀態與目前測試的結果"""
+        if not isinstance(payload, dict):
+            return
+
+        if topic == SAFETY_STATUS and "cover_closed" in payload:
+            closed = bool(payload["cover_closed"])
+            if not closed and self.current is None:
+                # 兩台之間開蓋才算換機 (測試中開蓋為暫停)
+                self._cover_opened = True
+            self.cover_closed = closed
+        elif self.current is None:
+            return
+        elif topic == TEST_RECORD and payload.get("test_id") == self.current.test_id:
+            self._unit_record = payload
+        elif topic == TEST_STATUS and payload.get("state") in TERMINAL_STATES:
+            self._unit_outcome = payload["state"]
+            self._unit_done.set()
+
+    def _interlock_block(self) -> Optional[str]:
+        """換機聯鎖未滿足的原因 (滿足時返回 None)"""
+        if not self.cover_closed:
+            return "cover_closed"
+        if self.require_cover_cycle and self._last_finished_at is not None and not self._cover_opened:
+            return "cover_cycle"
+        return None
+
+    def _next_item(self) -> Optional[QueueItem]:
+        """可開始測試的下一台 (尚未就緒時更新 waiting_for)"""
+        pending = self.pending()
+        if not self.active or not pending:
+            waiting_for = None
+        elif self.automation.state_machine.get_state().value not in (
+            TestState.IDLE.value, *TERMINAL_STATES
+        ):
+            waiting_for = "idle"
+        else:
+            waiting_for = self._interlock_block()
+
+        if waiting_for != self.waiting_for:
+            self.waiting_for = waiting_for
+            if waiting_for:
+                logger.info(f"⏳ 等待換機: {waiting_for}")
+            self.publish_status()
+        return pending[0] if self.active and pending and waiting_for is None else None
+
+    async def run_loop(self):
+        """佇列執行迴圈"""
+        logger.info("🔄 批次測試佇列迴圈已啟動")
+        while self._running:
+            item = self._next_item()
+            if item is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self._run_item(item)
+
+    async def _run_item(self, item: QueueItem):
+        """執行一台測試並等待結束"""
+        state_machine = self.automation.state_machine
+        if state_machine.get_state().value != TestState.IDLE.value:
+            # 上一台的結束狀態不必等待自動重置
+            self.automation.reset_test()
+
+        item.test_id = f"{item.serial}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        item.status = QueueItemStatus.RUNNING
+        item.started_at = time.time()
+        item.phases = {}
+        if self._last_finished_at is not None:
+            item.phases["changeover"] = round(item.started_at - self._last_finished_at, 3)
+
+        config = {**item.config, "test_id": item.test_id, "serial_number": item.serial, "auto_start": True}
+        if item.recipe:
+            config["recipe"] = item.recipe
+
+        self.current = item
+        self._unit_done.clear()
+        self._unit_outcome = None
+        self._unit_record = None
+        history_start = len(state_machine.transition_history)
+        self._save()
+        self.publish_status()
+        logger.info(f"▶️ 開始測試 {item.serial} (剩餘 {len(self.pending())} 台)")
+
+        await self.automation.start_test(config)
+        if state_machine.get_state().value == TestState.IDLE.value and not self._unit_done.is_set():
+            # 安全檢查未通過: 放回佇列並暫停
+            logger.error(f"❌ 無法開始測試 {item.serial}，佇列已暫停")
+            item.status = QueueItemStatus.PENDING
+            item.started_at = None
+            self.current = None
+            self.active = False
+            self._save()
+            self.publish_status()
+            return
+
+        while not self._unit_done.is_set():
+            try:
+                await asyncio.wait_for(self._unit_done.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                if state_machine.get_state().value == TestState.IDLE.value and not self._unit_done.is_set():
+                    # 測試被外部重置，未發布結束狀態
+                    self._unit_outcome = TestState.STOPPED.value
+                    break
+        self._finish_item(item, state_machine.transition_history[history_start:])
+
+    def _finish_item(self, item: QueueItem, transitions: List[Dict[str, Any]]):
+        """記錄測試結果與各階段耗時"""
+        item.finished_at = time.time()
+        item.status = TERMINAL_STATES[self._unit_outcome]
+        if self._unit_record is not None:
+            item.result = self._unit_record.get("result")
+        elif item.status != QueueItemStatus.COMPLETED:
+            item.result = "FAIL"
+
+        # 狀態階段耗時 (同一狀態多次進入時累加，如暫停後恢復)
+        for transition in transitions:
+            phase = transition["from"]
+            if phase != TestState.IDLE.value:
+                item.phases[phase] = round(item.phases.get(phase, 0.0) + transition["time_in_state_s"], 3)
+        for result in self.automation.recipe_engine.results:
+            item.phases[f"step:{result.step}"] = round(result.duration_s, 3)
+
+        self.current = None
+        self._last_finished_at = item.finished_at
+        self._cover_opened = False
+        if item.status == QueueItemStatus.STOPPED:
+            self.active = False
+            logger.warning(f"⚠️ 測試 {item.serial} 被停止，佇列已暫停")
+
+        self._save()
+        self.publish_status()
+        logger.info(
+            f"🏁 {item.serial} {item.status.value} ({item.result}) {item.duration_s}s | "
+            f"產能 {self.throughput()['units_per_hour']} 台/小時"
+        )
+
+    def stop(self):
+        """停止佇列服務 (佇列內容保留於檔案)"""
+        self._running = False
+        self._save()
+        logger.info("🛑 批次測試佇列已停止")
@@ -0,0 +1,155 @@
+"""曲線記錄與相似度計算 (RMSE、限制帶 DTW)"""
+import math
+from typing import List, Optional, Sequence, Tuple
+
+
+class CurveRecorder:
+    """
+    固定時間解析度的曲線記錄
+
+    同一時間格內的樣本合併為平均值，長時間測試的記憶體用量與樣本率無關
+    """
+
+    def __init__(self, resolution: float = 1.0):
+        """
+        Args:
+            resolution: 時間格長度（秒）
+        """
+        self.resolution = resolution
+        self.reset()
+
+    def reset(self):
+        """清除曲線"""
+        self.times: List[float] = []
+        self.values: List[float] = []
+        self._counts: List[int] = []
+        self._bin: Optional[int] = None
+
+    def add(self, t: float, value: float):
+        """
+        加入一筆樣本
+
+        Args:
+            t: 測試經過時間（秒，單調遞增）
+            value: 樣本值
+        """
+        bin_index = int(t // self.resolution)
+        if bin_index != self._bin:
+            self._bin = bin_index
+            self.times.append(t)
+            self.values.append(value)
+            self._counts.append(1)
+            return
+        n = self._counts[-1] + 1
+        self._counts[-1] = n
+        self.times[-1] += (t - self.times[-1]) / n
+        self.values[-1] += (value - self.values[-1]) / n
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def duration(self) -> float:
+        return self.times[-1] if self.times else 0.0
+
+
+def uniform_grid(duration: float, points: int) -> List[float]:
+    """[0, duration] 上的等間距時間點"""
+    if points < 2:
+        return [0.0]
+    step = duration / (points - 1)
+    return [i * step for i in range(points)]
+
+
+def resample(
+    times: Sequence[float],
+    values: Sequence[float],
+    grid: Sequence[float]
+) -> List[float]:
+    """
+    線性內插至指定時間點 (超出範圍取端點值)
+
+    Args:
+        times: 樣本時間 (遞增)
+        values: 樣本值
+        grid: 目標時間點 (遞增)
+    """
+    if not times:
+        raise ValueError("曲線沒有樣本")
+    result = []
+    last = len(times) - 1
+    k = 0
+    for t in grid:
+        while k < last and times[k + 1] < t:
+            k += 1
+        if t <= times[0]:
+            result.append(values[0])
+        elif k >= last:
+            result.append(values[last])
+        else:
+            t0, t1 = times[k], times[k + 1]
+            ratio = (t - t0) / (t1 - t0) if t1 > t0 else 0.0
+            result.append(values[k] + (values[k + 1] - values[k]) * min(ratio, 1.0))
+    return result
+
+
+def rmse(a: Sequence[float], b: Sequence[float]) -> float:
+    """均方根誤差 (長度需相同)"""
+    if len(a) != len(b) or not a:
+        raise ValueError("曲線長度不同或為空")
+    return math.sqrt(sum((x - y) * (x - y) for x, y in zip(a, b)) / len(a))
+
+
+def dtw_distance(a: Sequence[float], b: Sequence[float], band: Optional[int] = None) -> float:
+    """
+    限制帶 (Sakoe-Chiba) 動態時間校正距離
+
+    只計算 |i - j| <= band 的格點，時間 O(n × band)、記憶體 O(m)。
+    結果為對齊路徑上平方誤差和除以 max(n, m) 後開根號，
+    沿對角線對齊時與 RMSE 相同，可用相同尺度解讀。
+
+    Args:
+        a, b: 比較的曲線
+        band: 限制帶寬度 (點數)，None 表示不限制
+    """
+    n, m = len(a), len(b)
+    if not n or not m:
+        raise ValueError("曲線為空")
+    width = max(band if band is not None else max(n, m), abs(n - m))
+
+    inf = math.inf
+    previous = [0.0] + [inf] * m
+    for i in range(1, n + 1):
+        current = [inf] * (m + 1)
+        ai = a[i - 1]
+        for j in range(max(1, i - width), min(m, i + width) + 1):
+            d = ai - b[j - 1]
+            best = previous[j - 1]
+            if previous[j] < best:
+                best = previous[j]
+            if current[j - 1] < best:
+                best = current[j - 1]
+            current[j] = d * d + best
+        previous = current
+    return math.sqrt(previous[m] / max(n, m))
+
+
+def curve_scale(values: Sequence[float]) -> float:
+    """相對距離的尺度: 曲線最大絕對值 (全為 0 時為 1)"""
+    return max((abs(v) for v in values), default=0.0) or 1.0
+
+
+def compare_curves(
+    reference: Sequence[float],
+    candidate: Sequence[float],
+    band_ratio: float = 0.1
+) -> Tuple[float, float]:
+    """
+    比較兩條等長曲線
+
+    Returns:
+        (相對 RMSE, 相對 DTW 距離)，以參考曲線最大絕對值正規化
+    """
+    scale = curve_scale(reference)
+    band = max(1, int(len(reference) * band_ratio))
+    return rmse(reference, candidate) / scale, dtw_distance(reference, candidate, band) / scale
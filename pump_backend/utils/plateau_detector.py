@@ -0,0 +1,91 @@
+"""線上平台 (恆定狀態) 偵測"""
+from typing import Optional
+from models.enums import PlateauEvent
+from utils.running_stats import SlidingWindow
+
+
+class PlateauDetector:
+    """
+    線上平台偵測 (滑動窗口斜率/變異數檢定)
+
+    窗口涵蓋 window 秒後，若同時滿足:
+    - 趨勢: |斜率| × window / |平均| < tolerance (窗口內推估變化量)
+    - 雜訊: 標準差 / |平均| < tolerance
+    即判定進入平台；任一項超過 exit_tolerance 時離開平台 (遲滯避免邊界抖動)。
+
+    PRD FR-004 「壓力變化 < 1% 持續 5 分鐘」對應 window=300, tolerance=0.01
+    """
+
+    def __init__(
+        self,
+        window: float,
+        tolerance: float = 0.01,
+        exit_tolerance: Optional[float] = None,
+        min_samples: int = 3
+    ):
+        """
+        Args:
+            window: 判定窗口（秒）
+            tolerance: 進入平台的容許相對變化
+            exit_tolerance: 離開平台的相對變化 (預設 2 × tolerance)
+            min_samples: 判定所需的最少樣本數
+        """
+        self.tolerance = tolerance
+        self.exit_tolerance = exit_tolerance or tolerance * 2
+        self.min_samples = min_samples
+        self.window = SlidingWindow(window)
+
+        self.in_plateau = False
+        self.entered_at: Optional[float] = None
+        self.plateau_value: Optional[float] = None
+
+    def reset(self):
+        """清除窗口與狀態"""
+        self.window.reset()
+        self.in_plateau = False
+        self.entered_at = None
+        self.plateau_value = None
+
+    def deviation(self) -> Optional[float]:
+        """窗口內相對變化 (趨勢與雜訊取大者)，無法判定時返回 None"""
+        mean = self.window.mean
+        slope = self.window.slope()
+        if not mean or slope is None:
+            return None
+        drift = abs(slope) * self.window.span
+        noise = self.window.variance ** 0.5
+        return max(drift, noise) / abs(mean)
+
+    def update(self, t: float, value: float) -> Optional[PlateauEvent]:
+        """
+        加入一筆樣本
+
+        Args:
+            t: 樣本時間（秒，單調遞增）
+            value: 樣本值
+
+        Returns:
+            狀態改變時返回平台事件，否則 None
+        """
+        self.window.add(t, value)
+        deviation = self.deviation()
+
+        if not self.in_plateau:
+            if (
+                self.window.full
+                and self.window.count >= self.min_samples
+                and deviation is not None
+                and deviation < self.tolerance
+            ):
+                self.in_plateau = True
+                self.entered_at = t
+                self.plateau_value = self.window.mean
+                return PlateauEvent.ENTERED
+        elif deviation is None or deviation >= self.exit_tolerance:
+            self.in_plateau = False
+            self.entered_at = None
+            self.plateau_value = None
+            return PlateauEvent.EXITED
+        else:
+            self.plateau_value = self.window.mean
+        return None
@@ -0,0 +1,78 @@
+"""寄存器讀取錄製檔 (測試重播用)"""
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class RegisterRecorder:
+    """
+    寄存器讀取錄製
+
+    JSON Lines 格式，第一行為檔頭 {"config": 測試配置, "started_at": 時間}，其後每行一筆：
+    - 讀取: {"t": 時間, "c": 輪詢週期, "d": 設備, "a": 位址, "n": 數量, "r": 寄存器 (失敗為 null)}
+    - 事件: {"t": 時間, "e": "pause" | "resume" | "end", "outcome": 結束狀態 (end 時)}
+    """
+
+    def __init__(
+        self,
+        path: str,
+        config: Optional[Dict[str, Any]] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            path: 錄製檔路徑
+            config: 測試配置 (寫入檔頭，重播時用於評估)
+            clock: 時間來源
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.clock = clock
+        self.cycle = 0
+        self.reads = 0
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._write({"config": config or {}, "started_at": clock()})
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def record(self, device: str, address: int, count: int, registers: Optional[List[int]]):
+        """記錄一次寄存器讀取"""
+        if self._file.closed:
+            return
+        self._write({
+            "t": self.clock(), "c": self.cycle, "d": device,
+            "a": address, "n": count, "r": list(registers) if registers is not None else None
+        })
+        self.reads += 1
+
+    def mark(self, event: str, **fields):
+        """記錄事件 (pause / resume / end)"""
+        if self._file.closed:
+            return
+        self._write({"t": self.clock(), "e": event, **fields})
+
+    def close(self, outcome: Optional[str] = None):
+        """結束錄製"""
+        if self._file.closed:
+            return
+        self.mark("end", outcome=outcome)
+        self._file.close()
+
+
+def load_recording(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    載入錄製檔
+
+    Returns:
+        (檔頭, 讀取與事件列表)
+
+    Raises:
+        ValueError: 檔案缺少檔頭
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or "config" not in lines[0]:
+        raise ValueError(f"不是寄存器錄製檔: {path}")
+    return lines[0], lines[1:]
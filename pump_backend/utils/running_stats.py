@@ -0,0 +1,178 @@
+"""串流統計工具 (每筆樣本 O(1) 更新)"""
+import math
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class RunningStats:
+    """
+    串流統計 (Welford 演算法)
+
+    每筆樣本 O(1) 更新平均值、變異數與最小/最大值，不保存樣本
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清除所有統計"""
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def update(self, value: float):
+        """加入一筆樣本"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def variance(self) -> float:
+        """樣本變異數 (少於 2 筆時為 0)"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        """樣本標準差"""
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """統計摘要 (無樣本時數值為 None)"""
+        if not self.count:
+            return {"count": 0, "mean": None, "std": None, "min": None, "max": None}
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class SlidingWindow:
+    """
+    時間滑動窗口
+
+    保存最近 span 秒的樣本，以單調佇列維護窗口內最小/最大值，
+    並累計線性迴歸所需的和 (斜率、變異數)，每筆樣本攤銷 O(1) 更新
+    """
+
+    def __init__(self, span: float):
+        """
+        Args:
+            span: 窗口長度（秒）
+        """
+        self.span = span
+        self._samples: deque = deque()
+        self._min: deque = deque()
+        self._max: deque = deque()
+        self._seq = 0
+        self.reset()
+
+    def reset(self):
+        """清除窗口"""
+        self._samples.clear()
+        self._min.clear()
+        self._max.clear()
+        self._t0: Optional[float] = None
+        self._evicted = False
+        # Σv, Σv², Σt, Σt², Σtv (t 以第一筆樣本為原點，避免大數值相減失真)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._sum_t = 0.0
+        self._sum_tt = 0.0
+        self._sum_tv = 0.0
+
+    def add(self, t: float, value: float):
+        """
+        加入一筆樣本並移除超出窗口的舊樣本
+
+        Args:
+            t: 樣本時間（秒，單調遞增）
+            value: 樣本值
+        """
+        if self._t0 is None:
+            self._t0 = t
+        self._seq += 1
+        self._samples.append((self._seq, t, value))
+        self._accumulate(t - self._t0, value, 1)
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((self._seq, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((self._seq, value))
+
+        cutoff = t - self.span
+        while self._samples[0][1] < cutoff:
+            seq, old_t, old_value = self._samples.popleft()
+            self._evicted = True
+            self._accumulate(old_t - self._t0, old_value, -1)
+            if self._min[0][0] == seq:
+                self._min.popleft()
+            if self._max[0][0] == seq:
+                self._max.popleft()
+
+    def _accumulate(self, t: float, value: float, sign: int):
+        self._sum += sign * value
+        self._sum_sq += sign * value * value
+        self._sum_t += sign * t
+        self._sum_tt += sign * t * t
+        self._sum_tv += sign * t * value
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    @property
+    def duration(self) -> float:
+        """窗口內第一筆到最後一筆樣本的時間差"""
+        if not self._samples:
+            return 0.0
+        return self._samples[-1][1] - self._samples[0][1]
+
+    @property
+    def full(self) -> bool:
+        """樣本是否已涵蓋整個窗口長度 (已有樣本移出窗口也視為涵蓋)"""
+        return self._evicted or self.duration >= self.span
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._sum / len(self._samples) if self._samples else None
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+    def relative_range(self) -> Optional[float]:
+        """窗口內 (最大 - 最小) / |平均|，平均為 0 時返回 None"""
+        mean = self.mean
+        if not mean:
+            return None
+        return (self.max - self.min) / abs(mean)
+
+    @property
+    def variance(self) -> float:
+        """窗口內母體變異數"""
+        n = len(self._samples)
+        if n < 2:
+            return 0.0
+        mean = self._sum / n
+        return max(0.0, self._sum_sq / n - mean * mean)
+
+    def slope(self) -> Optional[float]:
+        """窗口內最小平方法斜率 (每秒變化量)，樣本不足時返回 None"""
+        n = len(self._samples)
+        denominator = n * self._sum_tt - self._sum_t * self._sum_t
+        if n < 2 or denominator <= 0:
+            return None
+        return (n * self._sum_tv - self._sum_t * self._sum) / denominator
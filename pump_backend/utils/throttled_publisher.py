@@ -1,7 +1,7 @@
 """MQTT 訊息節流發布器"""
 import asyncio
 import time
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 from loguru import logger
 from core.mqtt_client import MQTTClient
 
@@ -12,16 +12,25 @@ class ThrottledPublisher:
 
     只在間隔時間足夠時發布訊息，避免過度發布
     適用於高頻率感測器數據
+
+    訊息透過 MQTTClient.publish_nowait 進入發布佇列，輪詢迴圈不等待 PUBACK
     """
 
-    def __init__(self, mqtt_client: MQTTClient, min_interval: float = 0.1):
+    def __init__(
+        self,
+        mqtt_client: MQTTClient,
+        min_interval: float = 0.1,
+        clock: Callable[[], float] = time.time
+    ):
         """
         Args:
             mqtt_client: MQTT 客戶端
             min_interval: 最小發布間隔（秒），預設 100ms
+            clock: 時間來源 (重播時為虛擬時鐘)
         """
         self.mqtt = mqtt_client
         self.min_interval = min_interval
+        self.clock = clock
         self.last_publish_time: Dict[str, float] = {}
         self._pending_payloads: Dict[str, dict] = {}  # 待發布的訊息
 
@@ -33,12 +42,12 @@ class ThrottledPublisher:
             topic: MQTT 主題
             payload: 訊息內容
         """
-        now = time.time()
+        now = self.clock()
         last_time = self.last_publish_time.get(topic, 0)
 
         if now - last_time >= self.min_interval:
             # 可以發布
-            await self.mqtt.publish(topic, payload)
+            self.mqtt.publish_nowait(topic, payload)
             self.last_publish_time[topic] = now
             # 清除待發布的訊息
             self._pending_payloads.pop(topic, None)
@@ -51,7 +60,7 @@ class ThrottledPublisher:
         if not self._pending_payloads:
             return
 
-        now = time.time()
+        now = self.clock()
         topics_to_publish = []
 
         for topic, payload in self._pending_payloads.items():
@@ -60,14 +69,14 @@ class ThrottledPublisher:
                 topics_to_publish.append((topic, payload))
 
         for topic, payload in topics_to_publish:
-            await self.mqtt.publish(topic, payload)
-            self.last_publish_time[topic] = time.time()
+            self.mqtt.publish_nowait(topic, payload)
+            self.last_publish_time[topic] = self.clock()
             del self._pending_payloads[topic]
 
     async def force_publish(self, topic: str, payload: dict):
         """強制發布訊息（忽略節流）"""
-        await self.mqtt.publish(topic, payload)
-        self.last_publish_time[topic] = time.time()
+        self.mqtt.publish_nowait(topic, payload)
+        self.last_publish_time[topic] = self.clock()
         self._pending_payloads.pop(topic, None)
 
 
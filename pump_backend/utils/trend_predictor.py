@@ -0,0 +1,131 @@
+"""趨勢預測 (遞增式指數趨近擬合)"""
+import math
+from typing import Optional, Tuple
+
+
+class ExponentialPredictor:
+    """
+    遞增式指數趨近預測
+
+    抽真空/加壓曲線與啟動後的電流近似一階響應 x(t) = x∞ + (x0 - x∞)·e^(-t/τ)，
+    以固定間隔取樣時滿足 x[k+1] = a·x[k] + b (a = e^(-Δt/τ))，
+    最終值 x∞ = b / (1 - a)。
+
+    樣本先依 interval 分格平均，每完成一格以加權最小平方法更新 (x[k], x[k+1]) 的迴歸，
+    只保存累加和 (每筆 O(1))；forgetting < 1 時舊資料權重逐格衰減。
+    預測標準差以 delta method 由殘差變異數推得，可換算為信賴區間。
+    """
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        forgetting: float = 1.0,
+        min_points: int = 10,
+        min_r2: float = 0.9
+    ):
+        """
+        Args:
+            interval: 取樣分格長度（秒）
+            forgetting: 每格的舊資料權重衰減係數 (1 表示不衰減)
+            min_points: 可預測的最少迴歸點數
+            min_r2: 可預測的最低決定係數 (擬合不佳時不預測)
+        """
+        self.interval = interval
+        self.forgetting = forgetting
+        self.min_points = min_points
+        self.min_r2 = min_r2
+        self.reset()
+
+    def reset(self):
+        """清除擬合"""
+        self.points = 0
+        self._w = self._sx = self._sy = self._sxx = self._sxy = self._syy = 0.0
+        self._bin: Optional[int] = None
+        self._bin_sum = 0.0
+        self._bin_count = 0
+        self._previous: Optional[float] = None
+
+    def update(self, t: float, value: float) -> bool:
+        """
+        加入一筆樣本
+
+        Args:
+            t: 測試經過時間（秒，單調遞增）
+            value: 樣本值
+
+        Returns:
+            是否完成一格並更新擬合
+        """
+        bin_index = int(t // self.interval)
+        if self._bin is None or bin_index == self._bin:
+            self._bin = bin_index
+            self._bin_sum += value
+            self._bin_count += 1
+            return False
+
+        closed = self._bin_sum / self._bin_count
+        self._bin = bin_index
+        self._bin_sum = value
+        self._bin_count = 1
+
+        previous, self._previous = self._previous, closed
+        if previous is None:
+            return False
+        self._add_pair(previous, closed)
+        return True
+
+    def _add_pair(self, x: float, y: float):
+        lam = self.forgetting
+        self._w = self._w * lam + 1.0
+        self._sx = self._sx * lam + x
+        self._sy = self._sy * lam + y
+        self._sxx = self._sxx * lam + x * x
+        self._sxy = self._sxy * lam + x * y
+        self._syy = self._syy * lam + y * y
+        self.points += 1
+
+    def prediction(self) -> Optional[Tuple[float, float]]:
+        """
+        預測最終值
+
+        Returns:
+            (最終值, 標準差)；資料不足、不收斂 (a 不在 0~1) 或擬合不佳時返回 None
+        """
+        if self.points < self.min_points or self._w <= 2:
+            return None
+        w = self._w
+        mean_x, mean_y = self._sx / w, self._sy / w
+        sxx = self._sxx - self._sx * mean_x
+        sxy = self._sxy - self._sx * mean_y
+        syy = self._syy - self._sy * mean_y
+        if sxx <= 0 or syy <= 0:
+            return None
+
+        a = sxy / sxx
+        if not 0.0 < a < 1.0:
+            return None
+        residual = max(syy - a * sxy, 0.0)
+        if 1.0 - residual / syy < self.min_r2:
+            return None
+
+        s2 = residual / (w - 2)
+        final = (mean_y - a * mean_x) / (1.0 - a)
+        # 最終值 = (ȳ - a·x̄) / (1 - a)，ȳ 與 a 的估計誤差獨立
+        variance = (
+            s2 / w / (1.0 - a) ** 2
+            + (mean_y - mean_x) ** 2 / (1.0 - a) ** 4 * s2 / sxx
+        )
+        return final, math.sqrt(variance)
+
+    @property
+    def time_constant(self) -> Optional[float]:
+        """擬合的時間常數 τ（秒）"""
+        if self.points < 2 or self._w <= 1:
+            return None
+        sxx = self._sxx - self._sx * self._sx / self._w
+        if sxx <= 0:
+            return None
+        a = (self._sxy - self._sx * self._sy / self._w) / sxx
+        if not 0.0 < a < 1.0:
+            return None
+        return -self.interval / math.log(a)
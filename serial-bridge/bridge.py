@@ -1,23 +1,26 @@
 """Modbus RTU 到 TCP 的橋接器
 
-使用 pymodbus 在虛擬串口上運行 RTU 服務器，然後轉發到 Modbus TCP 模擬器
+在虛擬串口上接收 RTU 訊框，以原始 PDU 轉發到 Modbus TCP 模擬器
 """
 import asyncio
-import pty
 import os
 import sys
 from typing import Tuple, Optional
 from loguru import logger
-from pymodbus.server import StartAsyncSerialServer
-from pymodbus.datastore import ModbusServerContext
-from pymodbus.client import AsyncModbusTcpClient
-from forwarding_store import ForwardingModbusContext
+from cache import ResponseCache
+from gateway import build_gateways, load_gateways
+from rtu_server import BROADCAST_ID, RtuFrameServer, SerialSettings
+from tcp_gateway import load_servers
+from upstream import UpstreamError, UpstreamPool
 
 
 class RTUToTCPBridge:
     """Modbus RTU 到 TCP 的橋接器
     
-    在虛擬串口上運行 RTU 服務器，然後將請求轉發到 Modbus TCP 模擬器
+    在虛擬串口上接收 RTU 訊框，將 PDU 原樣轉發到 Modbus TCP 模擬器並回傳回應：
+    - 全程 asyncio，不阻塞事件迴圈，多個橋接器共用同一事件迴圈時互不等待
+    - 上游逾時回應閘道例外 0x0B，無法連線回應 0x0A (與實體 RTU/TCP 閘道相同)
+    - 上游連線與讀取快取由連線池提供，多個橋接器讀取同一端點時共用
     """
     
     def __init__(
@@ -26,7 +29,10 @@ class RTUToTCPBridge:
         tcp_host: str,
         tcp_port: int,
         uart_config: Tuple[int, int, str, int],
-        slave_id: int
+        slave_id: int,
+        pool: Optional[UpstreamPool] = None,
+        timeout: float = 2.0,
+        pipeline_depth: int = 1
     ):
         """
         Args:
@@ -35,6 +41,9 @@ class RTUToTCPBridge:
             tcp_port: Modbus TCP 端口
             uart_config: (baudrate, databits, parity, stopbits)
             slave_id: RTU 從站地址
+            pool: 共用的上游連線池 (None 表示建立自有的連線池，不快取)
+            timeout: 自有連線池的上游請求逾時（秒）
+            pipeline_depth: 自有連線池的上游連線同時未完成的請求上限
         """
         self.serial_port = serial_port
         self.tcp_host = tcp_host
@@ -46,7 +55,10 @@ class RTUToTCPBridge:
         self.slave_name: Optional[str] = None
         self.master_port: Optional[str] = None
         self.socat_process: Optional[object] = None
-        self.tcp_client: Optional[AsyncModbusTcpClient] = None
+        self._own_pool = pool is None
+        self.pool = pool or UpstreamPool(timeout, pipeline_depth)
+        self.upstream = self.pool.get(tcp_host, tcp_port)
+        self.server: Optional[RtuFrameServer] = None
         
         # 轉換 parity 字串
         parity_map = {
@@ -129,63 +141,55 @@ class RTUToTCPBridge:
             logger.debug(traceback.format_exc())
             return False
     
+    async def handle(self, unit: int, pdu: bytes) -> Optional[bytes]:
+        """
+        轉發一個請求 PDU
+
+        Returns:
+            回應 PDU，非本從站地址時為 None
+        """
+        if unit not in (self.slave_id, BROADCAST_ID):
+            return None
+        try:
+            return await self.pool.request(self.tcp_host, self.tcp_port, self.slave_id, pdu)
+        except UpstreamError as e:
+            logger.warning(f"⚠️ {self.serial_port} 轉發失敗: {e}")
+            return bytes([pdu[0] | 0x80, e.exception_code])
+
     async def start(self):
         """啟動橋接器"""
         if not self.create_virtual_serial():
             return False
         
-        # 連接到 Modbus TCP 服務器
-        self.tcp_client = AsyncModbusTcpClient(
-            host=self.tcp_host,
-            port=self.tcp_port
-        )
-        await self.tcp_client.connect()
+        # 預先連接上游；失敗時於第一個請求重試
+        try:
+            await self.upstream.connect()
+        except UpstreamError as e:
+            logger.warning(f"⚠️ {e}，將於收到請求時重試")
         
-        # 檢查連接狀態（pymodbus v3.x 使用 connected 屬性）
-        if not hasattr(self.tcp_client, 'connected') or not self.tcp_client.connected:
-            logger.error(f"❌ 無法連接到 Modbus TCP 服務器: {self.tcp_host}:{self.tcp_port}")
+        settings = SerialSettings(self.baudrate, self.databits, self.parity_char, self.stopbits)
+        self.server = RtuFrameServer(self.slave_name, settings, self.handle, name=self.serial_port)
+        try:
+            await self.server.start()
+        except OSError as e:
+            logger.error(f"❌ 開啟虛擬串口失敗: {self.slave_name}: {e}")
             return False
         
-        logger.info(f"✅ 已連接到 Modbus TCP 服務器: {self.tcp_host}:{self.tcp_port}")
-        
-        # 獲取當前事件循環
-        loop = asyncio.get_event_loop()
-        
-        # 創建轉發數據存儲，攔截所有讀寫操作並轉發到 TCP 客戶端
-        store = ForwardingModbusContext(self.tcp_client, self.slave_id, loop)
-        context = ModbusServerContext(devices={self.slave_id: store}, single=False)
-        
         self.running = True
         logger.info(f"🚀 RTU 到 TCP 橋接器已啟動")
         logger.info(f"   虛擬串口: {self.serial_port}")
         logger.info(f"   UART 設定: {self.baudrate}/{self.databits}/{self.parity}/{self.stopbits}")
         logger.info(f"   TCP 目標: {self.tcp_host}:{self.tcp_port}")
         logger.info(f"   Slave ID: {self.slave_id}")
-        
-        # 啟動 RTU 服務器
-        # 使用 socat 創建的虛擬串口
-        try:
-            await StartAsyncSerialServer(
-                context=context,
-                port=self.slave_name,  # 使用虛擬串口路徑
-                baudrate=self.baudrate,
-                bytesize=self.databits,
-                parity=self.parity_char,
-                stopbits=self.stopbits,
-                timeout=1.0,
-                framer='rtu'
-            )
-        except Exception as e:
-            logger.error(f"❌ 啟動 RTU 服務器失敗: {e}")
-            import traceback
-            logger.debug(traceback.format_exc())
-            raise
+        return True
     
     async def stop(self):
         """停止橋接器"""
         self.running = False
-        if self.tcp_client:
-            self.tcp_client.close()
+        if self.server:
+            await self.server.stop()
+        if self._own_pool:
+            await self.pool.close()
         if self.socat_process:
             try:
                 self.socat_process.terminate()
@@ -227,92 +231,130 @@ async def main():
     
     # 根據 MODBUS_all_devices.md 配置橋接器
     # 注意: 一個 USB 轉換器可能連接多個設備（不同的 Slave ID）
-    # 但每個設備需要獨立的虛擬串口，因為後端會通過不同的串口連接不同的設備
+    # device 模式（預設）每個設備一個虛擬串口；gateway 模式與實體接線相同，同一串口掛載多個 Slave ID
     
     tcp_host = os.getenv("MODBUS_SIMULATOR_HOST", "modbus-simulator")
+    upstream_timeout = float(os.getenv("UPSTREAM_TIMEOUT", "2.0"))
+    pipeline_depth = int(os.getenv("UPSTREAM_PIPELINE_DEPTH", "1"))
+    # 讀取快取 (選用): CACHE_CONFIG 指定 JSON 設定檔，或 CACHE_TTL 指定全域 TTL
+    # 每個上游端點 (服務器模式為每個串口) 一個快取，讀取同一設備的虛擬串口與用戶端共用
+    cache_config = os.getenv("CACHE_CONFIG")
+    cache_ttl = float(os.getenv("CACHE_TTL", "0"))
+    if cache_config:
+        logger.info(f"📦 讀取快取設定: {cache_config}")
+    
+    def make_cache() -> Optional[ResponseCache]:
+        if cache_config:
+            return ResponseCache.load(cache_config)
+        return ResponseCache(cache_ttl) if cache_ttl > 0 else None
     
-    bridges = [
-        # USB-Enhanced-SERIAL-A: 電表 (4台)
-        # DC 電表 (Slave ID 1) -> Port 5021
-        RTUToTCPBridge(
-            serial_port="/dev/ttySIM0",
-            tcp_host=tcp_host,
-            tcp_port=5021,
-            uart_config=(57600, 8, 'NONE', 1),
-            slave_id=1
-        ),
-        # AC110V 電表 (Slave ID 2) -> Port 5022
-        RTUToTCPBridge(
-            serial_port="/dev/ttySIM0_1",
-            tcp_host=tcp_host,
-            tcp_port=5022,
-            uart_config=(57600, 8, 'NONE', 1),
-            slave_id=2
-        ),
-        # AC220V 電表 (Slave ID 3) -> Port 5023
-        RTUToTCPBridge(
-            serial_port="/dev/ttySIM0_2",
-            tcp_host=tcp_host,
-            tcp_port=5023,
-            uart_config=(57600, 8, 'NONE', 1),
-            slave_id=3
-        ),
-        # AC220V 3P 電表 (Slave ID 4) -> Port 5024
-        RTUToTCPBridge(
-            serial_port="/dev/ttySIM0_3",
-            tcp_host=tcp_host,
-            tcp_port=5024,
-            uart_config=(57600, 8, 'NONE', 1),
-            slave_id=4
-        ),
+    # 閘道模式: 每個虛擬串口掛載多個 Slave ID；閘道與設備模式的上游連線與快取共用連線池
+    # 服務器模式 (生產環境): 反向將實體串口以 Modbus TCP 提供給多個用戶端
+    mode = os.getenv("BRIDGE_MODE", "device")
+    pool: Optional[UpstreamPool] = None
+    if mode == "server":
+        server_config = os.getenv("SERVER_CONFIG")
+        if not server_config:
+            logger.error("❌ 服務器模式需要以 SERVER_CONFIG 指定串口設定檔")
+            return
+        bridges = load_servers(server_config, make_cache)
+    elif mode == "gateway":
+        pool = UpstreamPool(upstream_timeout, pipeline_depth, make_cache)
+        bridges = build_gateways(load_gateways(os.getenv("GATEWAY_CONFIG")), tcp_host, pool)
+    else:
+        pool = UpstreamPool(upstream_timeout, pipeline_depth, make_cache)
+        bridges = [
+            # USB-Enhanced-SERIAL-A: 電表 (4台)
+            # DC 電表 (Slave ID 1) -> Port 5021
+            RTUToTCPBridge(
+                serial_port="/dev/ttySIM0",
+                tcp_host=tcp_host,
+                tcp_port=5021,
+                uart_config=(57600, 8, 'NONE', 1),
+                slave_id=1,
+                pool=pool
+            ),
+            # AC110V 電表 (Slave ID 2) -> Port 5022
+            RTUToTCPBridge(
+                serial_port="/dev/ttySIM0_1",
+                tcp_host=tcp_host,
+                tcp_port=5022,
+                uart_config=(57600, 8, 'NONE', 1),
+                slave_id=2,
+                pool=pool
+            ),
+            # AC220V 電表 (Slave ID 3) -> Port 5023
+            RTUToTCPBridge(
+                serial_port="/dev/ttySIM0_2",
+                tcp_host=tcp_host,
+                tcp_port=5023,
+                uart_config=(57600, 8, 'NONE', 1),
+                slave_id=3,
+                pool=pool
+            ),
+            # AC220V 3P 電表 (Slave ID 4) -> Port 5024
+            RTUToTCPBridge(
+                serial_port="/dev/ttySIM0_3",
+                tcp_host=tcp_host,
+                tcp_port=5024,
+                uart_config=(57600, 8, 'NONE', 1),
+                slave_id=4,
+                pool=pool
+            ),
         
-        # USB-Enhanced-SERIAL-C: 流量計 (1台) - Port 5020
-        RTUToTCPBridge(
-            serial_port="/dev/ttySIM1",
-            tcp_host=tcp_host,
-            tcp_port=5020,
-            uart_config=(19200, 8, 'NONE', 1),
-            slave_id=1
-        ),
+            # USB-Enhanced-SERIAL-C: 流量計 (1台) - Port 5020
+            RTUToTCPBridge(
+                serial_port="/dev/ttySIM1",
+                tcp_host=tcp_host,
+                tcp_port=5020,
+                uart_config=(19200, 8, 'NONE', 1),
+                slave_id=1,
+                pool=pool
+            ),
         
-        # USB-Enhanced-SERIAL-D: 繼電器 IO (1台) - Port 5027
-        RTUToTCPBridge(
-            serial_port="/dev/ttySIM2",
-            tcp_host=tcp_host,
-            tcp_port=5027,
-            uart_config=(115200, 8, 'NONE', 1),
-            slave_id=1
-        ),
+            # USB-Enhanced-SERIAL-D: 繼電器 IO (1台) - Port 5027
+            RTUToTCPBridge(
+                serial_port="/dev/ttySIM2",
+                tcp_host=tcp_host,
+                tcp_port=5027,
+                uart_config=(115200, 8, 'NONE', 1),
+                slave_id=1,
+                pool=pool
+            ),
         
-        # MOXA USB Serial Port: 壓力計 (2台)
-        # 正壓 (Slave ID 2) -> Port 5025
-        RTUToTCPBridge(
-            serial_port="/dev/ttySIM3",
-            tcp_host=tcp_host,
-            tcp_port=5025,
-            uart_config=(19200, 8, 'EVEN', 1),
-            slave_id=2
-        ),
-        # 真空 (Slave ID 3) -> Port 5026
-        RTUToTCPBridge(
-            serial_port="/dev/ttySIM3_1",
-            tcp_host=tcp_host,
-            tcp_port=5026,
-            uart_config=(19200, 8, 'EVEN', 1),
-            slave_id=3
-        ),
-    ]
-    
-    # 啟動所有橋接器
-    tasks = [bridge.start() for bridge in bridges]
+            # MOXA USB Serial Port: 壓力計 (2台)
+            # 正壓 (Slave ID 2) -> Port 5025
+            RTUToTCPBridge(
+                serial_port="/dev/ttySIM3",
+                tcp_host=tcp_host,
+                tcp_port=5025,
+                uart_config=(19200, 8, 'EVEN', 1),
+                slave_id=2,
+                pool=pool
+            ),
+            # 真空 (Slave ID 3) -> Port 5026
+            RTUToTCPBridge(
+                serial_port="/dev/ttySIM3_1",
+                tcp_host=tcp_host,
+                tcp_port=5026,
+                uart_config=(19200, 8, 'EVEN', 1),
+                slave_id=3,
+                pool=pool
+            ),
+        ]
     
+    # 啟動所有橋接器 (共用同一事件迴圈)
     try:
-        await asyncio.gather(*tasks)
-    except KeyboardInterrupt:
+        results = await asyncio.gather(*(bridge.start() for bridge in bridges))
+        logger.info(f"✅ {sum(bool(r) for r in results)}/{len(bridges)} 個橋接器已啟動")
+        await asyncio.Event().wait()
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("⏸️ 收到中斷信號，正在關閉...")
     finally:
         for bridge in bridges:
             await bridge.stop()
+        if pool:
+            await pool.close()
         logger.info("✅ 所有橋接器已停止")
 
 
@@ -0,0 +1,216 @@
+"""讀取回應快取 (TTL + 合併並行請求 + 寫入失效)"""
+import asyncio
+import json
+import struct
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from upstream import GATEWAY_TARGET_NO_RESPONSE, UpstreamError
+
+READ_FUNCTIONS = (1, 2, 3, 4)
+# 寫入功能碼 → 受影響的讀取功能碼 (線圈 / 保持寄存器)
+WRITE_TARGETS = {5: 1, 15: 1, 6: 3, 16: 3}
+BROADCAST_ID = 0
+
+# (單元 ID, 功能碼, 起始位址, 數量)
+CacheKey = Tuple[int, int, int, int]
+Forward = Callable[[int, bytes], Awaitable[bytes]]
+
+
+@dataclass
+class CacheRule:
+    """位址範圍的 TTL 規則 (unit / function 為 None 表示不限)"""
+    start: int
+    end: int
+    ttl: float
+    unit: Optional[int] = None
+    function: Optional[int] = None
+
+    def matches(self, unit: int, function: int, address: int, count: int) -> bool:
+        return (
+            (self.unit is None or self.unit == unit)
+            and (self.function is None or self.function == function)
+            and self.start <= address and address + count - 1 <= self.end
+        )
+
+
+@dataclass
+class _Flight:
+    """進行中的上游讀取"""
+    future: asyncio.Future
+    valid: bool = True
+
+
+def write_range(function: int, pdu: bytes) -> Optional[Tuple[int, int]]:
+    """寫入請求的 (起始位址, 數量)"""
+    try:
+        if function in (5, 6):
+            return struct.unpack(">H", pdu[1:3])[0], 1
+        if function in (15, 16):
+            return struct.unpack(">HH", pdu[1:5])
+    except struct.error:
+        return None
+    return None
+
+
+class ResponseCache:
+    """
+    讀取回應快取 (read-through)
+
+    以 (單元 ID, 功能碼, 起始位址, 數量) 為鍵保存上游的讀取回應 PDU：
+    - TTL 依位址範圍規則決定 (第一個完整涵蓋請求範圍的規則)，TTL 為 0 表示不快取
+    - 同一鍵的並行請求只轉發一次 (single-flight)，其餘等待同一結果；
+      發起的請求被取消時，等待者收到 UpstreamError (0x0B) 而非取消
+    - 寫入線圈/寄存器時，與寫入範圍重疊的快取與進行中的讀取一併失效
+    - 例外回應與轉發失敗不快取
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = 0.0,
+        rules: Optional[List[CacheRule]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            default_ttl: 未符合任何規則時的 TTL（秒）
+            rules: 位址範圍 TTL 規則
+            clock: 時間來源
+        """
+        self.default_ttl = default_ttl
+        self.rules = list(rules or [])
+        self.clock = clock
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidated": 0}
+        self._entries: Dict[CacheKey, Tuple[float, bytes]] = {}
+        self._inflight: Dict[CacheKey, _Flight] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ResponseCache":
+        """
+        由設定建立，例如:
+        {"default_ttl": 0.5, "ranges": [{"unit": 1, "function": 3, "start": 0, "end": 99, "ttl": 1.0}]}
+
+        Raises:
+            ValueError: 設定格式錯誤
+        """
+        try:
+            rules = [
+                CacheRule(
+                    start=int(r.get("start", 0)),
+                    end=int(r.get("end", 0xFFFF)),
+                    ttl=float(r["ttl"]),
+                    unit=None if r.get("unit") is None else int(r["unit"]),
+                    function=None if r.get("function") is None else int(r["function"]),
+                )
+                for r in config.get("ranges", [])
+            ]
+            default_ttl = float(config.get("default_ttl", 0.0))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"快取設定格式錯誤: {e}")
+        if default_ttl < 0 or any(r.ttl < 0 or r.start > r.end for r in rules):
+            raise ValueError("快取 TTL 不可為負，範圍起點不可大於終點")
+        return cls(default_ttl, rules)
+
+    @classmethod
+    def load(cls, path: str) -> "ResponseCache":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_config(json.load(f))
+
+    def ttl_for(self, unit: int, function: int, address: int, count: int) -> float:
+        for rule in self.rules:
+            if rule.matches(unit, function, address, count):
+                return rule.ttl
+        return self.default_ttl
+
+    async def request(self, unit: int, pdu: bytes, forward: Forward) -> bytes:
+        """
+        經快取轉發一個請求 PDU (非讀取請求直接轉發，寫入後使重疊範圍失效)
+
+        Raises:
+            轉發函式的例外 (不快取)
+        """
+        function = pdu[0] if pdu else None
+        if function in WRITE_TARGETS:
+            span = write_range(function, pdu)
+            self.invalidate(unit, WRITE_TARGETS[function], span)
+            try:
+                return await forward(unit, pdu)
+            finally:
+                self.invalidate(unit, WRITE_TARGETS[function], span)
+        if function not in READ_FUNCTIONS or len(pdu) < 5 or unit == BROADCAST_ID:
+            return await forward(unit, pdu)
+
+        address, count = struct.unpack(">HH", pdu[1:5])
+        key = (unit, function, address, count)
+        ttl = self.ttl_for(unit, function, address, count)
+        if ttl <= 0:
+            return await forward(unit, pdu)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self.clock():
+            self.stats["hits"] += 1
+            return entry[1]
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(flight.future)
+
+        self.stats["misses"] += 1
+        flight = _Flight(asyncio.get_running_loop().create_future())
+        self._inflight[key] = flight
+        try:
+            response = await forward(unit, pdu)
+        except asyncio.CancelledError:
+            # 發起的用戶端被取消 (例如斷線) 不應連帶取消合併的等待者: 改以上游錯誤回應
+            flight.future.set_exception(UpstreamError("合併的上游讀取已取消", GATEWAY_TARGET_NO_RESPONSE))
+            flight.future.exception()
+            raise
+        except Exception as e:
+            flight.future.set_exception(e)
+            # 無合併等待者時避免 "exception was never retrieved"
+            flight.future.exception()
+            raise
+        else:
+            flight.future.set_result(response)
+        finally:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+        # 進行中被寫入失效的結果仍回傳給等待者，但不寫入快取
+        if flight.valid and not response[0] & 0x80:
+            self._entries[key] = (self.clock() + ttl, response)
+        return response
+
+    def invalidate(self, unit: int, function: int, span: Optional[Tuple[int, int]] = None):
+        """
+        使重疊範圍的快取失效
+
+        Args:
+            unit: 單元 ID (廣播 0 表示所有單元)
+            function: 讀取功能碼
+            span: (起始位址, 數量)，None 表示整個功能碼
+        """
+        def overlaps(key: CacheKey) -> bool:
+            k_unit, k_function, k_address, k_count = key
+            if k_function != function or (unit != BROADCAST_ID and k_unit != unit):
+                return False
+            if span is None:
+                return True
+            start, count = span
+            return k_address < start + count and start < k_address + k_count
+
+        for key in [k for k in self._entries if overlaps(k)]:
+            del self._entries[key]
+            self.stats["invalidated"] += 1
+        for key in [k for k in self._inflight if overlaps(k)]:
+            # 進行中的讀取可能在寫入前取得舊值: 不再合併且結果不寫入快取
+            self._inflight.pop(key).valid = False
+
+    def clear(self):
+        self._entries.clear()
+
+    def log_stats(self, name: str):
+        s = self.stats
+        logger.info(
+            f"📦 {name} 快取: 命中 {s['hits']}、未命中 {s['misses']}、合併 {s['coalesced']}、失效 {s['invalidated']}"
+        )
@@ -0,0 +1,170 @@
+"""多從站 RTU 閘道 (一個虛擬串口、多個 Slave ID)"""
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from loguru import logger
+from rtu_server import BROADCAST_ID, RtuFrameServer, SerialSettings
+from upstream import UpstreamError, UpstreamPool
+
+BROADCAST_FUNCTIONS = (5, 6, 15, 16)
+
+# 預設路由表 (與模擬器 devices.yaml 的 buses 及實體 USB-RS485 接線相同)
+DEFAULT_GATEWAYS = [
+    # USB-Enhanced-SERIAL-A: 電表 (4台)
+    {"link": "/dev/ttySIM0", "baudrate": 57600, "parity": "N",
+     "routes": {1: 5021, 2: 5022, 3: 5023, 4: 5024}},
+    # USB-Enhanced-SERIAL-C: 流量計
+    {"link": "/dev/ttySIM1", "baudrate": 19200, "parity": "N", "routes": {1: 5020}},
+    # USB-Enhanced-SERIAL-D: 繼電器 IO
+    {"link": "/dev/ttySIM2", "baudrate": 115200, "parity": "N", "routes": {1: 5027}},
+    # MOXA USB Serial Port: 壓力計 (正壓 / 真空)
+    {"link": "/dev/ttySIM3", "baudrate": 19200, "parity": "E", "routes": {2: 5025, 3: 5026}},
+]
+
+
+@dataclass
+class Route:
+    """Slave ID 的上游端點"""
+    host: str
+    port: int
+    unit: int
+
+
+def parse_routes(routes: Dict, default_host: str) -> Dict[int, Route]:
+    """
+    解析路由表，值可為端口、"host:port" 或 {"host", "port", "unit"}
+
+    Raises:
+        ValueError: 路由格式錯誤
+    """
+    parsed = {}
+    for key, target in routes.items():
+        try:
+            slave_id = int(key)
+            if isinstance(target, dict):
+                route = Route(
+                    str(target.get("host", default_host)), int(target["port"]), int(target.get("unit", slave_id))
+                )
+            elif isinstance(target, str) and ":" in target:
+                host, port = target.rsplit(":", 1)
+                route = Route(host, int(port), slave_id)
+            else:
+                route = Route(default_host, int(target), slave_id)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Slave ID {key} 的路由格式錯誤: {e}")
+        if not 1 <= slave_id <= 247:
+            raise ValueError(f"Slave ID 超出範圍 (1-247): {slave_id}")
+        parsed[slave_id] = route
+    return parsed
+
+
+class RTUGateway:
+    """
+    多從站 RTU 閘道
+
+    一個虛擬串口 (pty，不需 socat) 掛載多個 Slave ID，依路由表轉發到各自的 Modbus TCP 上游：
+    - 未在路由表的 Slave ID 不回應 (與 RS485 匯流排上不存在的從站相同)
+    - 廣播 (ID 0) 的寫入轉發到所有路由，不回應
+    - 上游連線與讀取快取由連線池提供，同一端點只有一條連線與一個快取
+    """
+
+    def __init__(
+        self,
+        link: str,
+        settings: SerialSettings,
+        routes: Dict[int, Route],
+        pool: UpstreamPool
+    ):
+        """
+        Args:
+            link: 虛擬串口路徑 (符號連結，e.g., /dev/ttySIM0)
+            settings: 串口參數
+            routes: Slave ID → 上游端點
+            pool: 上游連線池
+        """
+        self.link = link
+        self.settings = settings
+        self.routes = routes
+        self.pool = pool
+        self.server = RtuFrameServer(None, settings, self.handle, name=link, link=link)
+        self.running = False
+
+    async def handle(self, unit: int, pdu: bytes) -> Optional[bytes]:
+        """
+        轉發一個請求 PDU
+
+        Returns:
+            回應 PDU，不回應時為 None
+        """
+        if unit == BROADCAST_ID:
+            if pdu and pdu[0] in BROADCAST_FUNCTIONS:
+                for slave_id in self.routes:
+                    await self._request(slave_id, pdu)
+            return None
+        if unit not in self.routes:
+            return None
+        return await self._request(unit, pdu)
+
+    async def _request(self, slave_id: int, pdu: bytes) -> bytes:
+        route = self.routes[slave_id]
+        try:
+            return await self.pool.request(route.host, route.port, route.unit, pdu)
+        except UpstreamError as e:
+            logger.warning(f"⚠️ {self.link} Slave ID {slave_id} 轉發失敗: {e}")
+            return bytes([pdu[0] | 0x80, e.exception_code])
+
+    async def start(self) -> bool:
+        """啟動閘道"""
+        try:
+            await self.server.start()
+        except OSError as e:
+            logger.error(f"❌ 建立虛擬串口失敗: {self.link}: {e}")
+            return False
+        self.running = True
+        s = self.settings
+        targets = ", ".join(f"{slave_id}→{r.host}:{r.port}" for slave_id, r in sorted(self.routes.items()))
+        logger.info(f"🚀 RTU 閘道 {self.link} ({s.baudrate}/{s.bytesize}/{s.parity}/{s.stopbits}): {targets}")
+        return True
+
+    async def stop(self):
+        self.running = False
+        await self.server.stop()
+        logger.info(f"🛑 RTU 閘道已停止: {self.link}")
+
+
+def build_gateways(
+    config: List[Dict],
+    default_host: str,
+    pool: UpstreamPool
+) -> List[RTUGateway]:
+    """
+    由設定建立閘道
+
+    Raises:
+        ValueError: 設定格式錯誤或虛擬串口重複
+    """
+    gateways, links = [], set()
+    for spec in config:
+        link = spec.get("link")
+        if not link or link in links:
+            raise ValueError(f"閘道虛擬串口未指定或重複: {link}")
+        links.add(link)
+        settings = SerialSettings(
+            baudrate=int(spec.get("baudrate", 19200)),
+            bytesize=int(spec.get("bytesize", 8)),
+            parity=str(spec.get("parity", "N"))[0].upper(),
+            stopbits=int(spec.get("stopbits", 1)),
+        )
+        routes = parse_routes(spec.get("routes") or {}, default_host)
+        if not routes:
+            raise ValueError(f"閘道 {link} 沒有路由")
+        gateways.append(RTUGateway(link, settings, routes, pool))
+    return gateways
+
+
+def load_gateways(path: Optional[str]) -> List[Dict]:
+    """讀取閘道設定檔 (JSON: {"gateways": [...]})，未指定時使用預設路由表"""
+    if not path:
+        return DEFAULT_GATEWAYS
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["gateways"]
@@ -0,0 +1,180 @@
+"""非阻塞 Modbus RTU 主站 (獨佔實體串口)"""
+import asyncio
+import fcntl
+import os
+import termios
+import tty
+from typing import Optional
+from loguru import logger
+from rtu_server import BROADCAST_ID, SerialSettings, crc16, with_crc
+
+BAUD_FLAGS = {
+    1200: termios.B1200, 2400: termios.B2400, 4800: termios.B4800, 9600: termios.B9600,
+    19200: termios.B19200, 38400: termios.B38400, 57600: termios.B57600, 115200: termios.B115200,
+}
+
+
+class RtuTimeout(Exception):
+    """從站未在逾時內回應完整訊框"""
+
+
+def response_length(buffer: bytes) -> Optional[int]:
+    """RTU 回應訊框長度 (資料不足或未知功能碼時返回 None)"""
+    if len(buffer) < 2:
+        return None
+    function = buffer[1]
+    if function & 0x80:
+        return 5
+    if function in (1, 2, 3, 4):
+        return 5 + buffer[2] if len(buffer) >= 3 else None
+    if function in (5, 6, 15, 16):
+        return 8
+    return None
+
+
+def configure_serial(fd: int, settings: SerialSettings):
+    """
+    設定串口為原始模式與指定的 UART 參數
+
+    Raises:
+        ValueError: 不支援的鮑率
+        termios.error: 串口不接受設定 (例如部分 pty 不支援同位位元)
+    """
+    if settings.baudrate not in BAUD_FLAGS:
+        raise ValueError(f"不支援的鮑率: {settings.baudrate}")
+    tty.setraw(fd)
+    attrs = termios.tcgetattr(fd)
+    cflag = attrs[2] & ~(termios.CSIZE | termios.PARENB | termios.PARODD | termios.CSTOPB)
+    cflag |= {5: termios.CS5, 6: termios.CS6, 7: termios.CS7}.get(settings.bytesize, termios.CS8)
+    cflag |= termios.CLOCAL | termios.CREAD
+    if settings.parity in ("E", "O"):
+        cflag |= termios.PARENB
+    if settings.parity == "O":
+        cflag |= termios.PARODD
+    if settings.stopbits == 2:
+        cflag |= termios.CSTOPB
+    attrs[2] = cflag
+    attrs[4] = attrs[5] = BAUD_FLAGS[settings.baudrate]
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+
+class RtuMaster:
+    """
+    Modbus RTU 主站
+
+    以事件迴圈的 add_reader 收發，同一時間只有一個交易在匯流排上 (半雙工)：
+    - 以 TIOCEXCL 獨佔串口，其他進程無法同時開啟
+    - 送出前清除殘留輸入，交易間保持 t3.5 訊框間隔
+    - 依功能碼判斷回應長度，CRC、Slave ID 或功能碼不符的回應視為錯誤
+    - 廣播 (ID 0) 不等待回應，送出後等待 turnaround_delay
+    """
+
+    def __init__(self, port: str, settings: SerialSettings, turnaround_delay: float = 0.1):
+        """
+        Args:
+            port: 串口路徑 (e.g., /dev/ttyUSB0)
+            settings: 串口參數
+            turnaround_delay: 廣播後的等待時間（秒）
+        """
+        self.port = port
+        self.settings = settings
+        self.turnaround_delay = turnaround_delay
+        self.stats = {"transactions": 0, "timeouts": 0, "frame_errors": 0}
+        self._fd: Optional[int] = None
+        self._buffer = b""
+        self._data = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    async def open(self):
+        """
+        開啟串口
+
+        Raises:
+            OSError: 無法開啟串口
+        """
+        self._fd = os.open(self.port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        if os.isatty(self._fd):
+            try:
+                fcntl.ioctl(self._fd, termios.TIOCEXCL)
+            except OSError as e:
+                logger.warning(f"⚠️ {self.port} 無法設定獨佔模式: {e}")
+            try:
+                configure_serial(self._fd, self.settings)
+            except (termios.error, ValueError) as e:
+                logger.warning(f"⚠️ {self.port} 無法套用 UART 設定，沿用原始模式: {e}")
+                tty.setraw(self._fd)
+        asyncio.get_running_loop().add_reader(self._fd, self._on_readable)
+
+    async def close(self):
+        if self._fd is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    def _on_readable(self):
+        try:
+            self._buffer += os.read(self._fd, 4096)
+        except (BlockingIOError, OSError):
+            return
+        self._data.set()
+
+    async def _write(self, frame: bytes):
+        while frame:
+            try:
+                written = os.write(self._fd, frame)
+            except BlockingIOError:
+                await asyncio.sleep(self.settings.char_time)
+                continue
+            frame = frame[written:]
+
+    async def _read_response(self, timeout: float) -> bytes:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            length = response_length(self._buffer)
+            if length is not None and len(self._buffer) >= length:
+                return self._buffer[:length]
+            self._data.clear()
+            # 未知功能碼: 收到資料後以 t3.5 間隔判斷訊框結束
+            wait = deadline - loop.time()
+            if length is None and len(self._buffer) >= 2:
+                wait = min(wait, self.settings.frame_gap)
+            if wait <= 0:
+                raise RtuTimeout(f"{self.port} 回應逾時")
+            try:
+                await asyncio.wait_for(self._data.wait(), wait)
+            except asyncio.TimeoutError:
+                if length is None and len(self._buffer) >= 2 and loop.time() < deadline:
+                    return self._buffer
+                raise RtuTimeout(f"{self.port} 回應逾時")
+
+    async def transact(self, unit: int, pdu: bytes, timeout: float = 1.0) -> Optional[bytes]:
+        """
+        執行一個交易
+
+        Returns:
+            回應 PDU，廣播時為 None
+
+        Raises:
+            RtuTimeout: 逾時或回應訊框錯誤
+        """
+        async with self._lock:
+            self.stats["transactions"] += 1
+            self._buffer = b""
+            await self._write(with_crc(bytes([unit]) + pdu))
+            try:
+                if unit == BROADCAST_ID:
+                    await asyncio.sleep(self.turnaround_delay)
+                    return None
+                frame = await self._read_response(timeout)
+            except RtuTimeout:
+                self.stats["timeouts"] += 1
+                raise
+            finally:
+                # 交易間的訊框間隔
+                await asyncio.sleep(self.settings.frame_gap)
+            if crc16(frame[:-2]) != int.from_bytes(frame[-2:], "little") or frame[0] != unit \
+                    or frame[1] & 0x7F != pdu[0]:
+                self.stats["frame_errors"] += 1
+                raise RtuTimeout(f"{self.port} 回應訊框錯誤: {frame.hex()}")
+            return frame[1:-2]
@@ -0,0 +1,220 @@
+"""非阻塞 Modbus RTU 訊框服務器 (串口端)"""
+import asyncio
+import os
+import pty
+import time
+import tty
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from loguru import logger
+
+PARITY_BITS = {"N": 0, "E": 1, "O": 1}
+BROADCAST_ID = 0
+
+# (單元 ID, 請求 PDU) → 回應 PDU，None 表示不回應
+FrameHandler = Callable[[int, bytes], Awaitable[Optional[bytes]]]
+
+
+def crc16(frame: bytes) -> int:
+    """MODBUS RTU CRC-16 (附加時低位元組在前)"""
+    crc = 0xFFFF
+    for byte in frame:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def with_crc(frame: bytes) -> bytes:
+    return frame + crc16(frame).to_bytes(2, "little")
+
+
+def request_length(buffer: bytes) -> Optional[int]:
+    """RTU 請求訊框長度 (資料不足或未知功能碼時返回 None)"""
+    if len(buffer) < 2:
+        return None
+    function = buffer[1]
+    if function in (1, 2, 3, 4, 5, 6):
+        return 8
+    if function in (15, 16):
+        return 9 + buffer[6] if len(buffer) >= 7 else None
+    return None
+
+
+@dataclass
+class SerialSettings:
+    """串口參數"""
+    baudrate: int = 19200
+    bytesize: int = 8
+    parity: str = "N"
+    stopbits: int = 1
+
+    @property
+    def char_time(self) -> float:
+        """一個字元的傳輸時間（秒）"""
+        return (1 + self.bytesize + PARITY_BITS.get(self.parity, 0) + self.stopbits) / self.baudrate
+
+    @property
+    def frame_gap(self) -> float:
+        """訊框間隔 t3.5 (鮑率高於 19200 時規範固定為 1.75 ms)"""
+        return 3.5 * self.char_time if self.baudrate <= 19200 else 0.00175
+
+
+class RtuFrameServer:
+    """
+    Modbus RTU 訊框服務器
+
+    以事件迴圈的 add_reader 讀取串口，不使用執行緒：
+    - 依功能碼判斷請求長度，未知功能碼以 t3.5 間隔判斷訊框結束 (原樣交給處理函式)
+    - CRC 錯誤的訊框捨棄不回應
+    - 串口為半雙工，同一串口的請求依序處理；等待處理函式時事件迴圈可服務其他串口
+    - port 為 None 時自行以 pty.openpty() 建立虛擬串口 (不需 socat)，從端以 link 符號連結提供給後端
+    """
+
+    def __init__(
+        self,
+        port: Optional[str],
+        settings: SerialSettings,
+        handler: FrameHandler,
+        name: Optional[str] = None,
+        link: Optional[str] = None
+    ):
+        """
+        Args:
+            port: 串口路徑 (已存在的 pty 或實體串口)，None 表示建立 pty
+            settings: 串口參數
+            handler: 請求處理函式
+            name: 日誌名稱
+            link: 自建 pty 從端的符號連結路徑
+        """
+        self.port = port
+        self.link = link
+        self.settings = settings
+        self.handler = handler
+        self.name = name or port or link
+        self.stats = {"requests": 0, "responses": 0, "crc_errors": 0, "discarded": 0}
+        self._fd: Optional[int] = None
+        self._pty_slave: Optional[int] = None
+        self._buffer = b""
+        self._last_rx = 0.0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """開啟串口並開始處理請求"""
+        if self.port is None:
+            self._fd = self._open_pty()
+        else:
+            self._fd = os.open(self.port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+            if os.isatty(self._fd):
+                tty.setraw(self._fd)
+        asyncio.get_running_loop().add_reader(self._fd, self._on_readable)
+        self._task = asyncio.create_task(self._serve())
+
+    def _open_pty(self) -> int:
+        master, self._pty_slave = pty.openpty()
+        # 從端保持開啟 (後端關閉串口時主端不會 EIO)，原始模式不回顯
+        tty.setraw(self._pty_slave)
+        tty.setraw(master)
+        os.set_blocking(master, False)
+        path = os.ttyname(self._pty_slave)
+        if self.link:
+            link = Path(self.link)
+            link.parent.mkdir(parents=True, exist_ok=True)
+            if link.is_symlink() or link.exists():
+                link.unlink()
+            link.symlink_to(path)
+        return master
+
+    @property
+    def path(self) -> Optional[str]:
+        """後端開啟的串口路徑"""
+        if self.port is not None:
+            return self.port
+        return self.link or (os.ttyname(self._pty_slave) if self._pty_slave is not None else None)
+
+    async def stop(self):
+        if self._fd is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for fd in (self._fd, self._pty_slave):
+            if fd is not None:
+                os.close(fd)
+        self._fd = self._pty_slave = None
+        if self.port is None and self.link and Path(self.link).is_symlink():
+            Path(self.link).unlink()
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 4096)
+        except (BlockingIOError, OSError):
+            return
+        self.feed(data, time.monotonic())
+
+    def feed(self, data: bytes, now: float):
+        """接收資料並切分訊框"""
+        if self._buffer and now - self._last_rx > self.settings.frame_gap:
+            self.stats["discarded"] += 1
+            self._buffer = b""
+        self._buffer += data
+        self._last_rx = now
+        while self._buffer:
+            length = request_length(self._buffer)
+            if length is None or len(self._buffer) < length:
+                break
+            frame, self._buffer = self._buffer[:length], self._buffer[length:]
+            self._queue.put_nowait(frame)
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if len(self._buffer) >= 2 and request_length(self._buffer) is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.settings.frame_gap, self._flush_unknown)
+
+    def _flush_unknown(self):
+        self._flush_handle = None
+        if self._buffer:
+            self._queue.put_nowait(self._buffer)
+            self._buffer = b""
+
+    async def handle(self, frame: bytes) -> Optional[bytes]:
+        """
+        處理一個請求訊框
+
+        Returns:
+            回應訊框 (含 CRC)，不回應時為 None
+        """
+        self.stats["requests"] += 1
+        if len(frame) < 4 or crc16(frame[:-2]) != int.from_bytes(frame[-2:], "little"):
+            self.stats["crc_errors"] += 1
+            return None
+        unit = frame[0]
+        pdu = await self.handler(unit, frame[1:-2])
+        if pdu is None or unit == BROADCAST_ID:
+            return None
+        return with_crc(bytes([unit]) + pdu)
+
+    async def _serve(self):
+        while True:
+            frame = await self._queue.get()
+            try:
+                response = await self.handle(frame)
+            except Exception as e:
+                logger.error(f"❌ {self.name} 處理請求失敗: {e}")
+                continue
+            if response is None:
+                continue
+            try:
+                os.write(self._fd, response)
+                self.stats["responses"] += 1
+            except OSError as e:
+                logger.warning(f"⚠️ {self.name} 寫入失敗: {e}")
@@ -0,0 +1,162 @@
+"""RTU 匯流排請求排程 (優先等級 + 用戶端公平輪替)"""
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Optional
+from loguru import logger
+
+# 優先等級 → 權重 (每輪可執行的請求數)
+DEFAULT_PRIORITIES = {"high": 4, "normal": 2, "low": 1}
+
+# (單元 ID, 請求 PDU, 逾時) → 回應 PDU
+Transact = Callable[[int, bytes, float], Awaitable[Optional[bytes]]]
+
+
+class QueueFull(Exception):
+    """用戶端排隊的請求已達上限"""
+
+
+@dataclass
+class _Job:
+    unit: int
+    pdu: bytes
+    deadline: float
+    future: asyncio.Future = field(repr=False)
+
+
+class BusScheduler:
+    """
+    RTU 匯流排請求排程
+
+    多個用戶端共用一條半雙工匯流排，由單一工作協程依序執行：
+    - 優先等級間以加權輪替 (預設 high 4 : normal 2 : low 1)，高優先請求優先但低優先不會餓死
+    - 同一等級內各用戶端輪流執行一個請求，單一用戶端大量請求不會佔滿匯流排
+    - 每個用戶端的排隊上限為 max_queue，超過時拒絕 (QueueFull)
+    - 排隊超過期限的請求不再送上匯流排 (用戶端已逾時)
+    """
+
+    def __init__(
+        self,
+        transact: Transact,
+        priorities: Optional[Dict[str, int]] = None,
+        max_queue: int = 32,
+        transaction_timeout: float = 1.0
+    ):
+        """
+        Args:
+            transact: 在匯流排上執行一個交易的函式
+            priorities: 優先等級 → 權重 (依字典順序由高到低)
+            max_queue: 每個用戶端的排隊上限
+            transaction_timeout: 單一交易的匯流排逾時（秒）
+        """
+        self.transact = transact
+        self.priorities = dict(priorities or DEFAULT_PRIORITIES)
+        if not self.priorities or any(weight < 1 for weight in self.priorities.values()):
+            raise ValueError("優先等級權重必須為正整數")
+        self.max_queue = max_queue
+        self.transaction_timeout = transaction_timeout
+        self.stats = {"executed": 0, "expired": 0, "rejected": 0}
+        self._queues: Dict[str, "OrderedDict[Hashable, Deque[_Job]]"] = {p: OrderedDict() for p in self.priorities}
+        self._credits = dict(self.priorities)
+        self._pending: Dict[Hashable, int] = {}
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for clients in self._queues.values():
+            for jobs in clients.values():
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.cancel()
+            clients.clear()
+        self._pending.clear()
+
+    @property
+    def queued(self) -> int:
+        return sum(self._pending.values())
+
+    async def submit(self, client: Hashable, priority: str, unit: int, pdu: bytes, timeout: float) -> Optional[bytes]:
+        """
+        排入一個請求並等待回應 PDU
+
+        Args:
+            client: 用戶端識別 (公平輪替的單位)
+            priority: 優先等級
+            unit: Slave ID
+            pdu: 請求 PDU
+            timeout: 含排隊的總期限（秒）
+
+        Raises:
+            ValueError: 未知的優先等級
+            QueueFull: 用戶端排隊已達上限
+            asyncio.TimeoutError: 排隊或交易超過期限
+            Exception: 交易函式的例外
+        """
+        if priority not in self._queues:
+            raise ValueError(f"未知的優先等級: {priority}")
+        if self._pending.get(client, 0) >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise QueueFull(f"用戶端 {client} 排隊已達上限 {self.max_queue}")
+        loop = asyncio.get_running_loop()
+        job = _Job(unit, pdu, loop.time() + timeout, loop.create_future())
+        self._queues[priority].setdefault(client, deque()).append(job)
+        self._pending[client] = self._pending.get(client, 0) + 1
+        self._ready.set()
+        return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+
+    def _next_job(self) -> Optional[_Job]:
+        """加權輪替選出下一個請求"""
+        for _ in range(2):
+            for priority, clients in self._queues.items():
+                if clients and self._credits[priority] > 0:
+                    self._credits[priority] -= 1
+                    client, jobs = clients.popitem(last=False)
+                    job = jobs.popleft()
+                    if jobs:
+                        clients[client] = jobs
+                    self._pending[client] -= 1
+                    if not self._pending[client]:
+                        del self._pending[client]
+                    return job
+            # 有請求的等級都已用完權重: 開始新的一輪
+            self._credits = dict(self.priorities)
+        return None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            if job.future.done() or loop.time() >= job.deadline:
+                self.stats["expired"] += 1
+                continue
+            try:
+                timeout = min(self.transaction_timeout, job.deadline - loop.time())
+                result = await self.transact(job.unit, job.pdu, timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+                    job.future.exception()
+            else:
+                if not job.future.done():
+                    job.future.set_result(result)
+            self.stats["executed"] += 1
+
+    def log_stats(self, name: str):
+        s = self.stats
+        logger.info(f"📊 {name} 排程: 執行 {s['executed']}、過期 {s['expired']}、拒絕 {s['rejected']}")
@@ -0,0 +1,209 @@
+"""Modbus TCP 到 RTU 的生產閘道 (一個進程獨佔一個實體串口)"""
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
+from loguru import logger
+from cache import ResponseCache
+from rtu_master import RtuMaster, RtuTimeout
+from rtu_server import SerialSettings
+from scheduler import DEFAULT_PRIORITIES, BusScheduler, QueueFull
+from upstream import GATEWAY_PATH_UNAVAILABLE, GATEWAY_TARGET_NO_RESPONSE, MBAP, UpstreamError
+
+SERVER_DEVICE_BUSY = 0x06
+MAX_PDU_LENGTH = 253
+
+
+@dataclass
+class Listener:
+    """TCP 監聽端口與其優先等級"""
+    port: int
+    priority: str = "normal"
+    host: str = "0.0.0.0"
+
+
+class TcpToRtuGateway:
+    """
+    Modbus TCP 到 RTU 閘道
+
+    獨佔一個實體串口，以 Modbus TCP 服務器提供給多個用戶端共用：
+    - 每個監聽端口對應一個優先等級 (例如後端使用 high、管理介面與診斷工具使用 low)
+    - 同一連線可管線化多個請求，回應依交易 ID 回傳
+    - 請求經 BusScheduler 排程後依序送上匯流排，不會互相碰撞
+    - 讀取快取 (選用) 由本串口的所有用戶端共用，多個用戶端輪詢同一設備時只佔用一次匯流排
+    - 匯流排逾時回應閘道例外 0x0B，串口失效回應 0x0A，用戶端排隊已滿回應 0x06 (Server Device Busy)
+    """
+
+    def __init__(
+        self,
+        master: RtuMaster,
+        listeners: List[Listener],
+        scheduler: Optional[BusScheduler] = None,
+        request_timeout: float = 3.0,
+        cache: Optional[ResponseCache] = None
+    ):
+        """
+        Args:
+            master: RTU 主站
+            listeners: TCP 監聽端口
+            scheduler: 請求排程 (None 表示使用預設優先等級)
+            request_timeout: 含排隊的請求期限（秒）
+            cache: 讀取回應快取 (None 表示不快取)
+        """
+        self.master = master
+        self.listeners = listeners
+        self.scheduler = scheduler or BusScheduler(master.transact)
+        self.request_timeout = request_timeout
+        self.cache = cache
+        for listener in listeners:
+            if listener.priority not in self.scheduler.priorities:
+                raise ValueError(f"端口 {listener.port} 的優先等級不存在: {listener.priority}")
+        self.servers: List[asyncio.AbstractServer] = []
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def name(self) -> str:
+        return self.master.port
+
+    async def start(self) -> bool:
+        """開啟串口並啟動 TCP 監聽"""
+        try:
+            await self.master.open()
+        except OSError as e:
+            logger.error(f"❌ 開啟串口失敗: {self.master.port}: {e}")
+            return False
+        self.scheduler.start()
+        for listener in self.listeners:
+            server = await asyncio.start_server(
+                lambda r, w, p=listener.priority: self._client(r, w, p), listener.host, listener.port
+            )
+            self.servers.append(server)
+        s = self.master.settings
+        ports = ", ".join(f"{l.port} ({l.priority})" for l in self.listeners)
+        logger.info(f"🚀 TCP 到 RTU 閘道 {self.name} ({s.baudrate}/{s.bytesize}/{s.parity}/{s.stopbits}): {ports}")
+        return True
+
+    async def stop(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        self.servers.clear()
+        # 關閉連線使用戶端協程讀到 EOF 後結束 (取消 start_server 的協程會被記錄為錯誤)
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self.scheduler.stop()
+        await self.master.close()
+        self.scheduler.log_stats(self.name)
+        if self.cache:
+            self.cache.log_stats(self.name)
+        logger.info(f"🛑 TCP 到 RTU 閘道已停止: {self.name}")
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, priority: str):
+        peer = writer.get_extra_info("peername")
+        # 以來源主機為公平輪替單位: 同一主機開多條連線不會多佔匯流排
+        client = peer[0] if peer else id(writer)
+        requests: Set[asyncio.Task] = set()
+        connection = asyncio.current_task()
+        self._connections[connection] = writer
+        logger.info(f"🔗 {self.name} 用戶端連線: {peer} ({priority})")
+        try:
+            while True:
+                tid, protocol, length, unit = MBAP.unpack(await reader.readexactly(MBAP.size))
+                if protocol != 0 or not 2 <= length <= MAX_PDU_LENGTH + 1:
+                    logger.warning(f"⚠️ {self.name} 無效的 MBAP 標頭，關閉連線: {peer}")
+                    break
+                pdu = await reader.readexactly(length - 1)
+                task = asyncio.create_task(self._request(writer, client, priority, tid, unit, pdu))
+                requests.add(task)
+                task.add_done_callback(requests.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            for task in requests:
+                task.cancel()
+            writer.close()
+            self._connections.pop(connection, None)
+            logger.info(f"🔌 {self.name} 用戶端斷線: {peer}")
+
+    async def _request(self, writer, client, priority: str, tid: int, unit: int, pdu: bytes):
+        async def forward(unit: int, pdu: bytes) -> Optional[bytes]:
+            return await self.scheduler.submit(client, priority, unit, pdu, self.request_timeout)
+
+        try:
+            if self.cache:
+                response = await self.cache.request(unit, pdu, forward)
+            else:
+                response = await forward(unit, pdu)
+        except QueueFull:
+            response = bytes([pdu[0] | 0x80, SERVER_DEVICE_BUSY])
+        except (RtuTimeout, asyncio.TimeoutError) as e:
+            logger.debug(f"{self.name} Slave ID {unit} 無回應: {e}")
+            response = bytes([pdu[0] | 0x80, GATEWAY_TARGET_NO_RESPONSE])
+        except OSError as e:
+            logger.error(f"❌ {self.name} 串口讀寫失敗: {e}")
+            response = bytes([pdu[0] | 0x80, GATEWAY_PATH_UNAVAILABLE])
+        except UpstreamError as e:
+            logger.debug(f"{self.name} Slave ID {unit} 轉發失敗: {e}")
+            response = bytes([pdu[0] | 0x80, e.exception_code])
+        if response is None or writer.is_closing():
+            return
+        writer.write(MBAP.pack(tid, 0, len(response) + 1, unit) + response)
+
+
+def build_servers(
+    config: Dict,
+    make_cache: Callable[[], Optional[ResponseCache]] = lambda: None
+) -> List[TcpToRtuGateway]:
+    """
+    由設定建立閘道 (每個串口一個讀取快取)，例如:
+    {"serial_ports": [{"port": "/dev/ttyUSB0", "baudrate": 19200, "parity": "N",
+                       "listeners": [{"port": 502, "priority": "high"}, {"port": 1502, "priority": "low"}]}]}
+
+    Raises:
+        ValueError: 設定格式錯誤或 TCP 端口重複
+    """
+    gateways, tcp_ports = [], set()
+    for spec in config.get("serial_ports", []):
+        try:
+            settings = SerialSettings(
+                baudrate=int(spec.get("baudrate", 19200)),
+                bytesize=int(spec.get("bytesize", 8)),
+                parity=str(spec.get("parity", "N"))[0].upper(),
+                stopbits=int(spec.get("stopbits", 1)),
+            )
+            listeners = [
+                Listener(int(l["port"]), str(l.get("priority", "normal")), str(l.get("host", "0.0.0.0")))
+                for l in spec.get("listeners", [])
+            ]
+            master = RtuMaster(spec["port"], settings)
+            scheduler = BusScheduler(
+                master.transact,
+                priorities=spec.get("priorities", DEFAULT_PRIORITIES),
+                max_queue=int(spec.get("max_queue", 32)),
+                transaction_timeout=float(spec.get("timeout", 1.0)),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"串口設定格式錯誤: {e}")
+        if not listeners:
+            raise ValueError(f"串口 {spec['port']} 沒有 TCP 監聽端口")
+        for listener in listeners:
+            if listener.port in tcp_ports:
+                raise ValueError(f"TCP 端口重複: {listener.port}")
+            tcp_ports.add(listener.port)
+        gateways.append(TcpToRtuGateway(
+            master, listeners, scheduler,
+            request_timeout=float(spec.get("request_timeout", 3.0)),
+            cache=make_cache(),
+        ))
+    if not gateways:
+        raise ValueError("未設定任何串口")
+    return gateways
+
+
+def load_servers(
+    path: str,
+    make_cache: Callable[[], Optional[ResponseCache]] = lambda: None
+) -> List[TcpToRtuGateway]:
+    with open(path, "r", encoding="utf-8") as f:
+        return build_servers(json.load(f), make_cache)
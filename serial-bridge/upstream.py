@@ -0,0 +1,228 @@
+"""Modbus TCP 上游連線 (管線化轉發 PDU)"""
+import asyncio
+import itertools
+import struct
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+from loguru import logger
+
+if TYPE_CHECKING:
+    from cache import ResponseCache
+
+# MBAP 標頭: 交易 ID、協定 ID (0)、長度 (單元 ID + PDU)、單元 ID
+MBAP = struct.Struct(">HHHB")
+
+# 閘道例外碼
+GATEWAY_PATH_UNAVAILABLE = 0x0A
+GATEWAY_TARGET_NO_RESPONSE = 0x0B
+
+
+class UpstreamError(Exception):
+    """上游無法連線或回應逾時"""
+
+    def __init__(self, message: str, exception_code: int):
+        super().__init__(message)
+        self.exception_code = exception_code
+
+
+class ModbusTcpUpstream:
+    """
+    Modbus TCP 上游連線
+
+    直接以 MBAP 標頭轉發原始 PDU，不解碼內容：
+    - 同一連線可同時有多個未完成的請求 (管線化)，回應依交易 ID 配對；
+      管線深度由 max_in_flight 限制 (pymodbus 的 TCP 服務器一次只處理一個請求，預設 1)，
+      超過深度的請求在事件迴圈中排隊等待
+    - 每個請求以 asyncio 逾時等待，不阻塞事件迴圈
+    - 連線中斷時所有未完成的請求失敗，下一個請求重新連線
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        timeout: float = 2.0,
+        connect_timeout: float = 3.0,
+        max_in_flight: int = 1
+    ):
+        """
+        Args:
+            host: Modbus TCP 服務器主機
+            port: Modbus TCP 端口
+            timeout: 請求逾時（秒，含排隊時間）
+            connect_timeout: 連線逾時（秒）
+            max_in_flight: 同一連線未完成請求的上限 (管線深度)
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.stats = {"requests": 0, "timeouts": 0, "errors": 0, "reconnects": 0}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._tids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    @property
+    def in_flight(self) -> int:
+        """未完成的請求數"""
+        return len(self._pending)
+
+    async def connect(self):
+        """
+        建立連線 (已連線時不動作)
+
+        Raises:
+            UpstreamError: 無法連線
+        """
+        async with self._connect_lock:
+            if self.connected:
+                return
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self.stats["errors"] += 1
+                raise UpstreamError(f"無法連線到 {self.host}:{self.port}: {e}", GATEWAY_PATH_UNAVAILABLE)
+            self._reader_task = asyncio.create_task(self._read_loop(self._reader))
+            if self.stats["requests"] > 1:
+                self.stats["reconnects"] += 1
+            logger.info(f"✅ 已連接到 Modbus TCP 上游: {self.host}:{self.port}")
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                header = await reader.readexactly(MBAP.size)
+                tid, _, length, _ = MBAP.unpack(header)
+                pdu = await reader.readexactly(length - 1)
+                future = self._pending.pop(tid, None)
+                if future is not None and not future.done():
+                    future.set_result(pdu)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            logger.warning(f"⚠️ Modbus TCP 上游連線中斷 {self.host}:{self.port}: {e}")
+        finally:
+            self._fail_pending(UpstreamError("上游連線中斷", GATEWAY_TARGET_NO_RESPONSE))
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _fail_pending(self, error: Exception):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(self, unit: int, pdu: bytes, timeout: Optional[float] = None) -> bytes:
+        """
+        轉發一個請求 PDU 並等待回應 PDU (例外回應照原樣返回)
+
+        Raises:
+            UpstreamError: 無法連線或逾時
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        self.stats["requests"] += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), deadline - loop.time())
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise UpstreamError(f"上游忙碌逾時: {self.host}:{self.port} 單元 {unit}", GATEWAY_TARGET_NO_RESPONSE)
+        tid = next(self._tids) & 0xFFFF
+        try:
+            await self.connect()
+            future = loop.create_future()
+            self._pending[tid] = future
+            self._writer.write(MBAP.pack(tid, 0, len(pdu) + 1, unit) + pdu)
+            return await asyncio.wait_for(future, max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise UpstreamError(f"上游回應逾時: {self.host}:{self.port} 單元 {unit}", GATEWAY_TARGET_NO_RESPONSE)
+        finally:
+            self._pending.pop(tid, None)
+            self._slots.release()
+
+    async def close(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._fail_pending(UpstreamError("上游連線已關閉", GATEWAY_PATH_UNAVAILABLE))
+
+
+class UpstreamPool:
+    """
+    上游連線池
+
+    同一 TCP 端點 (host, port) 只建立一條連線與一個讀取快取，
+    由所有轉發到該端點的橋接器、閘道與 Slave ID 共用 (不同虛擬串口讀取同一設備時可合併)
+    """
+
+    def __init__(
+        self,
+        timeout: float = 2.0,
+        max_in_flight: int = 1,
+        make_cache: Callable[[], Optional["ResponseCache"]] = lambda: None
+    ):
+        """
+        Args:
+            timeout: 請求逾時（秒）
+            max_in_flight: 每條連線的管線深度
+            make_cache: 建立端點讀取快取的函式 (返回 None 表示不快取)
+        """
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.make_cache = make_cache
+        self._connections: Dict[Tuple[str, int], ModbusTcpUpstream] = {}
+        self._caches: Dict[Tuple[str, int], Optional["ResponseCache"]] = {}
+
+    def get(self, host: str, port: int) -> ModbusTcpUpstream:
+        key = (host, port)
+        if key not in self._connections:
+            self._connections[key] = ModbusTcpUpstream(
+                host, port, timeout=self.timeout, max_in_flight=self.max_in_flight
+            )
+        return self._connections[key]
+
+    def cache(self, host: str, port: int) -> Optional["ResponseCache"]:
+        key = (host, port)
+        if key not in self._caches:
+            self._caches[key] = self.make_cache()
+        return self._caches[key]
+
+    async def request(self, host: str, port: int, unit: int, pdu: bytes) -> bytes:
+        """
+        經端點的讀取快取轉發一個請求 PDU
+
+        Raises:
+            UpstreamError: 無法連線或回應逾時
+        """
+        upstream = self.get(host, port)
+        cache = self.cache(host, port)
+        if cache:
+            return await cache.request(unit, pdu, upstream.request)
+        return await upstream.request(unit, pdu)
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    async def close(self):
+        for upstream in self._connections.values():
+            await upstream.close()
+        self._connections.clear()
+        for (host, port), cache in self._caches.items():
+            if cache:
+                cache.log_stats(f"{host}:{port}")
+        self._caches.clear()
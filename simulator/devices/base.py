@@ -1,96 +1,93 @@
 """MODBUS 模擬器基礎類別"""
-from pymodbus.server import StartAsyncTcpServer
-from pymodbus.datastore import ModbusDeviceContext, ModbusServerContext
-from pymodbus.datastore import ModbusSequentialDataBlock
-from typing import Dict, Any, Optional
-import asyncio
-from loguru import logger
+from pymodbus.datastore import ModbusSparseDataBlock
+from typing import Dict, Any, List, Optional, Tuple
+from faults import DeviceFaults, FaultyDeviceContext
 
 
 class BaseModbusSimulator:
-    """MODBUS 模擬器基礎類別"""
-    
+    """MODBUS 模擬器基礎類別
+
+    模擬器只保存設備狀態與寄存器，不各自啟動服務器與更新迴圈：
+    由 SimulatorEngine (engine.py) 依端口 → 設備映射提供 MODBUS TCP 服務，
+    並以單一排程依 update_interval 呼叫 update() 將設定值寫入寄存器。
+
+    寄存器使用稀疏數據塊，只配置 REGISTER_MAP 中的位址範圍；
+    讀取未映射的位址時回應非法位址例外 (與實體設備相同)。
+
+    faults 為本設備的故障注入設定 (faults.py)，只影響經由服務器的請求；
+    playback 為模擬值播放 (playback.py)，於每次排程更新前寫入設定、更新後寫入原始寄存器。
+    """
+
+    # 映射的位址範圍 {"hr" / "co" / "di" / "ir": [(起始位址, 數量), ...]}
+    REGISTER_MAP: Dict[str, List[Tuple[int, int]]] = {}
+    # 寄存器更新週期（秒），None 表示只在狀態變更時更新
+    update_interval: Optional[float] = None
+
+    # 數據塊類型對應的讀取功能碼
+    _FUNCTION_CODES = {"co": 0x01, "di": 0x02, "hr": 0x03, "ir": 0x04}
+
     def __init__(self, slave_id: int, port: int, config: Dict[str, Any]):
         self.slave_id = slave_id
         self.port = port
         self.config = config
-        self.store = ModbusDeviceContext(
-            di=ModbusSequentialDataBlock(0, [0]*100),  # Discrete Inputs
-            co=ModbusSequentialDataBlock(0, [0]*100),  # Coils
-            hr=ModbusSequentialDataBlock(0, [0]*5000), # Holding Registers (支持到 0x1000+)
-            ir=ModbusSequentialDataBlock(0, [0]*100)   # Input Registers
-        )
-        self.context = ModbusServerContext(devices={slave_id: self.store}, single=False)
-        self._running = False
-        self._server_task: Optional[asyncio.Task] = None
-        self._simulate_task: Optional[asyncio.Task] = None
-    
-    async def start(self):
-        """啟動模擬器"""
-        self._running = True
-        
-        # 啟動 MODBUS TCP 服務器（異步）
-        self._server_task = asyncio.create_task(
-            StartAsyncTcpServer(
-                context=self.context,
-                address=("0.0.0.0", self.port)
-            )
+        self.faults = DeviceFaults()
+        self.playback = None
+        self.store = FaultyDeviceContext(
+            di=ModbusSparseDataBlock(),  # Discrete Inputs
+            co=ModbusSparseDataBlock(),  # Coils
+            hr=ModbusSparseDataBlock(),  # Holding Registers
+            ir=ModbusSparseDataBlock(),  # Input Registers
+            faults=self.faults
         )
-        
-        # 啟動模擬數據更新迴圈
-        if hasattr(self, 'simulate_loop'):
-            self._simulate_task = asyncio.create_task(self.simulate_loop())
-        
-        logger.info(f"✅ MODBUS 模擬器已啟動 [Slave ID: {self.slave_id}, Port: {self.port}]")
-    
-    async def stop(self):
-        """停止模擬器"""
-        self._running = False
-        
-        if self._simulate_task:
-            self._simulate_task.cancel()
-            try:
-                await self._simulate_task
-            except asyncio.CancelledError:
-                pass
-        
-        if self._server_task:
-            self._server_task.cancel()
-            try:
-                await self._server_task
-            except asyncio.CancelledError:
-                pass
-        
-        logger.info(f"🛑 MODBUS 模擬器已停止 [Slave ID: {self.slave_id}]")
-    
+        for block, ranges in self.REGISTER_MAP.items():
+            for start, count in ranges:
+                self.store.setValues(self._FUNCTION_CODES[block], start, [0] * count)
+
+    def update(self):
+        """將設定值寫入寄存器"""
+
+    def tick(self, now: float):
+        """引擎排程呼叫 (以單調時鐘時間取樣播放值後更新寄存器)"""
+        if self.playback is None:
+            self.update()
+            return
+        self.config.update(self.playback.values(now))
+        self.update()
+        for address, value in self.playback.register_values(now).items():
+            self.update_register(address, value)
+
+    @property
+    def register_count(self) -> int:
+        """配置的位址數量"""
+        return sum(count for ranges in self.REGISTER_MAP.values() for _, count in ranges)
+
     def update_register(self, address: int, value: int):
         """更新寄存器值 (Holding Registers)"""
         # 確保值在 16 位元範圍內
         value = value & 0xFFFF
         self.store.setValues(3, address, [value])  # 3 = Holding Registers
-    
+
     def get_register(self, address: int) -> int:
         """讀取寄存器值 (Holding Registers)"""
         values = self.store.getValues(3, address, 1)
         return values[0] if values else 0
-    
+
     def update_coil(self, address: int, value: bool):
         """更新線圈值 (Coils) - 使用函數碼 0x05 (Write Single Coil)"""
         self.store.setValues(0x05, address, [value])
-    
+
     def get_coil(self, address: int) -> bool:
         """讀取線圈值 (Coils) - 使用函數碼 0x01 (Read Coils)"""
         values = self.store.getValues(0x01, address, 1)
         return bool(values[0]) if values else False
-    
+
     def update_discrete_input(self, address: int, value: int):
         """更新離散輸入值 (Discrete Inputs) - 使用函數碼 0x02 (Read Discrete Inputs)"""
         # 注意: Discrete Inputs 通常是只讀的，但模擬器中我們需要能夠設置它們
-        # 直接操作底層數據塊
-        self.store.store['d'].setValues(address, [value])
-    
+        # 經由設備上下文寫入，位址偏移與客戶端讀取一致
+        self.store.setValues(0x02, address, [value])
+
     def get_discrete_input(self, address: int) -> int:
         """讀取離散輸入值 (Discrete Inputs) - 使用函數碼 0x02 (Read Discrete Inputs)"""
         values = self.store.getValues(0x02, address, 1)
         return values[0] if values else 0
-
@@ -1,6 +1,5 @@
 """AFM07 流量計模擬器"""
 from .base import BaseModbusSimulator
-import asyncio
 from loguru import logger
 
 
@@ -15,6 +14,9 @@ class FlowMeterSimulator(BaseModbusSimulator):
     - 輪詢頻率: 1 Hz
     """
     
+    REGISTER_MAP = {"hr": [(0x0000, 3)]}
+    update_interval = 1.0  # 1Hz
+    
     def __init__(self, slave_id: int = 1, port: int = 5020):
         config = {
             'instantaneous_flow': 0.0,  # L/min
@@ -30,26 +32,23 @@ class FlowMeterSimulator(BaseModbusSimulator):
         self.update_register(0x0001, 0)
         self.update_register(0x0002, 0)
     
-    async def simulate_loop(self):
-        """模擬數據更新迴圈 (1Hz)"""
-        while self._running:
-            if self.config.get('enabled', True):
-                # 更新瞬时流量 (0-50 L/min)
-                instant_flow = self.config.get('instantaneous_flow', 0.0)
-                instant_flow_raw = int(instant_flow * 10)  # 倍數 10
-                instant_flow_raw = max(0, min(65535, instant_flow_raw))  # 限制在 UInt16 範圍
-                self.update_register(0x0000, instant_flow_raw)
-                
-                # 更新累計流量
-                cumulative_flow = self.config.get('cumulative_flow', 0.0)
-                cumulative_flow_raw = int(cumulative_flow * 10)
-                # 拆分為高 16 位和低 16 位
-                high_word = (cumulative_flow_raw >> 16) & 0xFFFF
-                low_word = cumulative_flow_raw & 0xFFFF
-                self.update_register(0x0001, high_word)
-                self.update_register(0x0002, low_word)
+    def update(self):
+        """更新寄存器 (1Hz)"""
+        if self.config.get('enabled', True):
+            # 更新瞬时流量 (0-50 L/min)
+            instant_flow = self.config.get('instantaneous_flow', 0.0)
+            instant_flow_raw = int(instant_flow * 10)  # 倍數 10
+            instant_flow_raw = max(0, min(65535, instant_flow_raw))  # 限制在 UInt16 範圍
+            self.update_register(0x0000, instant_flow_raw)
             
-            await asyncio.sleep(1.0)  # 1Hz 更新
+            # 更新累計流量
+            cumulative_flow = self.config.get('cumulative_flow', 0.0)
+            cumulative_flow_raw = int(cumulative_flow * 10)
+            # 拆分為高 16 位和低 16 位
+            high_word = (cumulative_flow_raw >> 16) & 0xFFFF
+            low_word = cumulative_flow_raw & 0xFFFF
+            self.update_register(0x0001, high_word)
+            self.update_register(0x0002, low_word)
     
     def set_instantaneous_flow(self, value: float):
         """設定瞬时流量 (L/min)"""
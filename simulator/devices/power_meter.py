@@ -1,6 +1,5 @@
 """JX3101 單相電表模擬器和 JX8304M 三相電表模擬器"""
 from .base import BaseModbusSimulator
-import asyncio
 import struct
 from loguru import logger
 
@@ -19,6 +18,10 @@ class SinglePhasePowerMeterSimulator(BaseModbusSimulator):
     - 輪詢頻率: 2 Hz
     """
     
+    # 規格位址 0x1000 起；後端驅動目前自 0x0000 讀取，同一組數值映射於兩處
+    REGISTER_MAP = {"hr": [(0x1000, 8), (0x0000, 8)]}
+    update_interval = 0.5  # 2Hz
+    
     def __init__(self, slave_id: int, port: int, meter_type: str = "DC"):
         """
         Args:
@@ -60,29 +63,28 @@ class SinglePhasePowerMeterSimulator(BaseModbusSimulator):
         
         self.update_register(start_address, high_word)
         self.update_register(start_address + 1, low_word)
+        self.update_register(start_address - 0x1000, high_word)
+        self.update_register(start_address - 0x1000 + 1, low_word)
     
-    async def simulate_loop(self):
-        """模擬數據更新迴圈 (2Hz = 0.5秒)"""
-        while self._running:
-            if self.config.get('enabled', True):
-                # 根據規格換算公式
-                # 電壓: 實際值 × 100
-                voltage_raw = int(self.config.get('voltage', 0.0) * 100)
-                self._update_int32_register(0x1000, voltage_raw)
-                
-                # 電流: 實際值 × 1000
-                current_raw = int(self.config.get('current', 0.0) * 1000)
-                self._update_int32_register(0x1002, current_raw)
-                
-                # 有功功率: 實際值 × 10000
-                power_raw = int(self.config.get('active_power', 0.0) * 10000)
-                self._update_int32_register(0x1004, power_raw)
-                
-                # 無功功率: 實際值 × 10000
-                reactive_power_raw = int(self.config.get('reactive_power', 0.0) * 10000)
-                self._update_int32_register(0x1006, reactive_power_raw)
+    def update(self):
+        """更新寄存器 (2Hz)"""
+        if self.config.get('enabled', True):
+            # 根據規格換算公式
+            # 電壓: 實際值 × 100
+            voltage_raw = int(self.config.get('voltage', 0.0) * 100)
+            self._update_int32_register(0x1000, voltage_raw)
+            
+            # 電流: 實際值 × 1000
+            current_raw = int(self.config.get('current', 0.0) * 1000)
+            self._update_int32_register(0x1002, current_raw)
+            
+            # 有功功率: 實際值 × 10000
+            power_raw = int(self.config.get('active_power', 0.0) * 10000)
+            self._update_int32_register(0x1004, power_raw)
             
-            await asyncio.sleep(0.5)  # 2Hz 更新
+            # 無功功率: 實際值 × 10000
+            reactive_power_raw = int(self.config.get('reactive_power', 0.0) * 10000)
+            self._update_int32_register(0x1006, reactive_power_raw)
     
     def set_voltage(self, value: float):
         """設定電壓 (V)"""
@@ -111,6 +113,10 @@ class ThreePhasePowerMeterSimulator(BaseModbusSimulator):
     - 輪詢頻率: 2 Hz
     """
     
+    # 同單相電表，0x0000 起映射後端驅動讀取的位址
+    REGISTER_MAP = {"hr": [(0x1000, 0x16), (0x0000, 0x16)]}
+    update_interval = 0.5  # 2Hz
+    
     def __init__(self, slave_id: int = 4, port: int = 5024):
         config = {
             'voltage_a': 220.0,  # V
@@ -158,32 +164,28 @@ class ThreePhasePowerMeterSimulator(BaseModbusSimulator):
         low_word = (bytes_data[2] << 8) | bytes_data[3]
         self.update_register(start_address, high_word)
         self.update_register(start_address + 1, low_word)
+        self.update_register(start_address - 0x1000, high_word)
+        self.update_register(start_address - 0x1000 + 1, low_word)
     
-    async def simulate_loop(self):
-        """模擬數據更新迴圈 (2Hz)"""
-        while self._running:
-            if self.config.get('enabled', True):
-                # 根據規格換算公式
-                # 電壓: ÷ 100, 電流: ÷ 1000, 功率: ÷ 10000
-                
-                # 更新電壓
-                self._update_int32_register(0x1000, int(self.config['voltage_a'] * 100))
-                self._update_int32_register(0x1002, int(self.config['voltage_b'] * 100))
-                self._update_int32_register(0x1004, int(self.config['voltage_c'] * 100))
-                
-                # 更新電流
-                self._update_int32_register(0x1006, int(self.config['current_a'] * 1000))
-                self._update_int32_register(0x1008, int(self.config['current_b'] * 1000))
-                self._update_int32_register(0x100A, int(self.config['current_c'] * 1000))
-                self._update_int32_register(0x100C, int(self.config['current_n'] * 1000))
-                
-                # 更新功率
-                self._update_int32_register(0x100E, int(self.config['power_a'] * 10000))
-                self._update_int32_register(0x1010, int(self.config['power_b'] * 10000))
-                self._update_int32_register(0x1012, int(self.config['power_c'] * 10000))
-                self._update_int32_register(0x1014, int(self.config['power_total'] * 10000))
+    def update(self):
+        """更新寄存器 (2Hz)"""
+        if self.config.get('enabled', True):
+            # 根據規格換算公式
+            # 電壓: ÷ 100, 電流: ÷ 1000, 功率: ÷ 10000
             
-            await asyncio.sleep(0.5)  # 2Hz 更新
-
-
-
+            # 更新電壓
+            self._update_int32_register(0x1000, int(self.config['voltage_a'] * 100))
+            self._update_int32_register(0x1002, int(self.config['voltage_b'] * 100))
+            self._update_int32_register(0x1004, int(self.config['voltage_c'] * 100))
+            
+            # 更新電流
+            self._update_int32_register(0x1006, int(self.config['current_a'] * 1000))
+            self._update_int32_register(0x1008, int(self.config['current_b'] * 1000))
+            self._update_int32_register(0x100A, int(self.config['current_c'] * 1000))
+            self._update_int32_register(0x100C, int(self.config['current_n'] * 1000))
+            
+            # 更新功率
+            self._update_int32_register(0x100E, int(self.config['power_a'] * 10000))
+            self._update_int32_register(0x1010, int(self.config['power_b'] * 10000))
+            self._update_int32_register(0x1012, int(self.config['power_c'] * 10000))
+            self._update_int32_register(0x1014, int(self.config['power_total'] * 10000))
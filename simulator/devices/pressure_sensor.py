@@ -1,6 +1,5 @@
 """Delta DPA 壓力計模擬器"""
 from .base import BaseModbusSimulator
-import asyncio
 from loguru import logger
 
 
@@ -17,6 +16,9 @@ class PressureSensorSimulator(BaseModbusSimulator):
     - 真空範圍: 0 ~ -100 kPa (0 ~ -0.1 MPa)
     """
     
+    REGISTER_MAP = {"hr": [(0x1000, 2)]}  # PV 值 (管理 API 讀取 2 個寄存器)
+    update_interval = 1.0  # 1Hz
+    
     def __init__(self, slave_id: int, port: int, is_vacuum: bool = False):
         """
         Args:
@@ -35,31 +37,28 @@ class PressureSensorSimulator(BaseModbusSimulator):
         # 注意：update_register 可以在任何時候調用，因為它只是更新數據存儲
         self.update_register(0x1000, 0)
     
-    async def simulate_loop(self):
-        """模擬數據更新迴圈 (1Hz)"""
-        while self._running:
-            if self.config.get('enabled', True):
-                pressure = self.config.get('pressure', 0.0)
-                
-                # 根據規格: 讀取值需乘以 0.1 得到實際壓力值
-                # 所以模擬器需要: 實際值 ÷ 0.1 = 實際值 × 10
-                if self.is_vacuum:
-                    # 真空: 範圍 0 ~ -100 kPa
-                    # 注意: 負數使用補碼，但 Unsigned Int16 無法直接表示負數
-                    # 實際設備可能使用有符號數的補碼表示
-                    # 例如: -50 kPa = 0xFFCE (65486 dec, 作為有符號數為 -50)
-                    pressure_raw = int(pressure * 10)
-                    if pressure_raw < 0:
-                        # 轉換為無符號 16 位元（補碼）
-                        pressure_raw = pressure_raw & 0xFFFF
-                else:
-                    # 正壓: 範圍 0 ~ 10 kg/cm²
-                    pressure_raw = int(pressure * 10)
-                    pressure_raw = max(0, min(100, pressure_raw))  # 0 ~ 100 (對應 0 ~ 10 kg/cm²)
-                
-                self.update_register(0x1000, pressure_raw)
+    def update(self):
+        """更新寄存器 (1Hz)"""
+        if self.config.get('enabled', True):
+            pressure = self.config.get('pressure', 0.0)
+            
+            # 根據規格: 讀取值需乘以 0.1 得到實際壓力值
+            # 所以模擬器需要: 實際值 ÷ 0.1 = 實際值 × 10
+            if self.is_vacuum:
+                # 真空: 範圍 0 ~ -100 kPa
+                # 注意: 負數使用補碼，但 Unsigned Int16 無法直接表示負數
+                # 實際設備可能使用有符號數的補碼表示
+                # 例如: -50 kPa = 0xFFCE (65486 dec, 作為有符號數為 -50)
+                pressure_raw = int(pressure * 10)
+                if pressure_raw < 0:
+                    # 轉換為無符號 16 位元（補碼）
+                    pressure_raw = pressure_raw & 0xFFFF
+            else:
+                # 正壓: 範圍 0 ~ 10 kg/cm²
+                pressure_raw = int(pressure * 10)
+                pressure_raw = max(0, min(100, pressure_raw))  # 0 ~ 100 (對應 0 ~ 10 kg/cm²)
             
-            await asyncio.sleep(1.0)  # 1Hz 更新
+            self.update_register(0x1000, pressure_raw)
     
     def set_pressure(self, value: float):
         """設定壓力值"""
@@ -1,6 +1,5 @@
 """Waveshare Modbus RTU Relay (D) 模擬器"""
 from .base import BaseModbusSimulator
-import asyncio
 from loguru import logger
 
 
@@ -16,8 +15,12 @@ class RelayIOSimulator(BaseModbusSimulator):
     - 輪詢頻率: 100 Hz
     - Bit 0: 緊急停止 (1=按下, 0=未按下)
     - Bit 1: 測試蓋狀態 (1=關蓋, 0=開蓋)
+    
+    Discrete Inputs 只在狀態變更時寫入 (不需週期更新)。
     """
     
+    REGISTER_MAP = {"co": [(0x0000, 8)], "di": [(0x0000, 8)]}
+    
     def __init__(self, slave_id: int = 1, port: int = 5027):
         config = {
             'relay_states': [False] * 8,  # CH1-CH8 繼電器狀態
@@ -32,18 +35,11 @@ class RelayIOSimulator(BaseModbusSimulator):
         
         # 初始化 Discrete Inputs
         # Bit 0: 緊急停止 (0=未按下), Bit 1: 測試蓋 (1=關蓋)
-        self.update_discrete_input(0, 0x02)
+        self._write_inputs(0x02)
     
-    async def simulate_loop(self):
-        """模擬數據更新迴圈 (100Hz = 0.01秒)"""
-        while self._running:
-            if self.config.get('enabled', True):
-                # 更新 Discrete Inputs (Bit 0-7)
-                # 根據規格: Bit 0=緊急停止, Bit 1=測試蓋
-                digital_inputs = self.config.get('digital_inputs', 0x02)
-                self.update_discrete_input(0, digital_inputs)
-            
-            await asyncio.sleep(0.01)  # 100Hz 更新
+    def _write_inputs(self, inputs: int):
+        """將 Bit 0-7 寫入 Discrete Inputs 0x0000-0x0007"""
+        self.store.setValues(0x02, 0x0000, [bool(inputs >> bit & 1) for bit in range(8)])
     
     def set_emergency_stop(self, pressed: bool):
         """設定緊急停止狀態"""
@@ -53,6 +49,7 @@ class RelayIOSimulator(BaseModbusSimulator):
         else:
             inputs &= 0xFE  # Bit 0 = 0
         self.config['digital_inputs'] = inputs
+        self._write_inputs(inputs)
         logger.info(f"緊急停止狀態已更新: {'按下' if pressed else '未按下'}")
     
     def set_cover_closed(self, closed: bool):
@@ -63,6 +60,7 @@ class RelayIOSimulator(BaseModbusSimulator):
         else:
             inputs &= 0xFD  # Bit 1 = 0
         self.config['digital_inputs'] = inputs
+        self._write_inputs(inputs)
         logger.info(f"測試蓋狀態已更新: {'關閉' if closed else '開啟'}")
     
     def set_relay(self, channel: int, state: bool):
@@ -0,0 +1,177 @@
+"""MODBUS 模擬器引擎 (單一程序、單一排程)"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Callable, Dict, List, Optional
+from pymodbus.server import ModbusTcpServer
+from pymodbus.datastore import ModbusServerContext
+from loguru import logger
+
+
+class _Job:
+    """排程工作"""
+
+    def __init__(self, name: str, callback: Callable[[float], None], interval: float):
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.runs = 0
+
+
+class SimulatorEngine:
+    """
+    模擬器引擎
+
+    以端口 → {Slave ID: 模擬器} 映射在同一程序中提供所有虛擬設備：
+    - 每個端口一個 MODBUS TCP 服務器，同端口的多台設備以 Slave ID 區分
+    - 所有寄存器更新 (各設備的 update_interval 與物理模型) 由單一排程迴圈依到期時間執行，
+      沒有到期工作時不喚醒；update_interval 為 None 的設備只在狀態變更時寫入
+    - 設備的 tick(now) 以排程時間呼叫，播放與物理模型共用同一時鐘
+    - RTU 匯流排 (rtu.py) 與 TCP 服務器共用設備的寄存器
+    """
+
+    def __init__(self, host: str = "0.0.0.0"):
+        """
+        Args:
+            host: 服務器監聽位址
+        """
+        self.host = host
+        self.ports: Dict[int, Dict[int, object]] = {}
+        self.buses: List[object] = []
+        self._jobs: List[list] = []
+        self._seq = itertools.count()
+        self._servers: List[ModbusTcpServer] = []
+        self._server_tasks: List[asyncio.Task] = []
+        self._scheduler_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._running = False
+
+    @property
+    def devices(self) -> List[object]:
+        return [device for slaves in self.ports.values() for device in slaves.values()]
+
+    def add_device(self, device):
+        """
+        加入模擬器 (依其 port / slave_id)
+
+        Raises:
+            ValueError: 同一端口的 Slave ID 重複
+        """
+        slaves = self.ports.setdefault(device.port, {})
+        if device.slave_id in slaves:
+            raise ValueError(f"端口 {device.port} 的 Slave ID {device.slave_id} 重複")
+        slaves[device.slave_id] = device
+        if device.update_interval:
+            self.schedule(
+                f"{type(device).__name__}@{device.port}/{device.slave_id}",
+                device.tick,
+                device.update_interval
+            )
+        return device
+
+    def add_bus(self, bus):
+        """加入 RTU 匯流排 (隨引擎啟動與停止)"""
+        self.buses.append(bus)
+        return bus
+
+    def schedule(self, name: str, callback: Callable[[float], None], interval: float, delay: float = 0.0):
+        """
+        加入週期工作
+
+        Args:
+            name: 工作名稱 (日誌用)
+            callback: 以單調時鐘時間呼叫
+            interval: 週期（秒）
+            delay: 首次執行的延遲（秒）
+        """
+        job = _Job(name, callback, interval)
+        heapq.heappush(self._jobs, [time.monotonic() + delay, next(self._seq), job])
+        self._wakeup.set()
+        return job
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """
+        執行所有到期的工作
+
+        Returns:
+            執行的工作數
+        """
+        now = time.monotonic() if now is None else now
+        executed = 0
+        while self._jobs and self._jobs[0][0] <= now:
+            entry = heapq.heappop(self._jobs)
+            job = entry[2]
+            try:
+                job.callback(now)
+            except Exception as e:
+                logger.error(f"❌ 模擬器工作異常 [{job.name}]: {e}")
+            job.runs += 1
+            executed += 1
+            # 落後超過一個週期時不補跑，從現在起重新計時
+            due = entry[0] + job.interval
+            entry[0] = due if due > now else now + job.interval
+            heapq.heappush(self._jobs, entry)
+        return executed
+
+    @property
+    def next_due(self) -> Optional[float]:
+        return self._jobs[0][0] if self._jobs else None
+
+    async def _scheduler(self):
+        while self._running:
+            self.run_due()
+            self._wakeup.clear()
+            timeout = None if self.next_due is None else max(self.next_due - time.monotonic(), 0.0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        """啟動所有端口的服務器與排程迴圈"""
+        self._running = True
+        for device in self.devices:
+            device.update()
+        for port, slaves in sorted(self.ports.items()):
+            context = ModbusServerContext(
+                devices={slave_id: device.store for slave_id, device in slaves.items()},
+                single=False
+            )
+            # 故障注入的「不回應」以 NoSuchIdException 實現，需忽略而非回應例外
+            server = ModbusTcpServer(context, address=(self.host, port), ignore_missing_devices=True)
+            self._servers.append(server)
+            self._server_tasks.append(asyncio.create_task(server.serve_forever()))
+        for bus in self.buses:
+            await bus.start()
+        self._scheduler_task = asyncio.create_task(self._scheduler())
+
+        registers = sum(device.register_count for device in self.devices)
+        logger.info(
+            f"✅ 模擬器引擎已啟動: {len(self.devices)} 台設備、{len(self.ports)} 個端口、"
+            f"{len(self.buses)} 條 RTU 匯流排、{len(self._jobs)} 個排程工作、{registers} 個寄存器"
+        )
+
+    async def stop(self):
+        """停止排程迴圈與所有服務器"""
+        self._running = False
+        tasks = [self._scheduler_task] if self._scheduler_task else []
+        for bus in self.buses:
+            try:
+                await bus.stop()
+            except Exception as e:
+                logger.warning(f"⚠️ 關閉 RTU 匯流排異常: {e}")
+        for server in self._servers:
+            try:
+                await server.shutdown()
+            except Exception as e:
+                logger.warning(f"⚠️ 關閉服務器異常: {e}")
+        for task in tasks + self._server_tasks:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._servers.clear()
+        self._server_tasks.clear()
+        logger.info("🛑 模擬器引擎已停止")
@@ -0,0 +1,328 @@
+"""模擬器故障注入"""
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import yaml
+from loguru import logger
+from pymodbus.constants import ExcCodes
+from pymodbus.datastore import ModbusDeviceContext
+from pymodbus.exceptions import NoSuchIdException
+
+# 故障命令與狀態主題 (管理 API 發布)
+FAULT_COMMAND_TOPIC = "simulator/faults/set"
+FAULT_STATUS_TOPIC = "simulator/faults/status"
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "exponential")
+FAULT_KEYS = (
+    "latency", "timeout_rate", "timeout_delay", "drop_rate",
+    "exception_rate", "exception_code", "corrupt_rate", "stuck", "flap", "seed",
+)
+# 讀取功能碼 (寫入請求的回應也會讀取，只在寫入時注入一次)
+READ_FUNCTION_CODES = (0x01, 0x02, 0x03, 0x04)
+
+
+class DeviceFaults:
+    """
+    單一設備的故障設定
+
+    設定格式 (所有欄位可省略):
+    {
+        "latency": {"dist": "fixed" | "uniform" | "normal" | "exponential",
+                    "value": 0.05, "min": 0.01, "max": 0.2, "mean": 0.05, "std": 0.01},
+        "timeout_rate": 0.1,      # 延遲 timeout_delay 秒後才回應 (超過客戶端逾時)
+        "timeout_delay": 3.0,
+        "drop_rate": 0.05,        # 不回應
+        "exception_rate": 0.05,   # 回應例外碼 exception_code (預設 0x06 設備忙碌)
+        "exception_code": 6,
+        "corrupt_rate": 0.05,     # RTU 回應 CRC 錯誤
+        "stuck": {"4096": 123},   # 寄存器卡在固定值 (Holding / Input)
+        "flap": {"bit": 0, "period": 0.5},  # 離散輸入位元週期翻轉 (如緊急停止)
+        "seed": 1                 # 亂數種子 (可重現)
+    }
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.spec: Dict[str, Any] = {}
+        self.stuck: Dict[int, int] = {}
+        self.counters: Dict[str, int] = {}
+        self._rng = random.Random()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.spec)
+
+    def configure(self, spec: Dict[str, Any]):
+        """
+        套用故障設定 (取代目前設定)
+
+        Raises:
+            ValueError: 設定無效
+        """
+        unknown = set(spec) - set(FAULT_KEYS)
+        if unknown:
+            raise ValueError(f"未知的故障設定: {', '.join(sorted(unknown))}")
+        latency = spec.get("latency")
+        if latency and latency.get("dist", "fixed") not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"未知的延遲分佈: {latency.get('dist')}")
+        for key in ("timeout_rate", "drop_rate", "exception_rate", "corrupt_rate"):
+            if not 0.0 <= float(spec.get(key, 0.0)) <= 1.0:
+                raise ValueError(f"{key} 必須介於 0~1")
+        if "exception_code" in spec:
+            ExcCodes(int(spec["exception_code"]))
+        flap = spec.get("flap")
+        if flap and float(flap.get("period", 0)) <= 0:
+            raise ValueError("flap.period 必須大於 0")
+
+        self.spec = dict(spec)
+        self.stuck = {int(address): int(value) & 0xFFFF for address, value in (spec.get("stuck") or {}).items()}
+        self.counters = {}
+        self._rng = random.Random(spec.get("seed"))
+
+    def clear(self):
+        self.configure({})
+
+    def _count(self, name: str):
+        self.counters[name] = self.counters.get(name, 0) + 1
+
+    def _hit(self, key: str) -> bool:
+        rate = self.spec.get(key, 0.0)
+        return rate > 0 and self._rng.random() < rate
+
+    def sample_latency(self) -> float:
+        """依分佈取樣附加延遲（秒）"""
+        latency = self.spec.get("latency")
+        if not latency:
+            return 0.0
+        dist = latency.get("dist", "fixed")
+        if dist == "uniform":
+            value = self._rng.uniform(latency.get("min", 0.0), latency.get("max", 0.0))
+        elif dist == "normal":
+            value = self._rng.gauss(latency.get("mean", 0.0), latency.get("std", 0.0))
+        elif dist == "exponential":
+            mean = latency.get("mean", 0.0)
+            value = self._rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        else:
+            value = latency.get("value", 0.0)
+        return max(value, 0.0)
+
+    def decide(self) -> Tuple[Optional[str], float]:
+        """
+        決定本次請求的故障
+
+        Returns:
+            (動作 None / "drop" / "exception" / "corrupt", 回應前延遲秒數)
+        """
+        if not self.spec:
+            return None, 0.0
+        delay = self.sample_latency()
+        if self._hit("drop_rate"):
+            self._count("drop")
+            return "drop", delay
+        if self._hit("timeout_rate"):
+            self._count("timeout")
+            delay += self.spec.get("timeout_delay", 3.0)
+        if self._hit("exception_rate"):
+            self._count("exception")
+            return "exception", delay
+        if self._hit("corrupt_rate"):
+            self._count("corrupt")
+            return "corrupt", delay
+        return None, delay
+
+    @property
+    def exception_code(self) -> ExcCodes:
+        return ExcCodes(int(self.spec.get("exception_code", ExcCodes.DEVICE_BUSY)))
+
+    def overlay(self, func_code: int, address: int, values: List) -> List:
+        """套用卡值與離散輸入翻轉"""
+        if func_code in (3, 4) and self.stuck:
+            values = [self.stuck.get(address + i, v) for i, v in enumerate(values)]
+        flap = self.spec.get("flap")
+        if func_code == 2 and flap:
+            index = int(flap.get("bit", 0)) - address
+            if 0 <= index < len(values):
+                values = list(values)
+                values[index] = int(self.clock() / float(flap["period"])) % 2 == 1
+        return values
+
+    def status(self) -> Dict[str, Any]:
+        return {"faults": self.spec, "counters": dict(self.counters)}
+
+
+def corrupt_crc(frame: bytes) -> bytes:
+    """翻轉 RTU 訊框的 CRC (客戶端校驗失敗)"""
+    if len(frame) < 4:
+        return frame
+    return frame[:-2] + bytes(b ^ 0xFF for b in frame[-2:])
+
+
+class FaultyDeviceContext(ModbusDeviceContext):
+    """
+    可注入故障的設備上下文
+
+    服務器處理請求時呼叫 async_getValues / async_setValues：
+    先依故障設定延遲，再決定不回應 (NoSuchIdException，服務器需 ignore_missing_devices)、
+    回應例外碼或照常存取；讀取結果套用卡值/翻轉。
+    CRC 錯誤需在 RTU 訊框層處理，記錄於 pending_corrupt 由 RTU 匯流排 (rtu.py) 取用。
+    """
+
+    def __init__(self, *args, faults: Optional[DeviceFaults] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.faults = faults or DeviceFaults()
+        self.pending_corrupt = False
+
+    async def _intercept(self):
+        action, delay = self.faults.decide()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if action == "drop":
+            raise NoSuchIdException("故障注入: 不回應")
+        if action == "exception":
+            return self.faults.exception_code
+        self.pending_corrupt = action == "corrupt"
+        return None
+
+    async def async_getValues(self, func_code, address, count=1):
+        if func_code in READ_FUNCTION_CODES:
+            code = await self._intercept()
+            if code is not None:
+                return code
+        values = await super().async_getValues(func_code, address, count)
+        if isinstance(values, ExcCodes) or not self.faults.active:
+            return values
+        return self.faults.overlay(func_code, address, values)
+
+    async def async_setValues(self, func_code, address, values):
+        code = await self._intercept()
+        if code is not None:
+            return code
+        return await super().async_setValues(func_code, address, values)
+
+
+class FaultController:
+    """
+    故障注入控制
+
+    設備以名稱註冊 (機群模式為 "rig001/pressure_positive")，
+    目標可為完整名稱、設備名稱 (所有測試台) 或 "*" (所有設備)。
+
+    - 排程: {"faults": [{"at": 10, "duration": 30, "target": "relay_io", "faults": {...}}]}，
+      at 為啟動後秒數，duration 省略表示持續；由引擎排程呼叫 tick()
+    - 命令 (MQTT FAULT_COMMAND_TOPIC): {"action": "set" | "clear" | "status", "target": ..., "faults": {...}}
+    """
+
+    def __init__(self):
+        self.devices: Dict[str, DeviceFaults] = {}
+        self.schedule: List[Dict[str, Any]] = []
+        self._started: Optional[float] = None
+        self._next = 0
+        self._expiring: List[Tuple[float, str]] = []
+
+    def register(self, name: str, faults: DeviceFaults):
+        self.devices[name] = faults
+
+    def _match(self, target: Optional[str]) -> List[str]:
+        if target in ("*", "", None):
+            return list(self.devices)
+        return [name for name in self.devices if name == target or name.split("/")[-1] == target]
+
+    def resolve(self, target: Optional[str]) -> List[str]:
+        """
+        Raises:
+            ValueError: 沒有符合的設備
+        """
+        names = self._match(target)
+        if not names:
+            raise ValueError(f"沒有符合的設備: {target}")
+        return names
+
+    def apply(self, target: str, spec: Dict[str, Any]) -> List[str]:
+        """套用故障設定，返回受影響的設備"""
+        names = self.resolve(target)
+        for name in names:
+            self.devices[name].configure(spec)
+        logger.warning(f"💥 故障注入 [{target}] → {len(names)} 台設備: {spec}")
+        return names
+
+    def clear(self, target: str = "*") -> List[str]:
+        names = self.resolve(target)
+        for name in names:
+            self.devices[name].clear()
+        logger.info(f"🩹 已清除故障 [{target}] ({len(names)} 台設備)")
+        return names
+
+    def status(self) -> Dict[str, Any]:
+        return {name: faults.status() for name, faults in self.devices.items() if faults.active}
+
+    def load_schedule(self, path: str):
+        """載入故障排程 (JSON / YAML)"""
+        text = Path(path).read_text(encoding="utf-8")
+        data = yaml.safe_load(text) if path.endswith((".yaml", ".yml")) else json.loads(text)
+        self.schedule = sorted(data.get("faults", []), key=lambda entry: entry["at"])
+        self._next = 0
+        logger.info(f"📅 已載入故障排程: {path} ({len(self.schedule)} 項)")
+
+    def tick(self, now: float):
+        """套用到期的排程項目與結束的故障"""
+        if self._started is None:
+            self._started = now
+        elapsed = now - self._started
+        while self._next < len(self.schedule) and self.schedule[self._next]["at"] <= elapsed:
+            entry = self.schedule[self._next]
+            self._next += 1
+            target = entry.get("target", "*")
+            try:
+                self.apply(target, entry.get("faults", {}))
+            except ValueError as e:
+                logger.error(f"❌ 故障排程項目無效: {e}")
+                continue
+            if entry.get("duration"):
+                self._expiring.append((entry["at"] + entry["duration"], target))
+        for entry in [e for e in self._expiring if e[0] <= elapsed]:
+            self._expiring.remove(entry)
+            self.clear(entry[1])
+
+    def handle_command(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """處理故障命令"""
+        try:
+            action = payload.get("action", "set")
+            target = payload.get("target", "*")
+            if action == "set":
+                return {"status": "success", "devices": self.apply(target, payload.get("faults", {}))}
+            if action == "clear":
+                return {"status": "success", "devices": self.clear(target)}
+            if action == "status":
+                return {"status": "success", "faults": self.status()}
+            return {"status": "error", "message": f"未知的故障命令: {action}"}
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+
+    async def listen(self, broker: str, port: int = 1883):
+        """
+        訂閱故障命令並回覆狀態 (斷線自動重連)
+
+        機群的每個工作程序各自訂閱，只回覆目標包含本程序設備的命令。
+        """
+        from aiomqtt import Client, MqttError
+
+        while True:
+            try:
+                async with Client(hostname=broker, port=port) as client:
+                    await client.subscribe(FAULT_COMMAND_TOPIC)
+                    logger.info(f"📡 故障命令已訂閱: {FAULT_COMMAND_TOPIC}")
+                    async for message in client.messages:
+                        try:
+                            payload = json.loads(message.payload)
+                        except ValueError:
+                            continue
+                        if payload.get("action") != "status" and not self._match(payload.get("target", "*")):
+                            continue
+                        reply = self.handle_command(payload)
+                        await client.publish(FAULT_STATUS_TOPIC, json.dumps(reply, ensure_ascii=False))
+            except MqttError as e:
+                logger.warning(f"⚠️ 故障命令 MQTT 連線中斷: {e}，5 秒後重試")
+                await asyncio.sleep(5)
@@ -0,0 +1,480 @@
+"""模擬器機群 (依設備範本產生 N 台虛擬測試台)"""
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import yaml
+from loguru import logger
+from engine import SimulatorEngine
+from faults import FaultController
+from plant import PumpPlant, PlantSimulation
+from playback import Playback, PlaybackClock
+from rtu import RtuBus, parse_serial
+
+TEMPLATE_FILE = Path(__file__).parent / "config" / "devices.yaml"
+MAX_SLAVE_ID = 247
+ALLOCATION_MODES = ("ports", "slaves")
+FAULT_TICK = 0.1  # 故障排程檢查週期（秒）
+
+# 範本設備名稱 → 物理模型的電源
+PLANT_METERS = {
+    "dc_meter": "dc",
+    "ac110v_meter": "ac110",
+    "ac220v_meter": "ac220",
+    "ac220v_3p_meter": "ac220_3p",
+}
+
+
+@dataclass
+class RigAllocation:
+    """一台虛擬測試台的分配結果"""
+    rig_id: str
+    worker: int
+    devices: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # 設備 → (端口, Slave ID)
+    serial: Dict[str, Tuple[str, str]] = field(default_factory=dict)   # 設備 → (匯流排名稱, 串口路徑)
+
+
+def load_template(path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    載入設備範本 (config/devices.yaml，只包含 enabled 的設備)
+
+    Raises:
+        ValueError: 範本沒有設備
+    """
+    data = yaml.safe_load(Path(path or TEMPLATE_FILE).read_text(encoding="utf-8")) or {}
+    devices = {
+        name: spec for name, spec in (data.get("devices") or {}).items()
+        if spec.get("enabled", True)
+    }
+    if not devices:
+        raise ValueError(f"設備範本沒有設備: {path or TEMPLATE_FILE}")
+    return devices
+
+
+def load_buses(
+    path: Optional[str] = None,
+    template: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    載入 RTU 匯流排設定 (config/devices.yaml 的 buses，只保留範本中的設備)
+
+    Raises:
+        ValueError: 設備重複出現在多個匯流排
+    """
+    data = yaml.safe_load(Path(path or TEMPLATE_FILE).read_text(encoding="utf-8")) or {}
+    buses, seen = {}, set()
+    for name, spec in (data.get("buses") or {}).items():
+        devices = [d for d in spec.get("devices") or [] if template is None or d in template]
+        duplicated = seen.intersection(devices)
+        if duplicated:
+            raise ValueError(f"設備重複出現在多個匯流排: {', '.join(sorted(duplicated))}")
+        seen.update(devices)
+        if devices:
+            buses[name] = {**spec, "devices": devices}
+    return buses
+
+
+def assign_buses(
+    allocations: List[RigAllocation],
+    buses: Dict[str, Dict[str, Any]],
+    mode: str = "ports",
+    link_dir: Optional[str] = None
+):
+    """
+    分配各測試台設備的 RTU 匯流排 (串口路徑)
+
+    單台測試台使用範本的 link；多台時 ports 模式每台測試台一組匯流排 ({link}_rig002)，
+    slaves 模式每個工作程序一組 ({link}_w1)，與 TCP 端口的分配方式相同。
+
+    Args:
+        link_dir: 取代 link 的目錄 (如非特權容器無法寫入 /dev)
+    """
+    for allocation in allocations:
+        for bus, spec in buses.items():
+            link = spec["link"]
+            if link_dir:
+                link = str(Path(link_dir) / Path(link).name)
+            if len(allocations) > 1:
+                link += f"_w{allocation.worker}" if mode == "slaves" else f"_{allocation.rig_id}"
+            for name in spec["devices"]:
+                if name in allocation.devices:
+                    allocation.serial[name] = (bus, link)
+
+
+def allocate(
+    template: Dict[str, Dict[str, Any]],
+    rigs: int,
+    workers: int = 1,
+    mode: str = "ports",
+    base_port: Optional[int] = None,
+    port_stride: Optional[int] = None
+) -> List[RigAllocation]:
+    """
+    分配各測試台的端口與 Slave ID
+
+    測試台依序輪流分配給各工作程序。
+    - ports: 每台測試台一組端口 (base_port + 測試台序號 × port_stride + 範本端口偏移)，Slave ID 同範本
+    - slaves: 每個工作程序一組端口，程序內的測試台以 Slave ID 區分
+      (範本 Slave ID + 程序內序號 × 範本最大 Slave ID)
+
+    Args:
+        template: 設備範本
+        rigs: 測試台數量
+        workers: 工作程序數量
+        mode: 分配方式 (ports / slaves)
+        base_port: 第一組端口的起點 (預設為範本最小端口，單台時與範本相同)
+        port_stride: 每組端口的間隔 (預設為範本端口跨度)
+
+    Raises:
+        ValueError: 參數無效、端口超出範圍或 Slave ID 不足
+    """
+    if mode not in ALLOCATION_MODES:
+        raise ValueError(f"未知的分配方式: {mode}")
+    if rigs < 1 or workers < 1:
+        raise ValueError("測試台與工作程序數量至少為 1")
+    workers = min(workers, rigs)
+
+    ports = [spec["port"] for spec in template.values()]
+    first_port = min(ports)
+    stride = port_stride or (max(ports) - first_port + 1)
+    base = first_port if base_port is None else base_port
+    slave_stride = max(spec["slave_id"] for spec in template.values())
+
+    allocations = []
+    for index in range(rigs):
+        worker = index % workers
+        block, slave_offset = index, 0
+        if mode == "slaves":
+            block, slave_offset = worker, (index // workers) * slave_stride
+            if slave_offset + slave_stride > MAX_SLAVE_ID:
+                raise ValueError(f"每個工作程序最多 {MAX_SLAVE_ID // slave_stride} 台測試台，請增加工作程序數量")
+
+        allocation = RigAllocation(rig_id=f"rig{index + 1:03d}", worker=worker)
+        for name, spec in template.items():
+            port = base + block * stride + spec["port"] - first_port
+            if port > 65535:
+                raise ValueError(f"端口超出範圍: {allocation.rig_id} {name} → {port}")
+            allocation.devices[name] = (port, spec["slave_id"] + slave_offset)
+        allocations.append(allocation)
+    return allocations
+
+
+def build_device(name: str, spec: Dict[str, Any], port: int, slave_id: int):
+    """
+    依範本建立設備模擬器並套用 default_values
+
+    Raises:
+        ValueError: 未知的設備類型
+    """
+    # 設備類別延後匯入: 範本與分配不需要 MODBUS 數據存儲
+    from devices import (
+        FlowMeterSimulator,
+        PressureSensorSimulator,
+        SinglePhasePowerMeterSimulator,
+        ThreePhasePowerMeterSimulator,
+        RelayIOSimulator
+    )
+
+    device_type = spec.get("type")
+    defaults = dict(spec.get("default_values") or {})
+    if device_type == "flow_meter":
+        device = FlowMeterSimulator(slave_id=slave_id, port=port)
+    elif device_type == "single_phase":
+        device = SinglePhasePowerMeterSimulator(slave_id=slave_id, port=port, meter_type=spec.get("meter_type", "DC"))
+    elif device_type == "three_phase":
+        device = ThreePhasePowerMeterSimulator(slave_id=slave_id, port=port)
+    elif device_type == "pressure":
+        device = PressureSensorSimulator(slave_id=slave_id, port=port, is_vacuum=spec.get("is_vacuum", False))
+    elif device_type == "relay_io":
+        device = RelayIOSimulator(slave_id=slave_id, port=port)
+        for channel, state in enumerate(defaults.pop("relay_states", []), start=1):
+            device.set_relay(channel, bool(state))
+        if "digital_inputs" in defaults:
+            device.config["digital_inputs"] = defaults.pop("digital_inputs")
+            device._write_inputs(device.config["digital_inputs"])
+    else:
+        raise ValueError(f"未知的設備類型: {name} ({device_type})")
+
+    device.config.update(defaults)
+    return device
+
+
+def build_rig(
+    template: Dict[str, Dict[str, Any]],
+    allocation: RigAllocation,
+    plant: bool = False,
+    timestep: float = 0.01
+) -> Tuple[Dict[str, Any], Optional[PlantSimulation]]:
+    """
+    建立一台測試台的所有設備 (與物理模型)
+
+    Returns:
+        (設備名稱 → 模擬器, 物理模型或 None)
+    """
+    devices = {
+        name: build_device(name, template[name], port, slave_id)
+        for name, (port, slave_id) in allocation.devices.items()
+    }
+    simulation = None
+    if plant and "relay_io" in devices:
+        simulation = PlantSimulation(
+            PumpPlant(timestep=timestep),
+            devices["relay_io"],
+            flow_meter=devices.get("flow_meter"),
+            pressure_positive=devices.get("pressure_positive"),
+            pressure_vacuum=devices.get("pressure_vacuum"),
+            meters={supply: devices[name] for name, supply in PLANT_METERS.items() if name in devices},
+        )
+    return devices, simulation
+
+
+def _manifest_device(
+    allocation: RigAllocation,
+    name: str,
+    host: str,
+    buses: Optional[Dict[str, Dict[str, Any]]]
+) -> Dict[str, Any]:
+    port, slave_id = allocation.devices[name]
+    if buses and name in allocation.serial:
+        bus, link = allocation.serial[name]
+        settings, _ = parse_serial(buses[bus])
+        return {
+            "port": link, "use_tcp": False, "slave_id": slave_id, "baudrate": settings.baudrate,
+            "bytesize": settings.bytesize, "parity": settings.parity, "stopbits": settings.stopbits,
+        }
+    return {"port": host, "tcp_port": port, "slave_id": slave_id, "use_tcp": True}
+
+
+def build_manifest(
+    allocations: List[RigAllocation],
+    host: str,
+    mode: str,
+    buses: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    機群清單
+
+    格式與後端 STATIONS_FILE 相同 ({"stations": [{"id", "devices": {設備: 覆寫欄位}}]})，
+    可直接作為後端的工作站配置；fleet 欄位記錄分配方式與各工作程序的測試台。
+    指定 buses (RTU 模式) 時，分配了匯流排的設備以串口連線。
+    """
+    stations = []
+    workers: Dict[int, List[str]] = {}
+    for allocation in allocations:
+        workers.setdefault(allocation.worker, []).append(allocation.rig_id)
+        stations.append({
+            "id": allocation.rig_id,
+            "worker": allocation.worker,
+            "devices": {name: _manifest_device(allocation, name, host, buses) for name in allocation.devices},
+        })
+    return {
+        "fleet": {
+            "generated_at": time.time(),
+            "host": host,
+            "mode": mode,
+            "rtu": bool(buses),
+            "rigs": len(allocations),
+            "workers": [{"index": index, "rigs": rigs} for index, rigs in sorted(workers.items())],
+        },
+        "stations": stations,
+    }
+
+
+def write_manifest(manifest: Dict[str, Any], path: str):
+    """寫入機群清單 (原子替換)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def build_engine(
+    template: Dict[str, Dict[str, Any]],
+    allocations: List[RigAllocation],
+    host: str = "0.0.0.0",
+    plant: bool = False,
+    timestep: float = 0.01,
+    faults: Optional[FaultController] = None,
+    playback: Optional[Playback] = None,
+    playback_start: Optional[float] = None,
+    buses: Optional[Dict[str, Dict[str, Any]]] = None
+) -> SimulatorEngine:
+    """
+    在同一引擎中建立多台測試台 (物理模型先於設備排程)
+
+    faults 不為 None 時註冊各設備的故障設定 ("rig001/relay_io") 並排程故障排程檢查；
+    playback 不為 None 時各測試台的設備以同一播放時鐘 (起點 playback_start) 播放；
+    buses 不為 None 時依分配的串口路徑建立 RTU 匯流排 (同時保留 TCP 服務)。
+    """
+    engine = SimulatorEngine(host)
+    rigs = [build_rig(template, allocation, plant, timestep) for allocation in allocations]
+    clock = PlaybackClock(playback.speed, playback_start) if playback else None
+    rtu_buses: Dict[str, RtuBus] = {}
+    for allocation, (_, simulation) in zip(allocations, rigs):
+        if simulation is not None:
+            engine.schedule(f"plant:{allocation.rig_id}", simulation.tick, simulation.period)
+    for allocation, (devices, _) in zip(allocations, rigs):
+        for name, device in devices.items():
+            engine.add_device(device)
+            if playback is not None:
+                device.playback = playback.for_device(name, clock)
+            if faults is not None:
+                faults.register(f"{allocation.rig_id}/{name}", device.faults)
+            if buses and name in allocation.serial:
+                bus, link = allocation.serial[name]
+                if link not in rtu_buses:
+                    settings, _ = parse_serial(buses[bus])
+                    rtu_buses[link] = engine.add_bus(RtuBus(bus, settings, link=link))
+                rtu_buses[link].add_device(device)
+    if faults is not None:
+        engine.schedule("faults", faults.tick, FAULT_TICK)
+    return engine
+
+
+def build_faults(schedule: Optional[str] = None) -> FaultController:
+    """建立故障注入控制 (並載入故障排程)"""
+    faults = FaultController()
+    if schedule:
+        faults.load_schedule(schedule)
+    return faults
+
+
+async def _serve_worker(
+    engine: SimulatorEngine,
+    stop_event: asyncio.Event,
+    faults: FaultController,
+    mqtt: Optional[Tuple[str, int]]
+):
+    await engine.start()
+    listener = asyncio.create_task(faults.listen(*mqtt)) if mqtt else None
+    try:
+        await stop_event.wait()
+    finally:
+        if listener:
+            listener.cancel()
+        await engine.stop()
+
+
+def _worker_main(
+    worker: int,
+    template: Dict[str, Dict[str, Any]],
+    allocations: List[RigAllocation],
+    host: str,
+    plant: bool,
+    timestep: float,
+    fault_schedule: Optional[str],
+    mqtt: Optional[Tuple[str, int]],
+    playback: Optional[str],
+    playback_start: Optional[float],
+    buses: Optional[Dict[str, Dict[str, Any]]]
+):
+    """工作程序入口 (SIGTERM 停止，SIGINT 由主程序處理)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    async def run():
+        stop_event = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop_event.set)
+        faults = build_faults(fault_schedule)
+        engine = build_engine(
+            template, allocations, host, plant, timestep, faults,
+            Playback.load(playback, template) if playback else None, playback_start, buses
+        )
+        logger.info(f"🏭 工作程序 {worker}: {len(allocations)} 台測試台")
+        await _serve_worker(engine, stop_event, faults, mqtt)
+
+    asyncio.run(run())
+
+
+class Fleet:
+    """
+    模擬器機群
+
+    依範本與分配結果提供 N 台虛擬測試台：單一工作程序時在目前程序中運行，
+    否則每個工作程序 (multiprocessing，spawn) 運行一個模擬器引擎。
+    每個引擎有各自的故障注入控制，共用同一故障排程與 MQTT 故障命令主題。
+    """
+
+    def __init__(
+        self,
+        template: Dict[str, Dict[str, Any]],
+        allocations: List[RigAllocation],
+        host: str = "0.0.0.0",
+        plant: bool = False,
+        timestep: float = 0.01,
+        fault_schedule: Optional[str] = None,
+        mqtt: Optional[Tuple[str, int]] = None,
+        playback: Optional[str] = None,
+        buses: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        """
+        Args:
+            fault_schedule: 故障排程檔案 (JSON / YAML)
+            mqtt: 故障命令的 MQTT Broker (主機, 端口)，None 表示不訂閱
+            playback: 模擬值播放設定檔 (JSON / YAML)
+            buses: RTU 匯流排設定 (allocations 需先經 assign_buses 分配)
+        """
+        self.template = template
+        self.allocations = allocations
+        self.host = host
+        self.plant = plant
+        self.timestep = timestep
+        self.fault_schedule = fault_schedule
+        self.mqtt = mqtt
+        self.playback = playback
+        self.buses = buses
+        self.workers = sorted({allocation.worker for allocation in allocations})
+        self.engine: Optional[SimulatorEngine] = None
+        self.faults: Optional[FaultController] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._processes: List[multiprocessing.Process] = []
+
+    async def start(self):
+        # 所有工作程序共用播放起點 (單調時鐘為系統共用)
+        playback_start = time.monotonic()
+        if len(self.workers) == 1:
+            self.faults = build_faults(self.fault_schedule)
+            self.engine = build_engine(
+                self.template, self.allocations, self.host, self.plant, self.timestep, self.faults,
+                Playback.load(self.playback, self.template) if self.playback else None, playback_start,
+                self.buses
+            )
+            await self.engine.start()
+            if self.mqtt:
+                self._listener = asyncio.create_task(self.faults.listen(*self.mqtt))
+            return
+
+        context = multiprocessing.get_context("spawn")
+        for worker in self.workers:
+            assigned = [a for a in self.allocations if a.worker == worker]
+            process = context.Process(
+                target=_worker_main,
+                args=(
+                    worker, self.template, assigned, self.host, self.plant, self.timestep,
+                    self.fault_schedule, self.mqtt, self.playback, playback_start, self.buses
+                ),
+                name=f"simulator-worker-{worker}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        logger.info(f"✅ 模擬器機群已啟動: {len(self.allocations)} 台測試台、{len(self._processes)} 個工作程序")
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+        if self.engine:
+            await self.engine.stop()
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            await asyncio.to_thread(process.join, 5.0)
+            if process.is_alive():
+                process.kill()
+        self._processes.clear()
@@ -4,13 +4,7 @@ import signal
 import os
 import sys
 from loguru import logger
-from devices import (
-    FlowMeterSimulator,
-    PressureSensorSimulator,
-    SinglePhasePowerMeterSimulator,
-    ThreePhasePowerMeterSimulator,
-    RelayIOSimulator
-)
+from fleet import Fleet, load_template, load_buses, allocate, assign_buses, build_manifest, write_manifest
 
 # 配置日誌
 log_level = os.getenv("LOG_LEVEL", "INFO")
@@ -35,37 +29,52 @@ async def main():
     """主程序"""
     logger.info("🚀 MODBUS 設備模擬器啟動中...")
     
-    # 註冊信號處理
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    # 註冊信號處理 (經事件迴圈，機群模式下主程序閒置時也能立即喚醒)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, signal_handler, sig, None)
+    
+    # 依設備範本 (config/devices.yaml) 建立測試台
+    # 預設一台，端口與 Slave ID 同範本；FLEET_RIGS > 1 時為機群模式
+    template = load_template(os.getenv("DEVICES_FILE"))
+    mode = os.getenv("FLEET_MODE", "ports")
+    allocations = allocate(
+        template,
+        rigs=int(os.getenv("FLEET_RIGS", "1")),
+        workers=int(os.getenv("FLEET_WORKERS", "1")),
+        mode=mode,
+        base_port=int(os.environ["FLEET_BASE_PORT"]) if os.getenv("FLEET_BASE_PORT") else None,
+        port_stride=int(os.environ["FLEET_PORT_STRIDE"]) if os.getenv("FLEET_PORT_STRIDE") else None,
+    )
     
-    # 創建所有設備模擬器
-    # 根據 MODBUS_all_devices.md 和 SIMULATOR_ARCHITECTURE.md
-    simulators = [
-        # 流量計 (Slave ID 1, Port 5020)
-        FlowMeterSimulator(slave_id=1, port=5020),
-        
-        # 電表 (4台)
-        SinglePhasePowerMeterSimulator(slave_id=1, port=5021, meter_type="DC"),
-        SinglePhasePowerMeterSimulator(slave_id=2, port=5022, meter_type="AC110V"),
-        SinglePhasePowerMeterSimulator(slave_id=3, port=5023, meter_type="AC220V"),
-        ThreePhasePowerMeterSimulator(slave_id=4, port=5024),
-        
-        # 壓力計 (2台)
-        PressureSensorSimulator(slave_id=2, port=5025, is_vacuum=False),  # 正壓
-        PressureSensorSimulator(slave_id=3, port=5026, is_vacuum=True),   # 真空
-        
-        # 繼電器 IO 模組 (Slave ID 1, Port 5027)
-        RelayIOSimulator(slave_id=1, port=5027),
-    ]
+    # RTU 模式: 依範本的 buses 以 pty 提供串口 (RTU_LINK_DIR 可取代 /dev)
+    buses = None
+    if os.getenv("RTU_MODE", "false").lower() in ("1", "true", "yes"):
+        buses = load_buses(os.getenv("DEVICES_FILE"), template)
+        assign_buses(allocations, buses, mode, os.getenv("RTU_LINK_DIR") or None)
     
-    # 啟動所有模擬器
-    tasks = []
-    for sim in simulators:
-        task = asyncio.create_task(sim.start())
-        tasks.append(task)
+    # 機群清單 (後端 STATIONS_FILE 格式)
+    manifest_path = os.getenv("FLEET_MANIFEST", "data/fleet_manifest.json")
+    write_manifest(
+        build_manifest(allocations, os.getenv("FLEET_ADVERTISE_HOST", "localhost"), mode, buses),
+        manifest_path
+    )
+    logger.info(f"📋 機群清單: {manifest_path} ({len(allocations)} 台測試台)")
     
-    logger.info(f"✅ 已啟動 {len(simulators)} 台設備模擬器")
+    # 物理模型: 閥門/電源繼電器驅動壓力、流量與電流 (PLANT_MODEL=true 啟用)
+    fleet = Fleet(
+        template,
+        allocations,
+        plant=os.getenv("PLANT_MODEL", "false").lower() in ("1", "true", "yes"),
+        timestep=float(os.getenv("PLANT_TIMESTEP", "0.01")),
+        # 故障注入: 排程檔案與管理 API 經 MQTT 下達的命令
+        fault_schedule=os.getenv("FAULT_SCHEDULE") or None,
+        mqtt=(os.environ["MQTT_BROKER"], int(os.getenv("MQTT_PORT", "1883"))) if os.getenv("MQTT_BROKER") else None,
+        # 模擬值播放: 波形與錄製軌跡 (取代管理 API 設定的固定值)
+        playback=os.getenv("PLAYBACK_FILE") or None,
+        buses=buses,
+    )
+    await fleet.start()
     
     try:
         # 等待停止信號
@@ -77,8 +86,7 @@ async def main():
     finally:
         # 停止所有模擬器
         logger.info("🛑 正在停止所有模擬器...")
-        stop_tasks = [sim.stop() for sim in simulators]
-        await asyncio.gather(*stop_tasks, return_exceptions=True)
+        await fleet.stop()
         logger.info("✅ 所有模擬器已停止")
 
 
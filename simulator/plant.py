@@ -0,0 +1,273 @@
+"""幫浦測試台物理模型 (閥門/電源 → 壓力、流量、電流)"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# 大氣壓 (kPa) 與壓力單位換算
+P_ATM = 101.325
+KPA_PER_KGCM2 = 98.0665
+
+# 繼電器 IO 線圈: CH1-CH4 = 電磁閥 A-D, CH5-CH8 = 電源 (與 pump_backend/drivers/relay_io.py 相同)
+VALVE_COILS = {"A": 0, "B": 1, "C": 2, "D": 3}
+SUPPLY_COILS = {"dc": 4, "ac110": 5, "ac220": 6, "ac220_3p": 7}
+
+# 狀態向量索引: 馬達轉速比 (0~1)、儲氣槽錶壓 (kPa)、累計流量 (L)
+SPEED, PRESSURE, VOLUME = 0, 1, 2
+
+
+@dataclass
+class PumpParameters:
+    """幫浦與測試台參數"""
+    free_flow: float = 30.0            # 零壓差流量 (L/min)
+    max_pressure: float = 300.0        # 正壓關斷壓力 (kPa)
+    max_vacuum: float = 80.0           # 極限真空 (kPa，錶壓 -80)
+    tank_volume: float = 10.0          # 儲氣槽容積 (L)
+    leak_conductance: float = 0.02     # 洩漏 (L/min/kPa，大氣壓下體積)
+    vent_conductance: float = 5.0      # 洩壓閥 A+B 全開 (L/min/kPa)
+    motor_time_constant: float = 0.5   # 馬達加減速時間常數 (秒)
+    no_load_power: float = 30.0        # 空載功率 (W)
+    full_load_power: float = 120.0     # 關斷壓力下功率 (W)
+    inrush_ratio: float = 2.0          # 啟動突波 (滿載功率的倍數，隨轉速上升消失)
+    power_factor: float = 0.9          # 交流功率因數
+    supply_voltage: Dict[str, float] = field(default_factory=lambda: {
+        "dc": 24.0, "ac110": 110.0, "ac220": 220.0, "ac220_3p": 220.0
+    })
+
+
+@dataclass
+class PlantInputs:
+    """模型輸入 (由繼電器線圈取得)"""
+    valves: Dict[str, bool] = field(default_factory=lambda: dict.fromkeys(VALVE_COILS, False))
+    supply: Optional[str] = None       # 通電的電源 (None 表示斷電)
+
+    @classmethod
+    def from_coils(cls, coils: List[bool]) -> "PlantInputs":
+        valves = {name: bool(coils[index]) for name, index in VALVE_COILS.items()}
+        supply = next((name for name, index in SUPPLY_COILS.items() if coils[index]), None)
+        return cls(valves, supply)
+
+    @property
+    def positive_path(self) -> bool:
+        """C 開 D 關: 幫浦出口接儲氣槽 (正壓/流量測試)"""
+        return self.valves["C"] and not self.valves["D"]
+
+    @property
+    def vacuum_path(self) -> bool:
+        """D 開 C 關: 幫浦入口接儲氣槽 (真空測試)"""
+        return self.valves["D"] and not self.valves["C"]
+
+    @property
+    def vent(self) -> bool:
+        """A+B 同時開啟: 儲氣槽洩壓"""
+        return self.valves["A"] and self.valves["B"]
+
+
+class PumpPlant:
+    """
+    幫浦測試台集總參數模型
+
+    狀態向量 [轉速比, 儲氣槽錶壓, 累計流量] 以固定時間步長的 RK4 積分：
+    - 幫浦曲線: Q = ω·Q₀·(1 - Δp/Δp_max)，Δp 為正壓或真空度
+    - 儲氣槽等溫: 正壓 dP/dt = P_atm·Q/V，真空 dP/dt = -(P_atm + p)·Q/V，洩漏/洩壓與錶壓成正比
+    - 馬達: 一階加減速，電功率隨負載 (Δp/Δp_max) 線性增加並含啟動突波，電流 = 功率 / 電壓
+    - 流量計量測接通管路 (C 或 D) 的幫浦流量並積分為累計流量
+    """
+
+    def __init__(self, params: Optional[PumpParameters] = None, timestep: float = 0.01):
+        """
+        Args:
+            params: 幫浦與測試台參數
+            timestep: 積分時間步長（秒）
+        """
+        self.params = params or PumpParameters()
+        self.timestep = timestep
+        self.state = [0.0, 0.0, 0.0]
+        self.inputs = PlantInputs()
+        self.time = 0.0
+        self._remainder = 0.0
+
+    def _load(self, pressure: float) -> float:
+        """幫浦負載 (壓差佔關斷壓差的比例)"""
+        p = self.params
+        if self.inputs.positive_path:
+            return min(max(pressure, 0.0) / p.max_pressure, 1.0)
+        if self.inputs.vacuum_path:
+            return min(max(-pressure, 0.0) / p.max_vacuum, 1.0)
+        return 0.0
+
+    def _pump_flow(self, state: List[float]) -> float:
+        """幫浦流量 (L/min)"""
+        return state[SPEED] * self.params.free_flow * (1.0 - self._load(state[PRESSURE]))
+
+    def _derivatives(self, state: List[float]) -> List[float]:
+        p = self.params
+        inputs = self.inputs
+        speed, pressure = state[SPEED], state[PRESSURE]
+        flow = self._pump_flow(state) / 60.0  # L/s
+
+        d_speed = ((1.0 if inputs.supply else 0.0) - speed) / p.motor_time_constant
+        conductance = p.leak_conductance + (p.vent_conductance if inputs.vent else 0.0)
+        d_pressure = -P_ATM * conductance / 60.0 * pressure / p.tank_volume
+        d_volume = 0.0
+        if inputs.positive_path:
+            d_pressure += P_ATM * flow / p.tank_volume
+            d_volume = flow
+        elif inputs.vacuum_path:
+            d_pressure -= (P_ATM + pressure) * flow / p.tank_volume
+            d_volume = flow
+        return [d_speed, d_pressure, d_volume]
+
+    def _rk4(self, h: float):
+        s = self.state
+        k1 = self._derivatives(s)
+        k2 = self._derivatives([x + h / 2 * k for x, k in zip(s, k1)])
+        k3 = self._derivatives([x + h / 2 * k for x, k in zip(s, k2)])
+        k4 = self._derivatives([x + h * k for x, k in zip(s, k3)])
+        self.state = [
+            x + h / 6 * (a + 2 * b + 2 * c + d)
+            for x, a, b, c, d in zip(s, k1, k2, k3, k4)
+        ]
+        self.state[PRESSURE] = max(self.state[PRESSURE], -P_ATM)
+
+    def step(self, dt: float) -> int:
+        """
+        推進模型 dt 秒 (以固定步長積分，不足一步的時間留待下次)
+
+        Returns:
+            執行的積分步數
+        """
+        self._remainder += dt
+        steps = int(self._remainder / self.timestep + 1e-9)
+        self._remainder -= steps * self.timestep
+        for _ in range(steps):
+            self._rk4(self.timestep)
+        self.time += steps * self.timestep
+        return steps
+
+    def set_inputs(self, inputs: PlantInputs):
+        self.inputs = inputs
+
+    @property
+    def pressure(self) -> float:
+        """儲氣槽錶壓 (kPa)"""
+        return self.state[PRESSURE]
+
+    @property
+    def flow(self) -> float:
+        """流量計瞬時流量 (L/min)"""
+        if self.inputs.positive_path or self.inputs.vacuum_path:
+            return self._pump_flow(self.state)
+        return 0.0
+
+    @property
+    def electrical_power(self) -> float:
+        """馬達電功率 (W)"""
+        if not self.inputs.supply:
+            return 0.0
+        p = self.params
+        speed = self.state[SPEED]
+        load = self._load(self.state[PRESSURE])
+        running = p.no_load_power + (p.full_load_power - p.no_load_power) * load
+        return running * speed + p.full_load_power * p.inrush_ratio * (1.0 - speed)
+
+    def readings(self) -> Dict[str, Dict[str, float]]:
+        """
+        各模擬設備的量測值
+
+        Returns:
+            {"pressure_positive": {"pressure"}, "pressure_vacuum": {"pressure"},
+             "flow_meter": {"instantaneous_flow", "cumulative_flow"},
+             "dc" / "ac110" / "ac220" / "ac220_3p": {"voltage", "current", "power"}}
+        """
+        p = self.params
+        pressure = self.pressure
+        readings = {
+            "pressure_positive": {"pressure": max(pressure, 0.0) / KPA_PER_KGCM2},
+            "pressure_vacuum": {"pressure": min(pressure, 0.0)},
+            "flow_meter": {"instantaneous_flow": self.flow, "cumulative_flow": self.state[VOLUME]},
+        }
+        power = self.electrical_power
+        for supply, voltage in p.supply_voltage.items():
+            energized = supply == self.inputs.supply
+            if supply == "dc":
+                current = power / voltage if energized else 0.0
+            elif supply == "ac220_3p":
+                current = power / (3 * voltage * p.power_factor) if energized else 0.0
+            else:
+                current = power / (voltage * p.power_factor) if energized else 0.0
+            readings[supply] = {
+                "voltage": voltage if energized or supply != "dc" else 0.0,
+                "current": current,
+                "power": power / 1000.0 if energized else 0.0,
+            }
+        return readings
+
+
+class PlantSimulation:
+    """
+    物理模型與 MODBUS 模擬器的耦合
+
+    由模擬器引擎每 period 秒呼叫 tick()：讀取繼電器 IO 模擬器的線圈 (閥門與電源)，
+    將模型推進實際經過的時間，再把量測值寫入各模擬器的設定；
+    各模擬器依自身的更新頻率寫入寄存器 (與實體設備相同)。
+    """
+
+    def __init__(
+        self,
+        plant: PumpPlant,
+        relay,
+        flow_meter=None,
+        pressure_positive=None,
+        pressure_vacuum=None,
+        meters: Optional[Dict[str, object]] = None,
+        period: float = 0.05
+    ):
+        """
+        Args:
+            plant: 物理模型
+            relay: 繼電器 IO 模擬器
+            flow_meter / pressure_positive / pressure_vacuum: 對應的模擬器
+            meters: 電源 → 電表模擬器 ("dc" / "ac110" / "ac220" / "ac220_3p")
+            period: 更新週期（秒）
+        """
+        self.plant = plant
+        self.relay = relay
+        self.flow_meter = flow_meter
+        self.pressure_positive = pressure_positive
+        self.pressure_vacuum = pressure_vacuum
+        self.meters = meters or {}
+        self.period = period
+        self._last: Optional[float] = None
+
+    def update(self, dt: float):
+        """讀取線圈、推進模型並更新模擬器"""
+        coils = [self.relay.get_coil(index) for index in range(8)]
+        self.plant.set_inputs(PlantInputs.from_coils(coils))
+        self.plant.step(dt)
+        self.apply(self.plant.readings())
+
+    def apply(self, readings: Dict[str, Dict[str, float]]):
+        """將量測值寫入模擬器設定"""
+        if self.pressure_positive is not None:
+            self.pressure_positive.config["pressure"] = readings["pressure_positive"]["pressure"]
+        if self.pressure_vacuum is not None:
+            self.pressure_vacuum.config["pressure"] = readings["pressure_vacuum"]["pressure"]
+        if self.flow_meter is not None:
+            self.flow_meter.config.update(readings["flow_meter"])
+        for supply, meter in self.meters.items():
+            values = readings[supply]
+            if supply == "ac220_3p":
+                for phase in ("a", "b", "c"):
+                    meter.config[f"voltage_{phase}"] = values["voltage"]
+                    meter.config[f"current_{phase}"] = values["current"]
+                    meter.config[f"power_{phase}"] = values["power"] / 3
+                meter.config["power_total"] = values["power"]
+            else:
+                meter.config["voltage"] = values["voltage"]
+                meter.config["current"] = values["current"]
+                meter.config["active_power"] = values["power"]
+
+    def tick(self, now: float):
+        """排程呼叫 (以單調時鐘計算經過時間)"""
+        if self._last is not None:
+            self.update(now - self._last)
+        self._last = now
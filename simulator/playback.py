@@ -0,0 +1,419 @@
+"""模擬值播放 (波形產生器與錄製軌跡)"""
+import bisect
+import csv
+import json
+import math
+import random
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import yaml
+from loguru import logger
+
+GENERATOR_TYPES = ("constant", "sine", "ramp", "step", "noise")
+
+# 後端測試記錄 CSV (services/data_logger.py) 欄位 → (設備, 設定欄位)
+DATA_LOGGER_COLUMNS = {
+    "flow_instantaneous": ("flow_meter", "instantaneous_flow"),
+    "flow_cumulative": ("flow_meter", "cumulative_flow"),
+    "pressure_positive": ("pressure_positive", "pressure"),
+    "pressure_vacuum": ("pressure_vacuum", "pressure"),
+    "dc_voltage": ("dc_meter", "voltage"),
+    "dc_current": ("dc_meter", "current"),
+    "dc_power": ("dc_meter", "active_power"),
+    "ac110_voltage": ("ac110v_meter", "voltage"),
+    "ac110_current": ("ac110v_meter", "current"),
+    "ac110_power": ("ac110v_meter", "active_power"),
+    "ac220_voltage": ("ac220v_meter", "voltage"),
+    "ac220_current": ("ac220v_meter", "current"),
+    "ac220_power": ("ac220v_meter", "active_power"),
+    "ac220_3p_voltage_a": ("ac220v_3p_meter", "voltage_a"),
+    "ac220_3p_voltage_b": ("ac220v_3p_meter", "voltage_b"),
+    "ac220_3p_voltage_c": ("ac220v_3p_meter", "voltage_c"),
+    "ac220_3p_current_a": ("ac220v_3p_meter", "current_a"),
+    "ac220_3p_current_b": ("ac220v_3p_meter", "current_b"),
+    "ac220_3p_current_c": ("ac220v_3p_meter", "current_c"),
+    "ac220_3p_total_power": ("ac220v_3p_meter", "power_total"),
+}
+TIME_COLUMNS = ("t", "time", "timestamp")
+
+# 匯流排錄製檔格式 (與 pump_backend/drivers/bus_capture.py 相同)
+CAPTURE_MAGIC = b"PBCAP1\x00\x00"
+CAPTURE_HEADER = struct.Struct("<dd")
+CAPTURE_RECORD = struct.Struct("<dIHBBHH")
+CAPTURE_OK = 0
+CAPTURE_CHANNEL = 0xFF
+
+
+class PlaybackClock:
+    """
+    共用播放時鐘
+
+    所有設備以同一起點與倍速換算播放位置；未指定起點時於首次取樣開始計時。
+    起點為單調時鐘時間，機群的各工作程序可共用主程序的起點。
+    """
+
+    def __init__(self, speed: float = 1.0, start: Optional[float] = None):
+        if speed <= 0:
+            raise ValueError("播放倍速必須大於 0")
+        self.speed = speed
+        self.start = start
+
+    def position(self, now: float) -> float:
+        """播放位置（秒）"""
+        if self.start is None:
+            self.start = now
+        return (now - self.start) * self.speed
+
+
+class Generator:
+    """
+    波形產生器
+
+    - constant: {"value"}
+    - sine: {"offset", "amplitude", "period", "phase"} (phase 為週期比例 0~1)
+    - ramp: {"start", "end", "duration"}，之後維持 end (loop 時為鋸齒波)
+    - step: {"levels": [...], "interval"} 或 {"levels": [...], "times": [...]}
+    - noise: {"mean", "std"}
+    任一類型可加上 "noise": 標準差 疊加高斯雜訊，"min" / "max" 限制範圍；"seed" 使雜訊可重現。
+    """
+
+    def __init__(self, spec: Dict[str, Any], loop: bool = True):
+        """
+        Raises:
+            ValueError: 設定無效
+        """
+        self.type = spec.get("type", "constant")
+        if self.type not in GENERATOR_TYPES:
+            raise ValueError(f"未知的波形類型: {self.type}")
+        self.spec = spec
+        self.loop = loop
+        self._rng = random.Random(spec.get("seed"))
+        if self.type == "sine" and spec.get("period", 0) <= 0:
+            raise ValueError("sine.period 必須大於 0")
+        if self.type == "ramp" and spec.get("duration", 0) <= 0:
+            raise ValueError("ramp.duration 必須大於 0")
+        if self.type == "step":
+            levels = spec.get("levels") or []
+            times = spec.get("times") or [i * spec.get("interval", 0) for i in range(len(levels))]
+            if not levels or len(times) != len(levels) or (len(levels) > 1 and times[-1] <= times[0]):
+                raise ValueError("step 需要 levels 與 interval (大於 0) 或等長的 times")
+            self._times = list(times)
+            # 循環週期: 最後一階維持與平均間隔相同的時間
+            self._cycle = times[-1] + (times[-1] - times[0]) / max(len(times) - 1, 1)
+
+    def _base(self, t: float) -> float:
+        s = self.spec
+        if self.type == "sine":
+            return s.get("offset", 0.0) + s.get("amplitude", 1.0) * math.sin(
+                2 * math.pi * (t / s["period"] + s.get("phase", 0.0))
+            )
+        if self.type == "ramp":
+            duration = s["duration"]
+            t = t % duration if self.loop else min(t, duration)
+            return s.get("start", 0.0) + (s.get("end", 1.0) - s.get("start", 0.0)) * t / duration
+        if self.type == "step":
+            if self.loop and self._cycle > 0:
+                t = t % self._cycle
+            index = max(bisect.bisect_right(self._times, t) - 1, 0)
+            return s["levels"][index]
+        if self.type == "noise":
+            return self._rng.gauss(s.get("mean", 0.0), s.get("std", 1.0))
+        return s.get("value", 0.0)
+
+    def value(self, t: float) -> float:
+        value = self._base(t)
+        if self.spec.get("noise"):
+            value += self._rng.gauss(0.0, self.spec["noise"])
+        if "min" in self.spec:
+            value = max(value, self.spec["min"])
+        if "max" in self.spec:
+            value = min(value, self.spec["max"])
+        return value
+
+
+class Trace:
+    """
+    錄製軌跡 (時間遞增的取樣點)
+
+    interpolate=True 時於取樣點間線性內插，否則維持前一取樣值 (原始寄存器)。
+    origin 為播放位置 0 對應的錄製時間 (同一錄製的軌跡共用，保持彼此的時間關係)。
+    """
+
+    def __init__(
+        self,
+        times: List[float],
+        values: List[Any],
+        loop: bool = True,
+        interpolate: bool = True,
+        origin: Optional[float] = None
+    ):
+        """
+        Raises:
+            ValueError: 沒有取樣點
+        """
+        if not times:
+            raise ValueError("軌跡沒有取樣點")
+        origin = times[0] if origin is None else origin
+        self.times = [t - origin for t in times]
+        self.values = values
+        self.loop = loop
+        self.interpolate = interpolate
+        self.duration = self.times[-1]
+
+    def value(self, t: float):
+        if self.loop and self.duration > 0:
+            t = t % self.duration
+        index = bisect.bisect_right(self.times, t) - 1
+        if index < 0:
+            return self.values[0]
+        if index >= len(self.times) - 1:
+            return self.values[-1]
+        if not self.interpolate:
+            return self.values[index]
+        t0, t1 = self.times[index], self.times[index + 1]
+        v0, v1 = self.values[index], self.values[index + 1]
+        return v0 + (v1 - v0) * (t - t0) / (t1 - t0) if t1 > t0 else v1
+
+
+def _parse_time(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def load_csv_traces(
+    path: str,
+    columns: Optional[Dict[str, str]] = None,
+    loop: bool = True
+) -> Dict[str, Dict[str, Trace]]:
+    """
+    載入 CSV 軌跡
+
+    第一欄 (或 t / time / timestamp 欄) 為時間 (秒或 ISO 時間)，空值的取樣點略過。
+
+    Args:
+        path: CSV 檔
+        columns: 欄位 → "設備.設定欄位"，預設為後端測試記錄的欄位
+        loop: 播放完畢後從頭循環
+
+    Returns:
+        {設備: {設定欄位: 軌跡}}
+
+    Raises:
+        ValueError: 沒有可播放的欄位
+    """
+    mapping = (
+        {column: tuple(target.split(".", 1)) for column, target in columns.items()}
+        if columns else DATA_LOGGER_COLUMNS
+    )
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        raise ValueError(f"CSV 沒有資料: {path}")
+    time_column = next((c for c in TIME_COLUMNS if c in rows[0]), next(iter(rows[0])))
+    origin = min(_parse_time(row[time_column]) for row in rows)
+
+    traces: Dict[str, Dict[str, Trace]] = {}
+    for column, (device, field) in mapping.items():
+        if column not in rows[0]:
+            continue
+        points = [(_parse_time(row[time_column]), float(row[column])) for row in rows if row.get(column) not in ("", None)]
+        if points:
+            times, values = zip(*points)
+            traces.setdefault(device, {})[field] = Trace(list(times), list(values), loop, origin=origin)
+    if not traces:
+        raise ValueError(f"CSV 沒有可播放的欄位: {path}")
+    return traces
+
+
+def load_register_recording(path: str, loop: bool = True) -> Dict[str, Dict[int, Trace]]:
+    """
+    載入寄存器錄製檔 (pump_backend/utils/register_recording.py，JSON Lines)
+
+    Returns:
+        {設備: {位址: 軌跡 (寄存器值，維持前值)}}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries or "config" not in entries[0]:
+        raise ValueError(f"不是寄存器錄製檔: {path}")
+    samples: Dict[str, List[Tuple[float, int, List[int]]]] = {}
+    for entry in entries[1:]:
+        if entry.get("r"):
+            samples.setdefault(entry["d"], []).append((entry["t"], entry["a"], entry["r"]))
+    return _register_traces(samples, loop)
+
+
+def _capture_registers(channel: str, request: bytes, response: bytes) -> Optional[Tuple[int, int, List[int]]]:
+    """由讀取寄存器 (功能碼 3/4) 交換取出 (從站, 起始位址, 寄存器)"""
+    if channel.startswith("tcp:"):
+        request, response = request[6:], response[6:]
+    if len(request) < 4 or request[1] not in (3, 4) or len(response) < 3 or response[1] != request[1]:
+        return None
+    data = response[3:3 + response[2]]
+    registers = [int.from_bytes(data[i:i + 2], "big") for i in range(0, len(data) - 1, 2)]
+    return request[0], int.from_bytes(request[2:4], "big"), registers
+
+
+def load_bus_capture(
+    path: str,
+    devices: Dict[Tuple[str, int], str],
+    loop: bool = True
+) -> Dict[str, Dict[int, Trace]]:
+    """
+    載入匯流排錄製檔 (.buscap) 中成功的讀取寄存器回應
+
+    Args:
+        path: 錄製檔
+        devices: (通道名稱或 TCP 端口字串, 從站) → 設備名稱，
+            通道名稱如 "rtu:/dev/ttyUSB0"，TCP 通道 ("tcp:主機:端口") 也可只用端口 ("5021")
+
+    Returns:
+        {設備: {位址: 軌跡 (寄存器值，維持前值)}}
+    """
+    samples: Dict[str, List[Tuple[float, int, List[int]]]] = {}
+    channels: Dict[int, str] = {}
+    with open(path, "rb") as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"不是匯流排錄製檔: {path}")
+        f.read(CAPTURE_HEADER.size)
+        while True:
+            head = f.read(CAPTURE_RECORD.size)
+            if len(head) < CAPTURE_RECORD.size:
+                break
+            t, _, channel_id, unit, outcome, req_len, resp_len = CAPTURE_RECORD.unpack(head)
+            body = f.read(req_len + resp_len)
+            if len(body) < req_len + resp_len:
+                break
+            if outcome == CAPTURE_CHANNEL:
+                channels[channel_id] = body[:req_len].decode("utf-8")
+                continue
+            channel = channels.get(channel_id, "")
+            device = devices.get((channel, unit)) or devices.get((channel.rsplit(":", 1)[-1], unit))
+            if outcome != CAPTURE_OK or device is None:
+                continue
+            parsed = _capture_registers(channel, body[:req_len], body[req_len:])
+            if parsed:
+                samples.setdefault(device, []).append((t, parsed[1], parsed[2]))
+    return _register_traces(samples, loop)
+
+
+def _register_traces(
+    samples: Dict[str, List[Tuple[float, int, List[int]]]],
+    loop: bool
+) -> Dict[str, Dict[int, Trace]]:
+    """依位址拆分寄存器取樣 (共用錄製起點，維持設備間的時間關係)"""
+    if not samples:
+        return {}
+    origin = min(points[0][0] for points in samples.values())
+    traces: Dict[str, Dict[int, Trace]] = {}
+    for device, points in samples.items():
+        per_address: Dict[int, List[Tuple[float, int]]] = {}
+        for t, address, registers in points:
+            for offset, value in enumerate(registers):
+                per_address.setdefault(address + offset, []).append((t, value))
+        traces[device] = {
+            address: Trace([t for t, _ in values], [v for _, v in values], loop, interpolate=False, origin=origin)
+            for address, values in per_address.items()
+        }
+    return traces
+
+
+class DevicePlayback:
+    """單一設備的播放 (設定欄位與原始寄存器)"""
+
+    def __init__(self, clock: PlaybackClock):
+        self.clock = clock
+        self.fields: Dict[str, Any] = {}      # 設定欄位 → Generator / Trace
+        self.registers: Dict[int, Trace] = {}  # Holding Register 位址 → Trace
+
+    def values(self, now: float) -> Dict[str, float]:
+        """目前播放位置的設定值"""
+        t = self.clock.position(now)
+        return {field: source.value(t) for field, source in self.fields.items()}
+
+    def register_values(self, now: float) -> Dict[int, int]:
+        t = self.clock.position(now)
+        return {address: trace.value(t) for address, trace in self.registers.items()}
+
+
+class Playback:
+    """
+    模擬值播放設定
+
+    設定格式 (PLAYBACK_FILE，JSON / YAML):
+    {
+        "speed": 1.0,          # 播放倍速 (所有設備共用時鐘)
+        "loop": true,          # 播放完畢後循環
+        "devices": {"pressure_positive": {"pressure": {"type": "sine", "offset": 3, "amplitude": 1, "period": 20}}},
+        "traces": [
+            {"file": "traces/test.csv", "columns": {"欄位": "設備.設定欄位"}},  # columns 省略為後端測試記錄格式
+            {"file": "traces/test.jsonl"},    # 後端寄存器錄製檔
+            {"file": "traces/test.buscap"}    # 後端匯流排錄製檔 (依範本端口與 Slave ID 對應設備)
+        ]
+    }
+    CSV 與波形寫入設備設定 (與管理 API 相同的單位)；寄存器錄製直接寫入原始寄存器。
+    """
+
+    def __init__(self, spec: Dict[str, Any], base_dir: Optional[Path] = None,
+                 template: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Args:
+            spec: 播放設定
+            base_dir: 軌跡檔相對路徑的基準目錄
+            template: 設備範本 (匯流排錄製檔依端口與 Slave ID 對應設備)
+
+        Raises:
+            ValueError: 設定無效
+        """
+        self.speed = float(spec.get("speed", 1.0))
+        self.loop = bool(spec.get("loop", True))
+        self.generators = {
+            device: {field: Generator(generator, self.loop) for field, generator in fields.items()}
+            for device, fields in (spec.get("devices") or {}).items()
+        }
+        self.field_traces: Dict[str, Dict[str, Trace]] = {}
+        self.register_traces: Dict[str, Dict[int, Trace]] = {}
+        for entry in spec.get("traces") or []:
+            path = Path(entry["file"])
+            if base_dir is not None and not path.is_absolute():
+                path = base_dir / path
+            if path.suffix == ".csv":
+                for device, traces in load_csv_traces(str(path), entry.get("columns"), self.loop).items():
+                    self.field_traces.setdefault(device, {}).update(traces)
+            elif path.suffix == ".buscap":
+                devices = {
+                    (str(device.get("port")), device.get("slave_id")): name
+                    for name, device in (template or {}).items()
+                }
+                devices.update({tuple(key.rsplit("/", 1)): name for key, name in (entry.get("devices") or {}).items()})
+                devices = {(channel, int(unit)): name for (channel, unit), name in devices.items()}
+                for device, traces in load_bus_capture(str(path), devices, self.loop).items():
+                    self.register_traces.setdefault(device, {}).update(traces)
+            else:
+                for device, traces in load_register_recording(str(path), self.loop).items():
+                    self.register_traces.setdefault(device, {}).update(traces)
+            logger.info(f"🎞️ 已載入播放軌跡: {path}")
+
+    @classmethod
+    def load(cls, path: str, template: Optional[Dict[str, Dict[str, Any]]] = None) -> "Playback":
+        text = Path(path).read_text(encoding="utf-8")
+        spec = yaml.safe_load(text) if path.endswith((".yaml", ".yml")) else json.loads(text)
+        return cls(spec or {}, Path(path).parent, template)
+
+    @property
+    def devices(self) -> List[str]:
+        return sorted(set(self.generators) | set(self.field_traces) | set(self.register_traces))
+
+    def for_device(self, name: str, clock: PlaybackClock) -> Optional[DevicePlayback]:
+        """建立設備的播放 (沒有該設備的設定時返回 None)"""
+        if name not in self.devices:
+            return None
+        playback = DevicePlayback(clock)
+        playback.fields.update(self.field_traces.get(name, {}))
+        playback.fields.update(self.generators.get(name, {}))
+        playback.registers.update(self.register_traces.get(name, {}))
+        return playback
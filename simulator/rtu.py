@@ -0,0 +1,328 @@
+"""MODBUS RTU 模擬匯流排 (pty，無需 socat)"""
+import asyncio
+import os
+import pty
+import struct
+import time
+import tty
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from loguru import logger
+from pymodbus.constants import ExcCodes
+from pymodbus.exceptions import NoSuchIdException
+from faults import corrupt_crc
+
+PARITY_BITS = {"N": 0, "E": 1, "O": 1}
+BROADCAST_ID = 0
+
+
+def crc16(frame: bytes) -> int:
+    """MODBUS RTU CRC-16 (附加時低位元組在前)"""
+    crc = 0xFFFF
+    for byte in frame:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def with_crc(frame: bytes) -> bytes:
+    return frame + crc16(frame).to_bytes(2, "little")
+
+
+def request_length(buffer: bytes) -> Optional[int]:
+    """RTU 請求訊框長度 (資料不足或未知功能碼時返回 None)"""
+    if len(buffer) < 2:
+        return None
+    function = buffer[1]
+    if function in (1, 2, 3, 4, 5, 6):
+        return 8
+    if function in (15, 16):
+        return 9 + buffer[6] if len(buffer) >= 7 else None
+    return None
+
+
+@dataclass
+class SerialSettings:
+    """串口參數"""
+    baudrate: int = 19200
+    bytesize: int = 8
+    parity: str = "N"
+    stopbits: int = 1
+
+    @property
+    def char_time(self) -> float:
+        """一個字元的傳輸時間（秒）: 起始位元 + 資料位元 + 同位位元 + 停止位元"""
+        return (1 + self.bytesize + PARITY_BITS.get(self.parity, 0) + self.stopbits) / self.baudrate
+
+    @property
+    def frame_gap(self) -> float:
+        """訊框間隔 t3.5 (鮑率高於 19200 時規範固定為 1.75 ms)"""
+        return 3.5 * self.char_time if self.baudrate <= 19200 else 0.00175
+
+
+def _exception(function: int, code: ExcCodes) -> bytes:
+    return bytes([function | 0x80, int(code)])
+
+
+def _pack_bits(bits) -> bytes:
+    data = bytearray((len(bits) + 7) // 8)
+    for index, bit in enumerate(bits):
+        if bit:
+            data[index // 8] |= 1 << (index % 8)
+    return bytes(data)
+
+
+async def execute(store, function: int, data: bytes) -> bytes:
+    """
+    對設備上下文執行請求 (經由 async_getValues / async_setValues，故障注入同樣生效)
+
+    Returns:
+        回應 PDU (功能碼 + 資料)
+
+    Raises:
+        NoSuchIdException: 故障注入的不回應
+    """
+    try:
+        if function in (1, 2, 3, 4):
+            address, count = struct.unpack(">HH", data[:4])
+            if not 1 <= count <= (2000 if function in (1, 2) else 125):
+                return _exception(function, ExcCodes.ILLEGAL_VALUE)
+            values = await store.async_getValues(function, address, count)
+            if isinstance(values, ExcCodes):
+                return _exception(function, values)
+            if function in (1, 2):
+                payload = _pack_bits(values[:count])
+            else:
+                payload = b"".join((v & 0xFFFF).to_bytes(2, "big") for v in values[:count])
+            return bytes([function, len(payload)]) + payload
+        if function == 5:
+            address, value = struct.unpack(">HH", data[:4])
+            if value not in (0x0000, 0xFF00):
+                return _exception(function, ExcCodes.ILLEGAL_VALUE)
+            result = await store.async_setValues(function, address, [value == 0xFF00])
+        elif function == 6:
+            address, value = struct.unpack(">HH", data[:4])
+            result = await store.async_setValues(function, address, [value])
+        elif function == 15:
+            address, count, _ = struct.unpack(">HHB", data[:5])
+            bits = [bool(data[5 + i // 8] >> (i % 8) & 1) for i in range(count)]
+            result = await store.async_setValues(function, address, bits)
+        elif function == 16:
+            address, count, _ = struct.unpack(">HHB", data[:5])
+            registers = list(struct.unpack(f">{count}H", data[5:5 + 2 * count]))
+            result = await store.async_setValues(function, address, registers)
+        else:
+            return _exception(function, ExcCodes.ILLEGAL_FUNCTION)
+    except (struct.error, IndexError):
+        return _exception(function, ExcCodes.ILLEGAL_VALUE)
+    if isinstance(result, ExcCodes):
+        return _exception(function, result)
+    # 寫入單一線圈/寄存器回應原請求，寫入多筆回應位址與數量
+    return bytes([function]) + data[:4]
+
+
+class RtuBus:
+    """
+    MODBUS RTU 模擬匯流排
+
+    以 pty.openpty() 建立虛擬串口：後端開啟 pty 從端 (可建立符號連結，如 /dev/ttySIM0)，
+    模擬器讀寫主端。同一匯流排掛載多台設備，以 Slave ID 區分 (與實體 USB-RS485 轉換器相同)：
+    - 依功能碼判斷請求長度，訊框內字元間隔超過 t3.5 時捨棄不完整的訊框
+    - CRC 錯誤、不存在的 Slave ID 與故障注入的不回應皆不回應；廣播 (ID 0) 執行寫入但不回應
+    - 半雙工依序處理，回應於請求與回應在該鮑率下的傳輸時間加上 t3.5 後送出
+    - 故障注入的 CRC 錯誤在此翻轉回應訊框的 CRC
+    """
+
+    def __init__(
+        self,
+        name: str,
+        settings: SerialSettings,
+        devices: Optional[Dict[int, object]] = None,
+        link: Optional[str] = None,
+        emulate_timing: bool = True
+    ):
+        """
+        Args:
+            name: 匯流排名稱 (日誌用)
+            settings: 串口參數
+            devices: Slave ID → 模擬器
+            link: pty 從端的符號連結路徑 (None 表示不建立)
+            emulate_timing: 依鮑率延遲回應
+        """
+        self.name = name
+        self.settings = settings
+        self.devices: Dict[int, object] = dict(devices or {})
+        self.link = link
+        self.emulate_timing = emulate_timing
+        self.path: Optional[str] = None
+        self.stats = {"requests": 0, "responses": 0, "crc_errors": 0, "discarded": 0}
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._buffer = b""
+        self._frame_start = 0.0
+        self._last_rx = 0.0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def add_device(self, device):
+        """
+        Raises:
+            ValueError: Slave ID 重複
+        """
+        if device.slave_id in self.devices:
+            raise ValueError(f"匯流排 {self.name} 的 Slave ID {device.slave_id} 重複")
+        self.devices[device.slave_id] = device
+        return device
+
+    @property
+    def port(self) -> Optional[str]:
+        """後端開啟的串口路徑"""
+        return self.link or self.path
+
+    async def start(self):
+        """建立 pty 並開始處理請求"""
+        self._master, self._slave = pty.openpty()
+        # 從端保持開啟 (後端關閉串口時主端不會 EIO)，原始模式不回顯
+        tty.setraw(self._slave)
+        tty.setraw(self._master)
+        os.set_blocking(self._master, False)
+        self.path = os.ttyname(self._slave)
+        if self.link:
+            link = Path(self.link)
+            link.parent.mkdir(parents=True, exist_ok=True)
+            if link.is_symlink() or link.exists():
+                link.unlink()
+            link.symlink_to(self.path)
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self._master, self._on_readable)
+        self._task = asyncio.create_task(self._serve())
+        s = self.settings
+        logger.info(
+            f"🔌 RTU 匯流排 {self.name}: {self.port} ({s.baudrate}/{s.bytesize}/{s.parity}/{s.stopbits}, "
+            f"Slave ID {sorted(self.devices)})"
+        )
+
+    async def stop(self):
+        if self._master is not None:
+            asyncio.get_running_loop().remove_reader(self._master)
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+        if self.link and Path(self.link).is_symlink():
+            Path(self.link).unlink()
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._master, 4096)
+        except (BlockingIOError, OSError):
+            return
+        self.feed(data, time.monotonic())
+
+    def feed(self, data: bytes, now: float):
+        """接收資料並切分訊框"""
+        if self._buffer and now - self._last_rx > self.settings.frame_gap:
+            self.stats["discarded"] += 1
+            self._buffer = b""
+        if not self._buffer:
+            self._frame_start = now
+        self._buffer += data
+        self._last_rx = now
+        while self._buffer:
+            length = request_length(self._buffer)
+            if length is None or len(self._buffer) < length:
+                break
+            frame, self._buffer = self._buffer[:length], self._buffer[length:]
+            self._queue.put_nowait((frame, self._frame_start))
+            self._frame_start = now
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._buffer and request_length(self._buffer) is None and len(self._buffer) >= 2:
+            # 未知功能碼: 以訊框間隔判斷結束
+            self._flush_handle = asyncio.get_running_loop().call_later(self.settings.frame_gap, self._flush_unknown)
+
+    def _flush_unknown(self):
+        self._flush_handle = None
+        if self._buffer:
+            self._queue.put_nowait((self._buffer, self._frame_start))
+            self._buffer = b""
+
+    async def handle(self, frame: bytes) -> Optional[bytes]:
+        """
+        處理一個請求訊框
+
+        Returns:
+            回應訊框 (含 CRC)，不回應時為 None
+        """
+        self.stats["requests"] += 1
+        if len(frame) < 4 or crc16(frame[:-2]) != int.from_bytes(frame[-2:], "little"):
+            self.stats["crc_errors"] += 1
+            return None
+        unit, function, data = frame[0], frame[1], frame[2:-2]
+        if unit == BROADCAST_ID:
+            if function in (5, 6, 15, 16):
+                for device in self.devices.values():
+                    try:
+                        await execute(device.store, function, data)
+                    except NoSuchIdException:
+                        pass
+            return None
+        device = self.devices.get(unit)
+        if device is None:
+            return None
+        try:
+            pdu = await execute(device.store, function, data)
+        except NoSuchIdException:
+            return None
+        response = with_crc(bytes([unit]) + pdu)
+        if getattr(device.store, "pending_corrupt", False):
+            device.store.pending_corrupt = False
+            response = corrupt_crc(response)
+        return response
+
+    def response_delay(self, request: bytes, response: bytes) -> float:
+        """請求與回應的線路傳輸時間加上訊框間隔（秒）"""
+        return (len(request) + len(response)) * self.settings.char_time + self.settings.frame_gap
+
+    async def _serve(self):
+        while True:
+            frame, started = await self._queue.get()
+            try:
+                response = await self.handle(frame)
+            except Exception as e:
+                logger.error(f"❌ RTU 匯流排 {self.name} 處理請求失敗: {e}")
+                continue
+            if response is None:
+                continue
+            if self.emulate_timing:
+                remaining = started + self.response_delay(frame, response) - time.monotonic()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+            try:
+                os.write(self._master, response)
+                self.stats["responses"] += 1
+            except OSError as e:
+                logger.warning(f"⚠️ RTU 匯流排 {self.name} 寫入失敗: {e}")
+
+
+def parse_serial(spec: Dict) -> Tuple[SerialSettings, list]:
+    """由範本的匯流排設定取得 (串口參數, 設備名稱)"""
+    settings = SerialSettings(
+        baudrate=int(spec.get("baudrate", 19200)),
+        bytesize=int(spec.get("bytesize", 8)),
+        parity=str(spec.get("parity", "N"))[0].upper(),
+        stopbits=int(spec.get("stopbits", 1)),
+    )
+    return settings, list(spec.get("devices") or [])
@@ -8,6 +8,9 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / "pump_backend"))
+# 模擬器模組以頂層名稱互相匯入 (engine / plant / devices)，置於最後避免遮蔽後端模組
+sys.path.append(str(project_root / "simulator"))
+sys.path.append(str(project_root / "serial-bridge"))
 
 # 確保 markdown_report 插件被載入
 pytest_plugins = ["tests.markdown_report"]
@@ -21,6 +24,15 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture
+def mqtt_client(tmp_path):
+    """未連線的 MQTT 客戶端 (離線緩衝區使用暫存目錄)"""
+    from pump_backend.core.mqtt_client import MQTTClient
+    client = MQTTClient(broker="localhost", port=1883, buffer_dir=str(tmp_path / "mqtt_buffer"))
+    yield client
+    client.offline_buffer.close()
+
+
 @pytest.fixture(scope="session")
 def test_config():
     """測試配置"""
@@ -0,0 +1,179 @@
+"""匯流排封包錄製測試"""
+import asyncio
+import socket
+import pytest
+from config.settings import settings
+from pymodbus.server import ModbusTcpServer
+from pymodbus.datastore import ModbusDeviceContext, ModbusServerContext, ModbusSequentialDataBlock
+from pump_backend.drivers import bus_capture
+from pump_backend.drivers.bus_capture import BusCapture, CaptureReader
+from pump_backend.drivers.pressure_sensor import PressureSensorDriver
+from pump_backend.core.station_mqtt import StationMQTTClient
+from pump_backend.services import test_automation
+
+
+def rtu_request(unit, address, count):
+    return bytes([unit, 3]) + address.to_bytes(2, "big") + count.to_bytes(2, "big") + b"\x00\x00"
+
+
+def rtu_response(unit, registers):
+    data = b"".join(r.to_bytes(2, "big") for r in registers)
+    return bytes([unit, 3, len(data)]) + data + b"\x00\x00"
+
+
+@pytest.mark.unit
+class TestBusCapture:
+    """匯流排封包錄製測試類"""
+
+    def test_rtu_exchanges_are_paired(self, tmp_path):
+        """RTU 請求與分段接收的回應應配對，未回應的請求記錄為逾時"""
+        capture = BusCapture(str(tmp_path))
+        channel = capture.channel("rtu:/dev/ttyUSB0", "rtu")
+
+        channel.trace(True, rtu_request(1, 0x1000, 1))
+        response = rtu_response(1, [523])
+        channel.trace(False, response[:3])
+        channel.trace(False, response[3:])
+        channel.trace(True, rtu_request(2, 0x0000, 2))  # 無回應
+        channel.trace(True, rtu_request(2, 0x0000, 2))
+        channel.trace(False, bytes([2, 0x83, 0x02, 0, 0]))  # 例外回應
+        capture.close()
+
+        records = list(CaptureReader(str(capture.path)).records())
+        assert [r.outcome for r in records] == ["ok", "timeout", "exception"]
+        assert records[0].unit == 1 and records[0].registers() == [523]
+        assert records[0].latency >= 0
+        assert records[1].unit == 2 and records[1].registers() is None
+
+    def test_index_seeks_by_device_and_time(self, tmp_path):
+        """依設備與時間讀取時只返回符合的紀錄"""
+        capture = BusCapture(str(tmp_path), index_interval=0.0)
+        channel = capture.channel("rtu:/dev/ttyUSB0", "rtu")
+        for i in range(200):
+            unit = 1 + i % 2
+            channel.trace(True, rtu_request(unit, 0, 1))
+            channel.trace(False, rtu_response(unit, [i]))
+        capture.close()
+
+        reader = CaptureReader(str(capture.path))
+        unit2 = list(reader.records(channel="rtu:/dev/ttyUSB0", unit=2))
+        assert [r.registers()[0] for r in unit2] == list(range(1, 200, 2))
+        middle = unit2[50].t
+        later = list(reader.records(unit=2, start=middle))
+        assert later[0].t == middle and len(later) == 50
+        assert list(reader.records(channel="tcp:unknown:502")) == []
+
+    def test_rotate_keeps_recent_files(self, tmp_path):
+        """輪替後每個檔案可單獨讀取，並只保留最近的檔案"""
+        capture = BusCapture(str(tmp_path), max_files=2)
+        channel = capture.channel("rtu:/dev/ttyUSB0", "rtu")
+        paths = []
+        for label in ("test_a", "test_b", "test_c"):
+            paths.append(capture.rotate(label))
+            channel.trace(True, rtu_request(1, 0, 1))
+            channel.trace(False, rtu_response(1, [7]))
+        capture.close()
+
+        assert sorted(p.name for p in tmp_path.glob("*.buscap")) == sorted(p.name for p in paths[1:])
+        reader = CaptureReader(str(paths[-1]))
+        assert reader.channels == {0: "rtu:/dev/ttyUSB0"}
+        assert [r.registers() for r in reader.records()] == [[7]]
+
+    def test_rotates_by_size(self, tmp_path):
+        """日誌檔超過大小上限時輪替，請求與回應跨檔時於新檔配對"""
+        capture = BusCapture(str(tmp_path), max_bytes=200)
+        channel = capture.channel("rtu:/dev/ttyUSB0", "rtu")
+        first = capture.path
+        for i in range(10):
+            channel.trace(True, rtu_request(1, 0, 1))
+            channel.trace(False, rtu_response(1, [i]))
+        capture.close()
+
+        paths = sorted(tmp_path.glob("*.buscap"), key=lambda p: p.stat().st_mtime)
+        assert len(paths) > 1 and paths[0] == first
+        values = [r.registers()[0] for path in paths for r in CaptureReader(str(path)).records()]
+        assert values == list(range(10))
+
+    def test_markers_do_not_split_records(self, tmp_path):
+        """標記寫入同一日誌，不影響交換紀錄的讀取"""
+        capture = BusCapture(str(tmp_path))
+        channel = capture.channel("rtu:/dev/ttyUSB0", "rtu")
+        channel.trace(True, rtu_request(1, 0, 1))
+        capture.mark("test_start A t1")
+        channel.trace(False, rtu_response(1, [5]))
+        capture.mark("test_end A t1")
+        capture.close()
+
+        reader = CaptureReader(str(capture.path))
+        assert [m.label for m in reader.markers] == ["test_start A t1", "test_end A t1"]
+        records = list(reader.records())
+        assert [r.registers() for r in records] == [[5]]
+
+
+@pytest.mark.unit
+def test_stations_share_one_capture(tmp_path, monkeypatch, mqtt_client):
+    """多工作站的測試開始/結束只寫入標記，不切斷其他工作站進行中的測試錄製"""
+    capture = BusCapture(str(tmp_path))
+    monkeypatch.setattr(test_automation, "get_bus_capture", lambda: capture)
+    station_a = test_automation.TestAutomation(StationMQTTClient(mqtt_client, "A"), None, None)
+    station_b = test_automation.TestAutomation(StationMQTTClient(mqtt_client, "B"), None, None)
+    channel = capture.channel("rtu:/dev/ttyUSB0", "rtu")
+
+    def exchange(value):
+        channel.trace(True, rtu_request(1, 0, 1))
+        channel.trace(False, rtu_response(1, [value]))
+
+    station_a.evaluator.begin({"test_id": "t1"})
+    station_a._mark_bus_capture("test_start")
+    exchange(1)
+    station_b.evaluator.begin({"test_id": "t1"})
+    station_b._mark_bus_capture("test_start")
+    exchange(2)
+    station_b._mark_bus_capture("test_end")
+    exchange(3)
+    station_a._mark_bus_capture("test_end")
+    capture.close()
+
+    assert list(tmp_path.glob("*.buscap")) == [capture.path]
+    reader = CaptureReader(str(capture.path))
+    assert [m.label for m in reader.markers] == [
+        "test_start A t1", "test_start B t1", "test_end B t1", "test_end A t1"
+    ]
+    start, end = reader.markers[0].t, reader.markers[-1].t
+    assert [r.registers()[0] for r in reader.records(start=start, end=end)] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+async def test_capture_real_tcp_exchange(tmp_path, monkeypatch):
+    """驅動程式經 pymodbus TCP 讀取時應錄製原始 MBAP 訊框"""
+    monkeypatch.setattr(settings, "BUS_CAPTURE_DIR", str(tmp_path / "capture"))
+    monkeypatch.setattr(bus_capture, "_capture", None)
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    registers = [0] * 5000
+    registers[0x1000] = 321
+    store = ModbusDeviceContext(hr=ModbusSequentialDataBlock(1, registers))
+    server = ModbusTcpServer(ModbusServerContext(devices={5: store}, single=False), address=("127.0.0.1", port))
+    server_task = asyncio.create_task(server.serve_forever())
+    await asyncio.sleep(0.2)
+
+    driver = PressureSensorDriver("positive", {
+        "port": "127.0.0.1", "tcp_port": port, "use_tcp": True, "slave_id": 5, "timeout": 1.0
+    })
+    try:
+        assert await driver.connect()
+        assert await driver.read_pressure() == pytest.approx(32.1)
+    finally:
+        await driver.disconnect_async()
+        await server.shutdown()
+        server_task.cancel()
+
+    capture = bus_capture.get_bus_capture()
+    capture.close()
+    records = list(CaptureReader(str(capture.path)).records(channel=f"tcp:127.0.0.1:{port}", unit=5))
+    assert len(records) == 1
+    assert records[0].function == 3 and records[0].registers() == [321]
+    assert records[0].outcome == "ok"
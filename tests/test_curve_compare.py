@@ -0,0 +1,69 @@
+"""曲線記錄與相似度計算測試"""
+import math
+import pytest
+import time
+from pump_backend.utils.curve_compare import (
+    CurveRecorder, uniform_grid, resample, rmse, dtw_distance, compare_curves
+)
+
+
+def vacuum_curve(t: float, rate: float = 0.9) -> float:
+    """模擬抽真空曲線"""
+    return -95.0 * (1 - rate ** t)
+
+
+@pytest.mark.unit
+class TestCurveCompare:
+    """曲線比較測試類"""
+
+    def test_recorder_bins_samples(self):
+        """同一時間格內的樣本應合併為平均值"""
+        recorder = CurveRecorder(resolution=1.0)
+        for t, v in [(0.0, 1.0), (0.5, 3.0), (1.2, 5.0), (2.1, 7.0), (2.9, 9.0)]:
+            recorder.add(t, v)
+
+        assert len(recorder) == 3
+        assert recorder.values == [2.0, 5.0, 8.0]
+        assert recorder.times[0] == pytest.approx(0.25)
+        assert recorder.duration == pytest.approx(2.5)
+
+    def test_resample_interpolates_and_clamps(self):
+        """線性內插，超出範圍取端點值"""
+        values = resample([1.0, 3.0], [10.0, 30.0], [0.0, 2.0, 3.0, 5.0])
+        assert values == [10.0, 20.0, 30.0, 30.0]
+        assert uniform_grid(10.0, 3) == [0.0, 5.0, 10.0]
+
+    def test_dtw_matches_rmse_on_diagonal(self):
+        """相同長度的曲線只有振幅差異時 DTW 不大於 RMSE"""
+        a = [vacuum_curve(t) for t in range(50)]
+        b = [v * 1.05 for v in a]
+        assert dtw_distance(a, a, band=5) == 0.0
+        assert dtw_distance(a, b, band=5) <= rmse(a, b) + 1e-9
+
+    def test_dtw_tolerates_time_shift(self):
+        """時間微幅偏移時 DTW 應明顯小於 RMSE"""
+        grid = uniform_grid(60.0, 200)
+        reference = [vacuum_curve(t) for t in grid]
+        shifted = [vacuum_curve(max(t - 2.0, 0.0)) for t in grid]
+
+        rel_rmse, rel_dtw = compare_curves(reference, shifted, band_ratio=0.1)
+        assert rel_dtw < rel_rmse / 2
+
+    def test_deviating_unit_scores_high(self):
+        """抽氣能力不足的曲線應有大偏差"""
+        grid = uniform_grid(60.0, 200)
+        reference = [vacuum_curve(t) for t in grid]
+        weak = [0.6 * vacuum_curve(t, rate=0.95) for t in grid]
+
+        _, rel_dtw = compare_curves(reference, weak)
+        assert rel_dtw > 0.3
+
+    def test_comparison_runs_in_milliseconds(self):
+        """200 點、10% 限制帶的比較應在數毫秒內完成"""
+        grid = uniform_grid(60.0, 200)
+        reference = [vacuum_curve(t) for t in grid]
+        candidate = [vacuum_curve(t) + 0.5 * math.sin(t) for t in grid]
+
+        started = time.perf_counter()
+        compare_curves(reference, candidate)
+        assert time.perf_counter() - started < 0.05
@@ -0,0 +1,140 @@
+"""串流測試結果評估測試"""
+import pytest
+import random
+from models.enums import TestState
+from pump_backend.services.test_evaluator import TestEvaluator as Evaluator
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestEvaluator:
+    """測試結果評估測試類"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def evaluator(self, mqtt_client, clock):
+        evaluator = Evaluator(mqtt_client, steady_window=3.0, steady_tolerance=0.01, clock=clock)
+        evaluator.start()
+        return evaluator
+
+    def run_vacuum(self, mqtt_client, clock, pressures, currents):
+        """每秒發布一筆真空壓力與 DC 電流"""
+        for pressure, current in zip(pressures, currents):
+            clock.now += 1.0
+            mqtt_client.publish_nowait("pump/sensors/pressure/vacuum", {"pressure_kpa": pressure})
+            mqtt_client.publish_nowait("pump/sensors/power/dc", {"current": current})
+
+    async def test_vacuum_record(self, mqtt_client, clock, evaluator):
+        """真空測試應計算最大/平均壓力與恆壓電流"""
+        evaluator.begin({"test_id": "t1", "mode": "vacuum", "criteria": {"pressure": -90}})
+        pressures = [-20.0, -60.0, -90.0, -95.0, -95.2, -95.1, -95.3, -95.2]
+        currents = [2.0, 4.0, 6.0, 7.0, 6.8, 6.8, 6.8, 6.8]
+        self.run_vacuum(mqtt_client, clock, pressures, currents)
+
+        record = await evaluator.finish(TestState.COMPLETED)
+
+        assert record["max_pressure"] == -95.3
+        assert record["avg_pressure"] == pytest.approx(sum(pressures) / len(pressures))
+        assert record["pressure_unit"] == "kPa"
+        assert record["power_type"] == "dc"
+        assert record["max_current_a"] == 7.0
+        assert record["avg_current_a"] == pytest.approx(sum(currents) / len(currents))
+        assert record["constant_pressure_current_a"] == pytest.approx(6.8)
+        assert record["duration_s"] == 8.0
+        assert record["result"] == "PASS"
+
+        # 未連線: 測試紀錄進入離線緩衝區
+        buffered = mqtt_client.offline_buffer.read_batch()
+        assert buffered[0]["t"] == "pump/test/record"
+        assert buffered[0]["p"]["test_id"] == "t1"
+
+    async def test_fail_criteria(self, mqtt_client, clock, evaluator):
+        """未達壓力或電流超限應判定 FAIL"""
+        evaluator.begin({"mode": "vacuum", "criteria": {"pressure": -90, "max_current": 5.0}})
+        self.run_vacuum(mqtt_client, clock, [-50.0, -60.0], [5.5, 6.0])
+
+        record = await evaluator.finish(TestState.COMPLETED)
+
+        assert record["result"] == "FAIL"
+        assert len(record["fail_reasons"]) == 2
+        assert record["constant_pressure_current_a"] is None
+
+    async def test_stopped_test_fails(self, mqtt_client, clock, evaluator):
+        """未完成的測試應判定 FAIL"""
+        evaluator.begin({"mode": "vacuum"})
+        record = await evaluator.finish(TestState.STOPPED)
+
+        assert record["result"] == "FAIL"
+        assert record["max_pressure"] is None
+
+    async def test_pause_excludes_samples(self, mqtt_client, clock, evaluator):
+        """暫停期間的數據與時間不應列入"""
+        evaluator.begin({"mode": "vacuum"})
+        self.run_vacuum(mqtt_client, clock, [-50.0], [3.0])
+        evaluator.pause()
+        self.run_vacuum(mqtt_client, clock, [-99.0], [9.0])
+        evaluator.resume()
+        self.run_vacuum(mqtt_client, clock, [-60.0], [4.0])
+
+        record = await evaluator.finish(TestState.COMPLETED)
+
+        assert record["max_pressure"] == -60.0
+        assert record["max_current_a"] == 4.0
+        assert record["duration_s"] == 2.0
+
+    async def test_finish_without_begin(self, evaluator):
+        """未開始評估時不應發布紀錄"""
+        assert await evaluator.finish(TestState.FAILED) is None
+
+    async def test_early_fail_on_predicted_pressure(self, mqtt_client, clock, evaluator):
+        """預測最終真空度確定未達規格時應提前中止"""
+        aborts = []
+        evaluator.on_abort = lambda reason, details: aborts.append((clock.now, details))
+        evaluator.begin({"mode": "vacuum", "criteria": {"pressure": -90}})
+        rng = random.Random(1)
+        for t in range(1, 121):
+            clock.now = float(t)
+            pressure = -60.0 * (1 - 0.9 ** t) + rng.gauss(0, 0.3)
+            mqtt_client.publish_nowait("pump/sensors/pressure/vacuum", {"pressure_kpa": pressure})
+
+        assert len(aborts) == 1
+        aborted_at, details = aborts[0]
+        assert aborted_at < 30, "應在數個時間常數內提前判定"
+        assert details["signal"] == "pressure"
+        assert details["predicted"] == pytest.approx(-60.0, abs=3.0)
+
+        record = await evaluator.finish(TestState.FAILED)
+        assert record["early_fail"]["limit"] == -90
+        assert record["result"] == "FAIL"
+
+    async def test_good_unit_not_aborted(self, mqtt_client, clock, evaluator):
+        """預測可達規格的幫浦不應中止"""
+        aborts = []
+        evaluator.on_abort = lambda reason, details: aborts.append(details)
+        evaluator.begin({"mode": "vacuum", "criteria": {"pressure": -90, "max_current": 8.0}})
+        rng = random.Random(2)
+        for t in range(1, 61):
+            clock.now = float(t)
+            mqtt_client.publish_nowait(
+                "pump/sensors/pressure/vacuum",
+                {"pressure_kpa": -95.0 * (1 - 0.9 ** t) + rng.gauss(0, 0.3)}
+            )
+            mqtt_client.publish_nowait("pump/sensors/power/dc", {"current": 6.0 * (1 - 0.8 ** t)})
+
+        record = await evaluator.finish(TestState.COMPLETED)
+        assert aborts == []
+        assert record["result"] == "PASS"
+        assert record["early_fail"] is None
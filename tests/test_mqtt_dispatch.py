@@ -0,0 +1,41 @@
+"""MQTT 訊息分派測試"""
+import pytest
+from aiomqtt import Message
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+@pytest.mark.mqtt
+class TestMessageDispatch:
+    """訊息分派測試類"""
+
+    async def test_unsubscribed_topic_is_not_decoded(self, mqtt_client):
+        """無訂閱者的主題不應解碼 (無效 JSON 也不會報錯)"""
+        await mqtt_client._handle_message(
+            Message("pump/sensors/flow", b"not json", 0, False, 0, None)
+        )
+        assert mqtt_client.messages_skipped == 1
+
+    async def test_json_payload_dispatch(self, mqtt_client):
+        """JSON 訊息應解碼後交給同步或非同步回調"""
+        received = []
+
+        async def on_flow(payload):
+            received.append(payload)
+
+        mqtt_client.subscribe("pump/sensors/flow", on_flow)
+        await mqtt_client._handle_message(
+            Message("pump/sensors/flow", '{"instantaneous": 12.5, "單位": "L/min"}'.encode(), 0, False, 0, None)
+        )
+        assert received == [{"instantaneous": 12.5, "單位": "L/min"}]
+
+    async def test_raw_subscription_receives_memoryview(self, mqtt_client):
+        """raw 訂閱應收到未解碼的 memoryview"""
+        received = []
+        mqtt_client.subscribe(
+            "pump/sensors/flow", lambda payload: received.append(bytes(payload)), raw=True
+        )
+        await mqtt_client._handle_message(
+            Message("pump/sensors/flow", b"\x01\x02raw", 0, False, 0, None)
+        )
+        assert received == [b"\x01\x02raw"]
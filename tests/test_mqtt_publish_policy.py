@@ -0,0 +1,97 @@
+"""MQTT 發布策略與發布管線測試"""
+import pytest
+import asyncio
+from config.settings import settings
+from pump_backend.core.mqtt_client import MQTTClient
+
+
+class FakeClient:
+    """模擬 aiomqtt Client，記錄發布內容"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.published = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def publish(self, topic, payload, qos=0, retain=False):
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        await asyncio.sleep(self.delay)
+        self.concurrent -= 1
+        self.published.append((topic, payload, qos, retain))
+
+
+@pytest.mark.unit
+@pytest.mark.mqtt
+class TestPublishPolicy:
+    """QoS 策略測試類"""
+
+    def test_telemetry_uses_qos0(self, mqtt_client):
+        """遙測主題應使用 QoS 0"""
+        assert mqtt_client.resolve_qos("pump/sensors/flow") == 0
+        assert mqtt_client.resolve_qos("pump/sensors/power/dc") == 0
+        assert mqtt_client.resolve_qos("pump/safety/status") == 0
+
+    def test_commands_and_alerts_keep_qos(self, mqtt_client):
+        """命令與警報應維持 QoS 1/2"""
+        assert mqtt_client.resolve_qos("pump/control/valve") == 1
+        assert mqtt_client.resolve_qos("pump/test/record") == 1
+        assert mqtt_client.resolve_qos("pump/system/alert") == 2
+
+    def test_unknown_topic_uses_default(self, mqtt_client):
+        """未列於策略的主題使用預設 QoS"""
+        assert mqtt_client.resolve_qos("other/topic") == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+@pytest.mark.mqtt
+class TestPublishPipeline:
+    """發布佇列測試類"""
+
+    async def test_publish_nowait_pipelines(self, mqtt_client):
+        """佇列中的訊息應並行發送，且不超過在途上限"""
+        fake = FakeClient(delay=0.01)
+        mqtt_client.client = fake
+        mqtt_client._publish_task = asyncio.create_task(mqtt_client._publish_loop())
+
+        for i in range(50):
+            assert mqtt_client.publish_nowait("pump/sensors/flow", {"i": i})
+
+        await mqtt_client.flush(timeout=2.0)
+
+        assert len(fake.published) == 50, "所有訊息都應被發送"
+        assert fake.published[0][2] == 0, "遙測應以 QoS 0 發送"
+        assert 1 < fake.max_concurrent <= 20, "應管線化發送且遵守在途上限"
+
+        metrics = mqtt_client.get_publish_metrics()
+        assert metrics["published"] == 50
+        assert metrics["queue_depth"] == 0
+        assert metrics["in_flight"] == 0
+
+        mqtt_client._publish_task.cancel()
+
+    async def test_full_queue_drops_only_telemetry(self, tmp_path, monkeypatch):
+        """佇列已滿時只捨棄 QoS 0 遙測，警報與命令仍加入佇列"""
+        monkeypatch.setattr(settings, "MQTT_PUBLISH_QUEUE_SIZE", 3)
+        mqtt_client = MQTTClient(broker="localhost", port=1883, buffer_dir=str(tmp_path))
+        for i in range(3):
+            assert mqtt_client.publish_nowait("pump/sensors/flow", {"i": i})
+
+        assert not mqtt_client.publish_nowait("pump/sensors/flow", {"i": 3})
+        assert mqtt_client.publish_nowait("pump/system/alert", {"type": "emergency"})
+        assert mqtt_client.publish_nowait("pump/control/valve", {"valve": "A"})
+
+        metrics = mqtt_client.get_publish_metrics()
+        assert metrics["dropped"] == 1
+        assert metrics["queue_depth"] == 5
+
+    async def test_explicit_qos_overrides_policy(self, mqtt_client):
+        """明確指定的 QoS 應覆蓋策略"""
+        fake = FakeClient()
+        mqtt_client.client = fake
+
+        await mqtt_client.publish("pump/sensors/flow", {"v": 1}, qos=2)
+
+        assert fake.published[0][2] == 2
@@ -0,0 +1,99 @@
+"""MQTT 請求/回應 (RPC) 測試"""
+import pytest
+import asyncio
+import json
+from aiomqtt import Message
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from pump_backend.core.mqtt_client import MQTTClient
+
+
+class FakeClient:
+    """模擬 aiomqtt Client，記錄發布內容與屬性"""
+
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, topic, payload, qos=0, retain=False, properties=None):
+        self.published.append((topic, json.loads(payload), properties))
+
+
+def make_message(topic, payload, response_topic=None, correlation=None):
+    """建立帶有 MQTT v5 屬性的訊息"""
+    props = Properties(PacketTypes.PUBLISH)
+    if response_topic:
+        props.ResponseTopic = response_topic
+    if correlation is not None:
+        props.CorrelationData = correlation
+    return Message(topic, json.dumps(payload).encode(), 1, False, 1, props)
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+@pytest.mark.mqtt
+class TestMQTTRpc:
+    """RPC 測試類"""
+
+    @pytest.fixture
+    def mqtt_client(self, tmp_path):
+        client = MQTTClient(broker="localhost", port=1883, client_id="ui-1", buffer_dir=str(tmp_path))
+        client.client = FakeClient()
+        yield client
+        client.offline_buffer.close()
+
+    async def test_request_resolves_by_correlation(self, mqtt_client):
+        """回應應依 correlation-data 對應到請求"""
+        task = asyncio.create_task(
+            mqtt_client.request("pump/control/valve", {"valve": "A", "state": True})
+        )
+        await asyncio.sleep(0)
+
+        topic, payload, props = mqtt_client.client.published[0]
+        assert topic == "pump/control/valve"
+        assert props.ResponseTopic == "pump/rpc/response/ui-1"
+
+        await mqtt_client._handle_message(make_message(
+            props.ResponseTopic, {"status": "success"}, correlation=props.CorrelationData
+        ))
+
+        assert await task == {"status": "success"}
+        assert mqtt_client.get_publish_metrics()["rpc_pending"] == 0
+
+    async def test_request_timeout(self, mqtt_client):
+        """逾時未回應應拋出 TimeoutError 並清除待處理請求"""
+        with pytest.raises(asyncio.TimeoutError):
+            await mqtt_client.request("pump/control/power", {}, timeout=0.05)
+        assert mqtt_client.metrics.rpc_timeouts == 1
+        assert not mqtt_client._pending_requests
+
+    async def test_handler_replies_to_response_topic(self, mqtt_client):
+        """請求處理器的回應應發布到請求者的回應主題，不回發到命令主題"""
+        mqtt_client.register_rpc_handler(
+            "pump/control/valve",
+            lambda payload: {"status": "success", "valve": payload["valve"]},
+            "pump/control/valve/status"
+        )
+
+        await mqtt_client._handle_message(make_message(
+            "pump/control/valve", {"valve": "B"},
+            response_topic="pump/rpc/response/ui-2", correlation=b"abc"
+        ))
+
+        topic, payload, props = mqtt_client.client.published[-1]
+        assert topic == "pump/rpc/response/ui-2"
+        assert payload == {"status": "success", "valve": "B"}
+        assert props.CorrelationData == b"abc"
+
+    async def test_legacy_request_replies_to_status_topic(self, mqtt_client):
+        """未帶回應主題的舊版請求應回覆至狀態主題"""
+        mqtt_client.register_rpc_handler(
+            "pump/control/power",
+            lambda payload: {"status": "success"},
+            "pump/control/power/status"
+        )
+
+        await mqtt_client._handle_message(
+            Message("pump/control/power", b'{"power_type": "dc"}', 1, False, 1, None)
+        )
+
+        assert mqtt_client.client.published[-1][0] == "pump/control/power/status"
@@ -0,0 +1,106 @@
+"""MQTT 離線緩衝區測試"""
+import pytest
+import asyncio
+from config.settings import settings
+from pump_backend.core.offline_buffer import OfflineBuffer
+from pump_backend.core.mqtt_client import MQTTClient
+
+
+@pytest.mark.unit
+@pytest.mark.mqtt
+class TestOfflineBuffer:
+    """離線緩衝區測試類"""
+
+    def test_replay_in_order(self, tmp_path):
+        """應依寫入順序讀出，commit 後不再重複"""
+        buffer = OfflineBuffer(str(tmp_path), segment_bytes=200)
+        for i in range(20):
+            buffer.append("pump/sensors/flow", {"i": i}, 0, False)
+        assert buffer.pending() == 20
+
+        received = []
+        while buffer.pending():
+            batch = buffer.read_batch(7)
+            received.extend(r["p"]["i"] for r in batch)
+            buffer.commit()
+
+        assert received == list(range(20)), "重送順序應與寫入順序一致"
+        assert buffer.read_batch(10) == []
+
+    def test_uncommitted_batch_is_reread(self, tmp_path):
+        """未 commit 的批次應在下次讀取時重新取得"""
+        buffer = OfflineBuffer(str(tmp_path))
+        for i in range(5):
+            buffer.append("pump/test/record", {"i": i}, 1, False)
+
+        first = buffer.read_batch(3)
+        again = buffer.read_batch(3)
+        assert [r["p"] for r in first] == [r["p"] for r in again]
+
+    def test_resume_after_restart(self, tmp_path):
+        """程序重啟後應從游標位置接續"""
+        buffer = OfflineBuffer(str(tmp_path))
+        for i in range(10):
+            buffer.append("pump/sensors/flow", {"i": i}, 0, False)
+        buffer.read_batch(4)
+        buffer.commit()
+        buffer.close()
+
+        reopened = OfflineBuffer(str(tmp_path))
+        assert reopened.pending() == 6
+        assert reopened.read_batch(1)[0]["p"] == {"i": 4}
+
+    def test_capacity_limit_drops_oldest(self, tmp_path):
+        """超過容量上限時應捨棄最舊的區段"""
+        buffer = OfflineBuffer(str(tmp_path), max_bytes=1000, segment_bytes=200)
+        for i in range(100):
+            buffer.append("pump/sensors/flow", {"i": i}, 0, False)
+
+        assert buffer.dropped > 0
+        assert buffer.pending() == 100 - buffer.dropped
+        batch = buffer.read_batch(1000)
+        assert batch[-1]["p"] == {"i": 99}, "最新的訊息應保留"
+
+
+class FakeClient:
+    """模擬 aiomqtt Client"""
+
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, topic, payload, qos=0, retain=False):
+        self.published.append((topic, payload))
+
+    async def subscribe(self, topics):
+        pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+@pytest.mark.mqtt
+class TestStoreAndForward:
+    """斷線暫存與重送測試類"""
+
+    async def test_buffer_while_disconnected_and_replay(self, tmp_path, monkeypatch):
+        """斷線期間的遙測應暫存，重連後依序重送，非暫存主題則捨棄"""
+        monkeypatch.setattr(settings, "MQTT_REPLAY_RATE", 10000)
+        mqtt_client = MQTTClient(broker="localhost", port=1883, buffer_dir=str(tmp_path))
+
+        for i in range(5):
+            await mqtt_client.publish("pump/sensors/flow", {"i": i})
+        await mqtt_client.publish("pump/safety/status", {"x": 1})
+
+        assert mqtt_client.offline_buffer.pending() == 5
+        assert mqtt_client.metrics.dropped == 1
+
+        # 模擬重新連線
+        fake = FakeClient()
+        await mqtt_client._on_connected(fake)
+        assert mqtt_client.is_connected
+        await mqtt_client._replay_task
+
+        assert [p for _, p in fake.published] == [
+            f'{{"i": {i}}}' for i in range(5)
+        ]
+        assert mqtt_client.offline_buffer.pending() == 0
+        mqtt_client.offline_buffer.close()
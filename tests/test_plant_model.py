@@ -0,0 +1,88 @@
+"""模擬器物理模型測試"""
+import pytest
+from simulator.plant import PumpPlant, PlantInputs, PlantSimulation, PumpParameters, KPA_PER_KGCM2
+
+POSITIVE = {"A": True, "B": False, "C": True, "D": False}
+VACUUM = {"A": False, "B": True, "C": False, "D": True}
+VENT = {"A": True, "B": True, "C": False, "D": False}
+
+
+class FakeSimulator:
+    def __init__(self, config=None):
+        self.config = dict(config or {})
+
+
+class FakeRelay:
+    def __init__(self):
+        self.coils = [False] * 8
+
+    def get_coil(self, address):
+        return self.coils[address]
+
+
+@pytest.mark.unit
+class TestPumpPlant:
+    """物理模型測試類"""
+
+    def test_pressure_rises_to_equilibrium_with_current(self):
+        """正壓管路通電後壓力上升並收斂，電流隨負載增加"""
+        plant = PumpPlant()
+        plant.set_inputs(PlantInputs(dict(POSITIVE), "ac110"))
+        plant.step(5.0)
+        early = plant.readings()
+        plant.step(600.0)
+        settled = plant.readings()
+
+        p = plant.params
+        equilibrium = p.free_flow / (p.free_flow / p.max_pressure + p.leak_conductance)
+        assert plant.pressure == pytest.approx(equilibrium, rel=1e-3)
+        assert settled["pressure_positive"]["pressure"] == pytest.approx(equilibrium / KPA_PER_KGCM2, rel=1e-3)
+        assert settled["ac110"]["current"] > early["ac110"]["current"] > 0
+        assert settled["dc"]["current"] == 0.0
+        assert settled["flow_meter"]["instantaneous_flow"] < early["flow_meter"]["instantaneous_flow"]
+        assert settled["flow_meter"]["cumulative_flow"] > 0
+
+    def test_vacuum_and_vent(self):
+        """真空管路抽真空，斷電後洩壓回到大氣壓"""
+        plant = PumpPlant()
+        plant.set_inputs(PlantInputs(dict(VACUUM), "dc"))
+        plant.step(120.0)
+        vacuum = plant.readings()["pressure_vacuum"]["pressure"]
+        assert -PumpParameters().max_vacuum < vacuum < -60
+        assert plant.readings()["pressure_positive"]["pressure"] == 0.0
+
+        plant.set_inputs(PlantInputs(dict(VENT), None))
+        plant.step(10.0)
+        assert abs(plant.pressure) < 0.5
+        assert plant.readings()["dc"]["voltage"] == 0.0
+
+    def test_fixed_timestep_is_independent_of_update_period(self):
+        """不論更新間隔如何切分，模型以相同步長積分得到相同結果"""
+        coarse, fine = PumpPlant(), PumpPlant()
+        for plant in (coarse, fine):
+            plant.set_inputs(PlantInputs(dict(POSITIVE), "ac220"))
+        coarse.step(3.0)
+        for _ in range(300):
+            fine.step(0.01)
+        assert coarse.time == pytest.approx(fine.time)
+        assert coarse.state == pytest.approx(fine.state)
+
+    def test_simulation_reads_coils_and_updates_simulators(self):
+        """耦合迴圈依繼電器線圈決定閥門與電源，並更新模擬器設定"""
+        relay = FakeRelay()
+        relay.coils[:4] = [True, False, True, False]  # 正壓管路
+        relay.coils[7] = True                         # AC220V 3P
+        positive, vacuum, flow = FakeSimulator(), FakeSimulator(), FakeSimulator()
+        three_phase = FakeSimulator({"power_total": 0.0})
+        simulation = PlantSimulation(
+            PumpPlant(), relay, flow_meter=flow, pressure_positive=positive,
+            pressure_vacuum=vacuum, meters={"ac220_3p": three_phase}
+        )
+        for _ in range(100):
+            simulation.update(0.05)
+
+        assert positive.config["pressure"] > 0
+        assert vacuum.config["pressure"] == 0.0
+        assert flow.config["instantaneous_flow"] > 0
+        assert three_phase.config["current_a"] > 0
+        assert three_phase.config["power_total"] == pytest.approx(3 * three_phase.config["power_a"])
@@ -0,0 +1,54 @@
+"""平台偵測測試"""
+import pytest
+import random
+from models.enums import PlateauEvent
+from pump_backend.utils.plateau_detector import PlateauDetector
+
+
+def vacuum_curve(t: float) -> float:
+    """模擬抽真空曲線: 約 60 秒後趨近 -95 kPa"""
+    return -95.0 * (1 - 0.9 ** t)
+
+
+@pytest.mark.unit
+class TestPlateauDetector:
+    """平台偵測測試類"""
+
+    def test_enters_plateau_after_window(self):
+        """曲線趨於平緩且窗口涵蓋完整後應進入平台"""
+        detector = PlateauDetector(window=20, tolerance=0.01)
+        events = []
+        for t in range(120):
+            event = detector.update(float(t), vacuum_curve(t))
+            if event:
+                events.append((t, event))
+
+        assert events[0][1] == PlateauEvent.ENTERED
+        assert 20 <= events[0][0] < 80, "應在上升段結束後才進入平台"
+        assert detector.plateau_value == pytest.approx(-95.0, rel=0.01)
+
+    def test_noise_within_tolerance(self):
+        """小於容許值的雜訊不應阻止判定"""
+        rng = random.Random(1)
+        detector = PlateauDetector(window=10, tolerance=0.01)
+        events = [detector.update(float(t), -80.0 + rng.uniform(-0.2, 0.2)) for t in range(30)]
+
+        assert PlateauEvent.ENTERED in events
+        assert PlateauEvent.EXITED not in events
+
+    def test_exits_on_change(self):
+        """數值明顯改變時應離開平台"""
+        detector = PlateauDetector(window=5, tolerance=0.01)
+        for t in range(10):
+            detector.update(float(t), 50.0)
+        assert detector.in_plateau
+
+        events = [detector.update(float(t), 50.0 + (t - 9) * 2) for t in range(10, 15)]
+        assert PlateauEvent.EXITED in events
+        assert not detector.in_plateau
+
+    def test_ramp_never_plateaus(self):
+        """持續線性變化不應判定為平台"""
+        detector = PlateauDetector(window=10, tolerance=0.01)
+        events = [detector.update(float(t), 10.0 + t * 0.5) for t in range(100)]
+        assert PlateauEvent.ENTERED not in events
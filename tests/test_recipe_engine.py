@@ -0,0 +1,139 @@
+"""測試配方引擎測試"""
+import pytest
+import asyncio
+from models.enums import StepStatus
+from pump_backend.services.recipe_engine import RecipeEngine
+
+
+class FakeControl:
+    """模擬控制服務，記錄閥門/電源操作"""
+
+    def __init__(self, fail_valve=None):
+        self.fail_valve = fail_valve
+        self.actions = []
+
+    async def set_valve(self, valve, state):
+        self.actions.append(("valve", valve, state))
+        if valve == self.fail_valve:
+            return {"status": "error", "message": f"閥門 {valve} 控制失敗"}
+        return {"status": "success"}
+
+    async def set_power(self, power_type, state):
+        self.actions.append(("power", power_type, state))
+        return {"status": "success"}
+
+
+@pytest.mark.unit
+def test_bundled_scenarios_load(mqtt_client):
+    """內建配方應可載入"""
+    engine = RecipeEngine(mqtt_client, FakeControl())
+
+    names = engine.list_recipes()
+    assert {"vacuum_test", "positive_pressure_test", "flow_test"} <= set(names)
+    for name in names:
+        assert engine.load_recipe(name).steps
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestRecipeEngine:
+    """配方引擎測試類"""
+
+    @pytest.fixture
+    def engine(self, mqtt_client):
+        engine = RecipeEngine(mqtt_client, FakeControl())
+        engine.start()
+        return engine
+
+    async def feed(self, mqtt_client, topic, payloads, interval=0.01):
+        """依序發布感測器數據"""
+        for payload in payloads:
+            await asyncio.sleep(interval)
+            mqtt_client.publish_nowait(topic, payload)
+
+    async def test_ramp_hold_passes_when_target_held(self, mqtt_client, engine):
+        """壓力達標並保持後步驟應完成"""
+        recipe = engine.load_recipe({"steps": [
+            {"type": "set_valves", "valves": {"A": True, "C": True}},
+            {"type": "power_on", "power_type": "dc"},
+            {"type": "ramp_hold", "signal": "pressure", "target": 0.5, "hold": 0.05, "timeout": 2},
+        ]})
+        feeder = asyncio.create_task(self.feed(
+            mqtt_client, "pump/sensors/pressure/positive",
+            [{"pressure_mpa": p} for p in (0.1, 0.3, 0.55, 0.6)]
+        ))
+
+        assert await engine.run(recipe) is True
+        await feeder
+
+        assert engine.control.actions[:3] == [
+            ("valve", "A", True), ("valve", "C", True), ("power", "dc", True)
+        ]
+        ramp = engine.results[-1]
+        assert ramp.status == StepStatus.PASSED
+        assert ramp.measurements["time_to_target_s"] > 0
+
+    async def test_ramp_hold_timeout(self, mqtt_client, engine):
+        """未達標應逾時並停止配方"""
+        recipe = engine.load_recipe({"steps": [
+            {"type": "ramp_hold", "signal": "pressure", "target": 0.5, "timeout": 0.1},
+            {"type": "wait", "duration": 10},
+        ]})
+        mqtt_client.publish_nowait("pump/sensors/pressure/positive", {"pressure_mpa": 0.2})
+
+        assert await engine.run(recipe) is False
+        assert len(engine.results) == 1
+        assert engine.results[0].status == StepStatus.TIMEOUT
+        assert 0.1 <= engine.results[0].duration_s < 0.5
+
+    async def test_measure_window_statistics(self, mqtt_client, engine):
+        """量測窗口應記錄各訊號統計值"""
+        engine.power_type = "dc"
+        recipe = engine.load_recipe({"steps": [
+            {"type": "measure", "duration": 0.2, "signals": ["current"]},
+        ]})
+        feeder = asyncio.create_task(self.feed(
+            mqtt_client, "pump/sensors/power/dc",
+            [{"current": c} for c in (1.0, 2.0, 3.0)]
+        ))
+
+        assert await engine.run(recipe) is True
+        await feeder
+
+        current = engine.results[0].measurements["current"]
+        assert current == {"count": 3, "min": 1.0, "max": 3.0, "avg": 2.0}
+
+    async def test_actuation_failure_fails_step(self, mqtt_client):
+        """致動失敗應使步驟失敗"""
+        engine = RecipeEngine(mqtt_client, FakeControl(fail_valve="B"))
+        recipe = engine.load_recipe({"steps": [
+            {"type": "set_valves", "valves": {"A": False, "B": True}},
+        ]})
+
+        assert await engine.run(recipe) is False
+        assert engine.results[0].status == StepStatus.FAILED
+        assert "B" in engine.results[0].message
+
+    async def test_invalid_step_params(self, engine):
+        """參數錯誤應記錄為失敗而非拋出例外"""
+        recipe = engine.load_recipe({"steps": [{"type": "measure", "signals": ["current"]}]})
+
+        assert await engine.run(recipe) is False
+        assert "參數錯誤" in engine.results[0].message
+
+    async def test_wait_plateau_finishes_early(self, mqtt_client, engine):
+        """平台成立即完成，不必等到逾時"""
+        recipe = engine.load_recipe({"steps": [
+            {"type": "wait_plateau", "signal": "vacuum", "window": 0.05, "tolerance": 0.01, "timeout": 5},
+        ]})
+        feeder = asyncio.create_task(self.feed(
+            mqtt_client, "pump/sensors/pressure/vacuum",
+            [{"pressure_kpa": -95.0} for _ in range(20)]
+        ))
+
+        assert await engine.run(recipe) is True
+        feeder.cancel()
+
+        result = engine.results[0]
+        assert result.measurements["plateau_value"] == pytest.approx(-95.0)
+        assert result.duration_s < 1.0
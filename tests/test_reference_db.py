@@ -0,0 +1,126 @@
+"""參考曲線資料庫測試"""
+import pytest
+from config.settings import settings
+from models.enums import TestState as State
+from pump_backend.services.reference_db import ReferenceDatabase, ReferenceService
+from pump_backend.services.test_evaluator import TestEvaluator as Evaluator
+from pump_backend.utils.curve_compare import CurveRecorder
+
+
+def vacuum_curves(duration=60, scale=1.0, rate=0.9):
+    """模擬真空測試的壓力與電流曲線"""
+    curves = {"pressure": CurveRecorder(), "current": CurveRecorder()}
+    for t in range(duration + 1):
+        curves["pressure"].add(float(t), scale * -95.0 * (1 - rate ** t))
+        curves["current"].add(float(t), 6.0 + 0.5 * (1 - rate ** t))
+    return curves
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestReferenceDatabase:
+    """參考曲線資料庫測試類"""
+
+    def test_add_merges_and_persists(self, tmp_path):
+        """同型號的良品曲線應逐點平均並保存"""
+        database = ReferenceDatabase(str(tmp_path), points=50)
+        database.add("DMM 9200", vacuum_curves(scale=1.0), "vacuum", "t1")
+        reference = database.add("DMM 9200", vacuum_curves(scale=0.9), "vacuum", "t2")
+
+        assert reference["count"] == 2
+        assert reference["curves"]["pressure"][-1] == pytest.approx(-95.0 * 0.95, rel=0.01)
+
+        reloaded = ReferenceDatabase(str(tmp_path))
+        assert reloaded.get("DMM 9200")["source_tests"] == ["t1", "t2"]
+        assert [r["pump_model"] for r in reloaded.list_models()] == ["DMM 9200"]
+        with pytest.raises(ValueError):
+            reloaded.add("DMM 9200", vacuum_curves(), "positive")
+
+    def test_compare_scores_deviation(self, tmp_path):
+        """良品偏差小，抽氣不足的幫浦偏差大"""
+        database = ReferenceDatabase(str(tmp_path), points=100)
+        database.add("DMM9200", vacuum_curves(), "vacuum")
+
+        good = database.compare("DMM9200", vacuum_curves(scale=1.02))
+        weak = database.compare("DMM9200", vacuum_curves(scale=0.6, rate=0.95))
+
+        assert good["deviation"] < 0.05
+        assert weak["deviation"] > 0.3
+        assert set(weak["signals"]) == {"pressure", "current"}
+        assert database.compare("unknown", vacuum_curves()) is None
+
+    def test_compare_prefix_while_running(self, tmp_path):
+        """測試進行中只比對已經過的區段"""
+        database = ReferenceDatabase(str(tmp_path), points=100)
+        database.add("DMM9200", vacuum_curves(), "vacuum")
+
+        partial = database.compare("DMM9200", vacuum_curves(duration=15), elapsed=15.0)
+        assert partial["coverage"] == pytest.approx(0.25, abs=0.02)
+        assert partial["deviation"] < 0.05
+        assert database.compare("DMM9200", vacuum_curves(duration=1), elapsed=1.0) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestReferenceEvaluation:
+    """評估服務與參考曲線整合測試類"""
+
+    @pytest.fixture
+    def database(self, tmp_path):
+        database = ReferenceDatabase(str(tmp_path / "refs"), points=100)
+        database.add("DMM9200", vacuum_curves(), "vacuum")
+        return database
+
+    def run(self, mqtt_client, clock, seconds, scale=1.0, rate=0.9):
+        for t in range(1, seconds + 1):
+            clock.now = float(t)
+            pressure = scale * -95.0 * (1 - rate ** t)
+            mqtt_client.publish_nowait("pump/sensors/pressure/vacuum", {"pressure_kpa": pressure})
+            mqtt_client.publish_nowait("pump/sensors/power/dc", {"current": 6.0})
+
+    async def test_deviating_unit_aborts_early(self, mqtt_client, database):
+        """明顯偏離參考曲線的幫浦應提前呼叫 on_abort 並判定 FAIL"""
+        clock = FakeClock()
+        evaluator = Evaluator(mqtt_client, clock=clock, reference_db=database)
+        evaluator.start()
+        aborts = []
+        evaluator.on_abort = lambda reason, details: aborts.append(details)
+
+        evaluator.begin({"test_id": "t1", "mode": "vacuum", "pump_model": "DMM9200"})
+        self.run(mqtt_client, clock, 30, scale=0.5, rate=0.95)
+
+        assert len(aborts) == 1
+        assert aborts[0]["deviation"] > settings.REFERENCE_ABORT_DEVIATION
+        record = await evaluator.finish(State.FAILED)
+        assert record["reference_comparison"]["coverage"] < 1.0
+        assert any("參考曲線" in reason for reason in record["fail_reasons"])
+
+    async def test_good_unit_passes_and_saves_reference(self, mqtt_client, database):
+        """良品不應中止；完成後可經命令存入參考資料庫"""
+        clock = FakeClock()
+        evaluator = Evaluator(mqtt_client, clock=clock, reference_db=database)
+        evaluator.start()
+        aborts = []
+        evaluator.on_abort = lambda reason, details: aborts.append(details)
+        service = ReferenceService(mqtt_client, database, evaluator)
+
+        evaluator.begin({"test_id": "t2", "mode": "vacuum", "pump_model": "DMM9200"})
+        self.run(mqtt_client, clock, 60)
+        record = await evaluator.finish(State.COMPLETED)
+
+        assert aborts == []
+        assert record["result"] == "PASS"
+        assert record["reference_comparison"]["coverage"] == 1.0
+
+        reply = service._handle_command({"action": "save"})
+        assert reply["status"] == "success"
+        assert reply["reference"]["count"] == 2
+        assert "t2" in database.get("DMM9200")["source_tests"]
+        assert service._handle_command({"action": "get", "pump_model": "nope"})["status"] == "error"
@@ -0,0 +1,123 @@
+"""測試重播測試"""
+import pytest
+from pathlib import Path
+from models.enums import TestState as State
+from pump_backend.drivers.transport_pool import TransportPool
+from pump_backend.services.sensor_service import SensorService
+from pump_backend.services.data_logger import DataLogger
+from pump_backend.services.test_evaluator import TestEvaluator as Evaluator
+from pump_backend.services.replay import (
+    ReplayHarness, ReplayResponse, VirtualClock, LoopbackMQTT, SENSOR_DEVICES
+)
+from pump_backend.config.modbus_devices import get_device_config
+
+START = 1_700_000_000.0
+
+
+class ScriptedTransport:
+    """依時間產生寄存器值的傳輸 (模擬抽真空與電流上升)"""
+
+    def __init__(self, device, clock):
+        self.device = device
+        self.clock = clock
+        self.connected = False
+
+    async def connect(self):
+        self.connected = True
+
+    async def close(self):
+        self.connected = False
+
+    async def read_holding_registers(self, address, count, device_id=1):
+        t = self.clock() - START
+        if self.device == "pressure_vacuum":
+            return ReplayResponse([int(950 * (1 - 0.9 ** t))])
+        if self.device == "ac110v_meter":
+            return ReplayResponse(None)  # 離線設備
+        value = int(1000 + 500 * (1 - 0.8 ** t)) + address
+        return ReplayResponse([0, value] * (count // 2) or [value])
+
+
+async def run_live(tmp_path, config):
+    """以實際服務運行並錄製寄存器讀取"""
+    clock = VirtualClock(START)
+    mqtt = LoopbackMQTT()
+    pool = TransportPool()
+    defaults = get_device_config()
+    devices = {}
+    for index, name in enumerate(SENSOR_DEVICES):
+        transport = ScriptedTransport(name, clock)
+        pool.acquire(TransportPool.key_for("live", True, index), lambda t=transport: (t, None))
+        devices[name] = {**defaults[name], "port": "live", "use_tcp": True, "tcp_port": index}
+
+    sensors = SensorService(mqtt, devices, pool, clock=clock)
+    data_logger = DataLogger(mqtt, str(tmp_path / "live"))
+    evaluator = Evaluator(mqtt, clock=clock, wall_clock=clock)
+    await sensors.start()
+    data_logger.subscribe()
+    evaluator.start()
+
+    evaluator.begin(config)
+    data_logger.start_test_logging(evaluator.test_id)
+    csv_file = data_logger.csv_handle.name
+    recording = tmp_path / "test.registers.jsonl"
+    sensors.start_recording(str(recording), evaluator.config)
+    for cycle in range(40):
+        clock.set(START + cycle + 1)
+        if cycle == 20:
+            evaluator.pause()
+            sensors.mark_recording("pause")
+        if cycle == 25:
+            evaluator.resume()
+            sensors.mark_recording("resume")
+        await sensors.poll_once(cycle)
+        await mqtt.deliver()
+    sensors.stop_recording(State.COMPLETED.value)
+    record = await evaluator.finish(State.COMPLETED)
+    data_logger.stop_test_logging()
+    sensors.stop()
+    return mqtt.messages, record, Path(csv_file).read_text(), recording
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestReplay:
+    """測試重播測試類"""
+
+    async def test_replay_reproduces_live_outputs(self, tmp_path):
+        """重播應產生與原測試相同的訊息、CSV 與測試結果"""
+        config = {"test_id": "T001", "mode": "vacuum", "criteria": {"pressure": -0.09}}
+        messages, record, csv_text, recording = await run_live(tmp_path, config)
+
+        harness = ReplayHarness(str(recording), str(tmp_path / "replay"))
+        summary = await harness.run()
+
+        assert harness.mqtt.messages == messages
+        assert summary["record"] == record
+        assert Path(summary["csv_file"]).read_text() == csv_text
+        assert summary["cycles"] == 40
+        assert len(messages) > 200 and record["max_pressure"] < 0
+        assert record["duration_s"] == pytest.approx(35.0)
+
+    async def test_replay_is_deterministic(self, tmp_path):
+        """同一錄製檔重播兩次輸出完全相同"""
+        _, _, _, recording = await run_live(tmp_path, {"test_id": "T002", "mode": "vacuum"})
+
+        first = ReplayHarness(str(recording), str(tmp_path / "a"))
+        second = ReplayHarness(str(recording), str(tmp_path / "b"))
+        summary_a, summary_b = await first.run(), await second.run()
+
+        assert first.mqtt.messages == second.mqtt.messages
+        assert summary_a["record"] == summary_b["record"]
+        assert summary_a["reads"] == summary_b["reads"] > 0
+
+    async def test_unrecorded_read_is_error(self, tmp_path):
+        """錄製檔未涵蓋的讀取應回應錯誤"""
+        _, _, _, recording = await run_live(tmp_path, {"test_id": "T003"})
+        harness = ReplayHarness(str(recording), str(tmp_path / "replay"))
+        transport = harness.transports["pressure_vacuum"]
+
+        transport.cycle = 999
+        assert (await transport.read_holding_registers(0x1000, 1)).isError()
+        transport.cycle = 0
+        assert not (await transport.read_holding_registers(0x1000, 1)).isError()
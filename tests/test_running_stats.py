@@ -0,0 +1,54 @@
+"""串流統計工具測試"""
+import pytest
+import statistics
+from pump_backend.utils.running_stats import RunningStats, SlidingWindow
+
+
+@pytest.mark.unit
+class TestRunningStats:
+    """Welford 串流統計測試類"""
+
+    def test_matches_batch_statistics(self):
+        """串流結果應與批次計算一致"""
+        values = [3.2, -1.5, 7.8, 0.0, 4.4, 4.4, -2.1]
+        stats = RunningStats()
+        for v in values:
+            stats.update(v)
+
+        assert stats.count == len(values)
+        assert stats.mean == pytest.approx(statistics.mean(values))
+        assert stats.variance == pytest.approx(statistics.variance(values))
+        assert stats.min == min(values)
+        assert stats.max == max(values)
+
+    def test_empty(self):
+        """無樣本時摘要應為 None"""
+        stats = RunningStats()
+        assert stats.variance == 0.0
+        assert stats.to_dict()["mean"] is None
+
+
+@pytest.mark.unit
+class TestSlidingWindow:
+    """時間滑動窗口測試類"""
+
+    def test_evicts_old_samples(self):
+        """超出窗口的樣本應被移除，最小/最大值隨之更新"""
+        window = SlidingWindow(span=2.0)
+        for t, v in [(0, 10.0), (1, 1.0), (2, 5.0), (3, 6.0), (4, 5.5)]:
+            window.add(t, v)
+
+        assert window.count == 3
+        assert window.min == 5.0
+        assert window.max == 6.0
+        assert window.mean == pytest.approx(5.5)
+        assert window.full
+
+    def test_relative_range(self):
+        """相對變化應為 (最大 - 最小) / |平均|"""
+        window = SlidingWindow(span=10.0)
+        for t, v in enumerate([-95.0, -95.5, -95.2]):
+            window.add(t, v)
+
+        assert window.relative_range() == pytest.approx(0.5 / 95.233333, rel=1e-4)
+        assert not window.full
@@ -0,0 +1,110 @@
+"""安全監控器狀態發布測試"""
+import asyncio
+import threading
+import pytest
+from config.mqtt_topics import RELAY_STATUS, SAFETY_ALERT
+from pump_backend.core.safety_monitor import SafetyMonitor
+from pump_backend.services.control_service import ControlService
+from pump_backend.services.state_cache import StateCache
+
+RELAY_CONFIG = {"port": "localhost", "tcp_port": 5027, "use_tcp": True, "slave_id": 1, "timeout": 1.0}
+
+
+def drain(mqtt_client):
+    """取出發布佇列中的所有訊息"""
+    items = []
+    while not mqtt_client._outgoing.empty():
+        items.append(mqtt_client._outgoing.get_nowait()[:4])
+    return items
+
+
+class Result:
+    bits = [False] * 8
+
+    def isError(self):
+        return False
+
+
+class FakeCoils:
+    """接受所有線圈寫入的繼電器模組"""
+
+    async def write_coil(self, address, value, device_id=1):
+        return Result()
+
+    async def write_coils(self, address, values, device_id=1):
+        return Result()
+
+
+def safety_status(emergency_stop=False, cover_closed=True, **extra):
+    return {"emergency_stop": emergency_stop, "cover_closed": cover_closed,
+            "system_locked": emergency_stop, "timestamp": 1.0, **extra}
+
+
+@pytest.mark.unit
+@pytest.mark.mqtt
+class TestSafetyMonitor:
+    """安全監控器測試類"""
+
+    async def publish(self, monitor, statuses):
+        """由狀態佇列發布一批狀態"""
+        for status in statuses:
+            monitor._status_queue.put_nowait(status)
+        task = asyncio.create_task(monitor._publish_status_loop())
+        while not monitor._status_queue.empty():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def test_alerts_published_on_change_only(self, mqtt_client):
+        """緊急停止鎖定期間不隨每筆 100Hz 狀態重複發布警報"""
+        monitor = SafetyMonitor(mqtt_client, RELAY_CONFIG)
+        await self.publish(monitor, [
+            *[safety_status(emergency_stop=True) for _ in range(40)],
+            safety_status(),
+            *[safety_status(cover_closed=False) for _ in range(40)],
+            safety_status(emergency_stop=True, cover_closed=False),
+        ])
+        alerts = [payload["type"] for topic, payload, _, _ in drain(mqtt_client) if topic == SAFETY_ALERT]
+        assert alerts == ["emergency", "warning", "emergency"]
+
+    async def test_cover_open_keeps_valve_states(self, mqtt_client):
+        """測試蓋開啟只切斷電源，保留狀態仍顯示控制服務開啟的閥門"""
+        monitor = SafetyMonitor(mqtt_client, RELAY_CONFIG)
+        control = ControlService(mqtt_client, monitor, RELAY_CONFIG)
+        cache = StateCache(mqtt_client)
+        cache.start()
+        monitor.io_driver.client = control.io_driver.client = FakeCoils()
+        inputs = [0b10]  # Bit1: 測試蓋關閉
+        monitor.io_driver.read_digital_inputs_sync = lambda: inputs[0]
+
+        thread = threading.Thread(target=monitor._monitor_loop_thread, daemon=True)
+        thread.start()
+        publisher = asyncio.create_task(monitor._publish_status_loop())
+        try:
+            while not monitor.cover_closed:
+                await asyncio.sleep(0.01)
+            for valve in ("A", "B"):
+                reply = await control._handle_valve_command({"valve": valve, "state": True})
+                assert reply["status"] == "success"
+            assert (await control._handle_power_command({"power_type": "dc", "state": True}))["status"] == "success"
+
+            inputs[0] = 0
+            for _ in range(200):
+                if cache.get(RELAY_STATUS)["relays"]["5"] is False:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            monitor._stop_event.set()
+            thread.join(timeout=1.0)
+            publisher.cancel()
+
+        cache.flush()
+        retained = [payload for topic, payload, _, retain in drain(mqtt_client)
+                    if topic == "pump/state/system/relays" and retain]
+        assert retained[-1]["relays"] == {
+            "1": True, "2": True, "3": False, "4": False,
+            "5": False, "6": False, "7": False, "8": False,
+        }
@@ -0,0 +1,290 @@
+"""串口橋接器轉發測試"""
+import asyncio
+import os
+import pty
+import struct
+import pytest
+from bridge import RTUToTCPBridge
+from cache import CacheRule, ResponseCache
+from gateway import DEFAULT_GATEWAYS, Route, build_gateways, parse_routes
+from rtu_server import RtuFrameServer, SerialSettings, with_crc
+from upstream import (
+    GATEWAY_PATH_UNAVAILABLE, GATEWAY_TARGET_NO_RESPONSE, MBAP, ModbusTcpUpstream, UpstreamError, UpstreamPool
+)
+
+
+class FakeTcpSlave:
+    """Modbus TCP 上游: 收齊 batch 個請求後反序回應，回應 PDU 為請求位址的兩倍"""
+
+    def __init__(self, batch=1, delay=0.0):
+        self.batch = batch
+        self.delay = delay
+        self.requests = []
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._client, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                batch = []
+                for _ in range(self.batch):
+                    tid, _, length, unit = MBAP.unpack(await reader.readexactly(MBAP.size))
+                    pdu = await reader.readexactly(length - 1)
+                    self.requests.append((unit, pdu))
+                    batch.append((tid, unit, pdu))
+                await asyncio.sleep(self.delay)
+                for tid, unit, pdu in reversed(batch):
+                    address = struct.unpack(">H", pdu[1:3])[0]
+                    response = bytes([pdu[0], 2]) + struct.pack(">H", address * 2)
+                    writer.write(MBAP.pack(tid, 0, len(response) + 1, unit) + response)
+        except (asyncio.IncompleteReadError, asyncio.CancelledError):
+            writer.close()
+
+
+def read_pdu(address, count=1):
+    return bytes([3]) + struct.pack(">HH", address, count)
+
+
+@pytest.mark.unit
+class TestSerialBridge:
+    """串口橋接器轉發測試類"""
+
+    async def test_pipelined_requests_match_by_transaction(self):
+        """同一連線多個未完成請求，反序回應依交易 ID 配對"""
+        async with FakeTcpSlave(batch=2) as slave:
+            upstream = ModbusTcpUpstream("127.0.0.1", slave.port, max_in_flight=2)
+            try:
+                first, second = await asyncio.gather(
+                    upstream.request(1, read_pdu(10)), upstream.request(1, read_pdu(20))
+                )
+                assert first == bytes([3, 2, 0, 20]) and second == bytes([3, 2, 0, 40])
+                assert upstream.in_flight == 0 and upstream.stats["requests"] == 2
+            finally:
+                await upstream.close()
+
+    async def test_pipeline_depth_queues_excess_requests(self):
+        """超過管線深度的請求排隊，不會同時送出"""
+        async with FakeTcpSlave() as slave:
+            upstream = ModbusTcpUpstream("127.0.0.1", slave.port)
+            try:
+                results = await asyncio.gather(*(upstream.request(1, read_pdu(a)) for a in range(5)))
+                assert [r[-1] for r in results] == [0, 2, 4, 6, 8]
+            finally:
+                await upstream.close()
+
+    async def test_timeout_and_unreachable_map_to_gateway_exceptions(self):
+        async with FakeTcpSlave(delay=0.5) as slave:
+            upstream = ModbusTcpUpstream("127.0.0.1", slave.port, timeout=0.05)
+            try:
+                with pytest.raises(UpstreamError) as error:
+                    await upstream.request(1, read_pdu(1))
+                assert error.value.exception_code == GATEWAY_TARGET_NO_RESPONSE
+                assert upstream.stats["timeouts"] == 1 and upstream.in_flight == 0
+            finally:
+                await upstream.close()
+            port = slave.port
+        bridge = RTUToTCPBridge("/dev/ttyTEST", "127.0.0.1", port, (19200, 8, "NONE", 1), slave_id=2)
+        assert await bridge.handle(2, read_pdu(1)) == bytes([0x83, GATEWAY_PATH_UNAVAILABLE])
+        assert await bridge.handle(5, read_pdu(1)) is None
+
+    async def test_rtu_frames_are_forwarded_over_pty(self):
+        """經 pty 分段寫入的 RTU 請求轉發到上游，錯誤 CRC 不回應"""
+        master, slave_fd = pty.openpty()
+        async with FakeTcpSlave() as slave:
+            bridge = RTUToTCPBridge("/dev/ttyTEST", "127.0.0.1", slave.port, (19200, 8, "NONE", 1), slave_id=2)
+            server = RtuFrameServer(os.ttyname(slave_fd), SerialSettings(19200), bridge.handle)
+            await server.start()
+            try:
+                request = with_crc(bytes([2]) + read_pdu(0x21))
+                os.write(master, request[:3])
+                os.write(master, request[3:])
+                response = b""
+                while len(response) < 7:
+                    response += await asyncio.wait_for(asyncio.to_thread(os.read, master, 64), 2.0)
+                assert response == with_crc(bytes([2, 3, 2, 0, 0x42]))
+                assert slave.requests == [(2, read_pdu(0x21))]
+                os.write(master, request[:-1] + b"\x00")
+                await asyncio.sleep(0.1)
+                assert server.stats["crc_errors"] == 1 and server.stats["responses"] == 1
+            finally:
+                await server.stop()
+                await bridge.upstream.close()
+                os.close(master)
+                os.close(slave_fd)
+
+
+class CountingUpstream:
+    """記錄轉發次數的上游，讀取回應為請求位址"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def request(self, unit, pdu):
+        self.calls.append((unit, pdu))
+        await asyncio.sleep(self.delay)
+        if pdu[0] in (3, 4):
+            return bytes([pdu[0], 2]) + pdu[1:3]
+        return pdu
+
+
+@pytest.mark.unit
+class TestResponseCache:
+    """讀取回應快取測試類"""
+
+    async def test_ttl_per_range(self):
+        now = [0.0]
+        cache = ResponseCache(0.0, [CacheRule(0, 99, ttl=1.0, function=3)], clock=lambda: now[0])
+        upstream = CountingUpstream()
+        for _ in range(3):
+            assert await cache.request(1, read_pdu(10), upstream.request) == bytes([3, 2, 0, 10])
+        assert len(upstream.calls) == 1 and cache.stats["hits"] == 2
+        now[0] = 1.5
+        await cache.request(1, read_pdu(10), upstream.request)
+        # 超出規則範圍 (預設 TTL 0) 與其他單元各自轉發
+        await cache.request(1, read_pdu(200), upstream.request)
+        await cache.request(1, read_pdu(200), upstream.request)
+        await cache.request(2, read_pdu(10), upstream.request)
+        assert len(upstream.calls) == 5
+
+    async def test_concurrent_reads_are_coalesced(self):
+        cache = ResponseCache(5.0)
+        upstream = CountingUpstream(delay=0.05)
+        results = await asyncio.gather(*(cache.request(1, read_pdu(7), upstream.request) for _ in range(4)))
+        assert set(results) == {bytes([3, 2, 0, 7])}
+        assert len(upstream.calls) == 1 and cache.stats["coalesced"] == 3
+
+    async def test_overlapping_writes_invalidate(self):
+        """寫入重疊範圍使快取失效，不重疊的範圍保留；寫入期間進行中的讀取不寫入快取"""
+        cache = ResponseCache(5.0)
+        upstream = CountingUpstream()
+        await cache.request(1, read_pdu(10, 4), upstream.request)
+        await cache.request(1, read_pdu(20, 2), upstream.request)
+        write = bytes([16]) + struct.pack(">HHB", 12, 2, 4) + b"\x00\x01\x00\x02"
+        await cache.request(1, write, upstream.request)
+        await cache.request(1, read_pdu(10, 4), upstream.request)
+        await cache.request(1, read_pdu(20, 2), upstream.request)
+        assert [pdu[0] for _, pdu in upstream.calls] == [3, 3, 16, 3]
+
+        slow = CountingUpstream(delay=0.05)
+        read = asyncio.create_task(cache.request(1, read_pdu(30), slow.request))
+        await asyncio.sleep(0.01)
+        await cache.request(1, bytes([6]) + struct.pack(">HH", 30, 5), upstream.request)
+        await read
+        await cache.request(1, read_pdu(30), slow.request)
+        assert len(slow.calls) == 2
+
+    async def test_exceptions_are_not_cached(self):
+        cache = ResponseCache.from_config({"default_ttl": 5.0})
+        calls = []
+
+        async def failing(unit, pdu):
+            calls.append(pdu)
+            return bytes([0x83, 0x02])
+
+        await cache.request(1, read_pdu(1), failing)
+        await cache.request(1, read_pdu(1), failing)
+        assert len(calls) == 2
+        with pytest.raises(ValueError):
+            ResponseCache.from_config({"ranges": [{"start": 10, "end": 5, "ttl": 1}]})
+
+    async def test_cancelled_read_fails_waiters_with_upstream_error(self):
+        """發起的讀取被取消時，合併的等待者收到閘道例外而非取消"""
+        cache = ResponseCache(5.0)
+        upstream = CountingUpstream(delay=0.5)
+        leader = asyncio.create_task(cache.request(1, read_pdu(3), upstream.request))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.request(1, read_pdu(3), upstream.request))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(UpstreamError) as error:
+            await waiter
+        assert error.value.exception_code == GATEWAY_TARGET_NO_RESPONSE
+        assert leader.cancelled() and cache.stats["coalesced"] == 1
+
+
+@pytest.mark.unit
+class TestRtuGateway:
+    """多從站 RTU 閘道測試類"""
+
+    def test_routes_and_default_layout(self):
+        pool = UpstreamPool()
+        gateways = build_gateways(DEFAULT_GATEWAYS, "sim", pool)
+        assert [g.link for g in gateways] == ["/dev/ttySIM0", "/dev/ttySIM1", "/dev/ttySIM2", "/dev/ttySIM3"]
+        assert gateways[3].settings.parity == "E" and sorted(gateways[3].routes) == [2, 3]
+        routes = parse_routes({"1": 5020, "2": "other:502", "3": {"port": 5030, "unit": 9}}, "sim")
+        assert routes == {1: Route("sim", 5020, 1), 2: Route("other", 502, 2), 3: Route("sim", 5030, 9)}
+        for bad in ({"0": 5020}, {"1": {"host": "x"}}):
+            with pytest.raises(ValueError):
+                parse_routes(bad, "sim")
+        with pytest.raises(ValueError):
+            build_gateways([{"link": "/dev/ttyX", "routes": {1: 1}}, {"link": "/dev/ttyX", "routes": {2: 2}}], "sim", pool)
+
+    async def test_slaves_share_pooled_upstreams(self, tmp_path):
+        """同一串口依 Slave ID 路由，相同端點共用連線，未路由的 Slave ID 不回應"""
+        async with FakeTcpSlave() as first, FakeTcpSlave() as second:
+            pool = UpstreamPool()
+            link = str(tmp_path / "ttySIM0")
+            gateway = build_gateways([{"link": link, "routes": {
+                1: first.port, 2: first.port, 3: {"port": second.port, "unit": 7},
+            }}], "127.0.0.1", pool)[0]
+            await gateway.start()
+            fd = os.open(link, os.O_RDWR | os.O_NOCTTY)
+            try:
+                for unit in (1, 2, 3, 9, 3):
+                    os.write(fd, with_crc(bytes([unit]) + read_pdu(unit)))
+                    if unit == 9:
+                        continue
+                    response = b""
+                    while len(response) < 7:
+                        response += await asyncio.wait_for(asyncio.to_thread(os.read, fd, 64), 2.0)
+                    assert response == with_crc(bytes([unit, 3, 2, 0, unit * 2]))
+                assert first.requests == [(1, read_pdu(1)), (2, read_pdu(2))]
+                assert second.requests == [(7, read_pdu(3)), (7, read_pdu(3))]
+                assert len(pool) == 2 and gateway.server.stats["responses"] == 4
+                await gateway.handle(0, bytes([6, 0, 1, 0, 5]))
+                assert len(first.requests) == 4 and len(second.requests) == 3
+            finally:
+                os.close(fd)
+                await gateway.stop()
+                await pool.close()
+            assert not os.path.lexists(link)
+
+    async def test_ports_reading_the_same_meter_share_one_read(self, tmp_path):
+        """不同虛擬串口 (閘道與橋接器) 讀取同一設備時共用端點快取，並行讀取只轉發一次"""
+        async with FakeTcpSlave(delay=0.2) as meter:
+            pool = UpstreamPool(make_cache=lambda: ResponseCache(5.0))
+            links = [str(tmp_path / "ttySIM0"), str(tmp_path / "ttySIM1")]
+            gateways = build_gateways(
+                [{"link": link, "routes": {1: meter.port}} for link in links], "127.0.0.1", pool
+            )
+            for gateway in gateways:
+                await gateway.start()
+            fds = [os.open(link, os.O_RDWR | os.O_NOCTTY) for link in links]
+            try:
+                for fd in fds:
+                    os.write(fd, with_crc(bytes([1]) + read_pdu(5)))
+                for fd in fds:
+                    response = b""
+                    while len(response) < 7:
+                        response += await asyncio.wait_for(asyncio.to_thread(os.read, fd, 64), 2.0)
+                    assert response == with_crc(bytes([1, 3, 2, 0, 10]))
+                bridge = RTUToTCPBridge("/dev/ttyTEST", "127.0.0.1", meter.port, (19200, 8, "NONE", 1), 1, pool=pool)
+                assert await bridge.handle(1, read_pdu(5)) == bytes([3, 2, 0, 10])
+                cache = pool.cache("127.0.0.1", meter.port)
+                assert meter.requests == [(1, read_pdu(5))]
+                assert cache.stats["coalesced"] == 1 and cache.stats["hits"] == 1
+            finally:
+                for fd in fds:
+                    os.close(fd)
+                for gateway in gateways:
+                    await gateway.stop()
+                await pool.close()
@@ -0,0 +1,197 @@
+"""TCP 到 RTU 生產閘道測試"""
+import asyncio
+import struct
+import pytest
+from pymodbus.constants import ExcCodes
+from cache import ResponseCache
+from rtu_master import RtuMaster, RtuTimeout, response_length
+from rtu_server import SerialSettings
+from scheduler import BusScheduler, QueueFull
+from tcp_gateway import Listener, TcpToRtuGateway, build_servers
+from upstream import MBAP
+from simulator.rtu import RtuBus
+
+
+class RegisterStore:
+    """保持寄存器為位址本身的設備上下文 (位址 ≥ 100 回應非法位址)"""
+
+    def __init__(self):
+        self.written = {}
+
+    async def async_getValues(self, function, address, count=1):
+        if address + count > 100:
+            return ExcCodes.ILLEGAL_ADDRESS
+        return [self.written.get(address + i, address + i) for i in range(count)]
+
+    async def async_setValues(self, function, address, values):
+        for i, value in enumerate(values):
+            self.written[address + i] = value
+
+
+class Slave:
+    def __init__(self, slave_id):
+        self.slave_id = slave_id
+        self.store = RegisterStore()
+
+
+def read_pdu(address, count=1):
+    return bytes([3]) + struct.pack(">HH", address, count)
+
+
+class RecordingBus:
+    """記錄執行順序的匯流排"""
+
+    def __init__(self):
+        self.order = []
+
+    async def transact(self, unit, pdu, timeout):
+        self.order.append(unit)
+        await asyncio.sleep(0)
+        return pdu
+
+
+async def submit_all(scheduler, jobs):
+    """先排入所有請求再啟動排程，返回各請求的結果"""
+    tasks = [asyncio.create_task(scheduler.submit(client, priority, unit, read_pdu(unit), 1.0))
+             for client, priority, unit in jobs]
+    await asyncio.sleep(0)
+    scheduler.start()
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await scheduler.stop()
+
+
+@pytest.mark.unit
+class TestBusScheduler:
+    """匯流排排程測試類"""
+
+    async def test_clients_alternate_within_priority(self):
+        bus = RecordingBus()
+        jobs = [("a", "normal", 1)] * 4 + [("b", "normal", 2)] * 2 + [("c", "normal", 3)]
+        await submit_all(BusScheduler(bus.transact), jobs)
+        assert bus.order == [1, 2, 3, 1, 2, 1, 1]
+
+    async def test_weighted_priorities_do_not_starve(self):
+        """高優先等級依權重優先，低優先等級每輪仍執行一個"""
+        bus = RecordingBus()
+        jobs = [("backend", "high", 1)] * 10 + [("admin", "low", 9)] * 2
+        await submit_all(BusScheduler(bus.transact, {"high": 4, "low": 1}), jobs)
+        assert bus.order == [1, 1, 1, 1, 9, 1, 1, 1, 1, 9, 1, 1]
+
+    async def test_queue_limit_and_expiry(self):
+        bus = RecordingBus()
+        scheduler = BusScheduler(bus.transact, max_queue=2)
+        tasks = [asyncio.create_task(scheduler.submit("a", "low", 1, read_pdu(1), 0.05)) for _ in range(3)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert isinstance(results[2], QueueFull)
+        assert all(isinstance(r, asyncio.TimeoutError) for r in results[:2])
+        scheduler.start()
+        await asyncio.sleep(0.01)
+        assert bus.order == [] and scheduler.stats["expired"] == 2
+        await scheduler.stop()
+        with pytest.raises(ValueError):
+            await scheduler.submit("a", "urgent", 1, read_pdu(1), 1.0)
+
+
+@pytest.mark.unit
+class TestTcpToRtuGateway:
+    """TCP 到 RTU 閘道測試類"""
+
+    async def _bus(self, tmp_path):
+        bus = RtuBus("test", SerialSettings(115200), link=str(tmp_path / "ttyUSB0"), emulate_timing=False)
+        bus.add_device(Slave(2))
+        bus.add_device(Slave(3))
+        await bus.start()
+        return bus
+
+    async def test_master_transactions(self, tmp_path):
+        assert response_length(bytes([2, 0x83])) == 5
+        assert response_length(bytes([2, 3, 4])) == 9
+        bus = await self._bus(tmp_path)
+        master = RtuMaster(bus.link, SerialSettings(115200))
+        await master.open()
+        try:
+            assert await master.transact(2, read_pdu(10, 2)) == bytes([3, 4, 0, 10, 0, 11])
+            assert await master.transact(3, read_pdu(200)) == bytes([0x83, 2])
+            assert await master.transact(2, bytes([6, 0, 5, 0, 42])) == bytes([6, 0, 5, 0, 42])
+            assert bus.devices[2].store.written == {5: 42}
+            with pytest.raises(RtuTimeout):
+                await master.transact(9, read_pdu(1), timeout=0.05)
+            assert master.stats == {"transactions": 4, "timeouts": 1, "frame_errors": 0}
+        finally:
+            await master.close()
+            await bus.stop()
+
+    async def test_tcp_clients_share_the_bus(self, tmp_path):
+        """多個 TCP 用戶端 (含管線化) 共用同一匯流排，無回應的從站回應閘道例外"""
+        bus = await self._bus(tmp_path)
+        master = RtuMaster(bus.link, SerialSettings(115200))
+        gateway = TcpToRtuGateway(
+            master,
+            [Listener(0, "high", "127.0.0.1"), Listener(0, "low", "127.0.0.1")],
+            BusScheduler(master.transact, transaction_timeout=0.1),
+        )
+        assert await gateway.start()
+        ports = [server.sockets[0].getsockname()[1] for server in gateway.servers]
+        clients = [await asyncio.open_connection("127.0.0.1", port) for port in ports]
+        try:
+            for tid, (unit, address) in enumerate([(2, 1), (3, 2), (9, 3)], start=1):
+                for _, writer in clients:
+                    writer.write(MBAP.pack(tid, 0, 6, unit) + read_pdu(address))
+            for reader, _ in clients:
+                responses = {}
+                for _ in range(3):
+                    tid, _, length, unit = MBAP.unpack(await asyncio.wait_for(reader.readexactly(MBAP.size), 2.0))
+                    responses[tid] = (unit, await reader.readexactly(length - 1))
+                assert responses == {
+                    1: (2, bytes([3, 2, 0, 1])), 2: (3, bytes([3, 2, 0, 2])), 3: (9, bytes([0x83, 0x0B])),
+                }
+            assert bus.stats["requests"] == 6
+        finally:
+            for _, writer in clients:
+                writer.close()
+            await gateway.stop()
+            await bus.stop()
+
+    async def test_clients_share_the_port_cache(self, tmp_path):
+        """同一串口的用戶端共用讀取快取，相同讀取只佔用一次匯流排"""
+        bus = await self._bus(tmp_path)
+        master = RtuMaster(bus.link, SerialSettings(115200))
+        cache = ResponseCache(5.0)
+        gateway = TcpToRtuGateway(
+            master, [Listener(0, "high", "127.0.0.1"), Listener(0, "low", "127.0.0.1")], cache=cache
+        )
+        assert await gateway.start()
+        ports = [server.sockets[0].getsockname()[1] for server in gateway.servers]
+        clients = [await asyncio.open_connection("127.0.0.1", port) for port in ports]
+        try:
+            for tid, (reader, writer) in enumerate(clients, start=1):
+                writer.write(MBAP.pack(tid, 0, 6, 2) + read_pdu(7))
+            for tid, (reader, _) in enumerate(clients, start=1):
+                header = MBAP.unpack(await asyncio.wait_for(reader.readexactly(MBAP.size), 2.0))
+                assert header == (tid, 0, 5, 2)
+                assert await reader.readexactly(4) == bytes([3, 2, 0, 7])
+            assert bus.stats["requests"] == 1
+            assert cache.stats["coalesced"] + cache.stats["hits"] == 1
+        finally:
+            for _, writer in clients:
+                writer.close()
+            await gateway.stop()
+            await bus.stop()
+
+    def test_config(self):
+        gateways = build_servers({"serial_ports": [{
+            "port": "/dev/ttyUSB0", "baudrate": 57600, "parity": "E",
+            "listeners": [{"port": 502, "priority": "high"}, {"port": 1502, "priority": "low"}],
+        }]})
+        assert gateways[0].master.settings.parity == "E" and [l.priority for l in gateways[0].listeners] == ["high", "low"]
+        for bad in (
+            {"serial_ports": []},
+            {"serial_ports": [{"port": "/dev/ttyUSB0", "listeners": []}]},
+            {"serial_ports": [{"port": "/dev/ttyUSB0", "listeners": [{"port": 502, "priority": "urgent"}]}]},
+            {"serial_ports": [{"port": "/dev/ttyUSB0", "listeners": [{"port": 502}]},
+                              {"port": "/dev/ttyUSB1", "listeners": [{"port": 502}]}]},
+        ):
+            with pytest.raises(ValueError):
+                build_servers(bad)
@@ -0,0 +1,113 @@
+"""模擬器設備寄存器映射測試 (後端驅動與管理 API 的讀取必須落在 REGISTER_MAP 內)"""
+import importlib.util
+from pathlib import Path
+import pytest
+from pump_backend.drivers.flow_meter import FlowMeterDriver
+from pump_backend.drivers.power_meter import SinglePhasePowerMeterDriver, ThreePhasePowerMeterDriver
+from pump_backend.drivers.pressure_sensor import PressureSensorDriver
+from pump_backend.drivers.relay_io import RelayIODriver
+from simulator.devices.flow_meter import FlowMeterSimulator
+from simulator.devices.power_meter import SinglePhasePowerMeterSimulator, ThreePhasePowerMeterSimulator
+from simulator.devices.pressure_sensor import PressureSensorSimulator
+from simulator.devices.relay_io import RelayIOSimulator
+
+TCP_CONFIG = {"port": "localhost", "tcp_port": 502, "use_tcp": True, "slave_id": 1, "timeout": 1.0}
+
+
+def load_admin_reader():
+    path = Path(__file__).parent.parent / "admin-api" / "modbus_reader.py"
+    spec = importlib.util.spec_from_file_location("admin_modbus_reader", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Result:
+    def __init__(self, values=None):
+        self.values = values
+
+    def isError(self):
+        return self.values is None
+
+    @property
+    def registers(self):
+        return self.values
+
+    @property
+    def bits(self):
+        return self.values
+
+
+class MappedClient:
+    """依模擬器 REGISTER_MAP 回應的用戶端 (讀取未映射的位址時回應錯誤，與稀疏數據塊相同)"""
+
+    connected = True
+
+    def __init__(self, simulator_class):
+        self.mapped = {
+            block: {start + i for start, count in ranges for i in range(count)}
+            for block, ranges in simulator_class.REGISTER_MAP.items()
+        }
+        self.reads = []
+
+    def _read(self, block, address, count, value):
+        self.reads.append((block, address, count))
+        mapped = self.mapped.get(block, set())
+        if all(address + i in mapped for i in range(count)):
+            return Result([value] * count)
+        return Result()
+
+    async def read_holding_registers(self, address, count=1, device_id=1):
+        return self._read("hr", address, count, 0)
+
+    async def read_discrete_inputs(self, address, count=1, device_id=1):
+        return self._read("di", address, count, False)
+
+
+@pytest.mark.unit
+class TestRegisterMaps:
+    """寄存器映射測試類"""
+
+    @pytest.mark.parametrize("driver_factory, simulator_class, read", [
+        (lambda: FlowMeterDriver(TCP_CONFIG), FlowMeterSimulator, "read_all"),
+        (lambda: PressureSensorDriver("positive", TCP_CONFIG), PressureSensorSimulator, "read_pressure"),
+        (lambda: PressureSensorDriver("vacuum", TCP_CONFIG), PressureSensorSimulator, "read_pressure"),
+        (lambda: SinglePhasePowerMeterDriver("dc", TCP_CONFIG), SinglePhasePowerMeterSimulator, "read_all"),
+        (lambda: ThreePhasePowerMeterDriver(TCP_CONFIG), ThreePhasePowerMeterSimulator, "read_all"),
+        (lambda: RelayIODriver(TCP_CONFIG), RelayIOSimulator, "read_digital_inputs"),
+    ])
+    async def test_backend_driver_reads(self, driver_factory, simulator_class, read):
+        """後端驅動的每個讀取都在模擬器映射的範圍內"""
+        driver = driver_factory()
+        client = MappedClient(simulator_class)
+        driver.client = client
+        failures = []
+        driver.read_observer = lambda address, count, registers: (
+            failures.append((address, count)) if registers is None else None
+        )
+        result = await getattr(driver, read)()
+        assert client.reads
+        assert failures == []
+        assert result is not None
+        if isinstance(result, dict):
+            assert None not in result.values()
+
+    @pytest.mark.parametrize("device_id, simulator_class", [
+        ("flow_meter", FlowMeterSimulator),
+        ("pressure_positive", PressureSensorSimulator),
+        ("pressure_vacuum", PressureSensorSimulator),
+        ("dc_meter", SinglePhasePowerMeterSimulator),
+        ("ac110v_meter", SinglePhasePowerMeterSimulator),
+        ("ac220v_meter", SinglePhasePowerMeterSimulator),
+        ("ac220v_3p_meter", ThreePhasePowerMeterSimulator),
+    ])
+    async def test_admin_api_reads(self, device_id, simulator_class):
+        """管理 API 的寄存器讀取都在模擬器映射的範圍內"""
+        module = load_admin_reader()
+        config = module.DEVICE_REGISTER_CONFIG[device_id]
+        reader = module.ModbusReader()
+        client = MappedClient(simulator_class)
+        reader.clients["localhost:5020"] = client
+        result = await reader.read_registers(device_id, {"enabled": True, "port": 5020, "slave_id": 1})
+        assert client.reads == [("hr", config["start_address"], config["count"])]
+        assert result is not None and len(result["registers"]) == config["count"]
@@ -0,0 +1,74 @@
+"""模擬器引擎排程測試"""
+import pytest
+from simulator.engine import SimulatorEngine
+
+
+class FakeDevice:
+    def __init__(self, slave_id, port, update_interval=None):
+        self.slave_id = slave_id
+        self.port = port
+        self.update_interval = update_interval
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+    def tick(self, now):
+        self.update()
+
+
+@pytest.mark.unit
+class TestSimulatorEngine:
+    """模擬器引擎測試類"""
+
+    def test_devices_share_ports_by_slave_id(self):
+        """同端口以 Slave ID 區分，重複時拒絕"""
+        engine = SimulatorEngine()
+        engine.add_device(FakeDevice(1, 5020))
+        engine.add_device(FakeDevice(2, 5020))
+        engine.add_device(FakeDevice(1, 5021))
+        assert sorted(engine.ports[5020]) == [1, 2]
+        assert len(engine.devices) == 3
+        with pytest.raises(ValueError):
+            engine.add_device(FakeDevice(2, 5020))
+
+    def test_single_schedule_runs_each_device_at_its_interval(self):
+        """單一排程依各設備的週期更新，事件驅動的設備不排程"""
+        engine = SimulatorEngine()
+        fast = engine.add_device(FakeDevice(1, 5021, update_interval=0.5))
+        slow = engine.add_device(FakeDevice(2, 5025, update_interval=1.0))
+        relay = engine.add_device(FakeDevice(1, 5027))
+        ticks = []
+        engine.schedule("plant", ticks.append, 0.05)
+
+        start = engine.next_due
+        for i in range(101):
+            engine.run_due(start + i * 0.05 + 0.001)
+
+        assert len(engine._jobs) == 3
+        assert fast.updates == 11 and slow.updates == 6
+        assert relay.updates == 0
+        assert len(ticks) == 101
+
+    def test_overrun_does_not_replay_missed_periods(self):
+        """排程落後時不補跑錯過的週期"""
+        engine = SimulatorEngine()
+        device = engine.add_device(FakeDevice(1, 5020, update_interval=1.0))
+        start = engine.next_due
+        assert engine.run_due(start + 10.0) == 1
+        assert engine.run_due(start + 10.5) == 0
+        assert engine.next_due == pytest.approx(start + 11.0)
+        assert device.updates == 1
+
+    def test_failing_job_keeps_schedule(self):
+        """工作異常時記錄並繼續排程"""
+        engine = SimulatorEngine()
+
+        def broken(now):
+            raise RuntimeError("boom")
+
+        job = engine.schedule("broken", broken, 1.0)
+        start = engine.next_due
+        engine.run_due(start)
+        engine.run_due(start + 1.0)
+        assert job.runs == 2
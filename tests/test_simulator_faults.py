@@ -0,0 +1,103 @@
+"""模擬器故障注入測試"""
+import json
+import pytest
+from simulator.faults import DeviceFaults, FaultController, corrupt_crc
+
+
+@pytest.mark.unit
+class TestDeviceFaults:
+    """設備故障設定測試類"""
+
+    def test_no_faults_pass_through(self):
+        """未設定故障時不延遲、不改值"""
+        faults = DeviceFaults()
+        assert faults.decide() == (None, 0.0)
+        assert faults.overlay(3, 0, [1, 2]) == [1, 2]
+
+    def test_seeded_decisions_are_reproducible(self):
+        """相同種子產生相同的故障序列，比例接近設定"""
+        spec = {"drop_rate": 0.2, "exception_rate": 0.1, "latency": {"dist": "uniform", "min": 0.01, "max": 0.02}, "seed": 7}
+        first, second = DeviceFaults(), DeviceFaults()
+        first.configure(spec)
+        second.configure(spec)
+        runs = [first.decide() for _ in range(2000)]
+        assert runs == [second.decide() for _ in range(2000)]
+        assert 300 < first.counters["drop"] < 500
+        assert all(0.01 <= delay <= 0.02 for _, delay in runs)
+
+    def test_timeout_adds_delay(self):
+        faults = DeviceFaults()
+        faults.configure({"timeout_rate": 1.0, "timeout_delay": 2.5, "latency": {"value": 0.1}})
+        assert faults.decide() == (None, pytest.approx(2.6))
+
+    def test_stuck_registers_and_flapping_input(self):
+        """卡值覆蓋讀取結果，離散輸入位元依週期翻轉"""
+        now = [0.0]
+        faults = DeviceFaults(clock=lambda: now[0])
+        faults.configure({"stuck": {"4097": 999}, "flap": {"bit": 2, "period": 0.5}})
+        assert faults.overlay(3, 0x1000, [1, 2, 3]) == [1, 999, 3]
+        assert faults.overlay(2, 0, [True] * 4) == [True, True, False, True]
+        now[0] = 0.6
+        assert faults.overlay(2, 0, [False] * 4) == [False, False, True, False]
+
+    def test_invalid_spec_rejected(self):
+        faults = DeviceFaults()
+        for spec in ({"drop_rate": 2}, {"unknown": 1}, {"exception_code": 99}, {"latency": {"dist": "pareto"}}):
+            with pytest.raises(ValueError):
+                faults.configure(spec)
+        assert not faults.active
+
+    def test_corrupt_crc(self):
+        frame = bytes([0x01, 0x03, 0x02, 0x00, 0x01, 0x79, 0x84])
+        corrupted = corrupt_crc(frame)
+        assert corrupted[:-2] == frame[:-2] and corrupted[-2:] != frame[-2:]
+
+
+@pytest.mark.unit
+class TestFaultController:
+    """故障注入控制測試類"""
+
+    def _controller(self):
+        controller = FaultController()
+        for rig in ("rig001", "rig002"):
+            for name in ("relay_io", "flow_meter"):
+                controller.register(f"{rig}/{name}", DeviceFaults())
+        return controller
+
+    def test_targets(self):
+        """完整名稱、設備名稱 (所有測試台) 與 * """
+        controller = self._controller()
+        assert controller.apply("rig001/relay_io", {"drop_rate": 1.0}) == ["rig001/relay_io"]
+        assert controller.apply("flow_meter", {"drop_rate": 1.0}) == ["rig001/flow_meter", "rig002/flow_meter"]
+        assert len(controller.status()) == 3
+        assert len(controller.clear("*")) == 4
+        assert controller.status() == {}
+        with pytest.raises(ValueError):
+            controller.apply("rig009/relay_io", {})
+
+    def test_schedule_applies_and_expires(self, tmp_path):
+        """排程項目到期套用，duration 結束後清除"""
+        path = tmp_path / "faults.json"
+        path.write_text(json.dumps({"faults": [
+            {"at": 5, "duration": 10, "target": "relay_io", "faults": {"flap": {"bit": 0, "period": 1}}},
+            {"at": 1, "target": "rig002/flow_meter", "faults": {"stuck": {"0": 1}}},
+        ]}))
+        controller = self._controller()
+        controller.load_schedule(str(path))
+        controller.tick(100.0)
+        assert controller.status() == {}
+        controller.tick(101.0)
+        assert list(controller.status()) == ["rig002/flow_meter"]
+        controller.tick(105.0)
+        assert sorted(controller.status()) == ["rig001/relay_io", "rig002/flow_meter", "rig002/relay_io"]
+        controller.tick(115.0)
+        assert list(controller.status()) == ["rig002/flow_meter"]
+
+    def test_commands(self):
+        controller = self._controller()
+        reply = controller.handle_command({"action": "set", "target": "relay_io", "faults": {"exception_rate": 0.5}})
+        assert reply["status"] == "success" and len(reply["devices"]) == 2
+        assert controller.handle_command({"action": "set", "target": "relay_io", "faults": {"drop_rate": -1}})["status"] == "error"
+        assert set(controller.handle_command({"action": "status"})["faults"]) == {"rig001/relay_io", "rig002/relay_io"}
+        assert controller.handle_command({"action": "clear", "target": "*"})["status"] == "success"
+        assert controller.handle_command({"action": "reboot"})["status"] == "error"
@@ -0,0 +1,77 @@
+"""模擬器機群分配與清單測試"""
+import json
+import pytest
+from simulator.fleet import (
+    load_template, load_buses, allocate, assign_buses, build_manifest, write_manifest, MAX_SLAVE_ID
+)
+from config.stations import load_station_configs
+
+
+@pytest.fixture
+def template():
+    return load_template()
+
+
+@pytest.mark.unit
+class TestSimulatorFleet:
+    """模擬器機群測試類"""
+
+    def test_single_rig_matches_template(self, template):
+        """單台測試台的端口與 Slave ID 與範本相同"""
+        (rig,) = allocate(template, 1)
+        assert rig.devices == {name: (spec["port"], spec["slave_id"]) for name, spec in template.items()}
+        assert rig.devices["relay_io"] == (5027, 1)
+
+    @pytest.mark.parametrize("mode", ["ports", "slaves"])
+    def test_allocations_do_not_collide(self, template, mode):
+        """每個設備的 (端口, Slave ID) 唯一，且每個端口只屬於一個工作程序"""
+        rigs = allocate(template, 200, workers=4, mode=mode, base_port=20000)
+        endpoints = [endpoint for rig in rigs for endpoint in rig.devices.values()]
+        assert len(set(endpoints)) == len(endpoints) == 200 * len(template)
+        assert all(1 <= slave <= MAX_SLAVE_ID for _, slave in endpoints)
+
+        owners = {}
+        for rig in rigs:
+            for port, _ in rig.devices.values():
+                assert owners.setdefault(port, rig.worker) == rig.worker
+        assert sorted({rig.worker for rig in rigs}) == [0, 1, 2, 3]
+
+    def test_slave_mode_limits_rigs_per_worker(self, template):
+        """Slave ID 不足時要求增加工作程序"""
+        allocate(template, 61, mode="slaves")
+        with pytest.raises(ValueError):
+            allocate(template, 62, mode="slaves")
+        with pytest.raises(ValueError):
+            allocate(template, 2, mode="ports", base_port=65530)
+
+    def test_manifest_is_a_backend_stations_file(self, template, tmp_path):
+        """機群清單可直接作為後端的工作站配置"""
+        rigs = allocate(template, 3, workers=2, base_port=20000)
+        path = tmp_path / "fleet.json"
+        write_manifest(build_manifest(rigs, "sim-host", "ports"), str(path))
+
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        assert manifest["fleet"]["workers"] == [
+            {"index": 0, "rigs": ["rig001", "rig003"]}, {"index": 1, "rigs": ["rig002"]}
+        ]
+        stations = load_station_configs(str(path))
+        assert [s.station_id for s in stations] == ["rig001", "rig002", "rig003"]
+        relay = stations[2].devices["relay_io"]
+        assert (relay["port"], relay["tcp_port"], relay["slave_id"], relay["use_tcp"]) == ("sim-host", 20023, 1, True)
+
+    @pytest.mark.parametrize("mode, expected", [("ports", "/tmp/sim/ttySIM0_rig002"), ("slaves", "/tmp/sim/ttySIM0_w1")])
+    def test_rtu_buses_follow_allocation(self, template, tmp_path, mode, expected):
+        """RTU 模式依分配方式指定匯流排，清單中的設備以串口連線並共用匯流排"""
+        buses = load_buses(template=template)
+        assert buses["meters"]["devices"] == ["dc_meter", "ac110v_meter", "ac220v_meter", "ac220v_3p_meter"]
+        rigs = allocate(template, 2, workers=2, mode=mode, base_port=20000)
+        assign_buses(rigs, buses, mode, link_dir="/tmp/sim")
+        path = tmp_path / "fleet.json"
+        write_manifest(build_manifest(rigs, "sim-host", mode, buses), str(path))
+
+        station = load_station_configs(str(path))[1]
+        meters = [station.devices[name] for name in buses["meters"]["devices"]]
+        assert {meter["port"] for meter in meters} == {expected}
+        assert [meter["slave_id"] for meter in meters] == [1, 2, 3, 4]
+        pressure = station.devices["pressure_vacuum"]
+        assert (pressure["use_tcp"], pressure["baudrate"], pressure["parity"]) == (False, 19200, "E")
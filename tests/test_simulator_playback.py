@@ -0,0 +1,87 @@
+"""模擬值播放測試"""
+import json
+import pytest
+from simulator.playback import Generator, Playback, PlaybackClock
+from pump_backend.drivers.bus_capture import BusCapture
+
+
+def rtu_exchange(channel, unit, address, registers):
+    data = b"".join(r.to_bytes(2, "big") for r in registers)
+    channel.trace(True, bytes([unit, 3]) + address.to_bytes(2, "big") + len(registers).to_bytes(2, "big") + b"\x00\x00")
+    channel.trace(False, bytes([unit, 3, len(data)]) + data + b"\x00\x00")
+
+
+@pytest.mark.unit
+class TestPlayback:
+    """模擬值播放測試類"""
+
+    def test_generators(self):
+        sine = Generator({"type": "sine", "offset": 5, "amplitude": 2, "period": 4})
+        assert sine.value(1.0) == pytest.approx(7.0)
+        assert sine.value(3.0) == pytest.approx(3.0)
+        ramp = Generator({"type": "ramp", "start": 0, "end": 10, "duration": 5}, loop=False)
+        assert [ramp.value(t) for t in (0, 2.5, 9)] == [0, 5, 10]
+        assert Generator({"type": "ramp", "end": 10, "duration": 5}).value(6) == pytest.approx(2)
+        step = Generator({"type": "step", "levels": [1, 2, 3], "interval": 10})
+        assert [step.value(t) for t in (0, 15, 25, 31)] == [1, 2, 3, 1]
+        noisy = Generator({"type": "constant", "value": 1, "noise": 0.5, "min": 0, "seed": 3})
+        values = [noisy.value(0) for _ in range(500)]
+        assert min(values) >= 0 and 0.9 < sum(values) / len(values) < 1.1
+        for spec in ({"type": "square"}, {"type": "sine", "period": 0}, {"type": "step", "levels": [1, 2]}):
+            with pytest.raises(ValueError):
+                Generator(spec)
+
+    def test_clock_speed_is_shared(self):
+        """同一時鐘的設備同步，倍速換算播放位置"""
+        playback = Playback({"speed": 2.0, "devices": {
+            "flow_meter": {"instantaneous_flow": {"type": "ramp", "end": 100, "duration": 100}},
+            "pressure_positive": {"pressure": {"type": "ramp", "end": 10, "duration": 100}},
+        }})
+        clock = PlaybackClock(playback.speed, start=50.0)
+        flow = playback.for_device("flow_meter", clock)
+        pressure = playback.for_device("pressure_positive", clock)
+        assert playback.for_device("relay_io", clock) is None
+        assert flow.values(60.0) == {"instantaneous_flow": pytest.approx(20.0)}
+        assert pressure.values(60.0) == {"pressure": pytest.approx(2.0)}
+
+    def test_data_logger_csv_is_interpolated(self, tmp_path):
+        """後端測試記錄 CSV 依共同起點線性內插"""
+        path = tmp_path / "test_1.csv"
+        path.write_text(
+            "timestamp,flow_instantaneous,pressure_positive,dc_current\n"
+            "1000.0,10.0,,1.0\n"
+            "1002.0,20.0,3.0,\n"
+            "1004.0,20.0,5.0,2.0\n"
+        )
+        (tmp_path / "playback.json").write_text(json.dumps({"loop": False, "traces": [{"file": "test_1.csv"}]}))
+        playback = Playback.load(str(tmp_path / "playback.json"))
+        assert playback.devices == ["dc_meter", "flow_meter", "pressure_positive"]
+        clock = PlaybackClock(start=0.0)
+        assert playback.for_device("flow_meter", clock).values(1.0) == {"instantaneous_flow": pytest.approx(15.0)}
+        assert playback.for_device("pressure_positive", clock).values(3.0) == {"pressure": pytest.approx(4.0)}
+        assert playback.for_device("dc_meter", clock).values(10.0) == {"current": pytest.approx(2.0)}
+
+    def test_register_recording_and_bus_capture(self, tmp_path):
+        """寄存器錄製與匯流排錄製以原始寄存器播放 (維持前值)"""
+        recording = tmp_path / "run.jsonl"
+        recording.write_text("\n".join(json.dumps(line) for line in (
+            {"config": {}, "started_at": 0},
+            {"t": 100.0, "c": 0, "d": "flow_meter", "a": 0, "n": 3, "r": [5, 0, 7]},
+            {"t": 101.0, "c": 1, "d": "flow_meter", "a": 0, "n": 3, "r": None},
+            {"t": 102.0, "c": 2, "d": "flow_meter", "a": 0, "n": 3, "r": [9, 0, 8]},
+        )))
+        capture = BusCapture(str(tmp_path / "captures"))
+        channel = capture.channel("rtu:/dev/ttyUSB0", "rtu")
+        rtu_exchange(channel, 2, 0x1000, [31])
+        rtu_exchange(channel, 2, 0x1000, [32])
+        capture.close()
+
+        playback = Playback({"loop": False, "traces": [
+            {"file": str(recording)},
+            {"file": str(capture.path), "devices": {"rtu:/dev/ttyUSB0/2": "pressure_positive"}},
+        ]})
+        clock = PlaybackClock(start=0.0)
+        flow = playback.for_device("flow_meter", clock)
+        assert flow.register_values(1.5) == {0: 5, 1: 0, 2: 7}
+        assert flow.register_values(2.0) == {0: 9, 1: 0, 2: 8}
+        assert playback.for_device("pressure_positive", clock).register_values(60.0) == {0x1000: 32}
@@ -0,0 +1,146 @@
+"""RTU 模擬匯流排測試"""
+import asyncio
+import os
+import select
+import time
+import pytest
+from pymodbus.constants import ExcCodes
+from simulator.rtu import RtuBus, SerialSettings, crc16, request_length, with_crc
+
+
+class FakeStore:
+    """以字典保存寄存器/線圈的設備上下文 (未映射位址回應非法位址)"""
+
+    def __init__(self, registers=None, coils=None):
+        self.registers = dict(registers or {})
+        self.coils = dict(coils or {})
+        self.pending_corrupt = False
+
+    def _table(self, function):
+        return self.coils if function in (1, 2, 5, 15) else self.registers
+
+    async def async_getValues(self, function, address, count=1):
+        table = self._table(function)
+        if any(address + i not in table for i in range(count)):
+            return ExcCodes.ILLEGAL_ADDRESS
+        return [table[address + i] for i in range(count)]
+
+    async def async_setValues(self, function, address, values):
+        table = self._table(function)
+        for i, value in enumerate(values):
+            table[address + i] = value
+
+
+class FakeDevice:
+    def __init__(self, slave_id, store):
+        self.slave_id = slave_id
+        self.store = store
+
+
+def read_request(unit, function, address, count):
+    return with_crc(bytes([unit, function]) + address.to_bytes(2, "big") + count.to_bytes(2, "big"))
+
+
+def read_frame(fd, length, timeout=2.0):
+    """讀取指定長度的回應，逾時返回已收到的部分"""
+    data = b""
+    deadline = time.monotonic() + timeout
+    while len(data) < length:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+            break
+        data += os.read(fd, 64)
+    return data
+
+
+@pytest.mark.unit
+class TestRtuBus:
+    """RTU 模擬匯流排測試類"""
+
+    def _bus(self):
+        bus = RtuBus("test", SerialSettings(19200, parity="E"))
+        bus.add_device(FakeDevice(2, FakeStore({0x1000: 42, 0x1001: 7})))
+        bus.add_device(FakeDevice(3, FakeStore(coils={i: i == 3 for i in range(8)})))
+        return bus
+
+    def test_crc_and_framing(self):
+        assert crc16(bytes.fromhex("010300000001")) == 0x0A84
+        assert request_length(bytes([1, 3])) == 8
+        assert request_length(bytes([1, 16, 0, 0, 0, 2])) is None
+        assert request_length(bytes([1, 16, 0, 0, 0, 2, 4])) == 13
+        assert SerialSettings(19200, parity="E").char_time == pytest.approx(11 / 19200)
+        assert SerialSettings(115200).frame_gap == pytest.approx(0.00175)
+
+    async def test_multiple_slaves_share_a_bus(self):
+        """同一匯流排依 Slave ID 回應，錯誤 CRC 與不存在的 Slave ID 不回應"""
+        bus = self._bus()
+        response = await bus.handle(read_request(2, 3, 0x1000, 2))
+        assert response == with_crc(bytes([2, 3, 4, 0, 42, 0, 7]))
+        assert await bus.handle(read_request(3, 1, 0, 8)) == with_crc(bytes([3, 1, 1, 0b1000]))
+        assert await bus.handle(read_request(2, 3, 0x2000, 1)) == with_crc(bytes([2, 0x83, 2]))
+        assert await bus.handle(read_request(9, 3, 0x1000, 1)) is None
+        corrupted = read_request(2, 3, 0x1000, 1)[:-1] + b"\x00"
+        assert await bus.handle(corrupted) is None and bus.stats["crc_errors"] == 1
+
+    async def test_writes_and_broadcast(self):
+        bus = self._bus()
+        request = with_crc(bytes([2, 16, 0x10, 0x00, 0, 2, 4, 0, 1, 0, 2]))
+        assert await bus.handle(request) == with_crc(bytes([2, 16, 0x10, 0x00, 0, 2]))
+        assert bus.devices[2].store.registers[0x1001] == 2
+        assert await bus.handle(with_crc(bytes([0, 6, 0x10, 0x00, 0, 9]))) is None
+        assert bus.devices[2].store.registers[0x1000] == 9
+
+    async def test_corrupt_crc_fault(self):
+        bus = self._bus()
+        bus.devices[2].store.pending_corrupt = True
+        response = await bus.handle(read_request(2, 3, 0x1000, 1))
+        assert crc16(response[:-2]) != int.from_bytes(response[-2:], "little")
+        assert not bus.devices[2].store.pending_corrupt
+
+    async def test_pty_round_trip_with_line_timing(self, tmp_path):
+        """經 pty 收發 (分段寫入)，回應依鮑率延遲"""
+        bus = self._bus()
+        bus.link = str(tmp_path / "ttySIM3")
+        await bus.start()
+        fd = os.open(bus.link, os.O_RDWR | os.O_NOCTTY)
+        try:
+            request = read_request(2, 3, 0x1000, 2)
+            started = time.monotonic()
+            os.write(fd, request[:3])
+            os.write(fd, request[3:])
+            response = await asyncio.to_thread(read_frame, fd, 9)
+            elapsed = time.monotonic() - started
+            assert response == with_crc(bytes([2, 3, 4, 0, 42, 0, 7]))
+            assert elapsed >= bus.response_delay(request, response) * 0.9
+        finally:
+            os.close(fd)
+            await bus.stop()
+        assert not os.path.lexists(tmp_path / "ttySIM3")
+
+    async def test_failing_request_does_not_stop_the_bus(self, tmp_path):
+        """設備上下文拋出例外時記錄並繼續處理下一個請求"""
+        bus = self._bus()
+        store = bus.devices[2].store
+        get_values = store.async_getValues
+        failures = [RuntimeError("boom")]
+
+        async def flaky(function, address, count=1):
+            if failures:
+                raise failures.pop()
+            return await get_values(function, address, count)
+
+        store.async_getValues = flaky
+        bus.link = str(tmp_path / "ttySIM3")
+        bus.emulate_timing = False
+        await bus.start()
+        fd = os.open(bus.link, os.O_RDWR | os.O_NOCTTY)
+        try:
+            os.write(fd, read_request(2, 3, 0x1000, 2))
+            await asyncio.sleep(0.05)
+            os.write(fd, read_request(2, 3, 0x1000, 2))
+            response = await asyncio.to_thread(read_frame, fd, 9)
+            assert response == with_crc(bytes([2, 3, 4, 0, 42, 0, 7]))
+            assert not failures
+        finally:
+            os.close(fd)
+            await bus.stop()
@@ -0,0 +1,74 @@
+"""最新狀態快取服務測試"""
+import pytest
+from pump_backend.services.state_cache import StateCache
+
+
+def drain(mqtt_client):
+    """取出發布佇列中的所有訊息"""
+    items = []
+    while not mqtt_client._outgoing.empty():
+        topic, payload, qos, retain = mqtt_client._outgoing.get_nowait()[:4]
+        items.append((topic, payload, qos, retain))
+    return items
+
+
+@pytest.mark.unit
+@pytest.mark.mqtt
+class TestStateCache:
+    """最新狀態快取測試類"""
+
+    @pytest.fixture
+    def cache(self, mqtt_client):
+        cache = StateCache(mqtt_client, sensor_interval=60.0)
+        cache.start()
+        return cache
+
+    def test_publishes_retained_state_on_change(self, mqtt_client, cache):
+        """來源主題數值改變時應發布保留訊息"""
+        mqtt_client.publish_nowait("pump/safety/status", {"emergency_stop": False, "timestamp": 1})
+        drain(mqtt_client)
+
+        cache.flush()
+        topic, payload, qos, retain = drain(mqtt_client)[0]
+        assert topic == "pump/state/safety/status"
+        assert payload["emergency_stop"] is False
+        assert qos == 1
+        assert retain is True
+
+    def test_unchanged_value_not_republished(self, mqtt_client, cache):
+        """只有時間戳改變時不應重新發布"""
+        mqtt_client.publish_nowait("pump/system/relays", {"relays": {"0": True}, "timestamp": 1})
+        cache.flush()
+        drain(mqtt_client)
+
+        mqtt_client.publish_nowait("pump/system/relays", {"relays": {"0": True}, "timestamp": 2})
+        cache.flush()
+        assert not [m for m in drain(mqtt_client) if m[0].startswith("pump/state/")]
+
+    def test_sensor_state_throttled(self, mqtt_client, cache):
+        """感測器狀態應受最小發布間隔限制，停止時強制送出"""
+        mqtt_client.publish_nowait("pump/sensors/flow", {"flow": 1.0})
+        cache.flush()
+        mqtt_client.publish_nowait("pump/sensors/flow", {"flow": 2.0})
+        cache.flush()
+
+        state = [m for m in drain(mqtt_client) if m[0] == "pump/state/sensors/flow"]
+        assert [m[1]["flow"] for m in state] == [1.0]
+
+        cache.stop()
+        assert drain(mqtt_client)[0][1]["flow"] == 2.0
+
+    def test_ignores_unrelated_topics(self, mqtt_client, cache):
+        """非來源主題不應被快取"""
+        mqtt_client.publish_nowait("pump/control/valve", {"valve": "A"})
+        assert cache.snapshot()["state"] == {}
+
+    def test_snapshot_request(self, mqtt_client, cache):
+        """快照請求應返回所有最新值"""
+        mqtt_client.publish_nowait("pump/sensors/flow", {"flow": 1.5})
+        mqtt_client.publish_nowait("pump/test/status", {"state": "running"})
+
+        reply = cache._handle_snapshot_request({})
+        assert reply["state"]["pump/state/sensors/flow"]["flow"] == 1.5
+        assert reply["state"]["pump/state/test/status"]["state"] == "running"
+        assert cache.get("pump/test/status")["state"] == "running"
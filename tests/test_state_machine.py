@@ -67,4 +67,85 @@ class TestStateMachine:
             assert state_machine.get_state() == TestState.IDLE, "重置後應該回到 IDLE"
         
         asyncio.run(test())
-
+    
+    def test_async_handler_runs_as_task(self, state_machine):
+        """非同步處理器應在背景 Task 執行，不阻塞轉換"""
+        import asyncio
+        started = []
+        
+        async def handler(context):
+            started.append(True)
+            await asyncio.sleep(60)
+        
+        state_machine.register_handler(TestState.INITIALIZING, handler)
+        
+        async def test():
+            await asyncio.wait_for(state_machine.transition_to(TestState.INITIALIZING), 1.0)
+            await asyncio.sleep(0)
+            assert started, "非同步處理器應該被執行"
+            assert not state_machine.state_task.done(), "處理器應在背景持續執行"
+            state_machine.reset()
+        
+        asyncio.run(test())
+    
+    def test_exit_transition_cancels_state_task(self, state_machine):
+        """離開狀態時應立即取消處理器 Task"""
+        import asyncio
+        cancelled = []
+        
+        async def running(context):
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        
+        state_machine.register_handler(TestState.RUNNING, running)
+        
+        async def test():
+            await state_machine.transition_to(TestState.INITIALIZING)
+            await state_machine.transition_to(TestState.READY)
+            await state_machine.transition_to(TestState.RUNNING)
+            await asyncio.sleep(0)
+            
+            await asyncio.wait_for(state_machine.transition_to(TestState.PAUSED), 0.1)
+            assert cancelled, "運行中的處理器應該被取消"
+            assert state_machine.get_state() == TestState.PAUSED
+        
+        asyncio.run(test())
+    
+    def test_handler_can_transition_itself(self, state_machine):
+        """處理器自身發起的轉換不應取消自己"""
+        import asyncio
+        finished = []
+        
+        async def initializing(context):
+            await state_machine.transition_to(TestState.READY)
+            finished.append(True)
+        
+        state_machine.register_handler(TestState.INITIALIZING, initializing)
+        
+        async def test():
+            await state_machine.transition_to(TestState.INITIALIZING)
+            await state_machine.wait_state_task()
+            assert state_machine.get_state() == TestState.READY
+            assert finished, "處理器應在轉換後正常結束"
+        
+        asyncio.run(test())
+    
+    def test_transition_timing_recorded(self, state_machine):
+        """轉換歷史應記錄時間資訊"""
+        import asyncio
+        
+        async def test():
+            await state_machine.transition_to(TestState.INITIALIZING)
+            await asyncio.sleep(0.05)
+            await state_machine.transition_to(TestState.READY)
+        
+        asyncio.run(test())
+        
+        record = state_machine.transition_history[-1]
+        assert record["from"] == "initializing" and record["to"] == "ready"
+        assert record["time_in_state_s"] >= 0.04
+        assert record["transition_ms"] >= 0
+        assert "timestamp" in record
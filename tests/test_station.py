@@ -0,0 +1,163 @@
+"""多工作站測試 (主題命名空間、隔離與共用傳輸連線池)"""
+import json
+import pytest
+import asyncio
+from config.settings import settings
+from config.stations import load_station_configs
+from models.enums import TestState as State
+from pump_backend.core.station_mqtt import StationMQTTClient
+from pump_backend.drivers.transport_pool import TransportPool
+from pump_backend.drivers.flow_meter import FlowMeterDriver
+from pump_backend.services.test_automation import TestAutomation as Automation
+
+
+def drain(mqtt_client):
+    """取出發布佇列中的所有訊息"""
+    items = []
+    while not mqtt_client._outgoing.empty():
+        items.append(mqtt_client._outgoing.get_nowait())
+    return items
+
+
+@pytest.mark.unit
+@pytest.mark.mqtt
+class TestStationTopics:
+    """工作站主題命名空間測試類"""
+
+    def test_publish_is_namespaced_with_policy_qos(self, mqtt_client):
+        """發布主題應加上工作站命名空間，並沿用原主題的 QoS 策略"""
+        rig = StationMQTTClient(mqtt_client, "rig1")
+        rig.publish_nowait("pump/sensors/flow", {"instantaneous_flow": 1.0})
+        rig.publish_nowait("pump/system/alert", {"type": "emergency"})
+
+        assert [(topic, qos) for topic, _, qos, _ in drain(mqtt_client)] == [
+            ("pump/rig1/sensors/flow", 0),
+            ("pump/rig1/system/alert", 2),
+        ]
+        assert mqtt_client.should_buffer("pump/rig1/test/record")
+        assert not mqtt_client.should_buffer("pump/rig1/system/alert")
+
+    def test_rpc_and_subscriptions_are_namespaced(self, mqtt_client):
+        """訂閱與請求處理器 (含舊版回應主題) 應註冊於工作站主題"""
+        rig = StationMQTTClient(mqtt_client, "rig1")
+        rig.subscribe("pump/control/test", lambda payload: None)
+        rig.register_rpc_handler("pump/control/valve", lambda payload: {}, "pump/control/valve/status")
+
+        assert "pump/rig1/control/test" in mqtt_client.subscriptions
+        assert mqtt_client._rpc_handlers["pump/rig1/control/valve"][1] == "pump/rig1/control/valve/status"
+
+    def test_observers_only_see_own_station(self, mqtt_client):
+        """發布觀察者只收到本工作站的發布 (主題已去除命名空間)"""
+        rig1 = StationMQTTClient(mqtt_client, "rig1")
+        rig2 = StationMQTTClient(mqtt_client, "rig2")
+        seen1, seen2 = [], []
+        rig1.add_publish_observer(lambda topic, payload: seen1.append(topic))
+        rig2.add_publish_observer(lambda topic, payload: seen2.append(topic))
+
+        rig1.publish_nowait("pump/sensors/flow", {})
+        rig2.publish_nowait("pump/safety/status", {})
+        mqtt_client.publish_nowait("pump/sensors/flow", {})
+
+        assert seen1 == ["pump/sensors/flow"]
+        assert seen2 == ["pump/safety/status"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+async def test_emergency_stop_is_isolated(mqtt_client):
+    """一個工作站的緊急停止不應影響其他工作站的測試"""
+    rigs = {}
+    transitions = []
+    for station_id in ("rig1", "rig2"):
+        mqtt = StationMQTTClient(mqtt_client, station_id)
+        automation = Automation(mqtt, control_service=None, sensor_service=None)
+        automation.state_machine.current_state = State.RUNNING
+
+        async def record(state, context=None, station_id=station_id):
+            transitions.append((station_id, state))
+
+        automation.state_machine.transition_to = record
+        mqtt.add_publish_observer(automation._on_publish)
+        rigs[station_id] = mqtt
+
+    await rigs["rig1"].publish("pump/system/alert", {"type": "emergency"})
+    await asyncio.sleep(0.01)
+
+    assert transitions == [("rig1", State.STOPPED)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+@pytest.mark.modbus
+class TestTransportPool:
+    """共用傳輸連線池測試類"""
+
+    DEVICE = {"port": "localhost", "tcp_port": 5020, "use_tcp": True, "slave_id": 1, "timeout": 1.0}
+
+    async def test_same_endpoint_shares_client(self):
+        """相同端點的設備應共用客戶端，最後一個釋放時才移除"""
+        pool = TransportPool()
+        meter1 = FlowMeterDriver(self.DEVICE, pool)
+        meter2 = FlowMeterDriver({**self.DEVICE, "slave_id": 2}, pool)
+        other = FlowMeterDriver({**self.DEVICE, "tcp_port": 5021}, pool)
+        key = pool.key_for("localhost", True, 5020)
+
+        assert meter1.client is meter2.client
+        assert other.client is not meter1.client
+        assert pool.refs(key) == 2
+
+        meter1.disconnect()
+        assert pool.refs(key) == 1
+        meter2.disconnect()
+        other.disconnect()
+        assert len(pool) == 0
+
+    async def test_release_reports_last_user(self):
+        """release 僅在最後一個使用者時返回 True"""
+        pool = TransportPool()
+        pool.acquire("bus", lambda: (object(), None))
+        pool.acquire("bus", lambda: pytest.fail("不應重複建立"))
+
+        assert pool.release("bus") is False
+        assert pool.release("bus") is True
+
+
+@pytest.mark.unit
+class TestStationConfig:
+    """工作站配置測試類"""
+
+    def test_default_is_single_legacy_station(self, monkeypatch):
+        """未設定配置檔時為單一工作站 (主題不加命名空間)"""
+        monkeypatch.setattr(settings, "STATIONS_FILE", None)
+        configs = load_station_configs()
+
+        assert len(configs) == 1
+        assert configs[0].station_id is None
+
+    def test_device_overrides_are_merged(self, tmp_path):
+        """工作站設備配置應逐欄位覆寫預設值"""
+        path = tmp_path / "stations.json"
+        path.write_text(json.dumps({"stations": [
+            {"id": "rig1"},
+            {"id": "rig2", "devices": {"relay_io": {"slave_id": 9}}},
+        ]}))
+        rig1, rig2 = load_station_configs(str(path))
+
+        assert rig2.devices["relay_io"]["slave_id"] == 9
+        assert rig2.devices["relay_io"]["port"] == rig1.devices["relay_io"]["port"]
+        assert rig1.devices["relay_io"]["slave_id"] != 9
+        assert rig2.data_dir.endswith("rig2")
+
+    @pytest.mark.parametrize("stations", [
+        [{"id": "rig1"}, {"id": "rig1"}],
+        [{"id": "sensors"}],
+        [{"id": "rig/1"}],
+        [{"id": "rig1", "devices": {"unknown": {}}}],
+    ])
+    def test_invalid_config_rejected(self, tmp_path, stations):
+        """重複、保留或無效的工作站 ID 及未知設備應拒絕"""
+        path = tmp_path / "stations.json"
+        path.write_text(json.dumps({"stations": stations}))
+
+        with pytest.raises(ValueError):
+            load_station_configs(str(path))
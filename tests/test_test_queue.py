@@ -0,0 +1,160 @@
+"""批次測試佇列測試"""
+import pytest
+import asyncio
+from models.enums import QueueItemStatus, TestState as State
+from pump_backend.services.test_queue import TestQueue as Queue
+
+
+class FakeStateMachine:
+    """模擬狀態機 (僅狀態與轉換歷史)"""
+
+    def __init__(self):
+        self.state = State.IDLE
+        self.transition_history = []
+
+    def get_state(self):
+        return self.state
+
+    def set(self, state, time_in_state=0.01):
+        self.transition_history.append({
+            "from": self.state.value, "to": state.value, "time_in_state_s": time_in_state
+        })
+        self.state = state
+
+
+class FakeRecipeEngine:
+    def __init__(self):
+        self.results = []
+
+    def load_recipe(self, spec):
+        if spec == "missing":
+            raise ValueError(f"找不到配方: {spec}")
+
+
+class FakeAutomation:
+    """模擬自動測試引擎: 開始測試後依 outcome 發布結果與結束狀態"""
+
+    def __init__(self, mqtt_client, outcome=State.COMPLETED):
+        self.mqtt = mqtt_client
+        self.outcome = outcome
+        self.state_machine = FakeStateMachine()
+        self.recipe_engine = FakeRecipeEngine()
+        self.started = []
+
+    async def start_test(self, config):
+        self.started.append(config)
+        self.state_machine.set(State.INITIALIZING)
+        asyncio.create_task(self._run(config))
+
+    async def _run(self, config):
+        await asyncio.sleep(0.02)
+        self.state_machine.set(State.RUNNING, 0.02)
+        await asyncio.sleep(0.02)
+        self.state_machine.set(self.outcome, 0.02)
+        await self.mqtt.publish("pump/test/record", {"test_id": config["test_id"], "result": "PASS"})
+        await self.mqtt.publish("pump/test/status", {"state": self.outcome.value})
+
+    def reset_test(self):
+        self.state_machine.set(State.IDLE)
+
+
+def cover(mqtt_client, closed):
+    mqtt_client.publish_nowait("pump/safety/status", {"cover_closed": closed})
+
+
+async def wait_until(condition, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("等待條件逾時")
+
+
+@pytest.mark.unit
+def test_queue_persists_and_requeues_interrupted(tmp_path, mqtt_client):
+    """佇列應保存於檔案，重新載入時中斷的項目重新排入"""
+    queue_file = tmp_path / "queue.json"
+    queue = Queue(mqtt_client, FakeAutomation(mqtt_client), str(queue_file))
+    first, second = queue.enqueue([{"serial": "SN1", "recipe": "vacuum_test"}, {"serial": "SN2"}])
+    first.status = QueueItemStatus.RUNNING
+    queue._save()
+
+    reloaded = Queue(mqtt_client, FakeAutomation(mqtt_client), str(queue_file))
+
+    assert [item.serial for item in reloaded.pending()] == ["SN1", "SN2"]
+    assert reloaded.pending()[0].recipe == "vacuum_test"
+    assert reloaded.active is False
+    positions = {item["serial"]: item["position"] for item in reloaded.status()["items"]}
+    assert positions == {"SN1": 1, "SN2": 2}
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestBatchRun:
+    """批次執行測試類"""
+
+    async def test_units_run_in_sequence_with_cover_interlock(self, tmp_path, mqtt_client):
+        """兩台之間需完成開/關蓋循環才開始下一台，並統計產能與階段耗時"""
+        automation = FakeAutomation(mqtt_client)
+        queue = Queue(mqtt_client, automation, str(tmp_path / "queue.json"), poll_interval=0.01)
+        queue.start()
+        queue.enqueue([{"serial": "SN1", "recipe": "vacuum_test"}, {"serial": "SN2"}])
+        cover(mqtt_client, True)
+        queue.resume()
+        runner = asyncio.create_task(queue.run_loop())
+
+        await wait_until(lambda: queue.items[0].finished)
+        await asyncio.sleep(0.05)
+        assert len(automation.started) == 1
+        assert queue.waiting_for == "cover_cycle"
+
+        cover(mqtt_client, False)
+        cover(mqtt_client, True)
+        await wait_until(lambda: queue.items[1].finished)
+        queue.stop()
+        await runner
+
+        first, second = queue.items
+        assert automation.started[0]["recipe"] == "vacuum_test"
+        assert automation.started[0]["serial_number"] == "SN1"
+        assert first.status == QueueItemStatus.COMPLETED and first.result == "PASS"
+        assert first.phases["running"] == pytest.approx(0.02)
+        assert "changeover" in second.phases and "changeover" not in first.phases
+        throughput = queue.status()["throughput"]
+        assert throughput["units"] == 2
+        assert throughput["units_per_hour"] > 0
+
+    async def test_stopped_unit_pauses_queue(self, tmp_path, mqtt_client):
+        """測試被停止時佇列應暫停，不再開始下一台"""
+        automation = FakeAutomation(mqtt_client, outcome=State.STOPPED)
+        queue = Queue(
+            mqtt_client, automation, str(tmp_path / "queue.json"),
+            require_cover_cycle=False, poll_interval=0.01
+        )
+        queue.start()
+        queue.enqueue([{"serial": "SN1"}, {"serial": "SN2"}])
+        cover(mqtt_client, True)
+        queue.resume()
+        runner = asyncio.create_task(queue.run_loop())
+
+        await wait_until(lambda: queue.items[0].finished)
+        await asyncio.sleep(0.05)
+        queue.stop()
+        await runner
+
+        assert queue.items[0].status == QueueItemStatus.STOPPED
+        assert queue.items[1].status == QueueItemStatus.PENDING
+        assert queue.active is False
+        assert len(automation.started) == 1
+
+    async def test_enqueue_command_validates_recipe(self, tmp_path, mqtt_client):
+        """排入不存在的配方應回覆錯誤且不改變佇列"""
+        queue = Queue(mqtt_client, FakeAutomation(mqtt_client), str(tmp_path / "queue.json"))
+
+        reply = await queue._handle_command({"action": "enqueue", "serials": ["SN1"], "recipe": "missing"})
+        assert reply["status"] == "error"
+        assert queue.items == []
+
+        reply = await queue._handle_command({"action": "enqueue", "serials": ["SN1", "SN2"], "recipe": "flow_test"})
+        assert reply["status"] == "success"
+        assert [item.recipe for item in queue.pending()] == ["flow_test", "flow_test"]
@@ -0,0 +1,51 @@
+"""趨勢預測測試"""
+import pytest
+import random
+from pump_backend.utils.trend_predictor import ExponentialPredictor
+
+
+def feed(predictor, curve, seconds, rate_hz=10, noise=0.0, seed=1):
+    rng = random.Random(seed)
+    for k in range(int(seconds * rate_hz)):
+        t = k / rate_hz
+        predictor.update(t, curve(t) + rng.gauss(0, noise))
+
+
+@pytest.mark.unit
+class TestExponentialPredictor:
+    """指數趨近預測測試類"""
+
+    def test_predicts_final_value_early(self):
+        """約一個時間常數後即可預測最終值"""
+        predictor = ExponentialPredictor(forgetting=0.98)
+        feed(predictor, lambda t: -60.0 * (1 - 0.92 ** t), seconds=15, noise=0.3)
+
+        final, std = predictor.prediction()
+        assert final == pytest.approx(-60.0, abs=2.0)
+        assert std < 2.0
+        assert predictor.time_constant == pytest.approx(12.0, rel=0.15)
+
+    def test_uncertainty_shrinks_with_data(self):
+        """資料越多預測標準差越小"""
+        curve = lambda t: 95.0 * (1 - 0.9 ** t)
+        short, long = ExponentialPredictor(), ExponentialPredictor()
+        feed(short, curve, seconds=12, noise=0.5)
+        feed(long, curve, seconds=30, noise=0.5)
+
+        assert long.prediction()[1] < short.prediction()[1]
+
+    def test_no_prediction_without_trend(self):
+        """純雜訊或資料不足時不預測"""
+        noise_only = ExponentialPredictor()
+        feed(noise_only, lambda t: 0.0, seconds=30, noise=0.2)
+        assert noise_only.prediction() is None
+
+        few = ExponentialPredictor(min_points=10)
+        feed(few, lambda t: -95.0 * (1 - 0.9 ** t), seconds=5)
+        assert few.prediction() is None
+
+    def test_diverging_ramp_not_predicted(self):
+        """持續線性上升 (不收斂) 時不預測"""
+        predictor = ExponentialPredictor()
+        feed(predictor, lambda t: 2.0 * t, seconds=30)
+        assert predictor.prediction() is None